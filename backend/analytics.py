@@ -0,0 +1,298 @@
+"""
+内存中的列式统计引擎
+
+活跃用户的余额、趋势、分类统计和概览每次请求都要重新扫描同一批交易。启用后
+（ANALYTICS_ENGINE=1），用户的交易在第一次使用时加载为几列紧凑的数组：
+
+- days：created_at所在日期（date.toordinal()），months：年*12+月-1
+- amounts：金额（分），incomes：收入为1、支出为0
+- categories：分类在names中的下标（分类字符串只保存一份）
+
+统计接口在这几列上按日期、月份或分类分组求和：安装了NumPy时用bincount，
+否则逐行累加。加载的数据包含归档表，结果与SQL查询一致。
+
+交易提交后写入方调用repository.notify_change()：只有新增时下次使用前只加载
+id更大的交易追加到数组末尾，修改或删除时下次使用前重新加载。只在SQLite上追加：
+SQLite同一时间只有一个写事务，交易按id顺序提交；PostgreSQL上并发的插入可能先提交
+id较大的一笔，按id追加会永久漏掉较小的那笔，所以有变化时一律重新加载。按用户的LRU限制内存，
+最多保留max_users个用户。引擎在进程内，其他进程的写入不会通知到这里；同时启用
+共享缓存（shared_cache）时按其中的用户版本号发现其他进程的写入，重新加载。
+"""
+
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date
+
+try:
+    from backend import repository
+    from backend.archive import transactions_source
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    import repository
+    from archive import transactions_source
+
+try:
+    import numpy
+except ImportError:  # 可选依赖，没有时逐行计算
+    numpy = None
+
+
+def _month_key(created_at):
+    return int(created_at[:4]) * 12 + int(created_at[5:7]) - 1
+
+
+def _month_text(key):
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+def _rows(columns, values):
+    """转换为与repository.fetch_all相同的结果"""
+    index = repository.column_index((name,) for name in columns)
+    rows = repository.Rows(repository.Record(index, row) for row in values)
+    rows.columns = list(columns)
+    return rows
+
+
+class UserColumns:
+    """一个用户全部交易的列式数据"""
+
+    def __init__(self, use_numpy=True):
+        self.days = array("q")
+        self.months = array("q")
+        self.amounts = array("q")
+        self.incomes = array("b")
+        self.categories = array("q")
+        self.names = []
+        self._name_index = {}
+        self.last_id = 0
+        self.use_numpy = use_numpy and numpy is not None
+        self.lock = threading.Lock()
+
+    def append(self, rows):
+        """按id顺序追加(id, created_at, type, amount, category)行，已有的行跳过"""
+        with self.lock:
+            for tx_id, created_at, trans_type, amount, category in rows:
+                if tx_id <= self.last_id:
+                    continue
+                created_at = str(created_at)
+                self.days.append(date.fromisoformat(created_at[:10]).toordinal())
+                self.months.append(_month_key(created_at))
+                self.amounts.append(amount)
+                self.incomes.append(1 if trans_type == "income" else 0)
+                index = self._name_index.get(category)
+                if index is None:
+                    index = self._name_index[category] = len(self.names)
+                    self.names.append(category)
+                self.categories.append(index)
+                self.last_id = tx_id
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def _group(self, keys, low=None, high=None):
+        """按keys分组，返回{键: [收入, 支出, 笔数, 支出笔数]}，只统计low <= 键 < high的行"""
+        with self.lock:
+            if self.use_numpy:
+                return self._group_numpy(keys, low, high)
+            return self._group_python(keys, low, high)
+
+    def _group_python(self, keys, low, high):
+        groups = {}
+        for key, amount, income in zip(keys, self.amounts, self.incomes):
+            if (low is not None and key < low) or (high is not None and key >= high):
+                continue
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0, 0, 0, 0]
+            if income:
+                group[0] += amount
+            else:
+                group[1] += amount
+                group[3] += 1
+            group[2] += 1
+        return groups
+
+    def _group_numpy(self, keys, low, high):
+        keys = numpy.frombuffer(keys, dtype=numpy.int64)
+        amounts = numpy.frombuffer(self.amounts, dtype=numpy.int64)
+        incomes = numpy.frombuffer(self.incomes, dtype=numpy.int8).astype(bool)
+        if low is not None or high is not None:
+            mask = numpy.ones(len(keys), dtype=bool)
+            if low is not None:
+                mask &= keys >= low
+            if high is not None:
+                mask &= keys < high
+            keys, amounts, incomes = keys[mask], amounts[mask], incomes[mask]
+        if not len(keys):
+            return {}
+
+        unique, inverse = numpy.unique(keys, return_inverse=True)
+        size = len(unique)
+        # bincount按float64累加，金额是整数分，合计在2**53以内时结果精确
+        income = numpy.bincount(
+            inverse, weights=numpy.where(incomes, amounts, 0), minlength=size
+        )
+        expense = numpy.bincount(
+            inverse, weights=numpy.where(incomes, 0, amounts), minlength=size
+        )
+        count = numpy.bincount(inverse, minlength=size)
+        expenses = numpy.bincount(inverse, weights=~incomes, minlength=size)
+        return {
+            int(key): [int(i), int(e), int(c), int(x)]
+            for key, i, e, c, x in zip(unique, income, expense, count, expenses)
+        }
+
+    def _totals(self, low=None, high=None, keys=None):
+        groups = self._group(self.days if keys is None else keys, low, high)
+        income = sum(group[0] for group in groups.values())
+        expense = sum(group[1] for group in groups.values())
+        return income, expense
+
+    def totals(self):
+        """全部收入和支出"""
+        return self._totals()
+
+    def totals_since(self, day):
+        """day（date，含）之后的收入和支出"""
+        return self._totals(low=day.toordinal())
+
+    def balance_before(self, day):
+        """day（date，不含）之前的余额"""
+        income, expense = self._totals(high=day.toordinal())
+        return income - expense
+
+    def totals_on(self, day):
+        return self._totals(low=day.toordinal(), high=day.toordinal() + 1)
+
+    def totals_in_month(self, day):
+        """day所在月份的收入和支出"""
+        key = day.year * 12 + day.month - 1
+        return self._totals(low=key, high=key + 1, keys=self.months)
+
+    def active_days(self):
+        """有交易的天数"""
+        return len(self._group(self.days))
+
+    def daily(self, day):
+        """day（date，含）之后每天的(日期, 收入, 支出)，按日期排序"""
+        groups = self._group(self.days, low=day.toordinal())
+        return [
+            (date.fromordinal(key).strftime("%Y-%m-%d"), group[0], group[1])
+            for key, group in sorted(groups.items())
+        ]
+
+    def monthly_totals(self, limit=12):
+        """最近limit个月的收入和支出，与repository.monthly_totals相同"""
+        groups = self._group(self.months)
+        keys = sorted(groups, reverse=True)[:limit]
+        return _rows(
+            ("month", "income", "expense"),
+            ((_month_text(key), groups[key][0], groups[key][1]) for key in keys),
+        )
+
+    def expense_by_category(self):
+        """按分类的支出合计，与repository.expense_by_category相同"""
+        groups = self._group(self.categories)
+        totals = [
+            (self.names[key], group[1]) for key, group in groups.items() if group[3]
+        ]
+        totals.sort(key=lambda row: row[1], reverse=True)
+        return _rows(("category", "total"), totals)
+
+    def category_totals(self):
+        """每个分类的收入、支出和笔数，与repository.category_totals相同"""
+        groups = self._group(self.categories)
+        totals = [
+            (self.names[key], group[0], group[1], group[2])
+            for key, group in groups.items()
+            if self.names[key]
+        ]
+        totals.sort(key=lambda row: row[3], reverse=True)
+        return _rows(("category", "income", "expense", "count"), totals)
+
+
+class AnalyticsEngine:
+    """按用户缓存列式数据，最多max_users个用户（LRU）"""
+
+    def __init__(self, max_users=200, use_numpy=True):
+        self.max_users = max(max_users, 1)
+        self.use_numpy = use_numpy
+        self.loads = 0
+        self.appends = 0
+        self._entries = OrderedDict()
+        # 每个用户的变化次数，和最近一次修改或删除时的次数
+        self._generations = {}
+        self._reload_generations = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def changed(self, user_id, appended=False):
+        """交易变化已提交（repository.notify_change的监听）"""
+        with self._lock:
+            generation = self._generations.get(user_id, 0) + 1
+            self._generations[user_id] = generation
+            if not appended:
+                self._reload_generations[user_id] = generation
+
+    def columns(self, conn, user_id, version=None):
+        """取用户的列式数据，有变化时先追加新交易或重新加载
+
+        version为共享缓存中用户的版本号：与加载时相比增加的次数多于本进程收到的变化时，
+        说明其他进程修改过，重新加载。
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            generation = self._generations.get(user_id, 0)
+            reload_generation = self._reload_generations.get(user_id, 0)
+
+        if entry is not None:
+            columns, loaded_generation, loaded_version = entry
+            if (
+                version is not None
+                and loaded_version is not None
+                and version - loaded_version != generation - loaded_generation
+            ):
+                entry = None
+            elif loaded_generation == generation:
+                return columns
+            elif loaded_generation >= reload_generation and isinstance(
+                conn, sqlite3.Connection
+            ):
+                columns.append(
+                    repository.transaction_columns(
+                        conn, user_id, "transactions", columns.last_id
+                    )
+                )
+                self.appends += 1
+                self._store(user_id, columns, generation, version)
+                return columns
+
+        # 先记下变化次数再查询：查询期间提交的变化会让下次使用时再次更新
+        columns = UserColumns(self.use_numpy)
+        columns.append(
+            repository.transaction_columns(
+                conn, user_id, transactions_source(conn, user_id)
+            )
+        )
+        self.loads += 1
+        self._store(user_id, columns, generation, version)
+        return columns
+
+    def _store(self, user_id, columns, generation, version=None):
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current is not None and current[1] > generation:
+                return
+            self._entries[user_id] = (columns, generation, version)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
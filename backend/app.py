@@ -1,25 +1,84 @@
 import atexit
-import csv
 import os
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from functools import wraps
-from io import StringIO
+from urllib.parse import urlencode
 
 from flask import (
     Flask,
+    Response,
     g,
+    has_request_context,
     jsonify,
     redirect,
     render_template,
     request,
-    send_file,
     session,
     url_for,
 )
-from werkzeug.security import check_password_hash, generate_password_hash
 from flask_babel import Babel, gettext as _, lazy_gettext as _l
 
+try:
+    from backend import repository
+    from backend.analytics import AnalyticsEngine
+    from backend.archive import (
+        ALL_TRANSACTIONS,
+        EARLIEST_DATE,
+        archive_totals,
+        find_transaction,
+        get_horizon,
+        refresh_archive,
+        transactions_source,
+    )
+    from backend.assets import init_assets
+    from backend.db import DatabasePools
+    from backend.downsample import METHODS as DOWNSAMPLE_METHODS
+    from backend.downsample import downsample
+    from backend.group_commit import GroupCommitter
+    from backend.http_compression import init_compression
+    from backend.metrics import init_metrics
+    from backend.money import MAX_CENTS, format_cents, to_cents, to_yuan, yuan_rows
+    from backend.passwords import PasswordHasher, PasswordHasherBusy
+    from backend.serialization import (
+        JSONProvider,
+        list_response,
+        rows_payload,
+        wants_columnar,
+    )
+    from backend.shards import ShardRouter
+    from backend.shared_cache import SharedCache, default_cache_path
+    from backend.slow_queries import init_slow_query_log
+    from backend.snapshots import balance_as_of, record_change
+    from backend.storage import PostgresStorage, SQLiteStorage, is_postgres_url
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    import repository
+    from analytics import AnalyticsEngine
+    from archive import (
+        ALL_TRANSACTIONS,
+        EARLIEST_DATE,
+        archive_totals,
+        find_transaction,
+        get_horizon,
+        refresh_archive,
+        transactions_source,
+    )
+    from assets import init_assets
+    from db import DatabasePools
+    from downsample import METHODS as DOWNSAMPLE_METHODS
+    from downsample import downsample
+    from group_commit import GroupCommitter
+    from http_compression import init_compression
+    from metrics import init_metrics
+    from money import MAX_CENTS, format_cents, to_cents, to_yuan, yuan_rows
+    from passwords import PasswordHasher, PasswordHasherBusy
+    from serialization import JSONProvider, list_response, rows_payload, wants_columnar
+    from shards import ShardRouter
+    from shared_cache import SharedCache, default_cache_path
+    from slow_queries import init_slow_query_log
+    from snapshots import balance_as_of, record_change
+    from storage import PostgresStorage, SQLiteStorage, is_postgres_url
+
 # 设置Flask应用路径
 project_root = os.path.dirname(os.path.dirname(__file__))
 template_dir = os.path.join(project_root, "frontend", "templates")
@@ -27,7 +86,69 @@ static_dir = os.path.join(project_root, "frontend", "static")
 
 app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 app.secret_key = os.environ.get("SECRET_KEY", "your-secret-key-change-in-production")
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "database", "cash_manager.db")
+app.json = JSONProvider(app)
+init_assets(app)
+
+# 请求指标（GET /metrics）和每个请求一行JSON的访问日志，为0时关闭；在响应压缩之前注册，耗时包含压缩
+app.config["METRICS"] = os.environ.get("METRICS", "1") == "1"
+app.config["ACCESS_LOG"] = os.environ.get("ACCESS_LOG", "1") == "1"
+metrics = init_metrics(app)
+
+# 慢查询日志：耗时不少于该毫秒数的语句记录SQL、参数类型、耗时、路由和查询计划（0为关闭）
+app.config["SLOW_QUERY_MS"] = float(os.environ.get("SLOW_QUERY_MS", 100))
+app.config["SLOW_QUERY_EXPLAIN"] = os.environ.get("SLOW_QUERY_EXPLAIN", "1") == "1"
+init_slow_query_log(app)
+
+# 响应压缩：压缩级别和最小压缩字节数
+app.config["COMPRESS_LEVEL"] = int(os.environ.get("COMPRESS_LEVEL", 6))
+app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", 500))
+init_compression(app)
+
+DATABASE_PATH = os.environ.get(
+    "DATABASE_PATH",
+    os.path.join(os.path.dirname(__file__), "database", "cash_manager.db"),
+)
+
+# 存储后端：配置为 postgresql://... 时使用PostgreSQL（多个应用节点共用），否则使用SQLite文件
+app.config["DATABASE_URL"] = os.environ.get("DATABASE_URL")
+
+# 分片：分片数（0为不分片）和分片文件目录（默认主数据库所在目录下的shards）
+app.config["SHARD_COUNT"] = int(os.environ.get("SHARD_COUNT", 0))
+app.config["SHARD_DIR"] = os.environ.get("SHARD_DIR")
+
+# 连接池：每个数据库文件的只读连接数和写连接数
+app.config["DB_READ_POOL"] = int(os.environ.get("DB_READ_POOL", 4))
+app.config["DB_WRITE_POOL"] = int(os.environ.get("DB_WRITE_POOL", 2))
+
+# 合并提交：为1时并发的新增交易请求合并到同一个事务提交；
+# 等待窗口（毫秒，0为只合并提交期间排队的请求）和每批最多的写操作数
+app.config["GROUP_COMMIT"] = os.environ.get("GROUP_COMMIT", "0") == "1"
+app.config["GROUP_COMMIT_WINDOW_MS"] = float(
+    os.environ.get("GROUP_COMMIT_WINDOW_MS", 2)
+)
+app.config["GROUP_COMMIT_MAX_BATCH"] = int(
+    os.environ.get("GROUP_COMMIT_MAX_BATCH", 100)
+)
+
+# 内存中的列式统计引擎：为1时启用，最多缓存多少个用户的数据
+app.config["ANALYTICS_ENGINE"] = os.environ.get("ANALYTICS_ENGINE", "0") == "1"
+app.config["ANALYTICS_MAX_USERS"] = int(os.environ.get("ANALYTICS_MAX_USERS", 200))
+
+# 多进程共用的统计结果缓存：为1时启用；SQLite缓存文件路径（默认数据库所在目录下的cache.db，
+# 使用PostgreSQL时缓存表建在PostgreSQL中）
+app.config["SHARED_CACHE"] = os.environ.get("SHARED_CACHE", "0") == "1"
+app.config["SHARED_CACHE_PATH"] = os.environ.get("SHARED_CACHE_PATH")
+
+# 趋势接口的最大天数和最多返回的点数
+MAX_TREND_DAYS = 36500
+MAX_TREND_POINTS = 1000
+
+# 密码哈希配置：算法及强度、进程池大小、最大排队数（进程池大小为0时在请求线程中计算）
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get(
+    "PASSWORD_HASH_METHOD", "scrypt:32768:8:1"
+)
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+app.config["PASSWORD_HASH_QUEUE"] = int(os.environ.get("PASSWORD_HASH_QUEUE", 32))
 
 # 配置Flask-Babel
 app.config["BABEL_DEFAULT_LOCALE"] = "zh_CN"  # 默认中文
@@ -61,13 +182,278 @@ def get_database_path():
     return app.config.get("DATABASE_PATH", DATABASE_PATH)
 
 
-def get_db_connection():
-    """获取数据库连接"""
-    conn = sqlite3.connect(get_database_path())
-    conn.row_factory = sqlite3.Row
+def get_shard_router():
+    """获取分片路由（数据库路径或分片配置变化时重新创建）"""
+    key = (get_database_path(), app.config["SHARD_DIR"], app.config["SHARD_COUNT"])
+    cached = app.extensions.get("shard_router")
+    if cached is None or cached[0] != key:
+        cached = (key, ShardRouter(*key))
+        app.extensions["shard_router"] = cached
+    return cached[1]
+
+
+def get_database_pools():
+    """获取数据库连接池（首次使用时按配置创建）"""
+    pools = app.extensions.get("database_pools")
+    if pools is None:
+        pools = DatabasePools(
+            read_size=app.config["DB_READ_POOL"], write_size=app.config["DB_WRITE_POOL"]
+        )
+        app.extensions["database_pools"] = pools
+        atexit.register(pools.close)
+    return pools
+
+
+def get_storage():
+    """获取存储后端：DATABASE_URL为PostgreSQL地址时使用PostgreSQL，否则使用SQLite连接池"""
+    url = app.config["DATABASE_URL"]
+    if not is_postgres_url(url):
+        return SQLiteStorage(get_database_pools())
+
+    storage = app.extensions.get("postgres_storage")
+    if storage is None or storage.url != url:
+        storage = PostgresStorage(
+            url, size=app.config["DB_READ_POOL"] + app.config["DB_WRITE_POOL"]
+        )
+        app.extensions["postgres_storage"] = storage
+        atexit.register(storage.close)
+    return storage
+
+
+def _connect(path):
+    """GET/HEAD请求使用只读快照连接，其他请求使用写连接；请求结束时自动归还"""
+    readonly = has_request_context() and request.method in ("GET", "HEAD")
+    conn = get_storage().connection(path, readonly=readonly)
+    if has_request_context():
+        g.setdefault("db_connections", []).append(conn)
     return conn
 
 
+@app.teardown_request
+def release_connections(exc):
+    """归还请求中没有关闭的连接（如处理过程中抛出异常）"""
+    for conn in g.pop("db_connections", []):
+        conn.close()
+
+
+def get_catalog_connection():
+    """获取主数据库连接（用户账号）"""
+    return _connect(get_database_path())
+
+
+def get_user_database_path():
+    """当前登录用户数据所在的数据库文件（不分片或使用PostgreSQL时即主数据库）"""
+    if "user_id" not in session or is_postgres_url(app.config["DATABASE_URL"]):
+        return get_database_path()
+    return get_shard_router().path_for(session["user_id"])
+
+
+def get_db_connection():
+    """获取当前登录用户数据所在的数据库连接"""
+    return _connect(get_user_database_path())
+
+
+def get_group_committer(db_path):
+    """获取数据库文件的合并提交写入线程，未启用合并提交或使用PostgreSQL时返回None"""
+    if not app.config["GROUP_COMMIT"] or is_postgres_url(app.config["DATABASE_URL"]):
+        return None
+    committers = app.extensions.setdefault("group_committers", {})
+    committer = committers.get(db_path)
+    if committer is None:
+        committer = committers.setdefault(
+            db_path,
+            GroupCommitter(
+                db_path,
+                window_ms=app.config["GROUP_COMMIT_WINDOW_MS"],
+                max_batch=app.config["GROUP_COMMIT_MAX_BATCH"],
+            ),
+        )
+        atexit.register(committer.shutdown)
+    return committer
+
+
+def get_analytics():
+    """获取列式统计引擎，未启用时返回None"""
+    if not app.config["ANALYTICS_ENGINE"]:
+        return None
+    engine = app.extensions.get("analytics")
+    if engine is None:
+        engine = AnalyticsEngine(max_users=app.config["ANALYTICS_MAX_USERS"])
+        app.extensions["analytics"] = engine
+        repository.add_change_listener(engine.changed)
+    return engine
+
+
+def get_user_columns(engine, conn):
+    """当前用户的列式数据；启用共享缓存时按请求开始时读到的版本号发现其他进程的写入"""
+    return engine.columns(conn, session["user_id"], g.get("cache_version"))
+
+
+def get_shared_cache():
+    """获取多进程共用的统计结果缓存，未启用时返回None"""
+    if not app.config["SHARED_CACHE"]:
+        return None
+    if is_postgres_url(app.config["DATABASE_URL"]):
+        key = app.config["DATABASE_URL"]
+    else:
+        key = app.config["SHARED_CACHE_PATH"] or default_cache_path(get_database_path())
+    cached = app.extensions.get("shared_cache")
+    if cached is None or cached[0] != key:
+        if cached is not None:
+            repository.remove_change_listener(cached[1].invalidate)
+            cached[1].close()
+        if is_postgres_url(key):
+            cache = SharedCache(storage=get_storage())
+        else:
+            cache = SharedCache(path=key)
+        cached = (key, cache)
+        app.extensions["shared_cache"] = cached
+        repository.add_change_listener(cache.invalidate)
+    return cached[1]
+
+
+def get_password_hasher():
+    """获取密码哈希器（首次使用时按配置创建）"""
+    hasher = app.extensions.get("password_hasher")
+    if hasher is None:
+        hasher = PasswordHasher(
+            method=app.config["PASSWORD_HASH_METHOD"],
+            workers=app.config["PASSWORD_HASH_WORKERS"],
+            max_pending=app.config["PASSWORD_HASH_QUEUE"],
+        )
+        app.extensions["password_hasher"] = hasher
+    return hasher
+
+
+# ---- /metrics中的连接池、缓存和定时任务指标：抓取时读取，只统计已经创建的对象 ----
+
+
+def _pool_stats():
+    pools = app.extensions.get("database_pools")
+    stats = []
+    if pools is not None:
+        stats = [
+            (os.path.basename(path), name, values)
+            for path, name, values in pools.stats()
+        ]
+    storage = app.extensions.get("postgres_storage")
+    if storage is not None:
+        stats.append(("postgresql", "shared", storage.stats()))
+    return stats
+
+
+def _pool_metric(key):
+    def collect():
+        return [
+            ({"database": database, "pool": pool}, values[key])
+            for database, pool, values in _pool_stats()
+        ]
+
+    return collect
+
+
+def _extension_metric(name, read):
+    def collect():
+        cache = app.extensions.get(name)
+        if cache is None:
+            return []
+        return [({}, read(cache[1] if isinstance(cache, tuple) else cache))]
+
+    return collect
+
+
+def _scheduler_status():
+    # 调度器只在 python backend/app.py 启动的进程中运行（见文件末尾）
+    status = app.extensions.get("scheduler_status")
+    return status() if status is not None else {"running": False, "jobs": []}
+
+
+def _job_metric(key):
+    def collect():
+        return [
+            ({"job": job["id"]}, job[key])
+            for job in _scheduler_status()["jobs"]
+            if job[key] is not None
+        ]
+
+    return collect
+
+
+metrics.gauge("db_pool_size", "连接池的连接数上限", _pool_metric("size"))
+metrics.gauge("db_pool_open_connections", "连接池已打开的连接数", _pool_metric("open"))
+metrics.gauge(
+    "db_pool_in_use_connections", "连接池中正在使用的连接数", _pool_metric("in_use")
+)
+metrics.gauge(
+    "analytics_cached_users",
+    "列式统计引擎缓存的用户数",
+    _extension_metric("analytics", len),
+)
+metrics.gauge(
+    "analytics_loads_total",
+    "列式统计引擎完整加载用户数据的次数",
+    _extension_metric("analytics", lambda engine: engine.loads),
+    "counter",
+)
+metrics.gauge(
+    "analytics_appends_total",
+    "列式统计引擎追加新交易的次数",
+    _extension_metric("analytics", lambda engine: engine.appends),
+    "counter",
+)
+metrics.gauge(
+    "shared_cache_hits_total",
+    "共享缓存命中次数",
+    _extension_metric("shared_cache", lambda cache: cache.hits),
+    "counter",
+)
+metrics.gauge(
+    "shared_cache_misses_total",
+    "共享缓存未命中次数",
+    _extension_metric("shared_cache", lambda cache: cache.misses),
+    "counter",
+)
+metrics.gauge(
+    "slow_queries_total",
+    "耗时超过SLOW_QUERY_MS的语句数",
+    _extension_metric("slow_query_log", lambda log: log.count),
+    "counter",
+)
+metrics.gauge(
+    "scheduler_running",
+    "本进程中的定时任务调度器是否在运行",
+    lambda: [({}, int(_scheduler_status()["running"]))],
+)
+metrics.gauge(
+    "scheduler_job_next_run_timestamp_seconds",
+    "任务下次执行的时间",
+    _job_metric("next_run"),
+)
+metrics.gauge(
+    "scheduler_job_last_success_timestamp_seconds",
+    "任务最近一次成功完成的时间",
+    _job_metric("last_success"),
+)
+metrics.gauge(
+    "scheduler_job_failures_total",
+    "任务执行失败的次数",
+    _job_metric("failures"),
+    "counter",
+)
+
+
+AMOUNT_ERROR = "金额必须大于0且不超过1亿元"
+
+
+def parse_amount(value):
+    """请求中的金额（元）转换为分，不是正数或超过MAX_CENTS时返回None"""
+    try:
+        cents = to_cents(value)
+    except ValueError:
+        return None
+    return cents if 0 < cents <= MAX_CENTS else None
+
+
 def login_required(f):
     """登录验证装饰器"""
 
@@ -80,6 +466,48 @@ def login_required(f):
     return decorated_function
 
 
+def shared_cached(f):
+    """统计接口的响应保存在共享缓存中，用户的版本号变化或跨天后重新计算"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        cache = get_shared_cache()
+        if cache is None:
+            return f(*args, **kwargs)
+
+        user_id = session["user_id"]
+        # 趋势和统计按本地日期，今日收支按UTC日期
+        day = datetime.now().strftime("%Y-%m-%d")
+        key = "|".join(
+            (
+                request.path,
+                urlencode(sorted(request.args.items(multi=True))),
+                "columnar" if wants_columnar() else "json",
+                day,
+                datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+            )
+        )
+        version, cached = cache.lookup(user_id, key)
+        if cached is not None:
+            mimetype, body = cached
+            return Response(body, mimetype=mimetype)
+
+        g.cache_version = version
+        response = app.make_response(f(*args, **kwargs))
+        if response.status_code == 200:
+            cache.store(
+                user_id,
+                key,
+                version,
+                day,
+                response.mimetype,
+                response.get_data(as_text=True),
+            )
+        return response
+
+    return decorated_function
+
+
 @app.route("/")
 def index():
     """首页，重定向到登录或主页面"""
@@ -102,13 +530,27 @@ def login():
         username = request.form.get("username")
         password = request.form.get("password")
 
-        conn = get_db_connection()
-        user = conn.execute(
-            "SELECT * FROM users WHERE username = ?", (username,)
-        ).fetchone()
+        conn = get_catalog_connection()
+        user = repository.get_user_by_name(conn, username)
         conn.close()
 
-        if user and check_password_hash(user["password"], password):
+        hasher = get_password_hasher()
+        try:
+            verified = bool(user) and hasher.verify(user["password"], password)
+        except PasswordHasherBusy:
+            return render_template("login.html", error="服务器繁忙，请稍后再试"), 503
+
+        if verified:
+            # 哈希参数变化后，登录成功时透明地重新哈希
+            if hasher.needs_rehash(user["password"]):
+                try:
+                    conn = get_catalog_connection()
+                    repository.set_password(conn, user["id"], hasher.hash(password))
+                    conn.commit()
+                    conn.close()
+                except PasswordHasherBusy:
+                    pass
+
             session["user_id"] = user["id"]
             session["username"] = user["username"]
             return redirect(url_for("dashboard"))
@@ -132,13 +574,14 @@ def register():
     if not username or not password:
         return jsonify({"success": False, "message": "用户名和密码不能为空"})
 
-    conn = get_db_connection()
     try:
-        hashed_password = generate_password_hash(password)
-        conn.execute(
-            "INSERT INTO users (username, password) VALUES (?, ?)",
-            (username, hashed_password),
-        )
+        hashed_password = get_password_hasher().hash(password)
+    except PasswordHasherBusy:
+        return jsonify({"success": False, "message": "服务器繁忙，请稍后再试"}), 503
+
+    conn = get_catalog_connection()
+    try:
+        repository.create_user(conn, username, hashed_password)
         conn.commit()
         return jsonify({"success": True, "message": "注册成功，请登录"})
     except sqlite3.IntegrityError:
@@ -170,7 +613,7 @@ def transactions():
     if request.method == "POST":
         data = request.get_json()
         trans_type = data.get("type")  # 'income' or 'expense'
-        amount = data.get("amount")
+        amount = parse_amount(data.get("amount"))
         description = data.get("description", "")
         category = data.get("category", "")
 
@@ -178,17 +621,27 @@ def transactions():
             conn.close()
             return jsonify({"success": False, "message": "无效的交易类型"})
 
-        if not amount or float(amount) <= 0:
+        if amount is None:
             conn.close()
-            return jsonify({"success": False, "message": "金额必须大于0"})
+            return jsonify({"success": False, "message": AMOUNT_ERROR})
 
-        conn.execute(
-            """INSERT INTO transactions (user_id, type, amount, description, category)
-               VALUES (?, ?, ?, ?, ?)""",
-            (session["user_id"], trans_type, float(amount), description, category),
-        )
-        conn.commit()
-        conn.close()
+        user_id = session["user_id"]
+
+        def insert(c):
+            repository.add_transaction(
+                c, user_id, trans_type, amount, description, category
+            )
+            record_change(c, user_id)
+
+        committer = get_group_committer(get_user_database_path())
+        if committer is not None:
+            conn.close()
+            committer.submit(insert)
+        else:
+            insert(conn)
+            conn.commit()
+            conn.close()
+        repository.notify_change(user_id, appended=True)
         return jsonify({"success": True, "message": "添加成功"})
 
     else:
@@ -197,25 +650,26 @@ def transactions():
         per_page = int(request.args.get("per_page", 10))
         offset = (page - 1) * per_page
 
-        transactions = conn.execute(
-            """SELECT * FROM transactions
-               WHERE user_id = ?
-               ORDER BY created_at DESC
-               LIMIT ? OFFSET ?""",
-            (session["user_id"], per_page, offset),
-        ).fetchall()
+        total = repository.count_transactions(conn, session["user_id"])
 
-        total = conn.execute(
-            "SELECT COUNT(*) as count FROM transactions WHERE user_id = ?",
-            (session["user_id"],),
-        ).fetchone()["count"]
+        # 已归档的交易都早于未归档的交易，翻到未归档部分之后才合并归档表
+        source = "transactions"
+        horizon = get_horizon(conn, session["user_id"])
+        if horizon is not None:
+            if offset + per_page > total:
+                source = ALL_TRANSACTIONS
+            total += horizon["archived_count"]
+
+        transactions = repository.list_transactions(
+            conn, session["user_id"], source, per_page, offset
+        )
 
         conn.close()
 
-        return jsonify(
+        return list_response(
             {
                 "success": True,
-                "transactions": [dict(tx) for tx in transactions],
+                "transactions": rows_payload(yuan_rows(transactions)),
                 "total": total,
                 "page": page,
                 "per_page": per_page,
@@ -228,80 +682,168 @@ def transactions():
 def delete_transaction(tx_id):
     """删除交易记录"""
     conn = get_db_connection()
-    conn.execute(
-        "DELETE FROM transactions WHERE id = ? AND user_id = ?",
-        (tx_id, session["user_id"]),
-    )
+    found = find_transaction(conn, tx_id, session["user_id"])
+    if found is not None:
+        table, created_at = found
+        repository.delete_transaction(conn, table, tx_id, session["user_id"])
+        if table == "transactions_archive":
+            refresh_archive(conn, session["user_id"])
+        record_change(conn, session["user_id"], created_at)
     conn.commit()
     conn.close()
+    if found is not None:
+        repository.notify_change(session["user_id"])
     return jsonify({"success": True, "message": "删除成功"})
 
 
 @app.route("/api/balance")
 @login_required
+@shared_cached
 def balance():
     """获取当前余额"""
     conn = get_db_connection()
 
-    income = conn.execute(
-        'SELECT COALESCE(SUM(amount), 0) as total FROM transactions WHERE user_id = ? AND type = "income"',
-        (session["user_id"],),
-    ).fetchone()["total"]
+    engine = get_analytics()
+    if engine is not None:
+        income, expense = get_user_columns(engine, conn).totals()
+    else:
+        income, expense = repository.totals(conn, session["user_id"])
+        archived_income, archived_expense = archive_totals(conn, session["user_id"])
+        income += archived_income
+        expense += archived_expense
+    balance = income - expense
 
-    expense = conn.execute(
-        'SELECT COALESCE(SUM(amount), 0) as total FROM transactions WHERE user_id = ? AND type = "expense"',
-        (session["user_id"],),
-    ).fetchone()["total"]
+    conn.close()
 
-    balance = income - expense
+    return jsonify(
+        {
+            "success": True,
+            "balance": to_yuan(balance),
+            "income": to_yuan(income),
+            "expense": to_yuan(expense),
+        }
+    )
+
+
+@app.route("/api/balance/as-of")
+@login_required
+@shared_cached
+def balance_as_of_date():
+    """获取截至某日（含当天）结束时的余额
+
+    参数:
+        date: 日期 YYYY-MM-DD
+    """
+    try:
+        day = datetime.strptime(request.args.get("date", ""), "%Y-%m-%d").date()
+    except ValueError:
+        return (
+            jsonify({"success": False, "message": "日期格式错误，应为YYYY-MM-DD"}),
+            400,
+        )
 
+    conn = get_db_connection()
+    result = balance_as_of(
+        conn, session["user_id"], (day + timedelta(days=1)).strftime("%Y-%m-%d")
+    )
     conn.close()
 
     return jsonify(
         {
             "success": True,
-            "balance": round(balance, 2),
-            "income": round(income, 2),
-            "expense": round(expense, 2),
+            "date": day.strftime("%Y-%m-%d"),
+            "balance": to_yuan(result["balance"]),
+            "income": to_yuan(result["income"]),
+            "expense": to_yuan(result["expense"]),
         }
     )
 
 
 @app.route("/api/trends")
 @login_required
+@shared_cached
 def trends():
-    """获取趋势数据"""
-    days = int(request.args.get("days", 30))
-    start_date = datetime.now() - timedelta(days=days)
+    """获取趋势数据
+
+    参数:
+        days: 天数（默认30，最多MAX_TREND_DAYS）
+        fill: 为1时补齐没有交易的日期（收支记为0）
+        max_points: 最多返回的点数，超过时在服务端降采样
+        downsample: 降采样方式，lttb（默认）或minmax
+    """
+    days = min(max(int(request.args.get("days", 30)), 1), MAX_TREND_DAYS)
+    fill = request.args.get("fill") in ("1", "true")
+    max_points = min(
+        max(int(request.args.get("max_points", MAX_TREND_POINTS)), 3), MAX_TREND_POINTS
+    )
+    method = request.args.get("downsample", "lttb")
+    if method not in DOWNSAMPLE_METHODS:
+        method = "lttb"
+
+    start_date = (datetime.now() - timedelta(days=days)).date()
+    start_text = start_date.strftime("%Y-%m-%d")
 
     conn = get_db_connection()
 
-    trend_data = conn.execute(
-        """SELECT
-            DATE(created_at) as date,
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
-           FROM transactions
-           WHERE user_id = ? AND DATE(created_at) >= ?
-           GROUP BY DATE(created_at)
-           ORDER BY date""",
-        (session["user_id"], start_date.strftime("%Y-%m-%d")),
-    ).fetchall()
+    engine = get_analytics()
+    if engine is not None:
+        columns = get_user_columns(engine, conn)
+        opening_balance = columns.balance_before(start_date)
+        trend_data = columns.daily(start_date)
+    else:
+        # 窗口开始前的余额，作为余额曲线的起点（最近的月末快照加上之后的交易）
+        opening_balance = balance_as_of(conn, session["user_id"], start_text)["balance"]
+        trend_data = repository.daily_totals(
+            conn,
+            session["user_id"],
+            transactions_source(conn, session["user_id"], start_text),
+            start_text,
+        )
+        trend_data = [
+            (row["date"], row["income"], row["expense"]) for row in trend_data
+        ]
 
     conn.close()
 
-    dates = []
-    income_data = []
-    expense_data = []
-    balance_data = []
-    running_balance = 0
+    if fill:
+        by_date = {date: (income, expense) for date, income, expense in trend_data}
+        points = []
+        day = start_date
+        end_date = datetime.now().date()
+        if trend_data:
+            last_date = datetime.strptime(trend_data[-1][0], "%Y-%m-%d").date()
+            end_date = max(end_date, last_date)
+        while day <= end_date:
+            date_text = day.strftime("%Y-%m-%d")
+            income, expense = by_date.get(date_text, (0, 0))
+            points.append((date_text, income, expense))
+            day += timedelta(days=1)
+    else:
+        points = trend_data
 
-    for row in trend_data:
-        dates.append(row["date"])
-        income_data.append(round(row["income"], 2))
-        expense_data.append(round(row["expense"], 2))
-        running_balance += row["income"] - row["expense"]
-        balance_data.append(round(running_balance, 2))
+    dates = [date for date, _, _ in points]
+    incomes = [income for _, income, _ in points]
+    expenses = [expense for _, _, expense in points]
+    balance_data = []
+    running_balance = opening_balance
+
+    for income, expense in zip(incomes, expenses):
+        running_balance += income - expense
+        balance_data.append(to_yuan(running_balance))
+
+    downsampled = len(dates) > max_points
+    if downsampled:
+        # 按余额曲线选点；收支为上一个保留点之后到该点的合计，总额与余额变化保持一致
+        xs = [datetime.strptime(d, "%Y-%m-%d").toordinal() for d in dates]
+        keep = downsample(xs, balance_data, max_points, method)
+        starts = [0] + [i + 1 for i in keep[:-1]]
+        dates = [dates[i] for i in keep]
+        incomes = [sum(incomes[s : i + 1]) for s, i in zip(starts, keep)]
+        expenses = [sum(expenses[s : i + 1]) for s, i in zip(starts, keep)]
+        balance_data = [balance_data[i] for i in keep]
+
+    income_data = [to_yuan(income) for income in incomes]
+    expense_data = [to_yuan(expense) for expense in expenses]
 
     return jsonify(
         {
@@ -310,50 +852,45 @@ def trends():
             "income": income_data,
             "expense": expense_data,
             "balance": balance_data,
+            "opening_balance": to_yuan(opening_balance),
+            "downsampled": downsampled,
         }
     )
 
 
 @app.route("/api/stats")
 @login_required
+@shared_cached
 def stats():
     """获取统计信息"""
     conn = get_db_connection()
-
-    # 按类别统计支出
-    expense_by_category = conn.execute(
-        """SELECT category, SUM(amount) as total
-           FROM transactions
-           WHERE user_id = ? AND type = 'expense'
-           GROUP BY category
-           ORDER BY total DESC""",
-        (session["user_id"],),
-    ).fetchall()
-
-    # 最近7天的收支
     seven_days_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-    recent_income = conn.execute(
-        """SELECT COALESCE(SUM(amount), 0) as total
-           FROM transactions
-           WHERE user_id = ? AND type = 'income' AND DATE(created_at) >= ?""",
-        (session["user_id"], seven_days_ago),
-    ).fetchone()["total"]
-
-    recent_expense = conn.execute(
-        """SELECT COALESCE(SUM(amount), 0) as total
-           FROM transactions
-           WHERE user_id = ? AND type = 'expense' AND DATE(created_at) >= ?""",
-        (session["user_id"], seven_days_ago),
-    ).fetchone()["total"]
+
+    engine = get_analytics()
+    if engine is not None:
+        columns = get_user_columns(engine, conn)
+        expense_by_category = columns.expense_by_category()
+        recent_income, recent_expense = columns.totals_since(
+            datetime.strptime(seven_days_ago, "%Y-%m-%d").date()
+        )
+    else:
+        # 按类别统计支出
+        expense_by_category = repository.expense_by_category(conn, session["user_id"])
+
+        # 最近7天的收支
+        recent = transactions_source(conn, session["user_id"], seven_days_ago)
+        recent_income, recent_expense = repository.totals_since(
+            conn, session["user_id"], recent, seven_days_ago
+        )
 
     conn.close()
 
     return jsonify(
         {
             "success": True,
-            "expense_by_category": [dict(row) for row in expense_by_category],
-            "recent_income": round(recent_income, 2),
-            "recent_expense": round(recent_expense, 2),
+            "expense_by_category": yuan_rows(expense_by_category),
+            "recent_income": to_yuan(recent_income),
+            "recent_expense": to_yuan(recent_expense),
         }
     )
 
@@ -367,7 +904,7 @@ def schedules():
     if request.method == "POST":
         data = request.get_json()
         frequency = data.get("frequency")  # 'daily', 'weekly', 'monthly'
-        amount = data.get("amount")
+        amount = parse_amount(data.get("amount"))
         category = data.get("category", "")
         description = data.get("description", "")
         day_of_week = data.get("day_of_week")
@@ -377,36 +914,30 @@ def schedules():
             conn.close()
             return jsonify({"success": False, "message": "无效的发放周期"})
 
-        if not amount or float(amount) <= 0:
+        if amount is None:
             conn.close()
-            return jsonify({"success": False, "message": "金额必须大于0"})
-
-        conn.execute(
-            """INSERT INTO schedules (user_id, frequency, amount, category, description, day_of_week, day_of_month)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (
-                session["user_id"],
-                frequency,
-                float(amount),
-                category,
-                description,
-                day_of_week,
-                day_of_month,
-            ),
+            return jsonify({"success": False, "message": AMOUNT_ERROR})
+
+        repository.add_schedule(
+            conn,
+            session["user_id"],
+            frequency,
+            amount,
+            category,
+            description,
+            day_of_week,
+            day_of_month,
         )
         conn.commit()
         conn.close()
         return jsonify({"success": True, "message": "添加成功"})
 
     else:
-        schedules = conn.execute(
-            "SELECT * FROM schedules WHERE user_id = ? ORDER BY created_at DESC",
-            (session["user_id"],),
-        ).fetchall()
+        schedules = repository.list_schedules(conn, session["user_id"])
 
         conn.close()
 
-        return jsonify({"success": True, "schedules": [dict(s) for s in schedules]})
+        return jsonify({"success": True, "schedules": yuan_rows(schedules)})
 
 
 @app.route("/api/schedules/<int:schedule_id>", methods=["DELETE"])
@@ -414,10 +945,7 @@ def schedules():
 def delete_schedule(schedule_id):
     """删除定时发放配置"""
     conn = get_db_connection()
-    conn.execute(
-        "DELETE FROM schedules WHERE id = ? AND user_id = ?",
-        (schedule_id, session["user_id"]),
-    )
+    repository.delete_schedule(conn, schedule_id, session["user_id"])
     conn.commit()
     conn.close()
     return jsonify({"success": True, "message": "删除成功"})
@@ -437,20 +965,20 @@ def change_password():
     if len(new_password) < 6:
         return jsonify({"success": False, "message": "新密码长度至少为6位"})
 
-    conn = get_db_connection()
-    user = conn.execute(
-        "SELECT * FROM users WHERE id = ?", (session["user_id"],)
-    ).fetchone()
-
-    if not check_password_hash(user["password"], old_password):
-        conn.close()
-        return jsonify({"success": False, "message": "旧密码错误"})
+    conn = get_catalog_connection()
+    user = repository.get_user(conn, session["user_id"])
+    conn.close()
 
-    hashed_password = generate_password_hash(new_password)
-    conn.execute(
-        "UPDATE users SET password = ? WHERE id = ?",
-        (hashed_password, session["user_id"]),
-    )
+    hasher = get_password_hasher()
+    try:
+        if not hasher.verify(user["password"], old_password):
+            return jsonify({"success": False, "message": "旧密码错误"})
+        hashed_password = hasher.hash(new_password)
+    except PasswordHasherBusy:
+        return jsonify({"success": False, "message": "服务器繁忙，请稍后再试"}), 503
+
+    conn = get_catalog_connection()
+    repository.set_password(conn, session["user_id"], hashed_password)
     conn.commit()
     conn.close()
 
@@ -460,39 +988,56 @@ def change_password():
 @app.route("/api/export/transactions")
 @login_required
 def export_transactions():
-    """导出交易记录为CSV"""
+    """导出交易记录为CSV（流式输出，逐行写出）
+
+    参数:
+        start_date: 只导出该日期（YYYY-MM-DD，含）之后的交易，默认全部
+    """
+    # 导出很少使用，按需导入以缩短Web进程的启动时间
+    import csv
+    from io import StringIO
+
+    start_date = request.args.get("start_date") or None
+
     conn = get_db_connection()
-    transactions = conn.execute(
-        """SELECT * FROM transactions
-           WHERE user_id = ?
-           ORDER BY created_at DESC""",
-        (session["user_id"],),
-    ).fetchall()
+    transactions = repository.transactions_since(
+        conn,
+        session["user_id"],
+        transactions_source(conn, session["user_id"], start_date),
+        start_date or EARLIEST_DATE,
+    )
     conn.close()
 
-    output = StringIO()
-    writer = csv.writer(output)
-
-    writer.writerow(["日期", "类型", "金额", "分类", "备注"])
-
-    for tx in transactions:
-        type_text = "收入" if tx["type"] == "income" else "支出"
-        writer.writerow(
-            [
-                tx["created_at"],
-                type_text,
-                tx["amount"],
-                tx["category"] or "",
-                tx["description"] or "",
-            ]
-        )
-
-    output.seek(0)
-    return send_file(
-        StringIO(output.getvalue()),
+    def generate():
+        output = StringIO()
+        writer = csv.writer(output)
+
+        writer.writerow(["日期", "类型", "金额", "分类", "备注"])
+
+        for i, tx in enumerate(transactions, 1):
+            type_text = "收入" if tx["type"] == "income" else "支出"
+            writer.writerow(
+                [
+                    tx["created_at"],
+                    type_text,
+                    format_cents(tx["amount"]),
+                    tx["category"] or "",
+                    tx["description"] or "",
+                ]
+            )
+            # 每500行输出一次
+            if i % 500 == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+
+        yield output.getvalue()
+
+    filename = f'transactions_{datetime.now().strftime("%Y%m%d")}.csv'
+    return Response(
+        generate(),
         mimetype="text/csv",
-        as_attachment=True,
-        download_name=f'transactions_{datetime.now().strftime("%Y%m%d")}.csv',
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
 
@@ -501,107 +1046,102 @@ def export_transactions():
 def update_transaction(tx_id):
     """更新交易记录"""
     data = request.get_json()
-    amount = data.get("amount")
+    amount = parse_amount(data.get("amount"))
     description = data.get("description", "")
     category = data.get("category", "")
 
-    if not amount or float(amount) <= 0:
-        return jsonify({"success": False, "message": "金额必须大于0"})
+    if amount is None:
+        return jsonify({"success": False, "message": AMOUNT_ERROR})
 
     conn = get_db_connection()
-    conn.execute(
-        """UPDATE transactions SET amount = ?, description = ?, category = ?
-           WHERE id = ? AND user_id = ?""",
-        (float(amount), description, category, tx_id, session["user_id"]),
-    )
+    found = find_transaction(conn, tx_id, session["user_id"])
+    if found is not None:
+        table, created_at = found
+        repository.update_transaction(
+            conn, table, tx_id, session["user_id"], amount, description, category
+        )
+        if table == "transactions_archive":
+            refresh_archive(conn, session["user_id"])
+        record_change(conn, session["user_id"], created_at)
     conn.commit()
     conn.close()
+    if found is not None:
+        repository.notify_change(session["user_id"])
 
     return jsonify({"success": True, "message": "更新成功"})
 
 
 @app.route("/api/summary/monthly")
 @login_required
+@shared_cached
 def monthly_summary():
     """获取月度汇总数据"""
     conn = get_db_connection()
 
-    monthly_data = conn.execute(
-        """SELECT
-            strftime('%Y-%m', created_at) as month,
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
-           FROM transactions
-           WHERE user_id = ?
-           GROUP BY strftime('%Y-%m', created_at)
-           ORDER BY month DESC
-           LIMIT 12""",
-        (session["user_id"],),
-    ).fetchall()
+    engine = get_analytics()
+    if engine is not None:
+        monthly_data = get_user_columns(engine, conn).monthly_totals()
+    else:
+        monthly_data = repository.monthly_totals(conn, session["user_id"])
 
     conn.close()
 
-    return jsonify({"success": True, "data": [dict(row) for row in monthly_data]})
+    return jsonify({"success": True, "data": yuan_rows(monthly_data)})
 
 
 @app.route("/api/categories")
 @login_required
+@shared_cached
 def get_categories():
     """获取用户的分类统计"""
     conn = get_db_connection()
 
-    categories = conn.execute(
-        """SELECT category,
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense,
-            COUNT(*) as count
-           FROM transactions
-           WHERE user_id = ? AND category IS NOT NULL AND category != ''
-           GROUP BY category
-           ORDER BY count DESC""",
-        (session["user_id"],),
-    ).fetchall()
+    engine = get_analytics()
+    if engine is not None:
+        categories = get_user_columns(engine, conn).category_totals()
+    else:
+        categories = repository.category_totals(conn, session["user_id"])
 
     conn.close()
 
-    return jsonify({"success": True, "categories": [dict(row) for row in categories]})
+    return list_response(
+        {"success": True, "categories": rows_payload(yuan_rows(categories))}
+    )
 
 
 @app.route("/api/search/transactions")
 @login_required
 def search_transactions():
-    """搜索交易记录"""
+    """搜索交易记录
+
+    参数:
+        keyword: 在备注和分类中搜索的关键字
+        start_date: 只搜索该日期（YYYY-MM-DD，含）之后的交易，默认全部
+    """
     keyword = request.args.get("keyword", "")
+    start_date = request.args.get("start_date") or None
     page = int(request.args.get("page", 1))
     per_page = int(request.args.get("per_page", 10))
     offset = (page - 1) * per_page
 
     conn = get_db_connection()
-
-    query = """SELECT * FROM transactions
-               WHERE user_id = ?
-               AND (description LIKE ? OR category LIKE ?)
-               ORDER BY created_at DESC
-               LIMIT ? OFFSET ?"""
+    source = transactions_source(conn, session["user_id"], start_date)
 
     search_pattern = f"%{keyword}%"
-    transactions = conn.execute(
-        query, (session["user_id"], search_pattern, search_pattern, per_page, offset)
-    ).fetchall()
-
-    total = conn.execute(
-        """SELECT COUNT(*) as count FROM transactions
-           WHERE user_id = ?
-           AND (description LIKE ? OR category LIKE ?)""",
-        (session["user_id"], search_pattern, search_pattern),
-    ).fetchone()["count"]
+    start = start_date or EARLIEST_DATE
+    transactions = repository.search_transactions(
+        conn, session["user_id"], source, start, search_pattern, per_page, offset
+    )
+    total = repository.count_matches(
+        conn, session["user_id"], source, start, search_pattern
+    )
 
     conn.close()
 
-    return jsonify(
+    return list_response(
         {
             "success": True,
-            "transactions": [dict(tx) for tx in transactions],
+            "transactions": rows_payload(yuan_rows(transactions)),
             "total": total,
             "page": page,
             "per_page": per_page,
@@ -611,59 +1151,34 @@ def search_transactions():
 
 @app.route("/api/stats/overview")
 @login_required
+@shared_cached
 def stats_overview():
     """获取统计概览"""
     conn = get_db_connection()
 
-    # 今日收支
-    today_income = conn.execute(
-        """SELECT COALESCE(SUM(amount), 0) as total
-           FROM transactions
-           WHERE user_id = ? AND type = 'income' AND DATE(created_at) = DATE('now')""",
-        (session["user_id"],),
-    ).fetchone()["total"]
-
-    today_expense = conn.execute(
-        """SELECT COALESCE(SUM(amount), 0) as total
-           FROM transactions
-           WHERE user_id = ? AND type = 'expense' AND DATE(created_at) = DATE('now')""",
-        (session["user_id"],),
-    ).fetchone()["total"]
-
-    # 本月收支
-    this_month_income = conn.execute(
-        """SELECT COALESCE(SUM(amount), 0) as total
-           FROM transactions
-           WHERE user_id = ? AND type = 'income'
-           AND strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')""",
-        (session["user_id"],),
-    ).fetchone()["total"]
-
-    this_month_expense = conn.execute(
-        """SELECT COALESCE(SUM(amount), 0) as total
-           FROM transactions
-           WHERE user_id = ? AND type = 'expense'
-           AND strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')""",
-        (session["user_id"],),
-    ).fetchone()["total"]
-
-    # 总交易次数
-    total_transactions = conn.execute(
-        "SELECT COUNT(*) as count FROM transactions WHERE user_id = ?",
-        (session["user_id"],),
-    ).fetchone()["count"]
+    engine = get_analytics()
+    if engine is not None:
+        columns = get_user_columns(engine, conn)
+        # 与SQL中的DATE('now')一致，按UTC
+        today = datetime.now(timezone.utc).date()
+        today_income, today_expense = columns.totals_on(today)
+        month_income, month_expense = columns.totals_in_month(today)
+        total_transactions, active_days = len(columns), columns.active_days()
+    else:
+        # 今日和本月收支
+        current = repository.current_totals(conn, session["user_id"])
+        today_income, today_expense = current["today_income"], current["today_expense"]
+        month_income, month_expense = current["month_income"], current["month_expense"]
+
+        # 总交易次数和有交易的天数（已归档部分取自归档记录）
+        total_transactions, active_days = repository.activity(conn, session["user_id"])
+        horizon = get_horizon(conn, session["user_id"])
+        if horizon is not None:
+            total_transactions += horizon["archived_count"]
+            active_days += horizon["archived_days"]
 
     # 平均每日交易
-    avg_daily = (
-        conn.execute(
-            """SELECT AVG(daily_count) as avg_count
-           FROM (SELECT COUNT(*) as daily_count FROM transactions
-                 WHERE user_id = ?
-                 GROUP BY DATE(created_at))""",
-            (session["user_id"],),
-        ).fetchone()["avg_count"]
-        or 0
-    )
+    avg_daily = total_transactions / active_days if active_days else 0
 
     conn.close()
 
@@ -671,12 +1186,12 @@ def stats_overview():
         {
             "success": True,
             "today": {
-                "income": round(today_income, 2),
-                "expense": round(today_expense, 2),
+                "income": to_yuan(today_income),
+                "expense": to_yuan(today_expense),
             },
             "this_month": {
-                "income": round(this_month_income, 2),
-                "expense": round(this_month_expense, 2),
+                "income": to_yuan(month_income),
+                "expense": to_yuan(month_expense),
             },
             "total_transactions": total_transactions,
             "avg_daily_transactions": round(avg_daily, 1),
@@ -686,12 +1201,15 @@ def stats_overview():
 
 if __name__ == "__main__":
     # 启动定时任务调度器
-    from scheduler import start_scheduler, stop_scheduler
+    from scheduler import scheduler_status, start_scheduler, stop_scheduler
 
     try:
-        start_scheduler()
-        # 注册退出时停止调度器
-        atexit.register(stop_scheduler)
+        # SCHEDULER=0时不启动（例如负载测试由驱动程序自行触发定时任务）
+        if os.environ.get("SCHEDULER", "1") == "1":
+            start_scheduler(app.config)
+            app.extensions["scheduler_status"] = scheduler_status
+            # 注册退出时停止调度器
+            atexit.register(stop_scheduler)
 
         # 从环境变量获取配置
         debug_mode = os.environ.get("FLASK_ENV", "production") != "production"
@@ -0,0 +1,181 @@
+"""
+交易归档
+
+transactions表只增不减，按用户的查询、索引和备份都会越来越重，而面板主要显示最近的数据。
+归档任务把早于界限（ARCHIVE_AFTER_DAYS天前所在月份的月初）的交易移到transactions_archive：
+
+- 只归档已有月末快照的月份，余额和累计收支仍由快照给出
+- 同时按月份、分类和类型累加到archive_rollups，分类和月度统计不必扫描归档表
+- 查询范围早于用户的归档界限时才合并归档表（transactions_source），
+  列表、搜索、导出对调用方透明；已归档的交易仍可修改和删除
+"""
+
+from datetime import timedelta
+
+try:
+    from backend.repository import execute, fetch_one
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from repository import execute, fetch_one
+
+# 交易表和归档表共有的列，合并查询时按这个顺序取列
+TRANSACTION_COLUMNS = "id, user_id, type, amount, description_id, category_id, created_at"
+
+# 合并了归档表的子查询，查询中与交易表一样写作 FROM {source} AS t
+ALL_TRANSACTIONS = (
+    f"(SELECT {TRANSACTION_COLUMNS} FROM transactions"
+    f" UNION ALL SELECT {TRANSACTION_COLUMNS} FROM transactions_archive)"
+)
+
+# 早于所有交易的日期，查询全部历史时作为created_at的下界
+EARLIEST_DATE = "0001-01-01"
+
+
+def get_horizon(conn, user_id):
+    """用户的归档界限、归档笔数和有交易的天数，没有归档时返回None"""
+    return fetch_one(
+        conn,
+        """SELECT archived_before, archived_count, archived_days
+           FROM archive_horizons WHERE user_id = ?""",
+        (user_id,),
+    )
+
+
+def transactions_source(conn, user_id, since=None):
+    """查询用户since（'YYYY-MM-DD'，含）之后的交易应使用的表
+
+    since早于归档界限或为空（全部历史）且用户有归档时，返回合并了归档表的子查询。
+    """
+    horizon = get_horizon(conn, user_id)
+    if horizon is None or (since is not None and since >= horizon[0]):
+        return "transactions"
+    return ALL_TRANSACTIONS
+
+
+def find_transaction(conn, tx_id, user_id):
+    """查找交易所在的表，返回(表名, created_at)，找不到时返回None"""
+    for table in ("transactions", "transactions_archive"):
+        row = execute(
+            conn,
+            f"SELECT created_at FROM {table} WHERE id = ? AND user_id = ?",
+            (tx_id, user_id),
+        ).fetchone()
+        if row is not None:
+            return table, row[0]
+    return None
+
+
+def _refresh_horizon(conn, user_id, archived_before):
+    count, days = execute(
+        conn,
+        """SELECT COUNT(*), COUNT(DISTINCT DATE(created_at))
+           FROM transactions_archive WHERE user_id = ?""",
+        (user_id,),
+    ).fetchone()
+    execute(
+        conn,
+        """INSERT INTO archive_horizons (user_id, archived_before, archived_count, archived_days)
+           VALUES (?, ?, ?, ?)
+           ON CONFLICT(user_id) DO UPDATE SET
+               archived_before = excluded.archived_before,
+               archived_count = excluded.archived_count,
+               archived_days = excluded.archived_days""",
+        (user_id, archived_before, count, days),
+    )
+
+
+_ROLLUP_SELECT = """SELECT user_id, strftime('%Y-%m', created_at), COALESCE(category_id, 0),
+                        type, SUM(amount), COUNT(*)
+                    FROM {table}
+                    WHERE user_id = ? {condition}
+                    GROUP BY user_id, 2, 3, 4"""
+
+
+def refresh_archive(conn, user_id):
+    """已归档的交易被修改或删除后，重新计算该用户的归档汇总"""
+    horizon = get_horizon(conn, user_id)
+    if horizon is None:
+        return
+    execute(conn, "DELETE FROM archive_rollups WHERE user_id = ?", (user_id,))
+    execute(
+        conn,
+        "INSERT INTO archive_rollups (user_id, month, category_id, type, total, count) "
+        + _ROLLUP_SELECT.format(table="transactions_archive", condition=""),
+        (user_id,),
+    )
+    _refresh_horizon(conn, user_id, horizon[0])
+
+
+def archive_transactions(conn, user_id, before):
+    """把用户早于before的交易移到归档表，返回移动的笔数
+
+    before取所在月份的月初，且不晚于最近一个月末快照的下一个月。调用方负责提交事务。
+    """
+    last_snapshot = execute(
+        conn,
+        "SELECT MAX(month) FROM balance_snapshots WHERE user_id = ?", (user_id,)
+    ).fetchone()[0]
+    if last_snapshot is None:
+        return 0
+
+    year, month = int(last_snapshot[:4]), int(last_snapshot[5:7])
+    after_snapshot = f"{year + month // 12:04d}-{month % 12 + 1:02d}-01"
+    before = min(f"{str(before)[:7]}-01", after_snapshot)
+
+    horizon = get_horizon(conn, user_id)
+    if horizon is not None and before <= horizon[0]:
+        return 0
+
+    condition = "AND created_at < ?"
+    execute(
+        conn,
+        "INSERT INTO archive_rollups (user_id, month, category_id, type, total, count) "
+        + _ROLLUP_SELECT.format(table="transactions", condition=condition)
+        + """ ON CONFLICT(user_id, month, category_id, type) DO UPDATE SET
+                  total = archive_rollups.total + excluded.total,
+                  count = archive_rollups.count + excluded.count""",
+        (user_id, before),
+    )
+    moved = execute(
+        conn,
+        f"""INSERT INTO transactions_archive ({TRANSACTION_COLUMNS})
+            SELECT {TRANSACTION_COLUMNS} FROM transactions
+            WHERE user_id = ? {condition}""",
+        (user_id, before),
+    ).rowcount
+    execute(
+        conn,
+        f"DELETE FROM transactions WHERE user_id = ? {condition}", (user_id, before)
+    )
+
+    if moved or horizon is not None:
+        _refresh_horizon(conn, user_id, before)
+    return moved
+
+
+def archive_all(conn, now, after_days):
+    """归档所有用户早于after_days天前所在月份的交易，每个用户一个事务，返回移动的笔数"""
+    cutoff = (now - timedelta(days=after_days)).strftime("%Y-%m-01")
+    user_ids = [
+        row[0]
+        for row in execute(
+            conn,
+            "SELECT DISTINCT user_id FROM transactions WHERE created_at < ?", (cutoff,)
+        ).fetchall()
+    ]
+    moved = 0
+    for user_id in user_ids:
+        moved += archive_transactions(conn, user_id, cutoff)
+        conn.commit()
+    return moved
+
+
+def archive_totals(conn, user_id):
+    """已归档交易的收入和支出合计"""
+    totals = dict(
+        execute(
+            conn,
+            "SELECT type, SUM(total) FROM archive_rollups WHERE user_id = ? GROUP BY type",
+            (user_id,),
+        ).fetchall()
+    )
+    return totals.get("income", 0), totals.get("expense", 0)
@@ -0,0 +1,78 @@
+"""
+静态资源
+
+模板通过asset_url()引用scripts/build_assets.py生成的带内容哈希的文件，
+/assets/路由按Accept-Encoding返回预压缩的brotli或gzip版本，并设置一年的不可变缓存。
+尚未构建时回退到 frontend/static/src 下的源文件，方便本地开发。
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import abort, current_app, request, send_from_directory, url_for
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_NAME = "manifest.json"
+
+# 预压缩版本（Content-Encoding, 文件后缀），按优先顺序排列
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest_cache = {}
+
+
+def load_manifest(dist_dir):
+    """读取manifest，文件未变化时使用缓存；不存在时返回空字典"""
+    path = os.path.join(dist_dir, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = (mtime, json.load(f))
+        _manifest_cache[path] = cached
+    return cached[1]
+
+
+def asset_url(name):
+    """返回静态资源的URL，已构建时指向带哈希的文件"""
+    manifest = load_manifest(current_app.config["ASSETS_DIST_DIR"])
+    if name in manifest:
+        return url_for("serve_asset", filename=manifest[name])
+    return url_for("static", filename=f"src/{name}")
+
+
+def serve_asset(filename):
+    """返回构建后的静态资源，优先使用客户端支持的预压缩版本"""
+    dist_dir = current_app.config["ASSETS_DIST_DIR"]
+    if filename not in load_manifest(dist_dir).values():
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0]
+    encoding = None
+    for candidate, suffix in PRECOMPRESSED:
+        if request.accept_encodings[candidate] and os.path.isfile(
+            os.path.join(dist_dir, filename + suffix)
+        ):
+            encoding = candidate
+            filename += suffix
+            break
+
+    response = send_from_directory(dist_dir, filename, mimetype=mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_assets(app):
+    """注册asset_url模板函数和/assets/路由"""
+    app.config.setdefault(
+        "ASSETS_DIST_DIR", os.path.join(app.static_folder, "dist")
+    )
+    app.add_template_global(asset_url)
+    app.add_url_rule("/assets/<path:filename>", "serve_asset", serve_asset)
@@ -0,0 +1,215 @@
+"""
+在线备份
+
+应用写入时直接复制数据库文件可能得到不一致的副本。这里用SQLite备份API复制：
+
+- 每次只复制少量页，两步之间暂停，复制不会长时间占用磁盘和锁
+- WAL模式下整个复制过程使用同一个读事务的快照，读事务不阻塞写入；
+  其他模式下每一步只在复制期间持有共享锁，写请求最多等待一步的时间，
+  复制期间源数据库被修改时SQLite会从头重新复制
+- 每次备份生成一个 backup_YYYYmmdd_HHMMSS 目录，包含每个数据库文件（可选gzip压缩）
+  和记录来源路径、SHA-256的manifest.json；副本通过quick_check和校验后才改为正式目录名
+- 只保留最新的若干份备份
+
+恢复时校验SHA-256和quick_check后，同样用备份API写回原数据库文件。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+MANIFEST = "manifest.json"
+BACKUP_PREFIX = "backup_"
+
+
+class BackupError(Exception):
+    """备份或恢复失败（副本损坏、校验不一致等）"""
+
+
+def default_backup_dir(db_path):
+    """默认的备份目录：数据库所在目录下的backups"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "backups")
+
+
+def copy_database(source_path, dest_path, pages=64, pause=0.01):
+    """用备份API分步复制数据库，每步复制pages页后暂停pause秒，返回复制的总页数"""
+    src = sqlite3.connect(source_path, isolation_level=None)
+    dst = sqlite3.connect(dest_path)
+    try:
+        if src.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # WAL模式下在整个复制期间保持一个读事务：读事务不阻塞写入，
+            # 每一步都从同一个快照复制，不会因为其他连接写入而从头重新复制
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        # 其他模式下两步之间不持有源数据库的锁，在这里暂停不会阻塞写入
+        src.backup(dst, pages=pages, progress=lambda *_: time.sleep(pause))
+        # 副本单独使用时不需要WAL
+        dst.execute("PRAGMA journal_mode = DELETE")
+        return dst.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+
+
+def _quick_check(path):
+    conn = sqlite3.connect(path)
+    try:
+        rows = [row[0] for row in conn.execute("PRAGMA quick_check")]
+    except sqlite3.DatabaseError as e:
+        rows = [str(e)]
+    finally:
+        conn.close()
+    if rows != ["ok"]:
+        raise BackupError(f"{path} 检查失败: {'; '.join(rows)}")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress(path):
+    with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(path)
+    return path + ".gz"
+
+
+def read_manifest(backup_path):
+    with open(os.path.join(backup_path, MANIFEST), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@contextmanager
+def _extracted(backup_path, entry):
+    """得到备份中数据库文件的未压缩副本并校验SHA-256和quick_check"""
+    stored = os.path.join(backup_path, entry["file"])
+    if not stored.endswith(".gz"):
+        path, temporary = stored, None
+    else:
+        fd, temporary = tempfile.mkstemp(suffix=".db", dir=backup_path)
+        with os.fdopen(fd, "wb") as dst, gzip.open(stored, "rb") as src:
+            shutil.copyfileobj(src, dst)
+        path = temporary
+    try:
+        if _sha256(path) != entry["sha256"]:
+            raise BackupError(f"{stored} 校验和不一致")
+        _quick_check(path)
+        yield path
+    finally:
+        if temporary is not None:
+            os.remove(temporary)
+
+
+def verify_backup(backup_path):
+    """校验备份中的每个数据库文件，失败时抛出BackupError"""
+    manifest = read_manifest(backup_path)
+    for entry in manifest["files"]:
+        with _extracted(backup_path, entry):
+            pass
+    return manifest
+
+
+def list_backups(backup_dir):
+    """备份目录中的正式备份，从旧到新"""
+    if not os.path.isdir(backup_dir):
+        return []
+    return [
+        os.path.join(backup_dir, name)
+        for name in sorted(os.listdir(backup_dir))
+        if name.startswith(BACKUP_PREFIX)
+        and not name.endswith(".tmp")
+        and os.path.isfile(os.path.join(backup_dir, name, MANIFEST))
+    ]
+
+
+def rotate_backups(backup_dir, keep):
+    """只保留最新的keep份备份，返回删除的备份"""
+    removed = list_backups(backup_dir)[:-keep] if keep > 0 else []
+    for path in removed:
+        shutil.rmtree(path)
+    return removed
+
+
+def create_backup(
+    db_paths, backup_dir, compress=True, keep=7, now=None, pages=64, pause=0.01
+):
+    """备份db_paths中的数据库文件，返回(备份目录, manifest)"""
+    now = now or datetime.now()
+    name = BACKUP_PREFIX + now.strftime("%Y%m%d_%H%M%S")
+    final = os.path.join(backup_dir, name)
+    work = final + ".tmp"
+    if os.path.exists(final):
+        raise BackupError(f"备份已存在: {final}")
+    if os.path.exists(work):
+        shutil.rmtree(work)
+    os.makedirs(work)
+
+    manifest = {"created_at": now.strftime("%Y-%m-%d %H:%M:%S"), "files": []}
+    try:
+        for db_path in db_paths:
+            file_name = os.path.basename(db_path)
+            if any(entry["name"] == file_name for entry in manifest["files"]):
+                raise BackupError(f"备份中文件名重复: {file_name}")
+            target = os.path.join(work, file_name)
+            page_count = copy_database(db_path, target, pages, pause)
+            _quick_check(target)
+            digest = _sha256(target)
+            if compress:
+                target = _compress(target)
+            manifest["files"].append(
+                {
+                    "name": file_name,
+                    "source": os.path.abspath(db_path),
+                    "file": os.path.basename(target),
+                    "sha256": digest,
+                    "pages": page_count,
+                    "bytes": os.path.getsize(target),
+                }
+            )
+        with open(os.path.join(work, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # 读回写入磁盘的文件再校验一次
+        verify_backup(work)
+        os.rename(work, final)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+
+    rotate_backups(backup_dir, keep)
+    return final, manifest
+
+
+def restore_backup(backup_path, targets=None):
+    """把备份写回数据库文件，返回恢复的文件列表
+
+    targets为 {备份中的文件名: 目标路径}，未指定的文件恢复到备份时的来源路径。
+    恢复前请停止应用和定时任务。
+    """
+    manifest = read_manifest(backup_path)
+    targets = targets or {}
+    restored = []
+    for entry in manifest["files"]:
+        target = targets.get(entry["name"], entry["source"])
+        with _extracted(backup_path, entry) as path:
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            src = sqlite3.connect(path)
+            dst = sqlite3.connect(target)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+        restored.append(target)
+    return restored
@@ -0,0 +1,33 @@
+"""
+可注入的时钟
+
+定时任务通过时钟获取"当前时间"，而不是直接调用SQLite的'now'。
+正常运行时使用系统时钟；模拟模式下替换为虚拟时钟，即可快速回放任意日期区间。
+"""
+
+from datetime import datetime, timedelta, timezone
+
+
+class SystemClock:
+    """系统时钟，返回UTC时间（与SQLite的CURRENT_TIMESTAMP保持一致）"""
+
+    def now(self):
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class VirtualClock:
+    """虚拟时钟，时间只在调用set或advance时变化"""
+
+    def __init__(self, start):
+        self._now = start
+
+    def now(self):
+        return self._now
+
+    def set(self, moment):
+        self._now = moment
+
+    def advance(self, **kwargs):
+        """按timedelta参数推进时间，例如advance(days=1)"""
+        self._now += timedelta(**kwargs)
+        return self._now
@@ -1,33 +1,225 @@
 import os
 import sqlite3
 
-from werkzeug.security import generate_password_hash
+DATABASE_PATH = os.environ.get(
+    "DATABASE_PATH", os.path.join(os.path.dirname(__file__), "cash_manager.db")
+)
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+POSTGRES_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema_postgres.sql")
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "cash_manager.db")
+# schema.sql的版本号，记录在数据库的PRAGMA user_version中（PostgreSQL记录在schema_version表中）；
+# 修改schema.sql时需要加1，并同步修改schema_postgres.sql
+SCHEMA_VERSION = 6
 
+# 升级时需要重建的表：版本5之前分类和备注以文字保存，版本6之前金额以元保存为REAL
+_REBUILT_TABLES = (
+    "transactions",
+    "transactions_archive",
+    "schedules",
+    "archive_rollups",
+    "balance_snapshots",
+)
 
-def init_database():
-    """初始化数据库，创建表结构"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+# 各表以分为单位的金额列
+_MONEY_COLUMNS = ("amount", "income", "expense", "balance", "total")
+
+# 按用户和文字查字典表的id
+_CATEGORY_ID = (
+    "(SELECT id FROM categories WHERE user_id = l.user_id AND name = l.category)"
+)
+_DESCRIPTION_ID = (
+    "(SELECT id FROM descriptions WHERE user_id = l.user_id AND text = l.description)"
+)
+
+
+def get_schema_version(conn):
+    """读取数据库记录的结构版本"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _table_columns(conn, table):
+    """表的{列名: 声明的类型}（按定义顺序）"""
+    return {
+        row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")
+    }
+
+
+def _schema_columns(schema):
+    """schema.sql中各表的列名（按定义顺序）"""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.executescript(schema)
+        return {table: list(_table_columns(conn, table)) for table in _REBUILT_TABLES}
+    finally:
+        conn.close()
+
+
+def _statements(script):
+    """把SQL脚本拆分为单条语句"""
+    statements = []
+    current = ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    return statements
+
+
+def _legacy_tables(conn):
+    """分类和备注仍以文字保存、或金额仍是REAL的表 {表名: {列名: 类型}}"""
+    legacy = {}
+    for table in _REBUILT_TABLES:
+        columns = _table_columns(conn, table)
+        if "category" in columns or any(
+            columns.get(column) == "REAL" for column in _MONEY_COLUMNS
+        ):
+            legacy[table] = columns
+    return legacy
+
+
+def _copy_value(table, column, legacy_columns):
+    """按旧表的一行（别名l）计算新表中column列的值，旧表没有对应数据时返回None"""
+    if column in _MONEY_COLUMNS and legacy_columns.get(column) == "REAL":
+        return f"CAST(ROUND(l.{column} * 100) AS INTEGER)"
+    if column in legacy_columns:
+        return f"l.{column}"
+    if column == "category_id" and "category" in legacy_columns:
+        if table == "archive_rollups":
+            return f"COALESCE({_CATEGORY_ID}, 0)"
+        return _CATEGORY_ID
+    if column == "description_id" and "description" in legacy_columns:
+        return _DESCRIPTION_ID
+    return None
+
+
+def _rebuild_migration(legacy, schema):
+    """重建旧结构的表的升级语句
+
+    旧表改名后按schema.sql建新表：分类和备注文字写入字典表后改为id，REAL金额乘100
+    四舍五入为整数分，按列复制数据，再删除旧表并重新执行schema.sql补建索引。
+    带AUTOINCREMENT的表沿用旧表的序号，已删除交易的id不会被重新使用。
+    """
+    new_columns = _schema_columns(schema)
+    statements = [f"ALTER TABLE {table} RENAME TO legacy_{table}" for table in legacy]
+    statements += _statements(schema)
+
+    for table, columns in legacy.items():
+        if "category" in columns:
+            statements.append(
+                f"""INSERT OR IGNORE INTO categories (user_id, name)
+                    SELECT DISTINCT user_id, category FROM legacy_{table}
+                    WHERE category IS NOT NULL"""
+            )
+        if "description" in columns:
+            statements.append(
+                f"""INSERT OR IGNORE INTO descriptions (user_id, text)
+                    SELECT DISTINCT user_id, description FROM legacy_{table}
+                    WHERE description IS NOT NULL"""
+            )
 
-    # 读取并执行schema.sql
-    schema_path = os.path.join(os.path.dirname(__file__), "schema.sql")
-    with open(schema_path, "r", encoding="utf-8") as f:
+    for table, columns in legacy.items():
+        # 按新表的列顺序复制旧表中有对应数据的列（很早的数据库可能缺少后加的列）
+        copied = [
+            (column, _copy_value(table, column, columns))
+            for column in new_columns[table]
+        ]
+        copied = [(column, value) for column, value in copied if value is not None]
+        names = ", ".join(column for column, _ in copied)
+        values = ", ".join(value for _, value in copied)
+        statements.append(
+            f"INSERT INTO {table} ({names}) SELECT {values} FROM legacy_{table} AS l"
+        )
+        if table in ("transactions", "schedules"):
+            statements.append(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+            statements.append(
+                f"UPDATE sqlite_sequence SET name = '{table}'"
+                f" WHERE name = 'legacy_{table}'"
+            )
+
+    statements += [f"DROP TABLE legacy_{table}" for table in legacy]
+    statements += _statements(schema)
+    return statements
+
+
+def _migrate_tables(conn, schema):
+    """在一个写事务中升级旧数据库（加锁后再检查一次，多个进程同时启动时只有一个执行）"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        legacy = _legacy_tables(conn)
+        statements = (
+            _rebuild_migration(legacy, schema) if legacy else _statements(schema)
+        )
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def ensure_schema(conn):
+    """数据库结构版本落后时执行schema.sql（语句均为IF NOT EXISTS，不影响已有数据）
+
+    版本一致时只读取一次PRAGMA user_version。分类和备注仍以文字保存、或金额仍以元
+    保存为REAL的旧数据库在同一个事务中重建相关的表。返回是否执行了schema.sql。
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return False
+
+    if version == 0:
+        # 只能在建表前设置；已有数据库用scripts/enable_incremental_vacuum.py迁移
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
         schema = f.read()
-        cursor.executescript(schema)
 
+    if _legacy_tables(conn):
+        _migrate_tables(conn, schema)
+        return True
+
+    conn.executescript(schema)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
+    return True
+
+
+def read_postgres_schema():
+    """PostgreSQL版本的表结构（使用PostgreSQL时由storage.py执行）"""
+    with open(POSTGRES_SCHEMA_PATH, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def init_database(db_path=None):
+    """初始化数据库，创建表结构
+
+    数据库结构版本已是最新时跳过，返回是否执行了初始化。
+    """
+    conn = sqlite3.connect(db_path or DATABASE_PATH)
+    initialized = ensure_schema(conn)
     conn.close()
-    print("数据库初始化完成")
+
+    if initialized:
+        print("数据库初始化完成")
+    else:
+        print("数据库结构已是最新，跳过初始化")
+    return initialized
 
 
-def create_default_user():
+def create_default_user(db_path=None):
     """创建默认用户 admin/admin123"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(db_path or DATABASE_PATH)
     cursor = conn.cursor()
 
     try:
+        # 先检查是否已存在，避免每次启动都计算一次密码哈希
+        if cursor.execute("SELECT 1 FROM users WHERE username = 'admin'").fetchone():
+            print("默认用户已存在")
+            return
+
+        from werkzeug.security import generate_password_hash
+
         hashed_password = generate_password_hash("admin123")
         cursor.execute(
             "INSERT INTO users (username, password) VALUES (?, ?)",
@@ -1,7 +1,9 @@
 import os
 import sqlite3
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "cash_manager.db")
+DATABASE_PATH = os.environ.get(
+    "DATABASE_PATH", os.path.join(os.path.dirname(__file__), "cash_manager.db")
+)
 
 
 def migrate_database():
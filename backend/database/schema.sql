@@ -5,15 +5,38 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 金额以分为单位保存为整数（交易、定时发放、月末快照和归档汇总），求和不经过浮点数；
+-- 接口收到和返回的金额仍以元为单位（money.py）。
+
+-- 字典表：每个用户的分类名和备注文字各保存一份，交易和定时发放配置只保存id。
+-- 分类统计按整数id分组，再取分类名；接口仍然使用名称。
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (user_id, name),
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+CREATE TABLE IF NOT EXISTS descriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (user_id, text),
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
 CREATE TABLE IF NOT EXISTS transactions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     type TEXT NOT NULL,
-    amount REAL NOT NULL,
-    description TEXT,
-    category TEXT,
+    amount INTEGER NOT NULL,
+    description_id INTEGER,
+    category_id INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (id)
+    FOREIGN KEY (user_id) REFERENCES users (id),
+    FOREIGN KEY (description_id) REFERENCES descriptions (id),
+    FOREIGN KEY (category_id) REFERENCES categories (id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_user_transactions ON transactions(user_id);
@@ -22,13 +45,71 @@ CREATE TABLE IF NOT EXISTS schedules (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     frequency TEXT NOT NULL,
-    amount REAL NOT NULL,
-    category TEXT,
-    description TEXT,
+    amount INTEGER NOT NULL,
+    category_id INTEGER,
+    description_id INTEGER,
     day_of_week INTEGER,
     day_of_month INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (id)
+    FOREIGN KEY (user_id) REFERENCES users (id),
+    FOREIGN KEY (category_id) REFERENCES categories (id),
+    FOREIGN KEY (description_id) REFERENCES descriptions (id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_user_schedules ON schedules(user_id);
+
+CREATE INDEX IF NOT EXISTS idx_user_transactions_created ON transactions(user_id, created_at);
+
+-- 月末余额快照：每个用户每个已结束月份一行，记录截至月末的累计收入、支出和余额。
+-- 月份结束后不再修改；修改或删除已结账月份的交易时，删除该月及之后的快照并重新生成。
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+    user_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    income INTEGER NOT NULL,
+    expense INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, month),
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+-- 分片目录：启用分片（SHARD_COUNT>0）时记录每个用户的数据所在的分片编号，只在主数据库中使用
+CREATE TABLE IF NOT EXISTS user_shards (
+    user_id INTEGER PRIMARY KEY,
+    shard INTEGER NOT NULL
+);
+
+-- 归档：早于归档界限的交易从transactions移到transactions_archive（保留原id）。
+-- archive_horizons记录每个用户的归档界限、归档笔数和有交易的天数，
+-- archive_rollups按月份、分类和类型汇总已归档的交易，统计接口不必扫描归档表（没有分类的交易category_id记为0）。
+CREATE TABLE IF NOT EXISTS transactions_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    description_id INTEGER,
+    category_id INTEGER,
+    created_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id),
+    FOREIGN KEY (description_id) REFERENCES descriptions (id),
+    FOREIGN KEY (category_id) REFERENCES categories (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_archive_user_created ON transactions_archive(user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS archive_horizons (
+    user_id INTEGER PRIMARY KEY,
+    archived_before TEXT NOT NULL,
+    archived_count INTEGER NOT NULL DEFAULT 0,
+    archived_days INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS archive_rollups (
+    user_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0,
+    type TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, category_id, type)
+);
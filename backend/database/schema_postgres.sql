@@ -0,0 +1,175 @@
+-- PostgreSQL版本的表结构，与schema.sql保持一致（修改schema.sql时同步修改这里）。
+-- 时间按UTC保存，与SQLite的CURRENT_TIMESTAMP一致；金额以分为单位，使用BIGINT（SQLite的INTEGER）。
+CREATE TABLE IF NOT EXISTS users (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    name TEXT NOT NULL,
+    UNIQUE (user_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS descriptions (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    text TEXT NOT NULL,
+    UNIQUE (user_id, text)
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    type TEXT NOT NULL,
+    amount BIGINT NOT NULL,
+    description_id BIGINT REFERENCES descriptions (id),
+    category_id BIGINT REFERENCES categories (id),
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_transactions ON transactions(user_id);
+
+CREATE TABLE IF NOT EXISTS schedules (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    frequency TEXT NOT NULL,
+    amount BIGINT NOT NULL,
+    category_id BIGINT REFERENCES categories (id),
+    description_id BIGINT REFERENCES descriptions (id),
+    day_of_week INTEGER,
+    day_of_month INTEGER,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_schedules ON schedules(user_id);
+
+CREATE INDEX IF NOT EXISTS idx_user_transactions_created ON transactions(user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    month TEXT NOT NULL,
+    income BIGINT NOT NULL,
+    expense BIGINT NOT NULL,
+    balance BIGINT NOT NULL,
+    closed_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+    PRIMARY KEY (user_id, month)
+);
+
+-- 使用PostgreSQL时不分片，没有user_shards表
+
+CREATE TABLE IF NOT EXISTS transactions_archive (
+    id BIGINT PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    type TEXT NOT NULL,
+    amount BIGINT NOT NULL,
+    description_id BIGINT REFERENCES descriptions (id),
+    category_id BIGINT REFERENCES categories (id),
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_archive_user_created ON transactions_archive(user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS archive_horizons (
+    user_id BIGINT PRIMARY KEY,
+    archived_before TEXT NOT NULL,
+    archived_count INTEGER NOT NULL DEFAULT 0,
+    archived_days INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS archive_rollups (
+    user_id BIGINT NOT NULL,
+    month TEXT NOT NULL,
+    category_id BIGINT NOT NULL DEFAULT 0,
+    type TEXT NOT NULL,
+    total BIGINT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, category_id, type)
+);
+
+-- 从版本4升级：分类和备注文字改为字典表的id（交易表还有category列时执行一次）
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'transactions' AND column_name = 'category'
+    ) THEN
+        INSERT INTO categories (user_id, name)
+            SELECT user_id, category FROM transactions WHERE category IS NOT NULL
+            UNION SELECT user_id, category FROM transactions_archive WHERE category IS NOT NULL
+            UNION SELECT user_id, category FROM schedules WHERE category IS NOT NULL
+            UNION SELECT user_id, category FROM archive_rollups
+            ON CONFLICT DO NOTHING;
+        INSERT INTO descriptions (user_id, text)
+            SELECT user_id, description FROM transactions WHERE description IS NOT NULL
+            UNION SELECT user_id, description FROM transactions_archive
+                WHERE description IS NOT NULL
+            UNION SELECT user_id, description FROM schedules WHERE description IS NOT NULL
+            ON CONFLICT DO NOTHING;
+
+        ALTER TABLE transactions
+            ADD COLUMN description_id BIGINT REFERENCES descriptions (id),
+            ADD COLUMN category_id BIGINT REFERENCES categories (id);
+        ALTER TABLE transactions_archive
+            ADD COLUMN description_id BIGINT REFERENCES descriptions (id),
+            ADD COLUMN category_id BIGINT REFERENCES categories (id);
+        ALTER TABLE schedules
+            ADD COLUMN category_id BIGINT REFERENCES categories (id),
+            ADD COLUMN description_id BIGINT REFERENCES descriptions (id);
+        ALTER TABLE archive_rollups ADD COLUMN category_id BIGINT NOT NULL DEFAULT 0;
+
+        UPDATE transactions AS t SET
+            category_id = (SELECT id FROM categories
+                           WHERE user_id = t.user_id AND name = t.category),
+            description_id = (SELECT id FROM descriptions
+                              WHERE user_id = t.user_id AND text = t.description);
+        UPDATE transactions_archive AS t SET
+            category_id = (SELECT id FROM categories
+                           WHERE user_id = t.user_id AND name = t.category),
+            description_id = (SELECT id FROM descriptions
+                              WHERE user_id = t.user_id AND text = t.description);
+        UPDATE schedules AS t SET
+            category_id = (SELECT id FROM categories
+                           WHERE user_id = t.user_id AND name = t.category),
+            description_id = (SELECT id FROM descriptions
+                              WHERE user_id = t.user_id AND text = t.description);
+        UPDATE archive_rollups AS t SET
+            category_id = COALESCE((SELECT id FROM categories
+                                    WHERE user_id = t.user_id AND name = t.category), 0);
+
+        ALTER TABLE transactions DROP COLUMN category, DROP COLUMN description;
+        ALTER TABLE transactions_archive DROP COLUMN category, DROP COLUMN description;
+        ALTER TABLE schedules DROP COLUMN category, DROP COLUMN description;
+        -- 删除category列时主键一起删除
+        ALTER TABLE archive_rollups DROP COLUMN category;
+        ALTER TABLE archive_rollups ADD PRIMARY KEY (user_id, month, category_id, type);
+    END IF;
+END $$;
+
+-- 从版本5升级：金额由元（DOUBLE PRECISION）改为整数分（交易表的amount列还是浮点数时执行一次）
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'transactions' AND column_name = 'amount'
+        AND data_type = 'double precision'
+    ) THEN
+        ALTER TABLE transactions
+            ALTER COLUMN amount TYPE BIGINT USING round(amount * 100);
+        ALTER TABLE transactions_archive
+            ALTER COLUMN amount TYPE BIGINT USING round(amount * 100);
+        ALTER TABLE schedules
+            ALTER COLUMN amount TYPE BIGINT USING round(amount * 100);
+        ALTER TABLE balance_snapshots
+            ALTER COLUMN income TYPE BIGINT USING round(income * 100),
+            ALTER COLUMN expense TYPE BIGINT USING round(expense * 100),
+            ALTER COLUMN balance TYPE BIGINT USING round(balance * 100);
+        ALTER TABLE archive_rollups
+            ALTER COLUMN total TYPE BIGINT USING round(total * 100);
+    END IF;
+END $$;
@@ -0,0 +1,217 @@
+"""
+读写分离的数据库连接池
+
+所有请求共用同一种读写连接时，统计、分类、搜索这类较重的读查询会与写入争用锁。
+这里为每个数据库文件维护两个连接池：
+
+- 只读连接池：以URI mode=ro打开并设置PRAGMA query_only，取出时开始一个读事务，
+  同一请求内的多次查询看到同一个快照
+- 写连接池：少量普通连接，处理会修改数据的请求
+
+数据库切换为WAL模式，读事务不会被写入阻塞，写入也不会被读事务阻塞。
+连接的close()把连接归还连接池；数据库文件被替换（如从备份恢复）后自动重建连接池。
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+
+try:
+    from backend.database.init_db import ensure_schema
+    from backend.repository import STATEMENT_CACHE_SIZE
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from database.init_db import ensure_schema
+    from repository import STATEMENT_CACHE_SIZE
+
+
+class PoolTimeout(Exception):
+    """等待空闲连接超时"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """close()时归还所属连接池的连接"""
+
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def discard(self):
+        """真正关闭连接"""
+        self.pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """一个数据库文件的连接池，最多size个连接"""
+
+    def __init__(self, db_path, size=4, readonly=False, timeout=30):
+        self.db_path = db_path
+        self.size = max(size, 1)
+        self.readonly = readonly
+        self.timeout = timeout
+        self.closed = False
+        self._idle = queue.LifoQueue()
+        self._checked_out = set()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self.readonly:
+            uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(
+                uri,
+                uri=True,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                factory=PooledConnection,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            conn.execute("PRAGMA query_only = 1")
+        else:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.timeout,
+                check_same_thread=False,
+                factory=PooledConnection,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+        conn.row_factory = sqlite3.Row
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        """取出一个连接；只读连接已开始读事务"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeout(f"等待数据库连接超时: {self.db_path}") from None
+
+        with self._lock:
+            self._checked_out.add(id(conn))
+        if self.readonly:
+            # 读事务在第一次查询时取得快照，之后的查询都看到同一个快照
+            conn.execute("BEGIN")
+        return conn
+
+    def release(self, conn):
+        """归还连接；未提交的事务会回滚，重复归还时忽略"""
+        with self._lock:
+            if id(conn) not in self._checked_out:
+                return
+            self._checked_out.discard(id(conn))
+        if conn.in_transaction:
+            conn.rollback()
+        if self.closed:
+            conn.discard()
+        else:
+            self._idle.put(conn)
+
+    def stats(self):
+        """连接池上限、已打开的连接数和使用中的连接数"""
+        with self._lock:
+            return {"size": self.size, "open": self._created, "in_use": len(self._checked_out)}
+
+    def close(self):
+        """关闭空闲连接；使用中的连接在归还时关闭"""
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().discard()
+            except queue.Empty:
+                break
+
+
+class DatabasePools:
+    """按数据库文件管理只读连接池和写连接池"""
+
+    def __init__(self, read_size=4, write_size=2, timeout=30):
+        self.read_size = read_size
+        self.write_size = write_size
+        self.timeout = timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _identity(db_path):
+        # 连接池一直持有打开的文件，被删除或替换后的新文件不会与之共用inode
+        try:
+            stat = os.stat(db_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _create(self, db_path):
+        writer = ConnectionPool(db_path, self.write_size, timeout=self.timeout)
+        conn = writer.acquire()
+        try:
+            ensure_schema(conn)
+            conn.execute("PRAGMA journal_mode = WAL")
+        finally:
+            conn.close()
+        reader = ConnectionPool(
+            db_path, self.read_size, readonly=True, timeout=self.timeout
+        )
+        return self._identity(db_path), reader, writer
+
+    def _get(self, db_path):
+        pools = self._pools.get(db_path)
+        if pools is not None and pools[0] == self._identity(db_path):
+            return pools
+
+        with self._lock:
+            pools = self._pools.get(db_path)
+            if pools is None or pools[0] != self._identity(db_path):
+                if pools is not None:
+                    pools[1].close()
+                    pools[2].close()
+                pools = self._create(db_path)
+                self._pools[db_path] = pools
+        return pools
+
+    def connection(self, db_path, readonly=False):
+        """取出数据库文件的只读连接或写连接，用完后调用close()归还"""
+        _, reader, writer = self._get(db_path)
+        return (reader if readonly else writer).acquire()
+
+    def stats(self):
+        """每个连接池的[(数据库路径, "read"或"write", ConnectionPool.stats())]"""
+        with self._lock:
+            pools = list(self._pools.items())
+        return [
+            (db_path, name, pool.stats())
+            for db_path, (_, reader, writer) in pools
+            for name, pool in (("read", reader), ("write", writer))
+        ]
+
+    def close(self):
+        """关闭所有连接池"""
+        with self._lock:
+            for _, reader, writer in self._pools.values():
+                reader.close()
+                writer.close()
+            self._pools.clear()
@@ -0,0 +1,87 @@
+"""
+时间序列降采样
+
+长时间范围的趋势数据点数远超图表能绘制的数量。这里提供两种降采样方式，
+都返回要保留的下标列表（升序，且总是包含首尾两个点），便于对多条序列取相同的点。
+返回的点数不超过max_points；max_points不足以分桶时只保留首尾两个点：
+
+- lttb:   Largest-Triangle-Three-Buckets，保留曲线的视觉形状
+- minmax: 每个桶保留最小值和最大值，不会漏掉峰值
+"""
+
+
+def _endpoints(n, max_points):
+    """点数太少无法分桶时只保留首尾两个点"""
+    return [0, n - 1][: max(max_points, 1)]
+
+
+def lttb(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets降采样，返回保留点的下标"""
+    n = len(ys)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return _endpoints(n, threshold)
+
+    sampled = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # 下一个桶的平均点
+        avg_start = int((i + 1) * bucket_size) + 1
+        avg_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_count = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / avg_count
+        avg_y = sum(ys[avg_start:avg_end]) / avg_count
+
+        # 当前桶中与上一个选中点、下一个桶平均点构成最大三角形的点
+        range_start = int(i * bucket_size) + 1
+        range_end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        max_area = -1.0
+        chosen = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+
+        sampled.append(chosen)
+        a = chosen
+
+    sampled.append(n - 1)
+    return sampled
+
+
+def minmax(ys, max_points):
+    """最小/最大值分桶降采样，返回保留点的下标"""
+    n = len(ys)
+    if max_points >= n:
+        return list(range(n))
+    if max_points < 4:
+        return _endpoints(n, max_points)
+
+    # 首尾各占一个点，其余每个桶最多两个点
+    buckets = (max_points - 2) // 2
+    bucket_size = (n - 2) / buckets
+    keep = {0, n - 1}
+    for i in range(buckets):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        if start >= end:
+            continue
+        window = range(start, end)
+        keep.add(min(window, key=ys.__getitem__))
+        keep.add(max(window, key=ys.__getitem__))
+    return sorted(keep)
+
+
+METHODS = ("lttb", "minmax")
+
+
+def downsample(xs, ys, max_points, method="lttb"):
+    """按指定方式降采样，返回保留点的下标"""
+    if method == "minmax":
+        return minmax(ys, max_points)
+    return lttb(xs, ys, max_points)
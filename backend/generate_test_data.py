@@ -1,119 +1,395 @@
+"""
+模拟数据生成器
+
+按用户数、天数（或年数）和每天的平均交易数批量生成交易，同一组参数和--seed
+每次生成完全相同的数据（--end固定结束日期时连日期也相同），用于压力测试和基准测试：
+
+- 分类、备注、金额范围和收入比例来自数据分布配置（--profile指定的JSON覆盖DEFAULT_PROFILE）
+- 每个新用户按配置添加定时发放
+- 用executemany按批写入，每commit_rows行提交一次；生成期间放宽同步和日志设置，
+  先删除交易表的索引，生成后重建
+- 生成后为已结束的月份建立余额快照，可选地归档旧交易
+
+不指定--users时与原来一样，清空第一个已有用户的交易后为其生成最近--days天的数据。
+生成到单个数据库文件；需要分片时再用scripts/shard_database.py迁移。
+
+用法:
+    python backend/generate_test_data.py
+    python backend/generate_test_data.py --users 1000 --years 5 --per-day 4 --seed 7
+    python backend/generate_test_data.py --database /tmp/load.db --users 10000 --years 3 \\
+        --profile profile.json --end 2025-06-30 --archive-days 365
+"""
+
+import argparse
+import json
 import os
 import random
 import sqlite3
-from datetime import datetime, timedelta
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+try:
+    from backend.archive import archive_all
+    from backend.database.init_db import ensure_schema
+    from backend.money import to_cents
+    from backend.snapshots import close_all_months
+except ImportError:  # 以脚本方式运行（python backend/generate_test_data.py）
+    from archive import archive_all
+    from database.init_db import ensure_schema
+    from money import to_cents
+    from snapshots import close_all_months
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "database", "cash_manager.db")
 
+# 数据分布：金额以元为单位，按step（元）取整；weight为同类型中被选中的相对权重
+DEFAULT_PROFILE = {
+    "income_ratio": 0.45,
+    "income": [
+        {"category": "零花钱", "descriptions": ["每周零花钱", "表现良好奖励"], "min": 10, "max": 50, "weight": 3},
+        {"category": "奖励", "descriptions": ["数学考试满分奖励", "帮忙做家务奖励"], "min": 5, "max": 20, "weight": 2},
+        {"category": "红包", "descriptions": ["奶奶给的红包"], "min": 20, "max": 100, "weight": 1},
+        {"category": "礼物", "descriptions": ["生日礼物钱"], "min": 20, "max": 50, "weight": 1},
+        {"category": "压岁钱", "descriptions": ["过年压岁钱"], "min": 50, "max": 200, "weight": 0.2},
+        {"category": "帮忙家务", "descriptions": ["洗碗奖励", "倒垃圾奖励"], "min": 1, "max": 5, "weight": 2},
+    ],
+    "expense": [
+        {"category": "零食", "descriptions": ["买糖果", "买薯片", "买冰淇淋"], "min": 1, "max": 8, "weight": 5},
+        {"category": "文具", "descriptions": ["买铅笔", "买橡皮擦", "买笔记本"], "min": 1, "max": 5, "weight": 3},
+        {"category": "玩具", "descriptions": ["买玩具车", "买积木"], "min": 10, "max": 30, "weight": 1},
+        {"category": "游戏", "descriptions": ["游戏充值", "买游戏卡"], "min": 5, "max": 15, "weight": 1},
+        {"category": "书籍", "descriptions": ["买故事书", "买漫画书"], "min": 5, "max": 12, "weight": 1},
+        {"category": "娱乐", "descriptions": ["看电影", "去游乐园"], "min": 10, "max": 50, "weight": 0.5},
+        {"category": "交通", "descriptions": ["坐公交"], "min": 1, "max": 2, "weight": 2},
+        {"category": "其他", "descriptions": ["其他支出", ""], "min": 1, "max": 10, "weight": 0.5},
+    ],
+    "step": 0.1,
+    "schedules": [
+        {"frequency": "daily", "amount": 2, "category": "每日零花钱"},
+        {"frequency": "weekly", "amount": 10, "category": "每周零花钱", "day_of_week": 0},
+        {"frequency": "monthly", "amount": 50, "category": "每月零花钱", "day_of_month": 1},
+    ],
+}
+
+
+class Profile:
+    """数据分布配置，金额转换为分，权重转换为累计权重"""
+
+    def __init__(self, data=None):
+        data = dict(DEFAULT_PROFILE, **(data or {}))
+        self.income_ratio = float(data["income_ratio"])
+        step = max(to_cents(data["step"]), 1)
+        self.kinds = {}
+        for trans_type in ("income", "expense"):
+            entries = []
+            total = 0.0
+            cum_weights = []
+            for entry in data[trans_type]:
+                total += float(entry.get("weight", 1))
+                cum_weights.append(total)
+                low = max(to_cents(entry["min"]) // step, 1)
+                high = max(to_cents(entry["max"]) // step, low)
+                entries.append(
+                    (entry["category"], list(entry.get("descriptions") or [""]), low, high, step)
+                )
+            self.kinds[trans_type] = (entries, cum_weights)
+        self.schedules = list(data["schedules"])
+
+    def categories(self):
+        names = {entry[0] for entries, _ in self.kinds.values() for entry in entries}
+        return sorted(names | {schedule["category"] for schedule in self.schedules})
+
+    def descriptions(self):
+        return sorted(
+            {text for entries, _ in self.kinds.values() for entry in entries for text in entry[1]}
+        )
+
+
+def load_profile(path=None):
+    """读取数据分布配置（JSON，未给出的键使用DEFAULT_PROFILE）"""
+    if not path:
+        return Profile()
+    with open(path, encoding="utf-8") as f:
+        return Profile(json.load(f))
+
+
+@contextmanager
+def bulk_load(conn):
+    """批量写入期间关闭同步、日志放在内存中，并先删除交易表的索引，结束后恢复"""
+    indexes = conn.execute(
+        """SELECT name, sql FROM sqlite_master
+           WHERE type = 'index' AND tbl_name = 'transactions' AND sql IS NOT NULL"""
+    ).fetchall()
+    conn.commit()
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.commit()
+        for _, sql in indexes:
+            conn.execute(sql)
+        conn.commit()
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+
 
-def generate_test_data():
-    """生成过去30天的测试数据"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-
-    # 获取用户ID（假设第一个用户）
-    cursor.execute("SELECT id FROM users LIMIT 1")
-    user = cursor.fetchone()
-    if not user:
-        print("没有找到用户，请先创建用户")
-        return
-
-    user_id = user[0]
-
-    # 清空现有交易数据
-    cursor.execute("DELETE FROM transactions WHERE user_id = ?", (user_id,))
-    print("已清空现有交易数据")
-
-    # 收入分类和描述
-    income_data = [
-        ("零花钱", "每周零花钱", 50),
-        ("奖励", "数学考试满分奖励", 20),
-        ("奖励", "帮忙做家务奖励", 10),
-        ("红包", "奶奶给的红包", 100),
-        ("礼物", "生日礼物钱", 50),
-        ("压岁钱", "过年压岁钱", 200),
-        ("帮忙家务", "洗碗奖励", 5),
-        ("帮忙家务", "倒垃圾奖励", 3),
-        ("零花钱", "表现良好奖励", 15),
-    ]
-
-    # 支出分类和描述
-    expense_data = [
-        ("零食", "买糖果", 5),
-        ("零食", "买薯片", 8),
-        ("零食", "买冰淇淋", 6),
-        ("文具", "买铅笔", 2),
-        ("文具", "买橡皮擦", 1),
-        ("文具", "买笔记本", 5),
-        ("玩具", "买玩具车", 25),
-        ("玩具", "买积木", 30),
-        ("游戏", "游戏充值", 10),
-        ("游戏", "买游戏卡", 15),
-        ("书籍", "买故事书", 12),
-        ("书籍", "买漫画书", 8),
-        ("娱乐", "看电影", 15),
-        ("娱乐", "去游乐园", 50),
-        ("交通", "坐公交", 2),
-        ("礼物", "给同学买生日礼物", 20),
-        ("捐款", "慈善捐款", 5),
-        ("其他", "其他支出", 10),
-    ]
-
-    # 生成过去30天的数据
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=30)
-
-    current_date = start_date
-    balance = 0
-
-    while current_date <= end_date:
-        # 每天随机生成0-3笔交易
-        num_transactions = random.randint(0, 3)
-
-        for _ in range(num_transactions):
-            # 55%概率是支出，45%概率是收入（提高收入比例）
-            if random.random() < 0.55:
-                # 支出
-                category, description, max_amount = random.choice(expense_data)
-                amount = round(random.uniform(1, max_amount), 2)
-                transaction_type = "expense"
-            else:
-                # 收入
-                category, description, max_amount = random.choice(income_data)
-                amount = round(random.uniform(10, max_amount), 2)
-                transaction_type = "income"
-
-            # 随机时间（白天）
-            hour = random.randint(9, 21)
-            minute = random.randint(0, 59)
-            transaction_time = current_date.replace(hour=hour, minute=minute)
-
-            cursor.execute(
-                """INSERT INTO transactions (user_id, type, amount, category, description, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (
-                    user_id,
-                    transaction_type,
-                    amount,
-                    category,
-                    description,
-                    transaction_time.strftime("%Y-%m-%d %H:%M:%S"),
-                ),
+def create_users(conn, count, password_hash, prefix="kid_"):
+    """新建count个用户（用户名为prefix加用户id），返回用户id列表
+
+    id从已有的最大id之后开始，用户名随id递增，在已有数据的库中再次生成时不会重名。
+    """
+    first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").fetchone()[0]
+    user_ids = list(range(first, first + count))
+    conn.executemany(
+        "INSERT INTO users (id, username, password) VALUES (?, ?, ?)",
+        [(user_id, f"{prefix}{user_id}", password_hash) for user_id in user_ids],
+    )
+    conn.commit()
+    return user_ids
+
+
+def _dictionary_ids(conn, user_ids, profile):
+    """批量写入字典表，返回{(用户id, 分类名): id}和{(用户id, 备注): id}"""
+    wanted = set(user_ids)
+    ids = []
+    for table, column, values in (
+        ("categories", "name", profile.categories()),
+        ("descriptions", "text", profile.descriptions()),
+    ):
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {table} (user_id, {column}) VALUES (?, ?)",
+            [(user_id, value) for user_id in user_ids for value in values],
+        )
+        ids.append(
+            {
+                (user_id, value): row_id
+                for row_id, user_id, value in conn.execute(
+                    f"SELECT id, user_id, {column} FROM {table}"
+                )
+                if user_id in wanted
+            }
+        )
+    return ids[0], ids[1]
+
+
+def add_schedules(conn, user_ids, profile, categories):
+    """为每个用户添加配置中的定时发放"""
+    conn.executemany(
+        """INSERT INTO schedules
+           (user_id, frequency, amount, category_id, day_of_week, day_of_month)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        [
+            (
+                user_id,
+                schedule["frequency"],
+                to_cents(schedule["amount"]),
+                categories[user_id, schedule["category"]],
+                schedule.get("day_of_week"),
+                schedule.get("day_of_month"),
             )
+            for user_id in user_ids
+            for schedule in profile.schedules
+        ],
+    )
 
-            # 更新余额
-            if transaction_type == "income":
-                balance += amount
-            else:
-                balance -= amount
 
-        current_date += timedelta(days=1)
+def generate_transactions(
+    conn, user_ids, start, end, per_day, seed, profile, names, commit_rows=1000000
+):
+    """为每个用户生成start到end（date，含）之间的交易，返回生成的笔数
 
+    每个用户每天0到2*per_day笔（平均per_day笔），同一天所有用户的交易按时间排序后写入，
+    交易id随时间递增。
+    """
+    categories, descriptions = names
+    rng = random.Random(seed)
+    income = profile.kinds["income"]
+    expense = profile.kinds["expense"]
+    span = 2 * per_day + 1
+    count = pending = 0
+    day = start
+    while day <= end:
+        prefix = day.strftime("%Y-%m-%d ")
+        rows = []
+        for user_id in user_ids:
+            n = int(rng.random() * span)
+            for _ in range(n):
+                if rng.random() < profile.income_ratio:
+                    trans_type, (entries, cum_weights) = "income", income
+                else:
+                    trans_type, (entries, cum_weights) = "expense", expense
+                category, texts, low, high, step = rng.choices(
+                    entries, cum_weights=cum_weights
+                )[0]
+                second = rng.randrange(86400)
+                rows.append(
+                    (
+                        f"{prefix}{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}",
+                        user_id,
+                        trans_type,
+                        rng.randint(low, high) * step,
+                        descriptions[user_id, rng.choice(texts)],
+                        categories[user_id, category],
+                    )
+                )
+        rows.sort()
+        conn.executemany(
+            """INSERT INTO transactions
+               (created_at, user_id, type, amount, description_id, category_id)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        count += len(rows)
+        pending += len(rows)
+        if pending >= commit_rows:
+            conn.commit()
+            pending = 0
+        day += timedelta(days=1)
     conn.commit()
-    conn.close()
+    return count
+
+
+def generate_dataset(
+    conn,
+    user_ids,
+    days,
+    per_day,
+    seed=42,
+    profile=None,
+    end=None,
+    schedules=True,
+    archive_days=0,
+    commit_rows=1000000,
+):
+    """为user_ids生成截至end（默认今天）的days天交易、定时发放、月末快照和归档，返回交易笔数"""
+    profile = profile or Profile()
+    end = end or date.today()
+    with bulk_load(conn):
+        names = _dictionary_ids(conn, user_ids, profile)
+        if schedules:
+            add_schedules(conn, user_ids, profile, names[0])
+        count = generate_transactions(
+            conn,
+            user_ids,
+            end - timedelta(days=days - 1),
+            end,
+            per_day,
+            seed,
+            profile,
+            names,
+            commit_rows,
+        )
+
+    now = datetime(end.year, end.month, end.day, 23, 59, 59)
+    close_all_months(conn, now)
+    if archive_days > 0:
+        archive_all(conn, now, archive_days)
+    conn.execute("ANALYZE")
+    conn.commit()
+    return count
+
+
+def generate_test_data(
+    database_path=DATABASE_PATH,
+    users=0,
+    days=30,
+    per_day=1.5,
+    seed=42,
+    profile=None,
+    end=None,
+    password="kid123",
+    archive_days=0,
+):
+    """生成模拟数据，返回(用户数, 交易笔数)
+
+    users为0时清空第一个已有用户的交易后为其生成数据（不添加定时发放）。
+    """
+    conn = sqlite3.connect(database_path)
+    ensure_schema(conn)
+    try:
+        if users:
+            from werkzeug.security import generate_password_hash
+
+            # 所有用户共用同一个密码哈希，避免生成大量用户时耗时
+            user_ids = create_users(conn, users, generate_password_hash(password))
+        else:
+            user = conn.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()
+            if not user:
+                print("没有找到用户，请先创建用户或使用--users")
+                return 0, 0
+            user_ids = [user[0]]
+            # 归档的交易和汇总一起清空，否则新数据会叠加在旧的归档历史上
+            for table in (
+                "transactions",
+                "balance_snapshots",
+                "transactions_archive",
+                "archive_horizons",
+                "archive_rollups",
+            ):
+                conn.execute(f"DELETE FROM {table} WHERE user_id = ?", user_ids)
+            conn.commit()
+            print("已清空现有交易数据")
+
+        count = generate_dataset(
+            conn,
+            user_ids,
+            days,
+            per_day,
+            seed,
+            profile,
+            end,
+            schedules=bool(users),
+            archive_days=archive_days,
+        )
+        return len(user_ids), count
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成模拟数据")
+    parser.add_argument("--database", default=DATABASE_PATH, help="数据库路径")
+    parser.add_argument("--users", type=int, default=0,
+                        help="新建的用户数（0为使用第一个已有用户）")
+    parser.add_argument("--days", type=int, default=30, help="生成多少天的数据")
+    parser.add_argument("--years", type=float, help="生成多少年的数据（覆盖--days）")
+    parser.add_argument("--per-day", type=float, default=1.5, help="每个用户每天的平均交易数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", help="最后一天 YYYY-MM-DD（默认今天）")
+    parser.add_argument("--profile", help="数据分布配置（JSON）")
+    parser.add_argument("--password", default="kid123", help="新建用户的密码")
+    parser.add_argument("--archive-days", type=int, default=0,
+                        help="生成后归档早于多少天的交易（0为不归档）")
+    args = parser.parse_args()
 
-    print(f"已生成30天的测试数据，最终余额：¥{balance:.2f}")
+    days = round(365.25 * args.years) if args.years else args.days
+    end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else None
+    began = time.perf_counter()
+    users, count = generate_test_data(
+        args.database,
+        args.users,
+        days,
+        args.per_day,
+        args.seed,
+        load_profile(args.profile),
+        end,
+        args.password,
+        args.archive_days,
+    )
+    seconds = time.perf_counter() - began
+    print(
+        f"已为 {users} 个用户生成 {days} 天的数据：{count} 笔交易，"
+        f"耗时 {seconds:.1f}s（每秒 {count / max(seconds, 1e-9):.0f} 笔）"
+    )
 
 
 if __name__ == "__main__":
-    generate_test_data()
+    main()
@@ -0,0 +1,197 @@
+"""
+合并提交（group commit）
+
+每个写请求单独提交时，每次插入都要等一次fsync，持续写入的吞吐量受磁盘延迟限制。
+启用合并提交后，写请求把写操作交给该数据库文件的写入线程，写入线程把
+等待窗口内（或凑满max_batch个）的写操作放在同一个事务中执行并提交，
+提交完成后才唤醒各个请求，因此请求返回时数据已经持久化。
+
+- 每个写操作在独立的SAVEPOINT中执行，单个失败只回滚它自己，异常在提交它的请求中抛出
+- window_ms为0时不额外等待，只合并写入线程忙于上一次提交期间排队的写操作
+- 写入线程无法打开数据库或连接出错退出时，已排队的写操作以该异常失败，
+  下一次submit()重新启动写入线程；等待超过timeout秒仍未开始执行的写操作被取消
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+try:
+    from backend.database.init_db import ensure_schema
+    from backend.repository import STATEMENT_CACHE_SIZE
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from database.init_db import ensure_schema
+    from repository import STATEMENT_CACHE_SIZE
+
+
+class _Pending:
+    """一个排队中的写操作"""
+
+    __slots__ = ("operation", "done", "result", "error", "claimed", "cancelled")
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.claimed = False
+        self.cancelled = False
+
+
+class GroupCommitter:
+    """一个数据库文件的合并提交写入线程"""
+
+    def __init__(self, db_path, window_ms=2, max_batch=100, timeout=30):
+        self.db_path = db_path
+        self.window = max(window_ms, 0) / 1000
+        self.max_batch = max(max_batch, 1)
+        self.timeout = timeout
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+
+    def _ensure_started(self):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            with self._lock:
+                thread = self._thread
+                if thread is None or not thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name="group-commit", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, operation):
+        """提交写操作operation(conn)，等到所在批次提交后返回它的返回值
+
+        operation在写入线程中执行，只执行SQL，不要调用conn.commit()。
+        超过timeout秒仍未开始执行时取消并抛出sqlite3.OperationalError。
+        """
+        self._ensure_started()
+        pending = _Pending(operation)
+        self._queue.put(pending)
+        deadline = time.monotonic() + self.timeout
+        while not pending.done.wait(min(max(deadline - time.monotonic(), 0), 1)):
+            if time.monotonic() < deadline:
+                # 写入线程在排队期间退出时重新启动，由新线程处理队列
+                self._ensure_started()
+                continue
+            with self._claim_lock:
+                if not pending.claimed:
+                    pending.cancelled = True
+                    raise sqlite3.OperationalError("合并提交等待超时")
+            # 已经开始执行，等待所在批次提交（或回滚）
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self, first):
+        """从first开始收集一批写操作；收到停止信号时返回(批次, True)"""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(
+                self.db_path,
+                isolation_level=None,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+        except Exception as e:
+            self._fail_queued(e)
+            return
+        try:
+            conn.row_factory = sqlite3.Row
+            ensure_schema(conn)
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is None:
+                    break
+                batch, stopping = self._collect(first)
+                self._flush(conn, batch)
+        except Exception as e:
+            # 连接已不可用：让排队的写操作失败，线程退出，下一次submit()重新启动
+            self._fail_queued(e)
+        finally:
+            conn.close()
+
+    def _fail_queued(self, error):
+        """以error结束队列中所有的写操作"""
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if pending is not None:
+                pending.error = error
+                pending.done.set()
+
+    def _claim(self, batch):
+        """去掉已超时取消的写操作，其余标记为开始执行"""
+        with self._claim_lock:
+            batch = [pending for pending in batch if not pending.cancelled]
+            for pending in batch:
+                pending.claimed = True
+        return batch
+
+    def _flush(self, conn, batch):
+        batch = self._claim(batch)
+        if not batch:
+            return
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for pending in batch:
+                conn.execute("SAVEPOINT operation")
+                try:
+                    pending.result = pending.operation(conn)
+                except Exception as e:
+                    pending.error = e
+                    conn.execute("ROLLBACK TO operation")
+                conn.execute("RELEASE operation")
+            conn.execute("COMMIT")
+        except Exception as e:
+            for pending in batch:
+                if pending.error is None:
+                    pending.error = e
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except Exception:
+                    # 无法回滚时连接不能再用，由_run结束线程
+                    self._finish(batch)
+                    raise
+        self._finish(batch)
+
+    def _finish(self, batch):
+        self.batches += 1
+        self.operations += len(batch)
+        for pending in batch:
+            pending.done.set()
+
+    def shutdown(self):
+        """处理完已排队的写操作后停止写入线程"""
+        with self._lock:
+            if self._thread is not None:
+                if self._thread.is_alive():
+                    self._queue.put(None)
+                    self._thread.join()
+                self._thread = None
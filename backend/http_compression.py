@@ -0,0 +1,97 @@
+"""
+响应压缩
+
+根据请求的Accept-Encoding对JSON、CSV等文本响应进行gzip或deflate压缩：
+小于阈值的响应不压缩，已带Content-Encoding的响应（如预压缩的静态资源）保持不变，
+流式响应逐块压缩。可压缩类型的响应都会带上Vary: Accept-Encoding。
+"""
+
+import zlib
+
+from flask import request
+
+# 支持的编码及对应的zlib wbits：gzip带gzip头，HTTP中的deflate即zlib格式
+ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+DEFAULT_MIMETYPES = (
+    "application/json",
+    "application/vnd.cashmanager.columnar+json",
+    "text/csv",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+)
+
+
+def compress_bytes(data, encoding, level=6):
+    """一次性压缩整个响应体"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level=6):
+    """逐块压缩流式响应，每块数据都会立即刷新给客户端"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def choose_encoding(accept_encodings):
+    """从Accept-Encoding中选出客户端最偏好的编码，不支持时返回None"""
+    return accept_encodings.best_match(list(ENCODINGS))
+
+
+def compress_response(response, accept_encodings, config, method="GET"):
+    """按配置压缩响应（after_request中调用）"""
+    if (
+        response.mimetype not in config["COMPRESS_MIMETYPES"]
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None or method == "HEAD":
+        return response
+
+    level = config["COMPRESS_LEVEL"]
+    streamed = response.is_streamed or response.direct_passthrough
+    if streamed:
+        length = response.content_length
+        if length is not None and length < config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.response = compress_stream(response.iter_encoded(), encoding, level)
+        response.direct_passthrough = False
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(compress_bytes(data, encoding, level))
+
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def init_compression(app):
+    """注册响应压缩"""
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+    app.config.setdefault("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES)
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(
+            response, request.accept_encodings, app.config, request.method
+        )
@@ -0,0 +1,210 @@
+"""
+数据库维护
+
+长期运行后数据库会出现这些问题：删除和归档留下的空闲页不会归还给文件系统，
+查询规划器没有统计信息，WAL文件只增不减。维护任务逐个处理这些问题：
+
+- analyze_stale_tables：行数变化超过阈值的表重新收集统计信息（相当于PRAGMA optimize，
+  3.46之前的PRAGMA optimize只分析本连接查询过的表，维护任务用的是新连接）；
+  行数按rowid的范围估计，不用COUNT(*)扫描整张表
+- incremental_vacuum：分批回收空闲页，需要数据库启用auto_vacuum=INCREMENTAL
+  （新数据库自动启用，已有数据库运行scripts/enable_incremental_vacuum.py迁移）
+- checkpoint_wal：把WAL写回数据库文件，没有读写时截断WAL文件
+- quick_check：检查数据库结构是否损坏
+
+每个任务都有时间上限，等待锁的时间很短，拿不到锁时跳过，不会长时间阻塞请求。
+返回值是记录做了什么的字典，由调度器写入日志。
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# 维护任务等待锁的最长时间（毫秒）
+BUSY_TIMEOUT_MS = 50
+
+# 每次增量回收的页数，每批是一个单独的短事务
+VACUUM_PAGES_PER_STEP = 256
+
+# ANALYZE每个索引最多检查的行数，大表的统计信息是近似值
+ANALYSIS_LIMIT = 1000
+
+
+@contextmanager
+def time_limit(conn, seconds):
+    """超过seconds秒后中断conn上正在执行的语句（抛出OperationalError: interrupted）"""
+    deadline = time.monotonic() + seconds
+    previous = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+    try:
+        yield deadline
+    finally:
+        conn.set_progress_handler(None, 0)
+        conn.execute(f"PRAGMA busy_timeout = {previous}")
+
+
+def _interrupted(error):
+    return "interrupted" in str(error)
+
+
+def _analyzed_rows(conn):
+    """上次ANALYZE时每张表的行数（受analysis_limit限制时是估计值）"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+    ).fetchone()
+    if exists is None:
+        return {}
+    rows = {}
+    for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+        rows[table] = int(stat.split()[0])
+    return rows
+
+
+# 上次ANALYZE时的行数估计：(数据库文件, 表) -> (sqlite_stat1中的行数, rowid的范围)
+_analyzed_spans = {}
+
+
+def _rowid_span(conn, table):
+    """按最小和最大rowid估计行数：两次索引查找，不扫描整张表
+
+    删除的行留下的空洞也计入范围，所以只与上次ANALYZE时的范围比较，不与实际行数比较。
+    没有rowid的表（WITHOUT ROWID）退回COUNT(*)。
+    """
+    try:
+        # 两个子查询各自走最小/最大值优化；写成MIN(rowid), MAX(rowid)会扫描整张表
+        low, high = conn.execute(
+            f'SELECT (SELECT MIN(rowid) FROM "{table}"),'
+            f' (SELECT MAX(rowid) FROM "{table}")'
+        ).fetchone()
+    except sqlite3.OperationalError as e:
+        if "rowid" not in str(e):
+            raise
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    return 0 if high is None else high - low + 1
+
+
+def analyze_stale_tables(conn, min_changes=1000, seconds=5):
+    """行数比上次ANALYZE时变化至少min_changes行（或从未分析）的表重新收集统计信息
+
+    上次ANALYZE不是由本进程执行的（重启后，或sqlite_stat1已被其他进程更新）时，
+    与sqlite_stat1中的行数比较。
+    """
+    started = time.monotonic()
+    report = {"analyzed": [], "timed_out": False}
+    with time_limit(conn, seconds):
+        try:
+            database = conn.execute("PRAGMA database_list").fetchone()[2]
+            analyzed = _analyzed_rows(conn)
+            tables = [
+                row[0]
+                for row in conn.execute(
+                    """SELECT name FROM sqlite_master
+                       WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+                       ORDER BY name"""
+                )
+            ]
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            for table in tables:
+                span = _rowid_span(conn, table)
+                previous = analyzed.get(table)
+                if previous is None and span == 0:
+                    continue
+                if previous is not None:
+                    stat_rows, base = _analyzed_spans.get((database, table), (None, 0))
+                    if stat_rows != previous:
+                        base = previous
+                    if abs(span - base) < min_changes:
+                        continue
+                conn.execute(f'ANALYZE "{table}"')
+                conn.commit()
+                _analyzed_spans[(database, table)] = (
+                    _analyzed_rows(conn).get(table),
+                    span,
+                )
+                report["analyzed"].append(table)
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not _interrupted(e) and "locked" not in str(e):
+                raise
+            report["timed_out"] = True
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report
+
+
+def incremental_vacuum(conn, seconds=5):
+    """分批回收空闲页，直到没有空闲页或超过时间上限"""
+    started = time.monotonic()
+    report = {
+        "enabled": conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2,
+        "freed_pages": 0,
+        "timed_out": False,
+    }
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if report["enabled"]:
+        with time_limit(conn, seconds) as deadline:
+            try:
+                while free > 0:
+                    if time.monotonic() > deadline:
+                        report["timed_out"] = True
+                        break
+                    conn.execute(
+                        f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})"
+                    ).fetchall()
+                    conn.commit()
+                    remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    report["freed_pages"] += free - remaining
+                    free = remaining
+                    # 两批之间让出写锁
+                    time.sleep(0.001)
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if not _interrupted(e) and "locked" not in str(e):
+                    raise
+                report["timed_out"] = True
+    report["free_pages"] = free
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report
+
+
+def checkpoint_wal(conn, seconds=5):
+    """把WAL写回数据库文件；全部写回后再尝试截断WAL文件"""
+    started = time.monotonic()
+    report = {"wal": conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"}
+    if report["wal"]:
+        with time_limit(conn, seconds):
+            try:
+                busy, frames, done = conn.execute(
+                    "PRAGMA wal_checkpoint(PASSIVE)"
+                ).fetchone()
+                report.update(frames=frames, checkpointed=done, truncated=False)
+                # 只有在没有读事务使用WAL时才能截断，等待锁的时间很短
+                if frames > 0 and done == frames:
+                    busy = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+                    report["truncated"] = busy == 0
+            except sqlite3.OperationalError as e:
+                if not _interrupted(e):
+                    raise
+                report["timed_out"] = True
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report
+
+
+def quick_check(conn, seconds=30, max_errors=10):
+    """检查数据库结构，ok为None表示超过时间上限未检查完"""
+    started = time.monotonic()
+    report = {"ok": None, "errors": []}
+    with time_limit(conn, seconds):
+        try:
+            rows = [row[0] for row in conn.execute(f"PRAGMA quick_check({max_errors})")]
+        except sqlite3.OperationalError as e:
+            if not _interrupted(e):
+                raise
+        else:
+            report["ok"] = rows == ["ok"]
+            if not report["ok"]:
+                report["errors"] = rows
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report
@@ -0,0 +1,237 @@
+"""
+请求指标和访问日志
+
+每个请求记录耗时、状态码、执行的SQL语句数和SQL耗时。SQL由repository.add_listener的监听
+计数，只累计当前线程正在处理的请求（合并提交的写入线程中执行的语句不计入请求）。汇总为：
+
+- cash_manager_http_request_duration_seconds: 按路由和方法的耗时直方图
+- cash_manager_http_requests_total: 按路由、方法和状态码的请求数
+- cash_manager_http_request_sql_statements: 每个请求的SQL语句数直方图
+- cash_manager_http_request_sql_seconds: 每个请求的SQL耗时直方图
+
+路由取URL规则（如 /api/transactions/<int:tx_id>），没有匹配的请求记为<unmatched>，
+标签的取值数量不随URL增长。应用用gauge()注册的指标（连接池、缓存、定时任务）在抓取时计算。
+
+GET /metrics 以Prometheus文本格式输出全部指标；访问日志（logger cash_manager.access）
+每个请求一行JSON，带有同样的数字。
+"""
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from flask import Response, abort, request, session
+
+try:
+    from backend import repository
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    import repository
+
+access_logger = logging.getLogger("cash_manager.access")
+
+PREFIX = "cash_manager_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SQL_SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+_local = threading.local()
+_ready_loggers = set()
+
+
+class RequestStats:
+    """当前线程正在处理的请求"""
+
+    __slots__ = ("began", "statements", "sql_seconds")
+
+    def __init__(self):
+        self.began = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+def _on_statement(sql, params, seconds):
+    current = getattr(_local, "request", None)
+    if current is not None:
+        current.statements += 1
+        current.sql_seconds += seconds
+
+
+class Histogram:
+    """一组标签的直方图：每个桶的计数（不累计）、总和和次数"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, buckets, value):
+        i = bisect_left(buckets, value)
+        if i < len(buckets):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return "+Inf" if value == float("inf") else repr(value)
+    return str(value)
+
+
+class Metrics:
+    """进程内的请求指标和注册的gauge"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._histograms = {
+            "http_request_duration_seconds": ("请求耗时（秒）", DURATION_BUCKETS, {}),
+            "http_request_sql_statements": ("每个请求执行的SQL语句数", STATEMENT_BUCKETS, {}),
+            "http_request_sql_seconds": ("每个请求执行SQL的耗时（秒）", SQL_SECONDS_BUCKETS, {}),
+        }
+        self._gauges = []
+
+    def observe(self, route, method, status, seconds, statements, sql_seconds):
+        """记录一个已完成的请求"""
+        key = (route, method)
+        with self._lock:
+            self._requests[route, method, status] += 1
+            for name, value in (
+                ("http_request_duration_seconds", seconds),
+                ("http_request_sql_statements", statements),
+                ("http_request_sql_seconds", sql_seconds),
+            ):
+                _, buckets, series = self._histograms[name]
+                histogram = series.get(key)
+                if histogram is None:
+                    histogram = series[key] = Histogram(len(buckets))
+                histogram.observe(buckets, value)
+
+    def gauge(self, name, help_text, collect, kind="gauge"):
+        """注册抓取时计算的指标：collect()返回[(标签字典, 值), ...]，kind为gauge或counter"""
+        self._gauges.append((PREFIX + name, help_text, collect, kind))
+
+    def render(self):
+        """Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            name = PREFIX + "http_requests_total"
+            lines += [f"# HELP {name} 按路由、方法和状态码的请求数", f"# TYPE {name} counter"]
+            for (route, method, status), count in sorted(self._requests.items()):
+                labels = _labels({"route": route, "method": method, "status": status})
+                lines.append(f"{name}{labels} {count}")
+
+            for short_name, (help_text, buckets, series) in self._histograms.items():
+                name = PREFIX + short_name
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (route, method), histogram in sorted(series.items()):
+                    labels = {"route": route, "method": method}
+                    cumulative = 0
+                    for bound, count in zip(buckets, histogram.counts):
+                        cumulative += count
+                        bucket_labels = _labels(dict(labels, le=_number(float(bound))))
+                        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                    bucket_labels = _labels(dict(labels, le="+Inf"))
+                    lines.append(f"{name}_bucket{bucket_labels} {histogram.count}")
+                    series_labels = _labels(labels)
+                    lines.append(f"{name}_sum{series_labels} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{series_labels} {histogram.count}")
+
+        for name, help_text, collect, kind in self._gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in collect():
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def log_json(logger, entry):
+    """以INFO级别输出一行JSON；与werkzeug的请求日志一样，没有配置日志处理器时输出到stderr"""
+    if logger.name not in _ready_loggers:
+        _ready_loggers.add(logger.name)
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+        if not logger.hasHandlers():
+            logger.addHandler(logging.StreamHandler())
+    logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+def init_metrics(app):
+    """注册请求计时、访问日志和 /metrics；在init_compression之前调用，耗时包含压缩"""
+    app.config.setdefault("METRICS", True)
+    app.config.setdefault("ACCESS_LOG", True)
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+    repository.add_listener(_on_statement)
+
+    @app.before_request
+    def _start_request():
+        _local.request = RequestStats()
+
+    @app.after_request
+    def _finish_request(response):
+        current = _local.__dict__.pop("request", None)
+        if current is None:
+            return response
+        seconds = time.perf_counter() - current.began
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        if app.config["METRICS"]:
+            metrics.observe(
+                route,
+                request.method,
+                response.status_code,
+                seconds,
+                current.statements,
+                current.sql_seconds,
+            )
+        if app.config["ACCESS_LOG"]:
+            log_json(
+                access_logger,
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "route": route,
+                    "status": response.status_code,
+                    "duration_ms": round(seconds * 1000, 3),
+                    "sql_statements": current.statements,
+                    "sql_ms": round(current.sql_seconds * 1000, 3),
+                    "bytes": response.content_length,
+                    # 只在视图已读取会话时取用户，避免给静态资源的响应加上Vary: Cookie
+                    "user_id": session.get("user_id") if session.accessed else None,
+                },
+            )
+        return response
+
+    @app.teardown_request
+    def _clear_request(exc):
+        _local.__dict__.pop("request", None)
+
+    @app.route("/metrics")
+    def export_metrics():
+        """Prometheus文本格式的指标"""
+        if not app.config["METRICS"]:
+            abort(404)
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+    return metrics
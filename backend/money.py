@@ -0,0 +1,69 @@
+"""
+金额的定点表示
+
+金额在数据库中以整数分保存：交易、定时发放、归档汇总和月末快照的金额列都是INTEGER，
+SQL中的SUM、归档汇总、快照和定时发放都按整数计算，长期累加不会产生浮点误差。
+只在接口边界转换：
+
+- 请求中的金额（数字或字符串）用to_cents转换为分，四舍五入到分；
+  接口只接受不超过MAX_CENTS的金额，单笔和合计都远小于INTEGER（64位）的上限
+- 响应中的金额用to_yuan转换为元（JSON数字），查询结果用yuan_rows转换金额列
+- 导出CSV和日志用format_cents输出两位小数
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+try:
+    from backend.repository import Record, Rows, column_index
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from repository import Record, Rows, column_index
+
+# 查询结果中以分为单位的列
+MONEY_COLUMNS = ("amount", "income", "expense", "total", "balance")
+
+# 单笔金额的上限（1亿元）：约9亿笔达到上限的交易相加才会超出64位整数
+MAX_CENTS = 10**10
+
+
+def to_cents(value):
+    """金额（元，数字或字符串）转换为整数分，不是有限数字时抛出ValueError"""
+    if isinstance(value, bool):
+        raise ValueError(f"无效的金额: {value!r}")
+    try:
+        cents = (Decimal(str(value).strip()) * 100).quantize(
+            Decimal(1), rounding=ROUND_HALF_UP
+        )
+        return int(cents)
+    except (InvalidOperation, ValueError, OverflowError):
+        raise ValueError(f"无效的金额: {value!r}") from None
+
+
+def to_yuan(cents):
+    """分转换为元（最接近该两位小数的浮点数，JSON编码后即为原来的小数）"""
+    if cents is None:
+        return None
+    return cents / 100
+
+
+def format_cents(cents):
+    """分格式化为两位小数的文字，如 1250 -> '12.50'"""
+    sign = "-" if cents < 0 else ""
+    yuan, fen = divmod(abs(cents), 100)
+    return f"{sign}{yuan}.{fen:02d}"
+
+
+def yuan_rows(rows):
+    """查询结果（repository.fetch_all的结果）中的金额列转换为元，其他列不变"""
+    columns = list(rows.columns)
+    money = [i for i, name in enumerate(columns) if name in MONEY_COLUMNS]
+    if not money:
+        return rows
+    index = column_index((name,) for name in columns)
+    converted = Rows()
+    for row in rows:
+        values = list(row)
+        for i in money:
+            values[i] = to_yuan(values[i])
+        converted.append(Record(index, tuple(values)))
+    converted.columns = columns
+    return converted
@@ -0,0 +1,108 @@
+"""
+密码哈希
+
+werkzeug的密码哈希每次调用都要消耗数百毫秒CPU，直接在请求线程里计算时，
+一阵登录请求就会卡住整个面板API。这里把哈希计算放到有界的进程池中执行，
+并限制排队数量；哈希算法和强度可配置，登录成功时若参数已变化会自动重新哈希。
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+# 与werkzeug默认值保持一致
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+# 简写形式对应的完整参数，werkzeug写入哈希串的是完整形式
+_METHOD_DEFAULTS = {
+    "scrypt": "scrypt:32768:8:1",
+    "pbkdf2": f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}",
+}
+
+
+class PasswordHasherBusy(Exception):
+    """排队的哈希任务已达上限"""
+
+
+def normalize_method(method):
+    """把"pbkdf2"、"pbkdf2:sha256"等简写补全为哈希串中的完整形式"""
+    method = (method or DEFAULT_METHOD).strip()
+    if method in _METHOD_DEFAULTS:
+        return _METHOD_DEFAULTS[method]
+    if method.startswith("pbkdf2:") and method.count(":") == 1:
+        return f"{method}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    """在进程池中计算密码哈希
+
+    workers为0时在当前线程中计算（用于测试或单进程部署）。
+    同时排队的任务超过max_pending时，等待queue_timeout秒仍无空位则抛出PasswordHasherBusy。
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=32, queue_timeout=5):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # 使用spawn避免在多线程的Web进程中fork
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """按当前配置生成密码哈希"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """校验密码"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """已存储的哈希是否使用了与当前配置不同的算法或强度"""
+        return password_hash.split("$", 1)[0] != self.method
+
+    def warm_up(self):
+        """提前启动全部工作进程，避免第一次登录时才等待进程启动"""
+        if self.workers <= 0:
+            return
+        executor = self._get_executor()
+        for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,662 @@
+"""
+数据访问层
+
+接口和定时任务用到的SQL都集中在这里，按SQLite的写法编写（PostgreSQL连接在执行前由
+storage.translate改写）。归档和快照模块的语句也经由这里的execute()执行：
+
+- 查询计数（count_queries）、耗时监听（add_listener）和慢语句监听（add_slow_listener）
+  只需挂在_run()上；fetch_*的计时包括取回结果，每条语句只通知一次
+- 交易提交后由写入方调用notify_change()，内存中的统计缓存据此更新（add_change_listener）
+- 查询结果是Record：同一次查询的所有行共用一个列名索引，直接包着游标返回的元组，
+  支持按列名和下标取值；接口把它直接放进JSON响应（serialization.JSONProvider），
+  不再先构造sqlite3.Row、再逐行复制成字典
+- 语句都是固定文本（表名只在交易表和合并了归档表的子查询之间切换），参数一律用占位符，
+  SQLite连接按STATEMENT_CACHE_SIZE缓存预编译语句，请求之间复用已编译的语句
+- 分类和备注保存在每个用户的字典表（categories、descriptions）中，交易和定时发放配置只存id；
+  写入时按名称取id（没有时新建），查询时连接字典表取回名称，对调用方仍是名称
+- 金额的参数和结果都以分为单位（整数），SUM在SQL中按整数求和；与元的转换在接口边界（money.py）
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# 每个SQLite连接缓存的预编译语句数：这里和归档、快照模块的全部语句
+# （含交易表/合并归档表两种变体）加上维护任务的语句，留有余量
+STATEMENT_CACHE_SIZE = 256
+
+
+class Record:
+    """一行查询结果，按列名和下标取值（与sqlite3.Row用法相同）"""
+
+    __slots__ = ("_index", "_values")
+
+    def __init__(self, index, values):
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return self._values[key]
+
+    def keys(self):
+        return list(self._index)
+
+    def as_dict(self):
+        return dict(zip(self._index, self._values))
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self._values == other._values
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._values)
+
+    def __repr__(self):
+        return f"Record({self.as_dict()!r})"
+
+
+class Rows(list):
+    """fetch_all的结果，columns为列名（没有结果时也能取到）"""
+
+    __slots__ = ("columns",)
+
+
+def column_index(description):
+    """游标的description转换为列名到下标的映射"""
+    return {column[0]: i for i, column in enumerate(description or ())}
+
+
+# ---- 执行与监听 ----
+
+_listeners = []
+_local = threading.local()
+
+
+def add_listener(listener):
+    """注册语句监听，每条语句执行（fetch_*为取回结果）后调用listener(sql, params, seconds)"""
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+
+_slow_listeners = []
+
+
+def add_slow_listener(listener, threshold):
+    """注册慢语句监听，耗时不少于threshold秒的语句执行后调用listener(conn, sql, params, seconds)"""
+    _slow_listeners.append((threshold, listener))
+
+
+def remove_slow_listener(listener):
+    _slow_listeners[:] = [item for item in _slow_listeners if item[1] is not listener]
+
+
+class QueryCount:
+    """count_queries期间当前线程执行的语句"""
+
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries():
+    """统计当前线程执行的语句，测试中用来断言接口的查询次数"""
+    counter = QueryCount()
+    counters = _local.__dict__.setdefault("counters", [])
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+def _run(conn, method, sql, params, fetch=None):
+    """执行语句；给出fetch时用它从游标取回结果，计时包括取回结果"""
+    for counter in getattr(_local, "counters", ()):
+        counter.statements.append(sql)
+    if not _listeners and not _slow_listeners:
+        cursor = method(sql, params)
+        return cursor if fetch is None else fetch(cursor)
+
+    began = time.perf_counter()
+    try:
+        cursor = method(sql, params)
+        return cursor if fetch is None else fetch(cursor)
+    finally:
+        seconds = time.perf_counter() - began
+        for listener in list(_listeners):
+            listener(sql, params, seconds)
+        for threshold, listener in list(_slow_listeners):
+            if seconds >= threshold:
+                listener(conn, sql, params, seconds)
+
+
+_change_listeners = []
+
+
+def add_change_listener(listener):
+    """注册交易变化监听，listener(user_id, appended)在变化提交后调用"""
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener):
+    _change_listeners.remove(listener)
+
+
+def notify_change(user_id, appended=False):
+    """用户的交易已变化并提交；appended为True表示只新增了交易（没有修改或删除）"""
+    for listener in list(_change_listeners):
+        listener(user_id, appended)
+
+
+def execute(conn, sql, params=()):
+    """执行一条语句，返回游标（行的类型由连接的row_factory决定）"""
+    return _run(conn, conn.execute, sql, params)
+
+
+def executemany(conn, sql, seq_of_params):
+    return _run(conn, conn.executemany, sql, seq_of_params)
+
+
+def _query(conn, sql, params, fetch):
+    if isinstance(conn, sqlite3.Connection):
+        # 直接取元组，由Record包装，不经过连接上的sqlite3.Row
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return _run(conn, cursor.execute, sql, params, fetch)
+    return _run(conn, conn.execute, sql, params, fetch)
+
+
+def _records(index, rows):
+    if rows and not isinstance(rows[0], Record):
+        rows = [Record(index, values) for values in rows]
+    return rows
+
+
+def _all(cursor):
+    index = column_index(cursor.description)
+    rows = Rows(_records(index, cursor.fetchall()))
+    rows.columns = list(index)
+    return rows
+
+
+def _raw(cursor):
+    return cursor.fetchall()
+
+
+def _first(cursor):
+    row = cursor.fetchone()
+    if row is None or isinstance(row, Record):
+        return row
+    return Record(column_index(cursor.description), row)
+
+
+def _value(cursor):
+    row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+def fetch_all(conn, sql, params=()):
+    """执行查询，返回Record列表"""
+    return _query(conn, sql, params, _all)
+
+
+def fetch_rows(conn, sql, params=()):
+    """执行查询，返回游标的原始行（不包装为Record），批量加载时使用"""
+    return _query(conn, sql, params, _raw)
+
+
+def fetch_one(conn, sql, params=()):
+    """执行查询，返回第一行Record，没有结果时返回None"""
+    return _query(conn, sql, params, _first)
+
+
+def fetch_value(conn, sql, params=()):
+    """执行查询，返回第一行第一列的值"""
+    return _query(conn, sql, params, _value)
+
+
+# ---- 用户 ----
+
+
+def get_user(conn, user_id):
+    return fetch_one(conn, "SELECT * FROM users WHERE id = ?", (user_id,))
+
+
+def get_user_by_name(conn, username):
+    return fetch_one(conn, "SELECT * FROM users WHERE username = ?", (username,))
+
+
+def create_user(conn, username, password):
+    """新建用户，用户名已存在时抛出sqlite3.IntegrityError"""
+    execute(
+        conn, "INSERT INTO users (username, password) VALUES (?, ?)", (username, password)
+    )
+
+
+def set_password(conn, user_id, password):
+    execute(conn, "UPDATE users SET password = ? WHERE id = ?", (password, user_id))
+
+
+# ---- 分类和备注字典 ----
+
+
+def _dictionary_id(conn, select_sql, insert_sql, user_id, value):
+    if value is None:
+        return None
+    found = fetch_value(conn, select_sql, (user_id, value))
+    if found is None:
+        # 并发写入同一个新名称时（PostgreSQL）后写入的一方忽略冲突，再查一次
+        execute(conn, insert_sql, (user_id, value))
+        found = fetch_value(conn, select_sql, (user_id, value))
+    return found
+
+
+def category_id(conn, user_id, name):
+    """分类名对应的id，没有时新建；name为None时返回None"""
+    return _dictionary_id(
+        conn,
+        "SELECT id FROM categories WHERE user_id = ? AND name = ?",
+        "INSERT OR IGNORE INTO categories (user_id, name) VALUES (?, ?)",
+        user_id,
+        name,
+    )
+
+
+def description_id(conn, user_id, text):
+    """备注文字对应的id，没有时新建；text为None时返回None"""
+    return _dictionary_id(
+        conn,
+        "SELECT id FROM descriptions WHERE user_id = ? AND text = ?",
+        "INSERT OR IGNORE INTO descriptions (user_id, text) VALUES (?, ?)",
+        user_id,
+        text,
+    )
+
+
+# 交易（含归档）和定时发放引用的字典id；分类还被归档汇总引用
+_REFERENCED = """SELECT {column} FROM transactions WHERE {column} IS NOT NULL
+                 UNION SELECT {column} FROM transactions_archive WHERE {column} IS NOT NULL
+                 UNION SELECT {column} FROM schedules WHERE {column} IS NOT NULL"""
+
+
+def delete_unused_names(conn):
+    """删除不再被引用的分类和备注，返回删除的行数
+
+    修改或删除交易和定时发放后，旧的分类和备注留在字典表中；写入时不检查，
+    由定时任务（scheduler.prune_dictionaries）批量清理。
+    """
+    deleted = execute(
+        conn,
+        f"""DELETE FROM descriptions WHERE id NOT IN (
+                {_REFERENCED.format(column="description_id")})""",
+    ).rowcount
+    deleted += execute(
+        conn,
+        f"""DELETE FROM categories WHERE id NOT IN (
+                {_REFERENCED.format(column="category_id")}
+                UNION SELECT category_id FROM archive_rollups)""",
+    ).rowcount
+    return deleted
+
+
+# 连接字典表取回名称；交易表的别名为t
+_NAMES = """LEFT JOIN descriptions AS d ON d.id = t.description_id
+           LEFT JOIN categories AS c ON c.id = t.category_id"""
+
+# 交易的列（与字典化之前交易表的列相同）
+_TRANSACTION_FIELDS = (
+    "t.id, t.user_id, t.type, t.amount, d.text AS description, c.name AS category, "
+    "t.created_at"
+)
+
+
+# ---- 交易 ----
+
+
+def add_transaction(conn, user_id, trans_type, amount, description, category, created_at=None):
+    """写入一笔交易（amount以分为单位）；created_at为空时使用数据库的当前时间"""
+    ids = (description_id(conn, user_id, description), category_id(conn, user_id, category))
+    if created_at is None:
+        execute(
+            conn,
+            """INSERT INTO transactions (user_id, type, amount, description_id, category_id)
+               VALUES (?, ?, ?, ?, ?)""",
+            (user_id, trans_type, amount) + ids,
+        )
+    else:
+        execute(
+            conn,
+            """INSERT INTO transactions
+               (user_id, type, amount, description_id, category_id, created_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (user_id, trans_type, amount) + ids + (created_at,),
+        )
+
+
+def count_transactions(conn, user_id):
+    """未归档的交易笔数"""
+    return fetch_value(
+        conn, "SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,)
+    )
+
+
+def list_transactions(conn, user_id, source, limit, offset):
+    """按时间倒序分页列出交易，source为交易表或合并了归档表的子查询"""
+    return fetch_all(
+        conn,
+        f"""SELECT {_TRANSACTION_FIELDS} FROM {source} AS t
+           {_NAMES}
+           WHERE t.user_id = ?
+           ORDER BY t.created_at DESC
+           LIMIT ? OFFSET ?""",
+        (user_id, limit, offset),
+    )
+
+
+def transactions_since(conn, user_id, source, start):
+    """start（含）之后的全部交易，按时间倒序"""
+    return fetch_all(
+        conn,
+        f"""SELECT {_TRANSACTION_FIELDS} FROM {source} AS t
+           {_NAMES}
+           WHERE t.user_id = ? AND t.created_at >= ?
+           ORDER BY t.created_at DESC""",
+        (user_id, start),
+    )
+
+
+def search_transactions(conn, user_id, source, start, pattern, limit, offset):
+    """备注或分类匹配LIKE模式pattern的交易，按时间倒序分页"""
+    return fetch_all(
+        conn,
+        f"""SELECT {_TRANSACTION_FIELDS} FROM {source} AS t
+           {_NAMES}
+           WHERE t.user_id = ? AND t.created_at >= ?
+           AND (d.text LIKE ? OR c.name LIKE ?)
+           ORDER BY t.created_at DESC
+           LIMIT ? OFFSET ?""",
+        (user_id, start, pattern, pattern, limit, offset),
+    )
+
+
+def count_matches(conn, user_id, source, start, pattern):
+    return fetch_value(
+        conn,
+        f"""SELECT COUNT(*) FROM {source} AS t
+           {_NAMES}
+           WHERE t.user_id = ? AND t.created_at >= ?
+           AND (d.text LIKE ? OR c.name LIKE ?)""",
+        (user_id, start, pattern, pattern),
+    )
+
+
+def transaction_columns(conn, user_id, source, after_id=0):
+    """按id顺序加载用户id大于after_id的交易的id、created_at、type、amount和category（原始行）"""
+    return fetch_rows(
+        conn,
+        f"""SELECT t.id, t.created_at, t.type, t.amount, c.name FROM {source} AS t
+           LEFT JOIN categories AS c ON c.id = t.category_id
+           WHERE t.user_id = ? AND t.id > ?
+           ORDER BY t.id""",
+        (user_id, after_id),
+    )
+
+
+def update_transaction(conn, table, tx_id, user_id, amount, description, category):
+    """修改交易，table为交易所在的表（见archive.find_transaction）"""
+    execute(
+        conn,
+        f"""UPDATE {table} SET amount = ?, description_id = ?, category_id = ?
+           WHERE id = ? AND user_id = ?""",
+        (
+            amount,
+            description_id(conn, user_id, description),
+            category_id(conn, user_id, category),
+            tx_id,
+            user_id,
+        ),
+    )
+
+
+def delete_transaction(conn, table, tx_id, user_id):
+    execute(conn, f"DELETE FROM {table} WHERE id = ? AND user_id = ?", (tx_id, user_id))
+
+
+def has_transaction(conn, user_id, category, start, end):
+    """[start, end)内是否已有该分类的交易（定时发放判断本周期是否已发放）"""
+    row = fetch_one(
+        conn,
+        """SELECT id FROM transactions
+           WHERE user_id = ?
+           AND category_id = (SELECT id FROM categories WHERE user_id = ? AND name = ?)
+           AND created_at >= ? AND created_at < ?
+           LIMIT 1""",
+        (user_id, user_id, category, start, end),
+    )
+    return row is not None
+
+
+# ---- 统计 ----
+
+
+def totals(conn, user_id):
+    """未归档交易的收入和支出合计"""
+    row = fetch_one(
+        conn,
+        """SELECT
+               COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0)
+           FROM transactions
+           WHERE user_id = ?""",
+        (user_id,),
+    )
+    return row[0], row[1]
+
+
+def totals_since(conn, user_id, source, since):
+    """since（'YYYY-MM-DD'，含）之后的收入和支出合计"""
+    row = fetch_one(
+        conn,
+        f"""SELECT
+               COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0)
+           FROM {source} AS t
+           WHERE user_id = ? AND DATE(created_at) >= ?""",
+        (user_id, since),
+    )
+    return row[0], row[1]
+
+
+def current_totals(conn, user_id):
+    """今天和本月（UTC）的收入和支出，列为today_income、today_expense、month_income、month_expense"""
+    return fetch_one(
+        conn,
+        """SELECT
+               COALESCE(SUM(CASE WHEN type = 'income' AND DATE(created_at) = DATE('now')
+                   THEN amount ELSE 0 END), 0) as today_income,
+               COALESCE(SUM(CASE WHEN type = 'expense' AND DATE(created_at) = DATE('now')
+                   THEN amount ELSE 0 END), 0) as today_expense,
+               COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0)
+                   as month_income,
+               COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0)
+                   as month_expense
+           FROM transactions
+           WHERE user_id = ?
+           AND strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')""",
+        (user_id,),
+    )
+
+
+def activity(conn, user_id):
+    """未归档交易的笔数和有交易的天数"""
+    row = fetch_one(
+        conn,
+        """SELECT COUNT(*), COUNT(DISTINCT DATE(created_at)) FROM transactions
+           WHERE user_id = ?""",
+        (user_id,),
+    )
+    return row[0], row[1]
+
+
+def daily_totals(conn, user_id, source, start):
+    """start（'YYYY-MM-DD'，含）之后每天的收入和支出，列为date、income、expense"""
+    return fetch_all(
+        conn,
+        f"""SELECT
+            DATE(created_at) as date,
+            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
+            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
+           FROM {source} AS t
+           WHERE user_id = ? AND DATE(created_at) >= ?
+           GROUP BY DATE(created_at)
+           ORDER BY date""",
+        (user_id, start),
+    )
+
+
+def expense_by_category(conn, user_id):
+    """按分类的支出合计（含归档汇总），列为category、total
+
+    按分类id分组后再取分类名；没有分类的交易与归档汇总一样记为0（分类名为None）。
+    """
+    return fetch_all(
+        conn,
+        """SELECT c.name as category, SUM(merged.total) as total
+           FROM (SELECT COALESCE(category_id, 0) as category_id, SUM(amount) as total
+                 FROM transactions
+                 WHERE user_id = ? AND type = 'expense'
+                 GROUP BY COALESCE(category_id, 0)
+                 UNION ALL
+                 SELECT category_id, SUM(total) FROM archive_rollups
+                 WHERE user_id = ? AND type = 'expense'
+                 GROUP BY category_id) AS merged
+           LEFT JOIN categories AS c ON c.id = merged.category_id
+           GROUP BY merged.category_id, c.name
+           ORDER BY total DESC""",
+        (user_id, user_id),
+    )
+
+
+def monthly_totals(conn, user_id, months=12):
+    """最近months个月的收入和支出（含归档汇总），列为month、income、expense"""
+    return fetch_all(
+        conn,
+        """SELECT month, SUM(income) as income, SUM(expense) as expense
+           FROM (SELECT
+                    strftime('%Y-%m', created_at) as month,
+                    SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
+                    SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
+                 FROM transactions
+                 WHERE user_id = ?
+                 GROUP BY strftime('%Y-%m', created_at)
+                 UNION ALL
+                 SELECT month,
+                    SUM(CASE WHEN type = 'income' THEN total ELSE 0 END),
+                    SUM(CASE WHEN type = 'expense' THEN total ELSE 0 END)
+                 FROM archive_rollups
+                 WHERE user_id = ?
+                 GROUP BY month) AS merged
+           GROUP BY month
+           ORDER BY month DESC
+           LIMIT ?""",
+        (user_id, user_id, months),
+    )
+
+
+def category_totals(conn, user_id):
+    """每个分类的收入、支出和笔数（含归档汇总），列为category、income、expense、count"""
+    return fetch_all(
+        conn,
+        """SELECT c.name as category, SUM(merged.income) as income,
+            SUM(merged.expense) as expense, SUM(merged.count) as count
+           FROM (SELECT category_id,
+                    SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
+                    SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense,
+                    COUNT(*) as count
+                 FROM transactions
+                 WHERE user_id = ? AND category_id IS NOT NULL
+                 GROUP BY category_id
+                 UNION ALL
+                 SELECT category_id,
+                    SUM(CASE WHEN type = 'income' THEN total ELSE 0 END),
+                    SUM(CASE WHEN type = 'expense' THEN total ELSE 0 END),
+                    SUM(count)
+                 FROM archive_rollups
+                 WHERE user_id = ? AND category_id != 0
+                 GROUP BY category_id) AS merged
+           JOIN categories AS c ON c.id = merged.category_id
+           WHERE c.name != ''
+           GROUP BY merged.category_id, c.name
+           ORDER BY count DESC""",
+        (user_id, user_id),
+    )
+
+
+# ---- 定时发放 ----
+
+# 发放配置的列（与字典化之前定时发放表的列相同），表的别名为t
+_SELECT_SCHEDULES = f"""SELECT t.id, t.user_id, t.frequency, t.amount,
+               c.name AS category, d.text AS description,
+               t.day_of_week, t.day_of_month, t.created_at
+           FROM schedules AS t
+           {_NAMES}"""
+
+
+def list_schedules(conn, user_id):
+    return fetch_all(
+        conn,
+        f"{_SELECT_SCHEDULES} WHERE t.user_id = ? ORDER BY t.created_at DESC",
+        (user_id,),
+    )
+
+
+def add_schedule(
+    conn, user_id, frequency, amount, category, description, day_of_week, day_of_month
+):
+    execute(
+        conn,
+        """INSERT INTO schedules (user_id, frequency, amount, category_id,
+                                  description_id, day_of_week, day_of_month)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (
+            user_id,
+            frequency,
+            amount,
+            category_id(conn, user_id, category),
+            description_id(conn, user_id, description),
+            day_of_week,
+            day_of_month,
+        ),
+    )
+
+
+def delete_schedule(conn, schedule_id, user_id):
+    execute(
+        conn,
+        "DELETE FROM schedules WHERE id = ? AND user_id = ?",
+        (schedule_id, user_id),
+    )
+
+
+def schedules_by_frequency(conn, frequency):
+    """所有用户某个周期的发放配置"""
+    return fetch_all(conn, f"{_SELECT_SCHEDULES} WHERE t.frequency = ?", (frequency,))
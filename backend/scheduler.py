@@ -1,143 +1,428 @@
 import logging
 import os
 import sqlite3
-from datetime import datetime
+import time
+from datetime import timedelta
+
+try:
+    from backend import repository
+    from backend.archive import archive_all
+    from backend.backup import create_backup, default_backup_dir
+    from backend.clock import SystemClock
+    from backend.database.init_db import ensure_schema
+    from backend.maintenance import (
+        analyze_stale_tables,
+        checkpoint_wal,
+        incremental_vacuum,
+        quick_check,
+    )
+    from backend.money import format_cents
+    from backend.shards import ShardRouter
+    from backend.shared_cache import SharedCache, default_cache_path
+    from backend.snapshots import close_all_months
+    from backend.storage import create_storage, is_postgres_url
+except ImportError:  # 以脚本方式运行（python backend/scheduler.py）
+    import repository
+    from archive import archive_all
+    from backup import create_backup, default_backup_dir
+    from clock import SystemClock
+    from database.init_db import ensure_schema
+    from maintenance import (
+        analyze_stale_tables,
+        checkpoint_wal,
+        incremental_vacuum,
+        quick_check,
+    )
+    from money import format_cents
+    from shards import ShardRouter
+    from shared_cache import SharedCache, default_cache_path
+    from snapshots import close_all_months
+    from storage import create_storage, is_postgres_url
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+# 独立运行时的数据库配置；由应用启动时通过configure(app.config)改为与应用一致
+DATABASE_PATH = os.environ.get(
+    "DATABASE_PATH",
+    os.path.join(os.path.dirname(__file__), "database", "cash_manager.db"),
+)
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "database", "cash_manager.db")
+# 配置为PostgreSQL地址时定时任务使用PostgreSQL（不分片）
+DATABASE_URL = os.environ.get("DATABASE_URL")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-scheduler = BackgroundScheduler()
+# 后台调度器在start_scheduler中创建；只处理Web请求的进程和模拟器不需要导入apscheduler
+scheduler = None
+
+# 每个任务最近一次成功的时间（Unix时间戳）和失败次数，由调度器的事件监听更新
+job_runs = {}
+
+# 早于多少天的交易归档到transactions_archive（按月对齐），0为不归档
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 0))
+
+# 每个维护任务在每个数据库上的时间上限（秒）
+MAINTENANCE_SECONDS = float(os.environ.get("MAINTENANCE_SECONDS", 5))
+
+# 表的行数比上次收集统计信息时变化多少行后重新收集
+ANALYZE_MIN_CHANGES = int(os.environ.get("ANALYZE_MIN_CHANGES", 1000))
+
+# 每天的在线备份：保留份数（0为不备份）、备份目录和是否gzip压缩
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", 7))
+BACKUP_DIR = os.environ.get("BACKUP_DIR") or default_backup_dir(DATABASE_PATH)
+BACKUP_COMPRESS = os.environ.get("BACKUP_COMPRESS", "1") == "1"
+
+# 分片模式下定时任务依次处理每个分片
+router = ShardRouter(
+    DATABASE_PATH, os.environ.get("SHARD_DIR"), int(os.environ.get("SHARD_COUNT", 0))
+)
+
+# PostgreSQL存储后端，第一次使用时创建
+storage = None
+
+# 多进程共用的统计结果缓存：启用时定时发放后让用户的缓存失效（在start_scheduler中注册）
+SHARED_CACHE = os.environ.get("SHARED_CACHE", "0") == "1"
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH")
+shared_cache = None
+
+# 发放任务使用的时钟，模拟模式下可替换为虚拟时钟
+clock = SystemClock()
 
 
-def get_db_connection():
-    """获取数据库连接"""
-    conn = sqlite3.connect(DATABASE_PATH)
+def get_db_connection(db_path=None):
+    """获取数据库连接；使用PostgreSQL时忽略db_path，取连接池中的连接"""
+    global storage
+    if is_postgres_url(DATABASE_URL):
+        if storage is None:
+            storage = create_storage(DATABASE_URL)
+        return storage.connection()
+
+    conn = sqlite3.connect(
+        db_path or DATABASE_PATH, cached_statements=repository.STATEMENT_CACHE_SIZE
+    )
     conn.row_factory = sqlite3.Row
+    ensure_schema(conn)
     return conn
 
 
-def process_daily_schedules():
-    """处理每日发放任务"""
-    logger.info("开始处理每日发放任务")
-    conn = get_db_connection()
+def configure(config):
+    """改用应用配置（app.config）中的数据库路径、存储后端和分片设置"""
+    global DATABASE_PATH, DATABASE_URL, BACKUP_DIR, SHARED_CACHE, SHARED_CACHE_PATH
+    global router, storage
+    DATABASE_PATH = config.get("DATABASE_PATH", DATABASE_PATH)
+    SHARED_CACHE = config.get("SHARED_CACHE", SHARED_CACHE)
+    SHARED_CACHE_PATH = config.get("SHARED_CACHE_PATH", SHARED_CACHE_PATH)
+    if not os.environ.get("BACKUP_DIR"):
+        BACKUP_DIR = default_backup_dir(DATABASE_PATH)
+    if storage is not None and config.get("DATABASE_URL") != DATABASE_URL:
+        storage.close()
+        storage = None
+    DATABASE_URL = config.get("DATABASE_URL")
+    router = ShardRouter(
+        DATABASE_PATH, config.get("SHARD_DIR"), config.get("SHARD_COUNT", 0)
+    )
 
-    schedules = conn.execute(
-        """SELECT * FROM schedules WHERE frequency = 'daily' """
-    ).fetchall()
 
+def register_shared_cache():
+    """启用共享缓存时注册失效监听：交易变化提交后用户的版本号加1"""
+    global shared_cache, storage
+    if shared_cache is not None:
+        repository.remove_change_listener(shared_cache.invalidate)
+        shared_cache.close()
+        shared_cache = None
+    if not SHARED_CACHE:
+        return None
+    if is_postgres_url(DATABASE_URL):
+        if storage is None:
+            storage = create_storage(DATABASE_URL)
+        shared_cache = SharedCache(storage=storage)
+    else:
+        shared_cache = SharedCache(
+            path=SHARED_CACHE_PATH or default_cache_path(DATABASE_PATH)
+        )
+    repository.add_change_listener(shared_cache.invalidate)
+    return shared_cache
+
+
+def _for_each_database(job, conn=None):
+    """在conn上执行job；conn为空时依次打开每个保存用户数据的数据库执行，返回结果之和"""
+    if conn is not None:
+        return job(conn)
+
+    total = 0
+    paths = [None] if is_postgres_url(DATABASE_URL) else router.database_paths()
+    for path in paths:
+        conn = get_db_connection(path)
+        try:
+            total += job(conn)
+        finally:
+            conn.close()
+    return total
+
+
+def set_clock(new_clock):
+    """替换调度器使用的时钟，返回原来的时钟（模拟模式使用）"""
+    global clock
+    previous, clock = clock, new_clock
+    return previous
+
+
+def _format_timestamp(moment):
+    """格式化为与CURRENT_TIMESTAMP相同的字符串"""
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _day_start(now):
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _daily_period(now):
+    start = _day_start(now)
+    return start, start + timedelta(days=1)
+
+
+def _weekly_period(now):
+    """本周区间（周一作为本周开始）"""
+    start = _day_start(now) - timedelta(days=now.weekday())
+    return start, start + timedelta(days=7)
+
+
+def _monthly_period(now):
+    start = _day_start(now).replace(day=1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def _process_schedules(frequency, label, period, conn=None, now=None):
+    """按周期处理发放任务，返回本次发放的笔数
+
+    conn为空时依次处理每个数据库（分片模式下为每个分片）；now为空时从时钟读取当前时间。
+    """
+    now = now or clock.now()
+    period_start, period_end = (_format_timestamp(t) for t in period(now))
+    return _for_each_database(
+        lambda c: _pay_schedules(c, frequency, label, now, period_start, period_end),
+        conn,
+    )
+
+
+def _pay_schedules(conn, frequency, label, now, period_start, period_end):
+    schedules = repository.schedules_by_frequency(conn, frequency)
+
+    payouts = 0
+    paid_users = set()
     for schedule in schedules:
-        # 检查今天是否已经发放过
-        last_transaction = conn.execute(
-            """SELECT * FROM transactions
-               WHERE user_id = ?
-               AND category = ?
-               AND DATE(created_at) = DATE('now')
-               ORDER BY created_at DESC LIMIT 1""",
-            (schedule["user_id"], schedule["category"]),
-        ).fetchone()
-
-        if last_transaction is None:
+        # 检查本周期内是否已经发放过
+        paid = repository.has_transaction(
+            conn, schedule["user_id"], schedule["category"], period_start, period_end
+        )
+
+        if not paid:
             # 发放零钱
-            conn.execute(
-                """INSERT INTO transactions (user_id, type, amount, category, description)
-                   VALUES (?, 'income', ?, ?, ?)""",
-                (
-                    schedule["user_id"],
-                    schedule["amount"],
-                    schedule["category"],
-                    f"[自动发放] {schedule['description'] or schedule['category']}",
-                ),
+            repository.add_transaction(
+                conn,
+                schedule["user_id"],
+                "income",
+                schedule["amount"],
+                f"[自动发放] {schedule['description'] or schedule['category']}",
+                schedule["category"],
+                _format_timestamp(now),
             )
-            logger.info(f"用户 {schedule['user_id']} 每日发放 {schedule['amount']} 元")
+            payouts += 1
+            paid_users.add(schedule["user_id"])
+            amount = format_cents(schedule["amount"])
+            logger.info(f"用户 {schedule['user_id']} {label}发放 {amount} 元")
 
     conn.commit()
-    conn.close()
+    for user_id in paid_users:
+        repository.notify_change(user_id, appended=True)
+    return payouts
+
+
+def process_daily_schedules(conn=None, now=None):
+    """处理每日发放任务"""
+    logger.info("开始处理每日发放任务")
+    payouts = _process_schedules("daily", "每日", _daily_period, conn, now)
     logger.info("每日发放任务完成")
+    return payouts
 
 
-def process_weekly_schedules():
+def process_weekly_schedules(conn=None, now=None):
     """处理每周发放任务"""
     logger.info("开始处理每周发放任务")
-    conn = get_db_connection()
-
-    schedules = conn.execute(
-        """SELECT * FROM schedules WHERE frequency = 'weekly' """
-    ).fetchall()
-
-    for schedule in schedules:
-        # 检查本周是否已经发放过（周一作为本周开始）
-        last_transaction = conn.execute(
-            """SELECT * FROM transactions
-               WHERE user_id = ?
-               AND category = ?
-               AND created_at >= datetime('now', 'weekday 0', '-7 days')
-               ORDER BY created_at DESC LIMIT 1""",
-            (schedule["user_id"], schedule["category"]),
-        ).fetchone()
-
-        if last_transaction is None:
-            conn.execute(
-                """INSERT INTO transactions (user_id, type, amount, category, description)
-                   VALUES (?, 'income', ?, ?, ?)""",
-                (
-                    schedule["user_id"],
-                    schedule["amount"],
-                    schedule["category"],
-                    f"[自动发放] {schedule['description'] or schedule['category']}",
-                ),
-            )
-            logger.info(f"用户 {schedule['user_id']} 每周发放 {schedule['amount']} 元")
-
-    conn.commit()
-    conn.close()
+    payouts = _process_schedules("weekly", "每周", _weekly_period, conn, now)
     logger.info("每周发放任务完成")
+    return payouts
 
 
-def process_monthly_schedules():
+def process_monthly_schedules(conn=None, now=None):
     """处理每月发放任务（每月1号）"""
     logger.info("开始处理每月发放任务")
-    conn = get_db_connection()
+    payouts = _process_schedules("monthly", "每月", _monthly_period, conn, now)
+    logger.info("每月发放任务完成")
+    return payouts
 
-    schedules = conn.execute(
-        """SELECT * FROM schedules WHERE frequency = 'monthly' """
-    ).fetchall()
 
-    for schedule in schedules:
-        # 检查本月是否已经发放过
-        last_transaction = conn.execute(
-            """SELECT * FROM transactions
-               WHERE user_id = ?
-               AND category = ?
-               AND strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')
-               ORDER BY created_at DESC LIMIT 1""",
-            (schedule["user_id"], schedule["category"]),
-        ).fetchone()
-
-        if last_transaction is None:
-            conn.execute(
-                """INSERT INTO transactions (user_id, type, amount, category, description)
-                   VALUES (?, 'income', ?, ?, ?)""",
-                (
-                    schedule["user_id"],
-                    schedule["amount"],
-                    schedule["category"],
-                    f"[自动发放] {schedule['description'] or schedule['category']}",
-                ),
-            )
-            logger.info(f"用户 {schedule['user_id']} 每月发放 {schedule['amount']} 元")
+def close_monthly_snapshots(conn=None, now=None):
+    """为上个月及更早的已结束月份生成余额快照"""
+    now = now or clock.now()
+    closed = _for_each_database(lambda c: close_all_months(c, now), conn)
+    logger.info(f"月末结账完成，生成 {closed} 个余额快照")
+    return closed
+
 
+def archive_old_transactions(conn=None, now=None, after_days=None):
+    """把早于ARCHIVE_AFTER_DAYS天前所在月份的交易移到归档表"""
+    after_days = ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    if after_days <= 0:
+        return 0
+    now = now or clock.now()
+    moved = _for_each_database(lambda c: archive_all(c, now, after_days), conn)
+    logger.info(f"归档完成，移动 {moved} 笔交易")
+    return moved
+
+
+def _delete_unused_names(conn):
+    deleted = repository.delete_unused_names(conn)
     conn.commit()
-    conn.close()
-    logger.info("每月发放任务完成")
+    return deleted
+
+
+def prune_dictionaries(conn=None):
+    """删除修改和删除交易、定时发放后不再被引用的分类和备注"""
+    deleted = _for_each_database(_delete_unused_names, conn)
+    logger.info(f"字典表清理完成，删除 {deleted} 个不再使用的分类和备注")
+    return deleted
+
+
+def _all_database_paths():
+    """所有SQLite数据库文件，分片模式下包括主数据库和每个分片；使用PostgreSQL时为空"""
+    if is_postgres_url(DATABASE_URL):
+        logger.info("使用PostgreSQL，跳过SQLite文件的维护和备份")
+        return []
+    paths = router.database_paths()
+    if router.enabled:
+        paths = [router.catalog_path] + paths
+    return paths
+
+
+def _maintain(name, task, conn=None):
+    """在每个数据库（含分片模式下的主数据库）上执行维护任务，记录并返回每个数据库的报告"""
+    if conn is not None:
+        connections = [(None, conn)]
+    else:
+        connections = [(path, None) for path in _all_database_paths()]
+
+    reports = []
+    for path, c in connections:
+        c = c or get_db_connection(path)
+        try:
+            report = task(c)
+        finally:
+            if path is not None:
+                c.close()
+        report["database"] = path or c.execute("PRAGMA database_list").fetchone()[2]
+        logger.info(f"{name}: {report}")
+        reports.append(report)
+    return reports
+
+
+def analyze_database(conn=None, min_changes=None):
+    """写入较多的表重新收集统计信息"""
+    min_changes = ANALYZE_MIN_CHANGES if min_changes is None else min_changes
+    return _maintain(
+        "更新统计信息",
+        lambda c: analyze_stale_tables(c, min_changes, MAINTENANCE_SECONDS),
+        conn,
+    )
 
 
-def start_scheduler():
-    """启动定时任务调度器"""
+def vacuum_database(conn=None):
+    """分批回收删除和归档留下的空闲页"""
+    return _maintain(
+        "回收空闲页", lambda c: incremental_vacuum(c, MAINTENANCE_SECONDS), conn
+    )
+
+
+def checkpoint_database(conn=None):
+    """把WAL写回数据库文件"""
+    return _maintain(
+        "WAL检查点", lambda c: checkpoint_wal(c, MAINTENANCE_SECONDS), conn
+    )
+
+
+def check_database(conn=None):
+    """快速检查数据库是否损坏，发现问题时记录错误日志"""
+    reports = _maintain(
+        "完整性检查", lambda c: quick_check(c, MAINTENANCE_SECONDS * 6), conn
+    )
+    for report in reports:
+        if report["ok"] is False:
+            logger.error(f"数据库 {report['database']} 检查失败: {report['errors']}")
+    return reports
+
+
+def backup_databases(now=None, backup_dir=None, keep=None):
+    """在线备份所有数据库文件，返回备份目录；BACKUP_KEEP为0或使用PostgreSQL时不备份"""
+    keep = BACKUP_KEEP if keep is None else keep
+    paths = _all_database_paths() if keep > 0 else []
+    if not paths:
+        return None
+    path, manifest = create_backup(
+        paths,
+        backup_dir or BACKUP_DIR,
+        compress=BACKUP_COMPRESS,
+        keep=keep,
+        now=now or clock.now(),
+    )
+    size = sum(entry["bytes"] for entry in manifest["files"])
+    logger.info(f"备份完成: {path}（{len(manifest['files'])} 个数据库，{size} 字节）")
+    return path
+
+
+def _record_job_run(event):
+    runs = job_runs.setdefault(event.job_id, {"last_success": None, "failures": 0})
+    if event.exception is not None:
+        runs["failures"] += 1
+    else:
+        runs["last_success"] = time.time()
+
+
+def scheduler_status():
+    """调度器是否在运行，以及每个任务的下次执行时间（Unix时间戳）、最近一次成功的时间和失败次数"""
+    if scheduler is None or not scheduler.running:
+        return {"running": False, "jobs": []}
+    jobs = []
+    for job in scheduler.get_jobs():
+        runs = job_runs.get(job.id, {})
+        jobs.append(
+            {
+                "id": job.id,
+                "next_run": (
+                    job.next_run_time.timestamp() if job.next_run_time else None
+                ),
+                "last_success": runs.get("last_success"),
+                "failures": runs.get("failures", 0),
+            }
+        )
+    return {"running": True, "jobs": jobs}
+
+
+def start_scheduler(config=None):
+    """启动定时任务调度器；config为应用的app.config时使用应用的数据库配置"""
+    global scheduler
+    if config is not None:
+        configure(config)
+    register_shared_cache()
+    from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    scheduler = BackgroundScheduler()
+    scheduler.add_listener(_record_job_run, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+
     # 每天早上9点执行每日发放任务
     scheduler.add_job(
         process_daily_schedules,
@@ -165,6 +450,78 @@ def start_scheduler():
         replace_existing=True,
     )
 
+    # 每月1号凌晨为上个月生成余额快照
+    scheduler.add_job(
+        close_monthly_snapshots,
+        CronTrigger(day=1, hour=0, minute=30),
+        id="monthly_snapshots",
+        name="月末余额快照",
+        replace_existing=True,
+    )
+
+    # 每月1号凌晨结账后归档旧交易（只归档已有快照的月份）
+    scheduler.add_job(
+        archive_old_transactions,
+        CronTrigger(day=1, hour=1, minute=0),
+        id="archive_transactions",
+        name="归档旧交易",
+        replace_existing=True,
+    )
+
+    # 每天凌晨在线备份
+    scheduler.add_job(
+        backup_databases,
+        CronTrigger(hour=2, minute=0),
+        id="backup_databases",
+        name="在线备份",
+        replace_existing=True,
+    )
+
+    # 每小时检查一次是否需要更新统计信息（写入较多时才执行ANALYZE）
+    scheduler.add_job(
+        analyze_database,
+        CronTrigger(minute=15),
+        id="analyze_database",
+        name="更新统计信息",
+        replace_existing=True,
+    )
+
+    # 每10分钟执行一次WAL检查点
+    scheduler.add_job(
+        checkpoint_database,
+        CronTrigger(minute="*/10"),
+        id="checkpoint_database",
+        name="WAL检查点",
+        replace_existing=True,
+    )
+
+    # 每天凌晨回收空闲页之前清理不再使用的分类和备注
+    scheduler.add_job(
+        prune_dictionaries,
+        CronTrigger(hour=3, minute=15),
+        id="prune_dictionaries",
+        name="清理字典表",
+        replace_existing=True,
+    )
+
+    # 每天凌晨回收空闲页
+    scheduler.add_job(
+        vacuum_database,
+        CronTrigger(hour=3, minute=30),
+        id="vacuum_database",
+        name="回收空闲页",
+        replace_existing=True,
+    )
+
+    # 每周日凌晨检查数据库
+    scheduler.add_job(
+        check_database,
+        CronTrigger(day_of_week="sun", hour=4, minute=0),
+        id="check_database",
+        name="完整性检查",
+        replace_existing=True,
+    )
+
     scheduler.start()
     logger.info("定时任务调度器已启动")
 
@@ -172,10 +529,13 @@ def start_scheduler():
     process_daily_schedules()
     process_weekly_schedules()
     process_monthly_schedules()
+    close_monthly_snapshots()
 
 
 def stop_scheduler():
     """停止定时任务调度器"""
+    if scheduler is None or not scheduler.running:
+        return
     scheduler.shutdown()
     logger.info("定时任务调度器已停止")
 
@@ -184,8 +544,6 @@ if __name__ == "__main__":
     start_scheduler()
 
     try:
-        import time
-
         while True:
             time.sleep(1)
     except (KeyboardInterrupt, SystemExit):
@@ -0,0 +1,123 @@
+"""
+列式响应格式
+
+列表类接口默认每行返回一个JSON对象，每一行都重复所有键名。客户端可以通过
+?format=columnar 或 Accept: application/vnd.cashmanager.columnar+json 请求列式格式：
+每列一个数组，可选地把分类等重复字符串编码为字典下标（?dictionary=1）。
+
+    {"columns": ["id", "amount", "category"],
+     "data": [[1, 2], [10.0, 5.5], [0, 0]],
+     "dictionaries": {"category": ["零花钱"]}}
+
+列式响应使用更快的JSON编码：安装了orjson时使用orjson，否则使用紧凑、不转义中文的json。
+查询结果（repository.Record）在编码时直接转换为JSON对象，接口不必先复制成字典。
+"""
+
+import json
+
+from flask import Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    from backend.repository import Record
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from repository import Record
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+COLUMNAR_MIMETYPE = "application/vnd.cashmanager.columnar+json"
+
+# 默认进行字典编码的列
+DICTIONARY_COLUMNS = ("category", "type")
+
+
+def wants_columnar():
+    """客户端是否请求了列式格式"""
+    if request.args.get("format") == "columnar":
+        return True
+    return request.accept_mimetypes[COLUMNAR_MIMETYPE] > request.accept_mimetypes[
+        "application/json"
+    ]
+
+
+def wants_dictionary():
+    """客户端是否要求对重复字符串进行字典编码"""
+    return request.args.get("dictionary") in ("1", "true")
+
+
+def to_columns(columns, rows, dictionary_columns=()):
+    """把查询结果转换为列式结构，columns为列名（结果为空时也能返回列名）"""
+    columns = list(columns)
+    data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+
+    result = {"columns": columns, "data": data}
+    dictionaries = {}
+    for name in dictionary_columns:
+        if name not in columns:
+            continue
+        index = columns.index(name)
+        lookup = {}
+        data[index] = [lookup.setdefault(value, len(lookup)) for value in data[index]]
+        dictionaries[name] = list(lookup)
+    if dictionaries:
+        result["dictionaries"] = dictionaries
+    return result
+
+
+def from_columns(payload):
+    """把列式结构还原为每行一个字典（客户端和测试使用）"""
+    columns, data = payload["columns"], payload["data"]
+    data = list(data)
+    for name, values in payload.get("dictionaries", {}).items():
+        index = columns.index(name)
+        data[index] = [values[i] for i in data[index]]
+    return [dict(zip(columns, row)) for row in zip(*data)]
+
+
+def json_default(value):
+    """JSON编码时把查询结果的行转换为对象"""
+    if isinstance(value, Record):
+        return value.as_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONProvider(DefaultJSONProvider):
+    """jsonify可以直接编码查询结果的行"""
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, Record):
+            return value.as_dict()
+        return DefaultJSONProvider.default(value)
+
+
+def dumps(payload):
+    """快速JSON编码，返回bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=json_default)
+    return json.dumps(
+        payload, ensure_ascii=False, separators=(",", ":"), default=json_default
+    ).encode("utf-8")
+
+
+def columnar_response(payload):
+    """返回列式格式的响应"""
+    return Response(dumps(payload), mimetype=COLUMNAR_MIMETYPE)
+
+
+def rows_payload(rows):
+    """按客户端请求的格式转换查询结果（repository.fetch_all的结果）：列式结构或行列表"""
+    if wants_columnar():
+        dictionary_columns = DICTIONARY_COLUMNS if wants_dictionary() else ()
+        return to_columns(rows.columns, rows, dictionary_columns)
+    return rows
+
+
+def list_response(payload):
+    """列式请求使用快速编码和列式MIME类型，否则保持原来的jsonify"""
+    if wants_columnar():
+        return columnar_response(payload)
+    return jsonify(payload)
@@ -0,0 +1,98 @@
+"""
+按用户分片的数据库路由
+
+SQLite同一个文件同时只允许一个写入者，所有家庭共用一个数据库时，一个家庭的批量修改
+会阻塞其他家庭的写入。启用分片（SHARD_COUNT>0）后：
+
+- 主数据库（DATABASE_PATH）只保存用户账号和分片目录user_shards
+- 每个用户的交易、定时发放和余额快照保存在 SHARD_DIR/shard_NNN.db 中
+- 新用户第一次访问数据时按 user_id % SHARD_COUNT 分配分片并写入目录，
+  之后始终按目录路由，调整SHARD_COUNT不会移动已有用户；
+  也可以直接修改目录，把数据量大的家庭放到单独的分片
+
+SHARD_COUNT为0时不分片，所有数据都在主数据库中。
+"""
+
+import os
+import sqlite3
+import threading
+
+try:
+    from backend.database.init_db import ensure_schema
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from database.init_db import ensure_schema
+
+
+def default_shard_dir(catalog_path):
+    """默认的分片目录：主数据库所在目录下的shards"""
+    return os.path.join(os.path.dirname(os.path.abspath(catalog_path)), "shards")
+
+
+class ShardRouter:
+    """把用户路由到所在的数据库文件"""
+
+    def __init__(self, catalog_path, shard_dir=None, shard_count=0):
+        self.catalog_path = catalog_path
+        self.shard_dir = shard_dir or default_shard_dir(catalog_path)
+        self.shard_count = shard_count
+        self._shards = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.shard_count > 0
+
+    def shard_path(self, shard):
+        """分片编号对应的数据库文件"""
+        return os.path.join(self.shard_dir, f"shard_{shard:03d}.db")
+
+    def _connect_catalog(self):
+        conn = sqlite3.connect(self.catalog_path)
+        ensure_schema(conn)
+        return conn
+
+    def shard_for(self, user_id):
+        """用户所在的分片编号，目录中没有时按哈希桶分配并记录"""
+        shard = self._shards.get(user_id)
+        if shard is not None:
+            return shard
+
+        with self._lock:
+            conn = self._connect_catalog()
+            try:
+                # 多个进程同时分配时以先写入目录的为准
+                conn.execute(
+                    "INSERT OR IGNORE INTO user_shards (user_id, shard) VALUES (?, ?)",
+                    (user_id, user_id % self.shard_count),
+                )
+                conn.commit()
+                shard = conn.execute(
+                    "SELECT shard FROM user_shards WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+            finally:
+                conn.close()
+            os.makedirs(self.shard_dir, exist_ok=True)
+            self._shards[user_id] = shard
+        return shard
+
+    def path_for(self, user_id):
+        """保存用户数据的数据库文件，不分片时为主数据库"""
+        if not self.enabled:
+            return self.catalog_path
+        return self.shard_path(self.shard_for(user_id))
+
+    def database_paths(self):
+        """所有保存用户数据的数据库文件，供定时任务逐个处理"""
+        if not self.enabled:
+            return [self.catalog_path]
+
+        shards = set(range(self.shard_count))
+        conn = self._connect_catalog()
+        try:
+            shards.update(
+                row[0] for row in conn.execute("SELECT DISTINCT shard FROM user_shards")
+            )
+        finally:
+            conn.close()
+        paths = (self.shard_path(shard) for shard in sorted(shards))
+        return [path for path in paths if os.path.exists(path)]
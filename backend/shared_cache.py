@@ -0,0 +1,158 @@
+"""
+多进程共用的统计结果缓存
+
+多个worker进程时，每个进程的内存缓存各自预热、各自失效。启用后（SHARED_CACHE=1），
+余额、趋势、统计、概览、分类和月度汇总接口的响应体保存在所有进程共用的缓存表中：
+
+- 使用SQLite时缓存表在单独的文件中（默认数据库所在目录下的cache.db），同一台机器上的
+  worker共用；使用PostgreSQL时缓存表建在PostgreSQL中，所有节点共用
+- cache_versions为每个用户记一个版本号，交易变化提交后加1（repository.notify_change），
+  缓存的响应带着计算前读到的版本号，版本号不一致的缓存不再使用，各进程不需要互相通知
+- 先读版本号再计算：计算期间有写入提交时，保存的响应版本号已过期，不会被使用
+- 与日期有关的接口（趋势、今日收支）的缓存键包含当天日期，跨天后自动失效
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+_TABLES = (
+    """CREATE TABLE IF NOT EXISTS cache_versions (
+           user_id BIGINT PRIMARY KEY,
+           version BIGINT NOT NULL
+       )""",
+    """CREATE TABLE IF NOT EXISTS aggregate_cache (
+           user_id BIGINT NOT NULL,
+           cache_key TEXT NOT NULL,
+           version BIGINT NOT NULL,
+           day TEXT NOT NULL,
+           mimetype TEXT NOT NULL,
+           body TEXT NOT NULL,
+           PRIMARY KEY (user_id, cache_key)
+       )""",
+)
+
+
+def default_cache_path(database_path):
+    """默认的缓存文件：数据库所在目录下的cache.db"""
+    return os.path.join(os.path.dirname(os.path.abspath(database_path)), "cache.db")
+
+
+class SharedCache:
+    """保存在SQLite文件（path）或PostgreSQL（storage）中的响应缓存"""
+
+    def __init__(self, path=None, storage=None, timeout=5):
+        self.path = path
+        self.storage = storage
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        if self.storage is not None:
+            conn = self.storage.connection()
+            try:
+                self._ensure_tables(conn)
+                yield conn
+                conn.commit()
+            finally:
+                conn.close()
+            return
+
+        # 每个线程一个自动提交的连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        self._ensure_tables(conn)
+        yield conn
+
+    def _ensure_tables(self, conn):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            if self.storage is not None:
+                # 多个节点同时建表时只有一个执行
+                conn.execute("SELECT pg_advisory_xact_lock(20250602)")
+            for sql in _TABLES:
+                conn.execute(sql)
+            if self.storage is not None:
+                conn.commit()
+            self._ready = True
+
+    def lookup(self, user_id, key):
+        """返回(当前版本号, (mimetype, body))，没有当前版本的缓存时第二项为None"""
+        with self._connection() as conn:
+            row = conn.execute(
+                """SELECT v.version, c.mimetype, c.body
+                   FROM (SELECT COALESCE(MAX(version), 0) AS version
+                         FROM cache_versions WHERE user_id = ?) AS v
+                   LEFT JOIN aggregate_cache AS c
+                   ON c.user_id = ? AND c.cache_key = ? AND c.version = v.version""",
+                (user_id, user_id, key),
+            ).fetchone()
+        if row[2] is None:
+            self.misses += 1
+            return row[0], None
+        self.hits += 1
+        return row[0], (row[1], row[2])
+
+    def store(self, user_id, key, version, day, mimetype, body):
+        """保存按版本号version计算的响应，同时删除该用户过期版本和前几天的缓存"""
+        with self._connection() as conn:
+            conn.execute(
+                """DELETE FROM aggregate_cache
+                   WHERE user_id = ? AND (version < ? OR day < ?)""",
+                (user_id, version, day),
+            )
+            conn.execute(
+                """INSERT INTO aggregate_cache
+                   (user_id, cache_key, version, day, mimetype, body)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (user_id, cache_key) DO UPDATE SET
+                       version = excluded.version,
+                       day = excluded.day,
+                       mimetype = excluded.mimetype,
+                       body = excluded.body
+                   WHERE excluded.version >= aggregate_cache.version""",
+                (user_id, key, version, day, mimetype, body),
+            )
+
+    def invalidate(self, user_id, appended=False):
+        """用户的交易已变化（repository.notify_change的监听）：版本号加1"""
+        with self._connection() as conn:
+            conn.execute(
+                """INSERT INTO cache_versions (user_id, version) VALUES (?, 1)
+                   ON CONFLICT (user_id)
+                   DO UPDATE SET version = cache_versions.version + 1""",
+                (user_id,),
+            )
+
+    def clear(self):
+        """清空缓存并让所有版本号加1（如从备份恢复后）"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM aggregate_cache")
+            conn.execute("UPDATE cache_versions SET version = version + 1")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
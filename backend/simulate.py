@@ -0,0 +1,265 @@
+"""
+定时发放模拟器
+
+用虚拟时钟驱动scheduler.py中的发放任务，在临时数据库上尽快回放一段日期区间
+（例如365天），报告每个模拟日产生的发放笔数、耗时和SQL语句数。
+既可用于检查发放逻辑是否正确，也可用于测试调度器随用户规模增长的性能。
+
+用法:
+    python backend/simulate.py --days 365 --start 2025-01-01 --users 100
+    python backend/simulate.py --source backend/database/cash_manager.db \
+        --json report.json
+    python backend/simulate.py --database /tmp/simulate.db --force
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+try:
+    from backend import repository, scheduler
+    from backend.clock import VirtualClock
+    from backend.database.init_db import ensure_schema
+except ImportError:  # 以脚本方式运行（python backend/simulate.py）
+    import repository
+    import scheduler
+    from clock import VirtualClock
+    from database.init_db import ensure_schema
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+
+# 模拟的执行时刻，与start_scheduler中的CronTrigger保持一致（每天9点）
+RUN_HOUR = 9
+
+DayReport = namedtuple("DayReport", "date daily weekly monthly seconds queries")
+
+
+def create_scratch_database(path, users=1, source=None):
+    """创建临时数据库
+
+    指定source时复制其中的用户和定时配置（清空交易记录、快照和归档）；
+    否则生成users个用户，每个用户各有一条每日、每周、每月发放配置。
+    """
+    conn = sqlite3.connect(path)
+    if source:
+        src = sqlite3.connect(source)
+        src.backup(conn)
+        src.close()
+        ensure_schema(conn)
+        # 归档的交易和汇总也要清空，否则回放从已归档的历史开始
+        for table in (
+            "transactions",
+            "balance_snapshots",
+            "transactions_archive",
+            "archive_horizons",
+            "archive_rollups",
+        ):
+            conn.execute(f"DELETE FROM {table}")
+    else:
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        # 所有模拟用户共用同一个密码哈希，避免生成大量用户时耗时
+        password = generate_password_hash("simulate")
+        for i in range(1, users + 1):
+            cursor = conn.execute(
+                "INSERT INTO users (username, password) VALUES (?, ?)",
+                (f"sim_user_{i}", password),
+            )
+            user_id = cursor.lastrowid
+            for frequency, amount, category, day_of_week, day_of_month in (
+                ("daily", 200, "每日零花钱", None, None),
+                ("weekly", 1000, "每周零花钱", 0, None),
+                ("monthly", 5000, "每月零花钱", None, 1),
+            ):
+                repository.add_schedule(
+                    conn,
+                    user_id,
+                    frequency,
+                    amount,
+                    category,
+                    "",
+                    day_of_week,
+                    day_of_month,
+                )
+    conn.commit()
+    conn.close()
+
+
+def expected_payouts(conn, start, days):
+    """根据定时配置计算区间内应发放的笔数"""
+    counts = dict(
+        conn.execute(
+            "SELECT frequency, COUNT(*) FROM schedules GROUP BY frequency"
+        ).fetchall()
+    )
+    dates = [start + timedelta(days=i) for i in range(days)]
+    mondays = sum(1 for d in dates if d.weekday() == 0)
+    firsts = sum(1 for d in dates if d.day == 1)
+    return (
+        counts.get("daily", 0) * days
+        + counts.get("weekly", 0) * mondays
+        + counts.get("monthly", 0) * firsts
+    )
+
+
+def run_simulation(database_path, start, days):
+    """在database_path上回放从start开始的days天，返回每日报告列表"""
+    clock = VirtualClock(start.replace(hour=RUN_HOUR, minute=0, second=0))
+    previous_clock = scheduler.set_clock(clock)
+
+    query_count = [0]
+
+    def count_statement(statement):
+        query_count[0] += 1
+
+    conn = scheduler.get_db_connection(database_path)
+    conn.set_trace_callback(count_statement)
+
+    reports = []
+    try:
+        for _ in range(days):
+            now = clock.now()
+            query_count[0] = 0
+            began = time.perf_counter()
+
+            # 与CronTrigger的触发规则一致：每天、每周一、每月1号
+            daily = scheduler.process_daily_schedules(conn)
+            weekly = monthly = 0
+            if now.weekday() == 0:
+                weekly = scheduler.process_weekly_schedules(conn)
+            if now.day == 1:
+                monthly = scheduler.process_monthly_schedules(conn)
+                scheduler.close_monthly_snapshots(conn)
+
+            reports.append(
+                DayReport(
+                    now.strftime("%Y-%m-%d"),
+                    daily,
+                    weekly,
+                    monthly,
+                    time.perf_counter() - began,
+                    query_count[0],
+                )
+            )
+            clock.advance(days=1)
+    finally:
+        conn.close()
+        scheduler.set_clock(previous_clock)
+
+    return reports
+
+
+def summarize(reports, expected=None):
+    """汇总每日报告"""
+    durations = sorted(r.seconds for r in reports)
+    payouts = sum(r.daily + r.weekly + r.monthly for r in reports)
+    summary = {
+        "days": len(reports),
+        "payouts": payouts,
+        "daily_payouts": sum(r.daily for r in reports),
+        "weekly_payouts": sum(r.weekly for r in reports),
+        "monthly_payouts": sum(r.monthly for r in reports),
+        "total_seconds": round(sum(durations), 4),
+        "queries": sum(r.queries for r in reports),
+    }
+    if reports:
+        summary["avg_ms_per_day"] = round(
+            summary["total_seconds"] * 1000 / len(reports), 3
+        )
+        summary["p95_ms_per_day"] = round(
+            durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 3
+        )
+        summary["max_ms_per_day"] = round(durations[-1] * 1000, 3)
+        summary["avg_queries_per_day"] = round(summary["queries"] / len(reports), 1)
+    if expected is not None:
+        summary["expected_payouts"] = expected
+        summary["correct"] = expected == payouts
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用虚拟时钟回放定时发放任务")
+    parser.add_argument("--start", default=datetime.now().strftime("%Y-%m-%d"),
+                        help="起始日期 YYYY-MM-DD（默认今天）")
+    parser.add_argument("--days", type=int, default=365, help="回放天数")
+    parser.add_argument("--users", type=int, default=1, help="生成的模拟用户数")
+    parser.add_argument("--source", help="从已有数据库复制用户和定时配置")
+    parser.add_argument("--database", help="临时数据库路径（默认自动创建并删除）")
+    parser.add_argument("--force", action="store_true", help="--database已存在时覆盖")
+    parser.add_argument("--json", dest="json_path", help="将报告写入JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="打印每日明细和发放日志")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.getLogger(scheduler.__name__).setLevel(logging.WARNING)
+
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    scratch_dir = None
+    database_path = args.database
+    if database_path is None:
+        scratch_dir = tempfile.mkdtemp(prefix="cash_manager_sim_")
+        database_path = os.path.join(scratch_dir, "simulate.db")
+    elif os.path.exists(database_path):
+        if not args.force:
+            parser.error(f"{database_path} 已存在，确认覆盖请加--force")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database_path + suffix):
+                os.remove(database_path + suffix)
+
+    try:
+        create_scratch_database(database_path, args.users, args.source)
+        reports = run_simulation(database_path, start, args.days)
+
+        conn = sqlite3.connect(database_path)
+        expected = expected_payouts(conn, start, args.days)
+        conn.close()
+        summary = summarize(reports, expected)
+    finally:
+        if scratch_dir:
+            for name in os.listdir(scratch_dir):
+                os.remove(os.path.join(scratch_dir, name))
+            os.rmdir(scratch_dir)
+
+    if args.verbose:
+        print(f"{'日期':<12}{'每日':>6}{'每周':>6}{'每月':>6}{'耗时ms':>10}{'SQL数':>8}")
+        for r in reports:
+            print(
+                f"{r.date:<12}{r.daily:>6}{r.weekly:>6}{r.monthly:>6}"
+                f"{r.seconds * 1000:>10.3f}{r.queries:>8}"
+            )
+
+    print(f"模拟天数: {summary['days']}")
+    print(
+        f"发放笔数: {summary['payouts']} (每日 {summary['daily_payouts']} / "
+        f"每周 {summary['weekly_payouts']} / 每月 {summary['monthly_payouts']})"
+    )
+    print(f"预期笔数: {summary['expected_payouts']} {'✅' if summary['correct'] else '❌'}")
+    if reports:
+        print(
+            f"每日耗时: 平均 {summary['avg_ms_per_day']}ms / "
+            f"p95 {summary['p95_ms_per_day']}ms / 最大 {summary['max_ms_per_day']}ms"
+        )
+        print(f"每日SQL数: 平均 {summary['avg_queries_per_day']}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"summary": summary, "days": [r._asdict() for r in reports]},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+    return 0 if summary["correct"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
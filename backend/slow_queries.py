@@ -0,0 +1,213 @@
+"""
+慢查询日志
+
+耗时不少于SLOW_QUERY_MS毫秒的语句（repository.add_slow_listener，即所有经由repository执行的
+语句，包括同一进程中的定时任务）记录为logger cash_manager.slow_query的一行JSON：
+
+- sql: 规范化的SQL（合并空白，字面量换成?，IN列表合并为一项）
+- params: 参数的类型（字符串和二进制带长度，不记录参数值）；executemany记录行数和第一行
+- duration_ms、route: 所在的请求（方法和URL规则），非请求线程为线程名
+- plan: EXPLAIN QUERY PLAN的输出（只对SQLite连接执行；同一条SQL在进程内只执行一次）
+
+进程内按规范化的SQL汇总次数、总耗时和最大耗时，top()返回总耗时最多的前N条；
+scripts/slow_query_report.py从日志文件汇总多个进程的记录。查询计划中有全表扫描
+（SCAN 表名，没有USING INDEX）或临时B树排序的语句在报告中标出，多为缺少索引，
+或者是LIKE、DATE()这类无法使用索引的条件。
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from flask import has_request_context, request
+
+try:
+    from backend import repository
+    from backend.metrics import log_json
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    import repository
+    from metrics import log_json
+
+logger = logging.getLogger("cash_manager.slow_query")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """同一条语句的不同写法、字面量和IN列表长度归为同一个文本"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("IN (?, ...)", sql)
+
+
+def _shape(value):
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shape(params):
+    """参数的类型，不含参数值"""
+    if isinstance(params, dict):
+        return {name: _shape(value) for name, value in params.items()}
+    if not isinstance(params, (list, tuple)):
+        return "iterator"
+    if params and isinstance(params[0], (list, tuple, dict)):
+        # executemany的参数序列
+        return {"rows": len(params), "first": param_shape(params[0])}
+    return [_shape(value) for value in params]
+
+
+def explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN的输出，每个步骤一行，子步骤缩进；不是SQLite连接或执行失败时返回None"""
+    if not isinstance(conn, sqlite3.Connection):
+        return None
+    if not isinstance(params, (list, tuple, dict)):
+        return None
+    if params and isinstance(params, (list, tuple)):
+        if isinstance(params[0], (list, tuple, dict)):
+            params = params[0]
+    try:
+        # 直接在连接上执行：不经过repository，不会再次触发监听
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return None
+    depth = {}
+    plan = []
+    for row in rows:
+        node, parent, detail = row[0], row[1], row[-1]
+        depth[node] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node] + detail)
+    return plan
+
+
+def plan_flags(plan):
+    """查询计划中的全表扫描和临时B树"""
+    flags = []
+    for step in plan or ():
+        step = step.strip()
+        if step.startswith("SCAN ") and " USING " not in step and "全表扫描" not in flags:
+            flags.append("全表扫描")
+        if step.startswith("USE TEMP B-TREE") and "临时B树" not in flags:
+            flags.append("临时B树")
+    return flags
+
+
+def current_route():
+    """语句所在的请求，非请求线程（定时任务、合并提交）为线程名"""
+    if has_request_context():
+        rule = request.url_rule
+        return f"{request.method} {rule.rule if rule is not None else request.path}"
+    return f"thread:{threading.current_thread().name}"
+
+
+class SlowQueryStats:
+    """按规范化的SQL汇总慢查询记录（日志中的一行JSON）"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, record):
+        entry = self.entries.get(record["sql"])
+        if entry is None:
+            entry = self.entries[record["sql"]] = {
+                "sql": record["sql"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": Counter(),
+                "plan": None,
+            }
+        entry["count"] += 1
+        entry["total_ms"] += record["duration_ms"]
+        entry["max_ms"] = max(entry["max_ms"], record["duration_ms"])
+        entry["routes"][record["route"]] += 1
+        if record.get("plan"):
+            entry["plan"] = record["plan"]
+
+    def top(self, n=10):
+        """总耗时最多的前n条"""
+        entries = self.entries.values()
+        return sorted(entries, key=lambda e: e["total_ms"], reverse=True)[:n]
+
+
+def format_report(entries):
+    """文字报告：每条语句的次数、总耗时、平均和最大耗时、来源、查询计划"""
+    lines = []
+    for rank, entry in enumerate(entries, 1):
+        flags = plan_flags(entry["plan"])
+        lines.append(
+            f"#{rank} 次数 {entry['count']}  总耗时 {entry['total_ms']:.1f}ms  "
+            f"平均 {entry['total_ms'] / entry['count']:.1f}ms  "
+            f"最大 {entry['max_ms']:.1f}ms"
+            + (f"  [{'、'.join(flags)}]" if flags else "")
+        )
+        lines.append(f"  {entry['sql']}")
+        routes = entry["routes"].most_common(3)
+        sources = ", ".join(f"{route} ×{count}" for route, count in routes)
+        lines.append(f"  来源: {sources}")
+        for step in entry["plan"] or ["（没有查询计划）"]:
+            lines.append(f"    {step}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+class SlowQueryLog:
+    """慢语句监听：写日志并在进程内汇总"""
+
+    def __init__(self, threshold_ms=100, explain_plans=True):
+        self.threshold = threshold_ms / 1000
+        self.explain_plans = explain_plans
+        self.stats = SlowQueryStats()
+        self.count = 0
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, sql, params, seconds):
+        normalized = normalize_sql(sql)
+        plan = self._plans.get(normalized)
+        if plan is None and self.explain_plans:
+            plan = explain(conn, sql, params)
+            if plan is not None:
+                self._plans[normalized] = plan
+        record = {
+            "sql": normalized,
+            "params": param_shape(params),
+            "duration_ms": round(seconds * 1000, 3),
+            "route": current_route(),
+            "plan": plan,
+        }
+        with self._lock:
+            self.count += 1
+            self.stats.add(record)
+        log_json(logger, record)
+
+    def top(self, n=10):
+        with self._lock:
+            return self.stats.top(n)
+
+    def start(self):
+        repository.add_slow_listener(self, self.threshold)
+        return self
+
+    def stop(self):
+        repository.remove_slow_listener(self)
+
+
+def init_slow_query_log(app):
+    """SLOW_QUERY_MS大于0时注册慢查询日志，返回SlowQueryLog（关闭时为None）"""
+    app.config.setdefault("SLOW_QUERY_MS", 100)
+    app.config.setdefault("SLOW_QUERY_EXPLAIN", True)
+    if app.config["SLOW_QUERY_MS"] <= 0:
+        return None
+    log = SlowQueryLog(app.config["SLOW_QUERY_MS"], app.config["SLOW_QUERY_EXPLAIN"])
+    app.extensions["slow_query_log"] = log
+    return log.start()
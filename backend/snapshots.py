@@ -0,0 +1,187 @@
+"""
+月末余额快照
+
+每个用户每个已结束的月份在balance_snapshots表中有一行，记录截至该月月末的
+累计收入、累计支出和余额。查询"某日期的余额"时只需取该日期之前最近的快照，
+再扫描快照之后不到一个多月的交易，而不必汇总全部历史。
+
+- 快照只为已结束的月份生成，生成后不再修改
+- 修改或删除已结账月份的交易时，删除该月及之后的快照，再由close_months重新生成
+- 没有快照时退化为从头汇总，结果始终正确
+- 范围早于归档界限时合并归档表汇总（见archive.py）
+
+日期边界统一使用'YYYY-MM-DD'文本，与created_at（UTC）按字符串比较。
+"""
+
+from datetime import date, datetime, timezone
+
+try:
+    from backend.archive import EARLIEST_DATE, transactions_source
+    from backend.repository import execute, executemany
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from archive import EARLIEST_DATE, transactions_source
+    from repository import execute, executemany
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _next_month(month):
+    """'YYYY-MM'的下一个月"""
+    year, number = int(month[:4]), int(month[5:7])
+    if number == 12:
+        return f"{year + 1:04d}-01"
+    return f"{year:04d}-{number + 1:02d}"
+
+
+def _month_start(month):
+    """'YYYY-MM'的第一天，作为created_at的比较边界"""
+    return f"{month}-01"
+
+
+def month_of(moment):
+    """datetime、date或created_at文本所在的月份'YYYY-MM'"""
+    if isinstance(moment, (datetime, date)):
+        return moment.strftime("%Y-%m")
+    return str(moment)[:7]
+
+
+def close_months(conn, user_id, now=None):
+    """为用户生成所有已结束但还没有快照的月份，返回新生成的快照数
+
+    从最近一个快照（没有时从第一笔交易）所在月份之后开始，到当前月份之前为止，
+    没有交易的月份也生成快照，保证查询时的尾部扫描不超过一个多月。调用方负责提交事务。
+    """
+    current_month = month_of(now or _utc_now())
+
+    last = execute(
+        conn,
+        """SELECT month, income, expense FROM balance_snapshots
+           WHERE user_id = ? ORDER BY month DESC LIMIT 1""",
+        (user_id,),
+    ).fetchone()
+    if last is not None:
+        month = _next_month(last[0])
+        income, expense = last[1], last[2]
+    else:
+        first = execute(
+            conn,
+            f"SELECT MIN(created_at) FROM {transactions_source(conn, user_id)} AS t"
+            " WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()[0]
+        if first is None:
+            return 0
+        month = month_of(first)
+        income = expense = 0
+
+    if month >= current_month:
+        return 0
+
+    source = transactions_source(conn, user_id, _month_start(month))
+    flows = {
+        row[0]: (row[1], row[2])
+        for row in execute(
+            conn,
+            f"""SELECT strftime('%Y-%m', created_at) as month,
+                   COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0)
+               FROM {source} AS t
+               WHERE user_id = ? AND created_at >= ? AND created_at < ?
+               GROUP BY month""",
+            (user_id, _month_start(month), _month_start(current_month)),
+        )
+    }
+
+    closed_at = (now or _utc_now()).strftime("%Y-%m-%d %H:%M:%S")
+    snapshots = []
+    while month < current_month:
+        month_income, month_expense = flows.get(month, (0, 0))
+        income += month_income
+        expense += month_expense
+        snapshots.append((user_id, month, income, expense, income - expense, closed_at))
+        month = _next_month(month)
+
+    # 并发结账时以先写入的为准，已有的快照不覆盖
+    executemany(
+        conn,
+        """INSERT OR IGNORE INTO balance_snapshots
+           (user_id, month, income, expense, balance, closed_at)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        snapshots,
+    )
+    return len(snapshots)
+
+
+def close_all_months(conn, now=None):
+    """为所有用户生成已结束月份的快照，返回新生成的快照数"""
+    user_ids = [
+        row[0]
+        for row in execute(conn, "SELECT DISTINCT user_id FROM transactions").fetchall()
+    ]
+    closed = sum(close_months(conn, user_id, now) for user_id in user_ids)
+    conn.commit()
+    return closed
+
+
+def invalidate(conn, user_id, created_at):
+    """交易的created_at落在已结账月份时，删除该月及之后的快照，返回删除的数量"""
+    cursor = execute(
+        conn,
+        "DELETE FROM balance_snapshots WHERE user_id = ? AND month >= ?",
+        (user_id, month_of(created_at)),
+    )
+    return cursor.rowcount
+
+
+def record_change(conn, user_id, created_at=None, now=None):
+    """交易写入、修改或删除后维护快照：失效受影响的月份，并补齐到上个月为止的快照
+
+    created_at为空表示按当前时间写入的新交易，不会落在已结账月份。
+    快照已是最新时只多一次按主键的查询。调用方负责提交事务。
+    """
+    if created_at is not None:
+        invalidate(conn, user_id, created_at)
+    close_months(conn, user_id, now)
+
+
+def balance_as_of(conn, user_id, before):
+    """截至before（不含，'YYYY-MM-DD'）的累计收入、支出和余额
+
+    取before所在月份之前最近的快照，再加上快照之后到before之间的交易。
+    """
+    snapshot = execute(
+        conn,
+        """SELECT month, income, expense FROM balance_snapshots
+           WHERE user_id = ? AND month < ?
+           ORDER BY month DESC LIMIT 1""",
+        (user_id, month_of(before)),
+    ).fetchone()
+
+    if snapshot is not None:
+        income, expense = snapshot[1], snapshot[2]
+        tail_start = _month_start(_next_month(snapshot[0]))
+    else:
+        income = expense = 0
+        tail_start = EARLIEST_DATE
+
+    source = transactions_source(conn, user_id, tail_start)
+    tail = execute(
+        conn,
+        f"""SELECT
+               COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0)
+           FROM {source} AS t
+           WHERE user_id = ? AND created_at >= ? AND created_at < ?""",
+        (user_id, tail_start, before),
+    ).fetchone()
+    income += tail[0]
+    expense += tail[1]
+
+    return {
+        "income": income,
+        "expense": expense,
+        "balance": income - expense,
+        "snapshot": snapshot[0] if snapshot is not None else None,
+    }
@@ -0,0 +1,254 @@
+"""
+存储后端
+
+默认使用SQLite：每个数据库文件一组读写连接池（db.py），可以按用户分片（shards.py）。
+配置 DATABASE_URL=postgresql://... 后改用PostgreSQL，多个应用节点共用同一个数据库，
+连接来自psycopg_pool连接池（可选依赖 psycopg[binary,pool]）。
+
+两种后端的连接接口相同：execute/executemany/commit/rollback/close，
+返回的行都是repository.Record，支持按列名和下标取值。业务代码中的SQL按SQLite的写法编写，
+PostgreSQL连接在执行前把其中SQLite特有的写法改写为等价的PostgreSQL语法（translate）：
+
+- ? 占位符 -> %s
+- strftime('%Y-%m', x) -> to_char(x, 'YYYY-MM')，DATE(x) -> CAST(x AS DATE)
+- 'now' 按UTC计算，与SQLite的CURRENT_TIMESTAMP一致
+- INSERT OR IGNORE -> INSERT ... ON CONFLICT DO NOTHING
+- LIKE -> ILIKE：SQLite的LIKE不区分ASCII字母的大小写，PostgreSQL的LIKE区分
+
+PostgreSQL返回的时间、日期和numeric转换为与SQLite相同的文本和数字，接口输出保持一致。
+WAL检查点、增量回收和在线备份等维护任务只适用于SQLite，PostgreSQL由数据库自身维护。
+"""
+
+import functools
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    from backend.database.init_db import SCHEMA_VERSION, read_postgres_schema
+    from backend.db import DatabasePools
+    from backend.repository import Record
+except ImportError:  # 以脚本方式运行（python backend/app.py）
+    from database.init_db import SCHEMA_VERSION, read_postgres_schema
+    from db import DatabasePools
+    from repository import Record
+
+try:
+    import psycopg
+    from psycopg_pool import ConnectionPool as PostgresPool
+except ImportError:  # 可选依赖，只有使用PostgreSQL时需要
+    psycopg = None
+
+
+def is_postgres_url(url):
+    return bool(url) and url.startswith(("postgresql://", "postgres://"))
+
+
+class SQLiteStorage:
+    """SQLite后端：按数据库文件管理只读连接池和写连接池"""
+
+    name = "sqlite"
+
+    def __init__(self, pools=None, read_size=4, write_size=2):
+        self.pools = pools or DatabasePools(read_size=read_size, write_size=write_size)
+
+    def connection(self, path, readonly=False):
+        return self.pools.connection(path, readonly=readonly)
+
+    def close(self):
+        self.pools.close()
+
+
+# strftime格式到to_char格式
+_DATE_FORMATS = {
+    "%Y": "YYYY",
+    "%m": "MM",
+    "%d": "DD",
+    "%H": "HH24",
+    "%M": "MI",
+    "%S": "SS",
+}
+
+_UTC_NOW = "(now() AT TIME ZONE 'utc')"
+_STRFTIME = re.compile(r"strftime\('([^']*)',\s*('now'|[\w.]+)\)")
+_DATE = re.compile(r"\bDATE\(\s*('now'|[\w.]+)\s*\)")
+_INSERT_OR_IGNORE = re.compile(r"^\s*INSERT OR IGNORE INTO", re.IGNORECASE)
+_LIKE = re.compile(r"\bLIKE\b", re.IGNORECASE)
+
+
+def _to_char(match):
+    fmt = match.group(1)
+    for old, new in _DATE_FORMATS.items():
+        fmt = fmt.replace(old, new)
+    value = _UTC_NOW if match.group(2) == "'now'" else match.group(2)
+    return f"to_char({value}, '{fmt}')"
+
+
+def _cast_date(match):
+    value = _UTC_NOW if match.group(1) == "'now'" else match.group(1)
+    return f"CAST({value} AS DATE)"
+
+
+@functools.lru_cache(maxsize=512)
+def translate(sql):
+    """把按SQLite写法编写的SQL改写为PostgreSQL语法"""
+    sql = _STRFTIME.sub(_to_char, sql)
+    sql = _DATE.sub(_cast_date, sql)
+    if _INSERT_OR_IGNORE.match(sql):
+        sql = _INSERT_OR_IGNORE.sub("INSERT INTO", sql, count=1)
+        sql += " ON CONFLICT DO NOTHING"
+    sql = _LIKE.sub("ILIKE", sql)
+
+    # 字符串字面量之外的?改为%s，%转义为%%
+    out = []
+    quoted = False
+    for char in sql:
+        if char == "'":
+            quoted = not quoted
+        if char == "%":
+            out.append("%%")
+        elif char == "?" and not quoted:
+            out.append("%s")
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def _sqlite_value(value):
+    """PostgreSQL返回的值转换为SQLite中对应的表示"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _row_factory(cursor):
+    names = [column.name for column in cursor.description or ()]
+    index = {name: i for i, name in enumerate(names)}
+
+    def make_row(values):
+        return Record(index, tuple(_sqlite_value(value) for value in values))
+
+    return make_row
+
+
+class PostgresConnection:
+    """连接池中的PostgreSQL连接，接口与SQLite连接相同，close()归还连接池"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def _cursor_execute(self, method, sql, params):
+        cursor = self._conn.cursor()
+        try:
+            getattr(cursor, method)(translate(sql), params)
+        except psycopg.IntegrityError as e:
+            # 业务代码按SQLite的异常类型处理唯一约束等错误
+            raise sqlite3.IntegrityError(str(e)) from e
+        return cursor
+
+    def execute(self, sql, params=()):
+        return self._cursor_execute("execute", sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._cursor_execute("executemany", sql, list(seq_of_params))
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE
+
+    def close(self):
+        """归还连接（未提交的事务由连接池回滚），重复调用时忽略"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.putconn(conn)
+
+
+class PostgresStorage:
+    """PostgreSQL后端：所有用户共用一个数据库，连接来自同一个连接池"""
+
+    name = "postgresql"
+
+    def __init__(self, url, size=6, timeout=30):
+        if psycopg is None:
+            raise RuntimeError("使用PostgreSQL需要安装 psycopg[binary,pool]")
+        self.url = url
+        self.timeout = timeout
+        self._pool = PostgresPool(
+            url,
+            min_size=1,
+            max_size=max(size, 1),
+            kwargs={"row_factory": _row_factory},
+            open=True,
+        )
+        self._schema_checked = False
+        self._lock = threading.Lock()
+
+    def _ensure_schema(self, conn):
+        with self._lock:
+            if self._schema_checked:
+                return
+            # 多个节点同时启动时只有一个执行建表
+            conn.execute("SELECT pg_advisory_xact_lock(20250601)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+            )
+            version = conn.execute(
+                "SELECT MAX(version) FROM schema_version"
+            ).fetchone()[0]
+            if version is None or version < SCHEMA_VERSION:
+                conn.execute(read_postgres_schema())
+                conn.execute("DELETE FROM schema_version")
+                conn.execute(
+                    "INSERT INTO schema_version (version) VALUES (%s)",
+                    (SCHEMA_VERSION,),
+                )
+            conn.commit()
+            self._schema_checked = True
+
+    def connection(self, path=None, readonly=False):
+        """取出连接；只读连接在可重复读的只读事务中执行，同一请求内看到同一个快照"""
+        conn = self._pool.getconn(timeout=self.timeout)
+        try:
+            if not self._schema_checked:
+                self._ensure_schema(conn)
+            conn.read_only = readonly
+            conn.isolation_level = (
+                psycopg.IsolationLevel.REPEATABLE_READ if readonly else None
+            )
+        except BaseException:
+            self._pool.putconn(conn)
+            raise
+        return PostgresConnection(self._pool, conn)
+
+    def stats(self):
+        """连接池上限、已打开的连接数和使用中的连接数（与ConnectionPool.stats()相同）"""
+        stats = self._pool.get_stats()
+        size = stats.get("pool_size", 0)
+        return {
+            "size": self._pool.max_size,
+            "open": size,
+            "in_use": size - stats.get("pool_available", 0),
+        }
+
+    def close(self):
+        self._pool.close()
+
+
+def create_storage(url=None, read_size=4, write_size=2, pools=None):
+    """按DATABASE_URL创建存储后端，未配置或不是PostgreSQL地址时使用SQLite"""
+    if is_postgres_url(url):
+        return PostgresStorage(url, size=read_size + write_size)
+    return SQLiteStorage(pools, read_size, write_size)
@@ -3,7 +3,6 @@
 """
 
 import os
-import sqlite3
 import unittest
 from datetime import datetime, timedelta
 
@@ -17,66 +16,39 @@ TEST_DATABASE_PATH = os.path.join(
 # 在导入app之前设置环境变量
 os.environ["TEST_DATABASE_PATH"] = TEST_DATABASE_PATH
 
+from backend import repository
 from backend.app import app
+from backend.testing import PostgresBackend, SQLiteBackend, skip_unless_postgres
 
 
-class AdditionalTestCase(unittest.TestCase):
+class AdditionalTestCase(SQLiteBackend, unittest.TestCase):
     """额外的功能测试用例"""
 
+    database_path = TEST_DATABASE_PATH
+
     @classmethod
     def setUpClass(cls):
         """测试类初始化"""
-        app.config["TESTING"] = True
-        app.config["DATABASE_PATH"] = TEST_DATABASE_PATH
+        cls.use_backend()
         app.config["SECRET_KEY"] = "test-secret-key"
 
-        # 删除可能存在的旧测试数据库
-        if os.path.exists(TEST_DATABASE_PATH):
-            os.remove(TEST_DATABASE_PATH)
-
-        # 创建测试数据库
-        conn = sqlite3.connect(TEST_DATABASE_PATH)
-        cursor = conn.cursor()
-
-        # 创建表结构
-        cursor.execute(
-            """
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        )
+        # 删除可能存在的旧测试数据库，按当前表结构重建
+        cls.reset_database()
 
-        cursor.execute(
-            """
-            CREATE TABLE transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                type TEXT NOT NULL,
-                amount REAL NOT NULL,
-                description TEXT,
-                category TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        """
-        )
+        conn = cls.connect()
 
         # 创建测试用户
         hashed_password = generate_password_hash("test123")
-        cursor.execute(
-            "INSERT INTO users (id, username, password) VALUES (?, ?, ?)",
-            (1, "testuser", hashed_password),
+        conn.execute(
+            "INSERT INTO users (username, password) VALUES (?, ?)",
+            ("testuser", hashed_password),
         )
 
         # 创建另一个测试用户
         hashed_password2 = generate_password_hash("test456")
-        cursor.execute(
-            "INSERT INTO users (id, username, password) VALUES (?, ?, ?)",
-            (2, "testuser2", hashed_password2),
+        conn.execute(
+            "INSERT INTO users (username, password) VALUES (?, ?)",
+            ("testuser2", hashed_password2),
         )
 
         conn.commit()
@@ -92,26 +64,23 @@ class AdditionalTestCase(unittest.TestCase):
             sess["username"] = "testuser"
 
         # 彻底清空交易记录
-        conn = sqlite3.connect(TEST_DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM transactions")
+        conn = self.connect()
+        conn.execute("DELETE FROM transactions")
         conn.commit()
         conn.close()
 
     def tearDown(self):
         """每个测试方法执行后的清理工作"""
         # 清空交易记录
-        conn = sqlite3.connect(TEST_DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM transactions WHERE user_id = ?", (1,))
+        conn = self.connect()
+        conn.execute("DELETE FROM transactions WHERE user_id = ?", (1,))
         conn.commit()
         conn.close()
 
     @classmethod
     def tearDownClass(cls):
         """测试类清理"""
-        if os.path.exists(TEST_DATABASE_PATH):
-            os.remove(TEST_DATABASE_PATH)
+        cls.restore_backend()
 
     def test_login_page_get(self):
         """测试登录页面GET请求"""
@@ -325,24 +294,20 @@ class AdditionalTestCase(unittest.TestCase):
     def test_trends_data_structure(self):
         """测试趋势数据的结构"""
         # 添加一些历史数据
-        conn = sqlite3.connect(TEST_DATABASE_PATH)
-        cursor = conn.cursor()
+        conn = self.connect()
 
-        # 添加过去几天的交易记录
+        # 添加过去几天的交易记录（金额以分为单位）
         base_date = datetime.now()
         for i in range(5):
             transaction_date = base_date - timedelta(days=i)
-            cursor.execute(
-                """INSERT INTO transactions (user_id, type, amount, description, category, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (
-                    1,
-                    "income",
-                    10.0,
-                    f"测试收入{i}",
-                    "零花钱",
-                    transaction_date.isoformat(),
-                ),
+            repository.add_transaction(
+                conn,
+                1,
+                "income",
+                1000,
+                f"测试收入{i}",
+                "零花钱",
+                transaction_date.isoformat(),
             )
 
         conn.commit()
@@ -488,5 +453,10 @@ class AdditionalTestCase(unittest.TestCase):
         self.assertEqual(data["balance"], 100.0)
 
 
+@skip_unless_postgres
+class PostgresAdditionalTestCase(PostgresBackend, AdditionalTestCase):
+    """在PostgreSQL上运行的额外功能测试用例"""
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,196 @@
+"""
+列式统计引擎的测试用例
+"""
+
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from backend import repository, scheduler
+from backend.analytics import AnalyticsEngine, numpy
+from backend.app import app
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_analytics.db"
+)
+
+ENDPOINTS = (
+    "/api/balance",
+    "/api/trends?days=400&fill=1",
+    "/api/trends?days=30",
+    "/api/stats",
+    "/api/stats/overview",
+    "/api/categories",
+    "/api/categories?format=columnar&dictionary=1",
+    "/api/summary/monthly",
+)
+
+
+class ConnectionProxy:
+    """包装SQLite连接，模拟PostgreSQL等其他后端的连接"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class AnalyticsTestCase(unittest.TestCase):
+    """列式统计引擎与SQL查询结果一致、增量追加和失效的测试用例"""
+
+    use_numpy = False
+
+    def setUp(self):
+        self.remove_files()
+        self.saved_path = app.config.get("DATABASE_PATH")
+        app.config.update(
+            TESTING=True, DATABASE_PATH=TEST_DATABASE_PATH, ANALYTICS_ENGINE=False
+        )
+
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        repository.create_user(conn, "testuser", "x")
+        self.user_id = repository.get_user_by_name(conn, "testuser")["id"]
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = []
+        for i in range(300):
+            moment = now - timedelta(days=i * 1.7, hours=i % 5)
+            trans_type = "income" if i % 3 == 0 else "expense"
+            category = ("零花钱", "零花钱", "零花钱", "零食", "零食", "文具", "")[i % 7]
+            rows.append((trans_type, (i % 40) * 100 + 25, category, moment))
+        rows.append(("income", 750, "零花钱", now))
+        for trans_type, amount, category, moment in rows:
+            repository.add_transaction(
+                conn,
+                self.user_id,
+                trans_type,
+                amount,
+                "",
+                category,
+                moment.strftime("%Y-%m-%d %H:%M:%S"),
+            )
+        conn.commit()
+        scheduler.close_monthly_snapshots(conn, now)
+        scheduler.archive_old_transactions(conn, now, after_days=120)
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = self.user_id
+
+    def tearDown(self):
+        self.disable()
+        app.config["ANALYTICS_ENGINE"] = False
+        if self.saved_path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = self.saved_path
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def enable(self, max_users=200):
+        self.engine = AnalyticsEngine(max_users=max_users, use_numpy=self.use_numpy)
+        app.extensions["analytics"] = self.engine
+        repository.add_change_listener(self.engine.changed)
+        app.config["ANALYTICS_ENGINE"] = True
+
+    def disable(self):
+        engine = app.extensions.pop("analytics", None)
+        if engine is not None:
+            repository.remove_change_listener(engine.changed)
+        app.config["ANALYTICS_ENGINE"] = False
+
+    def responses(self):
+        return {url: self.client.get(url).get_json() for url in ENDPOINTS}
+
+    def assertSameAsSQL(self):
+        self.disable()
+        expected = self.responses()
+        self.enable()
+        self.assertEqual(self.responses(), expected)
+
+    def test_matches_sql(self):
+        """测试各统计接口的结果与SQL查询相同（含归档的交易）"""
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        self.assertGreater(
+            conn.execute("SELECT COUNT(*) FROM transactions_archive").fetchone()[0], 0
+        )
+        conn.close()
+        self.assertSameAsSQL()
+
+    def test_append_on_insert(self):
+        """测试新增交易后只追加新行"""
+        self.enable()
+        self.client.get("/api/balance")
+        self.client.post(
+            "/api/transactions",
+            json={"type": "expense", "amount": 3.5, "category": "新分类"},
+        )
+        # 同一进程中的定时发放也会通知到引擎
+        self.client.post("/api/schedules", json={"frequency": "daily", "amount": 2})
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        self.assertEqual(scheduler.process_daily_schedules(conn), 1)
+        conn.close()
+
+        with repository.count_queries() as queries:
+            self.client.get("/api/balance")
+        self.assertEqual((self.engine.loads, self.engine.appends), (1, 1))
+        self.assertEqual(queries.count, 1)
+        self.assertSameAsSQL()
+
+    def test_reload_on_insert_without_sqlite(self):
+        """测试不是SQLite连接时（PostgreSQL可能不按id顺序提交）新增交易后也重新加载"""
+        self.enable()
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        proxy = ConnectionProxy(conn)
+        try:
+            self.engine.columns(proxy, self.user_id)
+            repository.add_transaction(conn, self.user_id, "income", 500, "", "奖励")
+            conn.commit()
+            repository.notify_change(self.user_id, appended=True)
+            columns = self.engine.columns(proxy, self.user_id)
+        finally:
+            conn.close()
+        self.assertEqual((self.engine.loads, self.engine.appends), (2, 0))
+        self.assertEqual(len(columns), 302)
+
+    def test_reload_on_update_and_delete(self):
+        """测试修改或删除交易后重新加载"""
+        self.enable()
+        self.client.get("/api/stats")
+        tx_id = self.client.get("/api/transactions").get_json()["transactions"][0]["id"]
+        self.client.put(
+            f"/api/transactions/{tx_id}", json={"amount": 99, "category": "零食"}
+        )
+        self.client.get("/api/stats")
+        self.assertEqual(self.engine.loads, 2)
+        self.assertSameAsSQL()
+
+        self.client.delete(f"/api/transactions/{tx_id}")
+        self.assertSameAsSQL()
+
+    def test_lru(self):
+        """测试最多缓存max_users个用户"""
+        self.enable(max_users=1)
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        self.engine.columns(conn, self.user_id)
+        self.engine.columns(conn, self.user_id + 1)
+        self.engine.columns(conn, self.user_id)
+        conn.close()
+        self.assertEqual(self.engine.loads, 3)
+        self.assertEqual(len(self.engine._entries), 1)
+
+
+@unittest.skipIf(numpy is None, "需要安装NumPy")
+class NumpyAnalyticsTestCase(AnalyticsTestCase):
+    """使用NumPy计算的列式统计引擎测试用例"""
+
+    use_numpy = True
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
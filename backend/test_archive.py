@@ -0,0 +1,172 @@
+"""
+交易归档的测试用例
+"""
+
+import os
+import unittest
+from datetime import datetime
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.archive import ALL_TRANSACTIONS, archive_transactions, transactions_source
+from backend.money import to_yuan
+from backend.testing import PostgresBackend, SQLiteBackend, skip_unless_postgres
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_archive.db"
+)
+
+NOW = datetime(2025, 6, 15, 12, 0, 0)
+
+# 对比归档前后结果的只读接口
+ENDPOINTS = (
+    "/api/balance",
+    "/api/transactions?per_page=100",
+    "/api/search/transactions?keyword=记录&per_page=100",
+    "/api/categories",
+    "/api/summary/monthly",
+    "/api/stats",
+    "/api/stats/overview",
+    "/api/export/transactions",
+    "/api/balance/as-of?date=2025-03-20",
+)
+
+
+class ArchiveTestCase(SQLiteBackend, unittest.TestCase):
+    """归档任务和透明查询测试用例"""
+
+    database_path = TEST_DATABASE_PATH
+
+    def setUp(self):
+        self.use_backend()
+        self.reset_database()
+        conn = self.connect()
+        conn.execute("INSERT INTO users (username, password) VALUES ('testuser', 'x')")
+        for i in range(30):
+            repository.add_transaction(
+                conn,
+                1,
+                "income" if i % 3 else "expense",
+                (i + 1) * 100,
+                f"记录{i}",
+                ["零花钱", "零食", ""][i % 3],
+                f"2025-{i % 6 + 1:02d}-{i % 27 + 1:02d} 10:{i:02d}:00",
+            )
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+
+    def tearDown(self):
+        self.restore_backend()
+
+    def archive(self):
+        conn = self.connect()
+        scheduler.close_monthly_snapshots(conn, NOW)
+        moved = scheduler.archive_old_transactions(conn, NOW, after_days=60)
+        conn.close()
+        return moved
+
+    def responses(self):
+        return {url: self.client.get(url).data for url in ENDPOINTS}
+
+    def test_archive_moves_old_months(self):
+        """测试按月对齐归档，并记录归档界限和汇总"""
+        self.assertEqual(self.archive(), 15)
+
+        conn = self.connect()
+        self.assertEqual(
+            conn.execute("SELECT MIN(created_at) FROM transactions").fetchone()[0][:7],
+            "2025-04",
+        )
+        self.assertEqual(
+            tuple(conn.execute("SELECT * FROM archive_horizons").fetchone()),
+            (1, "2025-04-01", 15, 15),
+        )
+        self.assertEqual(
+            conn.execute("SELECT SUM(count) FROM archive_rollups").fetchone()[0], 15
+        )
+        self.assertEqual(transactions_source(conn, 1, "2025-04-01"), "transactions")
+        self.assertEqual(transactions_source(conn, 1, "2025-03-31"), ALL_TRANSACTIONS)
+        self.assertEqual(transactions_source(conn, 1), ALL_TRANSACTIONS)
+        self.assertEqual(transactions_source(conn, 2), "transactions")
+        conn.close()
+
+        # 已归档的月份不再重复归档
+        self.assertEqual(self.archive(), 0)
+
+    def test_archive_requires_snapshots(self):
+        """测试没有月末快照的月份不归档"""
+        conn = self.connect()
+        self.assertEqual(archive_transactions(conn, 1, "2025-04-01"), 0)
+        conn.close()
+
+    def test_queries_are_transparent(self):
+        """测试归档前后各接口的结果一致"""
+        before = self.responses()
+        self.archive()
+        after = self.responses()
+
+        for url in ENDPOINTS:
+            self.assertEqual(after[url], before[url], url)
+
+    def test_list_pages_cross_archive(self):
+        """测试翻页跨过归档界限时顺序和总数不变"""
+        self.archive()
+        seen = []
+        for page in range(1, 5):
+            data = self.client.get(
+                f"/api/transactions?per_page=8&page={page}"
+            ).get_json()
+            self.assertEqual(data["total"], 30)
+            seen.extend(tx["created_at"] for tx in data["transactions"])
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_range_filters(self):
+        """测试带起始日期的搜索和导出只返回范围内的交易"""
+        self.archive()
+        data = self.client.get(
+            "/api/search/transactions?keyword=记录&start_date=2025-05-01&per_page=100"
+        ).get_json()
+        self.assertEqual(data["total"], 10)
+
+        csv_text = self.client.get(
+            "/api/export/transactions?start_date=2025-03-01"
+        ).data.decode("utf-8")
+        self.assertEqual(len(csv_text.strip().splitlines()), 1 + 20)
+
+    def test_edit_archived_transaction(self):
+        """测试修改和删除已归档的交易后余额和统计随之更新"""
+        self.archive()
+        conn = self.connect()
+        tx_id, cents = conn.execute(
+            """SELECT id, amount FROM transactions_archive
+               WHERE type = 'income' ORDER BY id LIMIT 1"""
+        ).fetchone()
+        conn.close()
+        amount = to_yuan(cents)
+        balance = self.client.get("/api/balance").get_json()["balance"]
+
+        self.client.put(f"/api/transactions/{tx_id}", json={"amount": amount + 100})
+        self.assertEqual(
+            self.client.get("/api/balance").get_json()["balance"], balance + 100
+        )
+
+        self.client.delete(f"/api/transactions/{tx_id}")
+        self.assertEqual(
+            self.client.get("/api/balance").get_json()["balance"], balance - amount
+        )
+        overview = self.client.get("/api/stats/overview").get_json()
+        self.assertEqual(overview["total_transactions"], 29)
+
+
+@skip_unless_postgres
+class PostgresArchiveTestCase(PostgresBackend, ArchiveTestCase):
+    """在PostgreSQL上运行的归档测试用例"""
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
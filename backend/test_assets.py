@@ -0,0 +1,91 @@
+"""
+静态资源构建和缓存的测试用例
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from backend.app import app
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from build_assets import SOURCE_DIR, build_assets  # noqa: E402
+
+
+class AssetsTestCase(unittest.TestCase):
+    """静态资源测试用例"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config["TESTING"] = True
+        cls.dist_dir = tempfile.mkdtemp(prefix="cash_manager_assets_")
+        cls.manifest = build_assets(SOURCE_DIR, cls.dist_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dist_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.saved_dist_dir = app.config["ASSETS_DIST_DIR"]
+        app.config["ASSETS_DIST_DIR"] = self.dist_dir
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["username"] = "testuser"
+
+    def tearDown(self):
+        app.config["ASSETS_DIST_DIR"] = self.saved_dist_dir
+
+    def test_dashboard_references_hashed_assets(self):
+        """测试面板页面引用带哈希的资源文件，不再内联CSS和JS"""
+        response = self.client.get("/dashboard")
+        html = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"/assets/{self.manifest['dashboard.css']}", html)
+        self.assertIn(f"/assets/{self.manifest['dashboard.js']}", html)
+        self.assertNotIn("<style>", html)
+
+    def test_asset_served_precompressed_and_immutable(self):
+        """测试资源文件返回预压缩版本和不可变缓存头"""
+        name = self.manifest["dashboard.js"]
+        response = self.client.get(
+            f"/assets/{name}", headers={"Accept-Encoding": "gzip"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        with open(os.path.join(SOURCE_DIR, "dashboard.js"), "rb") as f:
+            self.assertEqual(gzip.decompress(response.data), f.read())
+        response.close()
+
+    def test_asset_without_accept_encoding(self):
+        """测试客户端不支持压缩时返回原始文件"""
+        name = self.manifest["dashboard.css"]
+        response = self.client.get(f"/assets/{name}", headers={"Accept-Encoding": ""})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertTrue(response.content_type.startswith("text/css"))
+        response.close()
+
+    def test_unknown_asset_returns_404(self):
+        """测试不在manifest中的文件返回404"""
+        response = self.client.get("/assets/manifest.json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_fallback_to_source_without_manifest(self):
+        """测试未构建资源时回退到源文件"""
+        app.config["ASSETS_DIST_DIR"] = os.path.join(self.dist_dir, "missing")
+        html = self.client.get("/dashboard").get_data(as_text=True)
+        self.assertIn("/static/src/dashboard.css", html)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,175 @@
+"""
+在线备份与恢复的测试用例
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from backend import repository, scheduler
+from backend.backup import (
+    BackupError,
+    create_backup,
+    list_backups,
+    restore_backup,
+    verify_backup,
+)
+from backend.shards import ShardRouter
+
+DATABASE_DIR = os.path.join(os.path.dirname(__file__), "database")
+TEST_DATABASE_PATH = os.path.join(DATABASE_DIR, "test_cash_manager_backup.db")
+RESTORED_PATH = os.path.join(DATABASE_DIR, "test_cash_manager_restored.db")
+BACKUP_DIR = os.path.join(DATABASE_DIR, "test_backups")
+SHARD_DIR = os.path.join(DATABASE_DIR, "test_backup_shards")
+
+NOW = datetime(2025, 6, 1, 2, 0, 0)
+
+
+class BackupTestCase(unittest.TestCase):
+    """在线备份、校验、轮换和恢复测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (1, 'testuser', 'x')"
+        )
+        for i in range(3000):
+            repository.add_transaction(
+                conn, 1, "income", i + 1.0, "记录" * 50, "零花钱"
+            )
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.remove_files()
+
+    def remove_files(self):
+        for path in (TEST_DATABASE_PATH, RESTORED_PATH):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        shutil.rmtree(BACKUP_DIR, ignore_errors=True)
+        shutil.rmtree(SHARD_DIR, ignore_errors=True)
+
+    def total(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute(
+                "SELECT COUNT(*), SUM(amount) FROM transactions"
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def test_backup_and_restore(self):
+        """测试压缩备份通过校验，并能恢复到新文件"""
+        expected = self.total(TEST_DATABASE_PATH)
+        path, manifest = create_backup([TEST_DATABASE_PATH], BACKUP_DIR, now=NOW)
+        self.assertTrue(path.endswith("backup_20250601_020000"))
+        self.assertEqual(manifest["files"][0]["file"], "test_cash_manager_backup.db.gz")
+        self.assertEqual(verify_backup(path)["files"], manifest["files"])
+
+        restored = restore_backup(path, {"test_cash_manager_backup.db": RESTORED_PATH})
+        self.assertEqual(restored, [RESTORED_PATH])
+        self.assertEqual(self.total(RESTORED_PATH), expected)
+
+    def test_restore_over_existing_database(self):
+        """测试恢复覆盖备份后写入的数据"""
+        path, _ = create_backup(
+            [TEST_DATABASE_PATH], BACKUP_DIR, compress=False, now=NOW
+        )
+        expected = self.total(TEST_DATABASE_PATH)
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        conn.execute("DELETE FROM transactions")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(restore_backup(path), [os.path.abspath(TEST_DATABASE_PATH)])
+        self.assertEqual(self.total(TEST_DATABASE_PATH), expected)
+
+    def test_corrupted_backup_is_rejected(self):
+        """测试备份文件被修改后校验和恢复失败"""
+        path, manifest = create_backup([TEST_DATABASE_PATH], BACKUP_DIR, now=NOW)
+        stored = os.path.join(path, manifest["files"][0]["file"])
+        with gzip.open(stored, "rb") as f:
+            data = bytearray(f.read())
+        data[5000] ^= 0xFF
+        with gzip.open(stored, "wb") as f:
+            f.write(bytes(data))
+
+        with self.assertRaises(BackupError):
+            verify_backup(path)
+        with self.assertRaises(BackupError):
+            restore_backup(path, {"test_cash_manager_backup.db": RESTORED_PATH})
+        self.assertFalse(os.path.exists(RESTORED_PATH))
+
+    def test_rotation(self):
+        """测试只保留最新的几份备份"""
+        for day in range(4):
+            create_backup(
+                [TEST_DATABASE_PATH], BACKUP_DIR, keep=2, now=NOW + timedelta(days=day)
+            )
+        self.assertEqual(
+            [os.path.basename(path) for path in list_backups(BACKUP_DIR)],
+            ["backup_20250603_020000", "backup_20250604_020000"],
+        )
+
+    def test_writers_not_blocked(self):
+        """测试备份期间写入不被长时间阻塞"""
+        stop = threading.Event()
+        waits = []
+
+        def write():
+            conn = sqlite3.connect(TEST_DATABASE_PATH, timeout=10)
+            while not stop.is_set():
+                began = time.perf_counter()
+                conn.execute(
+                    """INSERT INTO transactions (user_id, type, amount)
+                       VALUES (1, 'income', 1)"""
+                )
+                conn.commit()
+                waits.append(time.perf_counter() - began)
+                time.sleep(0.002)
+            conn.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            path, manifest = create_backup(
+                [TEST_DATABASE_PATH], BACKUP_DIR, now=NOW, pages=16, pause=0.002
+            )
+        finally:
+            stop.set()
+            writer.join()
+
+        self.assertGreater(len(waits), 0)
+        self.assertLess(max(waits), 0.5)
+        restore_backup(path, {"test_cash_manager_backup.db": RESTORED_PATH})
+        self.assertGreaterEqual(self.total(RESTORED_PATH)[0], 3000)
+
+    def test_scheduler_job(self):
+        """测试定时任务备份主数据库和所有分片"""
+        saved_router = scheduler.router
+        scheduler.router = ShardRouter(TEST_DATABASE_PATH, SHARD_DIR, shard_count=2)
+        try:
+            for user_id in (1, 2):
+                scheduler.get_db_connection(scheduler.router.path_for(user_id)).close()
+            self.assertIsNone(scheduler.backup_databases(NOW, BACKUP_DIR, keep=0))
+
+            path = scheduler.backup_databases(NOW, BACKUP_DIR, keep=3)
+            names = [entry["name"] for entry in verify_backup(path)["files"]]
+            self.assertEqual(
+                names, ["test_cash_manager_backup.db", "shard_000.db", "shard_001.db"]
+            )
+        finally:
+            scheduler.router = saved_router
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
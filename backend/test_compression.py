@@ -0,0 +1,119 @@
+"""
+响应压缩的测试用例
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import unittest
+import zlib
+
+from backend import repository
+from backend.app import app
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_compression.db"
+)
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+
+
+class CompressionTestCase(unittest.TestCase):
+    """响应压缩测试用例"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config["TESTING"] = True
+
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (1, 'testuser', 'x')"
+        )
+        for i in range(1200):
+            repository.add_transaction(
+                conn, 1, "income", i + 1, f"测试收入{i}", "零花钱"
+            )
+        conn.commit()
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+    def setUp(self):
+        self.saved_database_path = app.config.get("DATABASE_PATH")
+        app.config["DATABASE_PATH"] = TEST_DATABASE_PATH
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["username"] = "testuser"
+
+    def tearDown(self):
+        if self.saved_database_path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = self.saved_database_path
+
+    def test_large_json_is_gzipped(self):
+        """测试较大的JSON响应使用gzip压缩"""
+        response = self.client.get(
+            "/api/transactions?per_page=100", headers={"Accept-Encoding": "gzip"}
+        )
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(int(response.headers["Content-Length"]), len(response.data))
+        data = json.loads(gzip.decompress(response.data))
+        self.assertEqual(len(data["transactions"]), 100)
+
+    def test_deflate(self):
+        """测试deflate压缩"""
+        response = self.client.get(
+            "/api/transactions?per_page=100", headers={"Accept-Encoding": "deflate"}
+        )
+
+        self.assertEqual(response.headers["Content-Encoding"], "deflate")
+        self.assertIn(b'"success"', zlib.decompress(response.data))
+
+    def test_small_response_not_compressed(self):
+        """测试小于阈值的响应不压缩，但仍带Vary头"""
+        response = self.client.get("/api/balance", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertTrue(response.get_json()["success"])
+
+    def test_no_accept_encoding(self):
+        """测试客户端不支持压缩时返回原始数据"""
+        response = self.client.get(
+            "/api/transactions?per_page=100", headers={"Accept-Encoding": "identity"}
+        )
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(len(response.get_json()["transactions"]), 100)
+
+    def test_streamed_csv_export_is_compressed(self):
+        """测试流式CSV导出逐块压缩"""
+        response = self.client.get(
+            "/api/export/transactions", headers={"Accept-Encoding": "gzip"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertIn("attachment", response.headers["Content-Disposition"])
+
+        lines = gzip.decompress(response.data).decode("utf-8").splitlines()
+        self.assertEqual(lines[0], "日期,类型,金额,分类,备注")
+        self.assertEqual(len(lines), 1201)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
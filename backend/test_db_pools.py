@@ -0,0 +1,154 @@
+"""
+读写分离连接池的测试用例
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.db import DatabasePools
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_db_pools.db"
+)
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+
+
+class SlowCommitConnection(sqlite3.Connection):
+    """提交前等待放行，模拟一次耗时的发放任务一直持有写锁"""
+
+    holding = None
+    release = None
+
+    def commit(self):
+        self.holding.set()
+        self.release.wait(10)
+        super().commit()
+
+
+class DatabasePoolsTestCase(unittest.TestCase):
+    """只读快照连接和读写争用测试用例"""
+
+    def setUp(self):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (1, 'testuser', 'x')"
+        )
+        for i in range(10):
+            repository.add_transaction(
+                conn, 1, "income", (i + 1) * 100, "记录", "零花钱"
+            )
+        repository.add_schedule(conn, 1, "daily", 200, "每日零花钱", None, None, None)
+        conn.commit()
+        conn.close()
+        self.pools = DatabasePools(read_size=2, write_size=1)
+
+    def tearDown(self):
+        self.pools.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def count(self, conn):
+        return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def test_read_connection_is_read_only(self):
+        """测试只读连接不能写入"""
+        conn = self.pools.connection(TEST_DATABASE_PATH, readonly=True)
+        with self.assertRaises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM transactions")
+        conn.close()
+
+        conn = self.pools.connection(TEST_DATABASE_PATH)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        conn.close()
+
+    def test_read_snapshot(self):
+        """测试同一个读连接内的查询看到同一个快照"""
+        reader = self.pools.connection(TEST_DATABASE_PATH, readonly=True)
+        self.assertEqual(self.count(reader), 10)
+
+        writer = self.pools.connection(TEST_DATABASE_PATH)
+        writer.execute(
+            "INSERT INTO transactions (user_id, type, amount) VALUES (1, 'income', 1)"
+        )
+        writer.commit()
+        writer.close()
+
+        self.assertEqual(self.count(reader), 10)
+        reader.close()
+        reader = self.pools.connection(TEST_DATABASE_PATH, readonly=True)
+        self.assertEqual(self.count(reader), 11)
+        reader.close()
+
+    def test_connections_are_reused(self):
+        """测试归还的连接被复用，重复归还被忽略"""
+        conn = self.pools.connection(TEST_DATABASE_PATH, readonly=True)
+        conn.close()
+        conn.close()
+        self.assertIs(self.pools.connection(TEST_DATABASE_PATH, readonly=True), conn)
+
+    def test_readers_not_blocked_by_scheduler_payout(self):
+        """测试定时发放持有写锁期间，读接口不被阻塞且看到发放前的数据"""
+        saved = app.config.get("DATABASE_PATH")
+        saved_pools = app.extensions.pop("database_pools", None)
+        app.config.update(TESTING=True, DATABASE_PATH=TEST_DATABASE_PATH)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = 1
+        # 先访问一次，让数据库切换为WAL模式
+        client.get("/api/balance")
+
+        holding, release = threading.Event(), threading.Event()
+        SlowCommitConnection.holding = holding
+        SlowCommitConnection.release = release
+        payout_conn = sqlite3.connect(
+            TEST_DATABASE_PATH, factory=SlowCommitConnection, check_same_thread=False
+        )
+        payout_conn.row_factory = sqlite3.Row
+        payout = threading.Thread(
+            target=scheduler.process_daily_schedules,
+            args=(payout_conn, datetime(2025, 3, 5, 9, 0)),
+        )
+        payout.start()
+        try:
+            self.assertTrue(holding.wait(5))
+            for url in (
+                "/api/stats/overview",
+                "/api/categories",
+                "/api/search/transactions?keyword=记录",
+                "/api/balance",
+            ):
+                began = time.perf_counter()
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                self.assertLess(time.perf_counter() - began, 1.0, url)
+            self.assertEqual(client.get("/api/balance").get_json()["balance"], 55.0)
+
+            release.set()
+            payout.join()
+            self.assertEqual(client.get("/api/balance").get_json()["balance"], 57.0)
+        finally:
+            release.set()
+            payout.join()
+            payout_conn.close()
+            app.extensions.pop("database_pools").close()
+            if saved_pools is not None:
+                app.extensions["database_pools"] = saved_pools
+            if saved is None:
+                app.config.pop("DATABASE_PATH")
+            else:
+                app.config["DATABASE_PATH"] = saved
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
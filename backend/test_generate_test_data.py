@@ -0,0 +1,189 @@
+"""
+模拟数据生成器的测试用例
+"""
+
+import os
+import sqlite3
+import unittest
+from datetime import date
+
+from backend import repository
+from backend.database.init_db import ensure_schema
+from backend.generate_test_data import (
+    Profile,
+    create_users,
+    generate_dataset,
+    generate_test_data,
+)
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_generate.db"
+)
+
+TRANSACTIONS = """SELECT t.created_at, t.user_id, t.type, t.amount, c.name, d.text
+                  FROM transactions t
+                  JOIN categories c ON c.id = t.category_id
+                  JOIN descriptions d ON d.id = t.description_id
+                  ORDER BY t.id"""
+
+
+class GenerateTestDataTestCase(unittest.TestCase):
+    """批量生成模拟数据的测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+
+    def tearDown(self):
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def generate(self, seed, profile=None):
+        self.remove_files()
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        ensure_schema(conn)
+        user_ids = create_users(conn, 3, "x")
+        count = generate_dataset(
+            conn, user_ids, 60, 2, seed, profile, end=date(2024, 3, 31)
+        )
+        rows = conn.execute(TRANSACTIONS).fetchall()
+        return conn, user_ids, count, rows
+
+    def test_same_seed_same_data(self):
+        """测试同一个种子生成完全相同的数据，不同种子生成不同的数据"""
+        conn, user_ids, count, rows = self.generate(7)
+        conn.close()
+        self.assertEqual(user_ids, [1, 2, 3])
+        self.assertEqual(count, len(rows))
+        self.assertGreater(count, 0)
+
+        conn, _, _, again = self.generate(7)
+        conn.close()
+        self.assertEqual(again, rows)
+        conn, _, _, other = self.generate(8)
+        conn.close()
+        self.assertNotEqual(other, rows)
+
+    def test_dataset(self):
+        """测试交易按时间写入、索引和日志设置恢复，并生成定时发放和月末快照"""
+        conn, user_ids, count, rows = self.generate(1)
+        try:
+            self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+            self.assertEqual(rows[0][0][:10], "2024-02-01")
+            self.assertEqual(rows[-1][0][:10], "2024-03-31")
+            indexes = {
+                row[0]
+                for row in conn.execute(
+                    """SELECT name FROM sqlite_master
+                       WHERE tbl_name = 'transactions' AND type = 'index'"""
+                )
+            }
+            self.assertIn("idx_user_transactions_created", indexes)
+            self.assertEqual(
+                conn.execute("PRAGMA journal_mode").fetchone()[0], "delete"
+            )
+
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM schedules").fetchone()[0],
+                3 * len(Profile().schedules),
+            )
+            for user_id in user_ids:
+                income, expense = repository.totals(conn, user_id)
+                balance = conn.execute(
+                    """SELECT balance FROM balance_snapshots
+                       WHERE user_id = ? AND month = '2024-02'""",
+                    (user_id,),
+                ).fetchone()[0]
+                self.assertEqual(
+                    balance,
+                    sum(
+                        row[3] if row[2] == "income" else -row[3]
+                        for row in rows
+                        if row[1] == user_id and row[0] < "2024-03"
+                    ),
+                )
+                self.assertEqual(
+                    income + expense, sum(r[3] for r in rows if r[1] == user_id)
+                )
+        finally:
+            conn.close()
+
+    def test_profile(self):
+        """测试数据分布配置：只有支出、金额范围和取整单位"""
+        profile = Profile(
+            {
+                "income_ratio": 0,
+                "expense": [
+                    {"category": "零食", "descriptions": ["买糖果"], "min": 1, "max": 3}
+                ],
+                "step": 0.5,
+            }
+        )
+        conn, _, _, rows = self.generate(3, profile)
+        conn.close()
+        self.assertEqual(
+            {(row[2], row[4], row[5]) for row in rows}, {("expense", "零食", "买糖果")}
+        )
+        self.assertTrue(all(100 <= row[3] <= 300 and row[3] % 50 == 0 for row in rows))
+
+    def test_add_users_to_existing_dataset(self):
+        """测试在已有数据的库中再次生成用户时，用户名随id递增，不与已有用户重名"""
+        end = date(2024, 3, 31)
+        for _ in range(2):
+            self.assertEqual(
+                generate_test_data(TEST_DATABASE_PATH, users=2, days=30, end=end)[0], 2
+            )
+
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        try:
+            users = conn.execute(
+                "SELECT id, username FROM users ORDER BY id"
+            ).fetchall()
+            self.assertEqual(users, [(i, f"kid_{i}") for i in range(1, 5)])
+            self.assertEqual(
+                conn.execute(
+                    "SELECT COUNT(DISTINCT user_id) FROM transactions"
+                ).fetchone()[0],
+                4,
+            )
+        finally:
+            conn.close()
+
+    def test_regenerate_clears_archive(self):
+        """测试为已有用户重新生成数据时清空归档，不叠加旧的归档历史"""
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        ensure_schema(conn)
+        conn.close()
+        end = date(2024, 6, 30)
+        self.assertEqual(
+            generate_test_data(TEST_DATABASE_PATH, users=1, days=180, end=end)[0], 1
+        )
+        _, count = generate_test_data(
+            TEST_DATABASE_PATH, days=180, end=end, archive_days=60
+        )
+        _, again = generate_test_data(
+            TEST_DATABASE_PATH, days=180, end=end, archive_days=60
+        )
+
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        try:
+            total = conn.execute(
+                """SELECT (SELECT COUNT(*) FROM transactions)
+                        + (SELECT COUNT(*) FROM transactions_archive)"""
+            ).fetchone()[0]
+            self.assertEqual((again, total), (count, count))
+            archived, rolled_up = conn.execute(
+                """SELECT h.archived_count, (SELECT SUM(count) FROM archive_rollups)
+                   FROM archive_horizons h"""
+            ).fetchone()
+            self.assertGreater(archived, 0)
+            self.assertEqual(rolled_up, archived)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
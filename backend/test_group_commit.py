@@ -0,0 +1,151 @@
+"""
+合并提交的测试用例
+"""
+
+import os
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+
+from backend import repository
+from backend.app import app, get_group_committer
+from backend.group_commit import GroupCommitter
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_group_commit.db"
+)
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+
+
+def insert_income(amount):
+    def operation(conn):
+        repository.add_transaction(conn, 1, "income", amount, None, "测试")
+        return amount
+
+    return operation
+
+
+class GroupCommitTestCase(unittest.TestCase):
+    """合并提交测试用例"""
+
+    def setUp(self):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (1, 'testuser', 'x')"
+        )
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+    def count(self):
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        total = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        conn.close()
+        return total
+
+    def test_concurrent_writes_share_commits(self):
+        """测试并发写入合并为更少的事务，返回时数据已提交"""
+        committer = GroupCommitter(TEST_DATABASE_PATH, window_ms=20, max_batch=50)
+        results = []
+
+        def worker(i):
+            results.append(committer.submit(insert_income(i + 1)))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        committer.shutdown()
+
+        self.assertEqual(sorted(results), list(range(1, 41)))
+        self.assertEqual(self.count(), 40)
+        self.assertEqual(committer.operations, 40)
+        self.assertLess(committer.batches, 40)
+
+    def test_failed_operation_is_isolated(self):
+        """测试单个写操作失败只影响它自己"""
+        committer = GroupCommitter(TEST_DATABASE_PATH, window_ms=0)
+
+        def broken(conn):
+            conn.execute(
+                """INSERT INTO transactions (user_id, type, amount)
+                   VALUES (1, 'income', 5)"""
+            )
+            conn.execute("INSERT INTO no_such_table VALUES (1)")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            committer.submit(broken)
+        committer.submit(insert_income(3))
+        committer.shutdown()
+
+        self.assertEqual(self.count(), 1)
+
+    def test_startup_failure_fails_and_restarts(self):
+        """测试写入线程启动失败时写操作抛出异常，下一次提交重新启动写入线程"""
+        committer = GroupCommitter(TEST_DATABASE_PATH, window_ms=0)
+        error = sqlite3.OperationalError("database is locked")
+        with mock.patch("backend.group_commit.ensure_schema", side_effect=error):
+            with self.assertRaises(sqlite3.OperationalError):
+                committer.submit(insert_income(1))
+        self.assertEqual(committer.submit(insert_income(2)), 2)
+        committer.shutdown()
+
+        self.assertEqual(self.count(), 1)
+
+    def test_waiting_operation_times_out(self):
+        """测试排队超时的写操作被取消，不会在之后执行"""
+        committer = GroupCommitter(TEST_DATABASE_PATH, window_ms=0, timeout=0.2)
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking(conn):
+            started.set()
+            release.wait()
+            return insert_income(1)(conn)
+
+        worker = threading.Thread(target=committer.submit, args=(blocking,))
+        worker.start()
+        started.wait()
+        with self.assertRaises(sqlite3.OperationalError):
+            committer.submit(insert_income(2))
+        release.set()
+        worker.join()
+        committer.shutdown()
+
+        self.assertEqual(self.count(), 1)
+
+    def test_post_through_group_commit(self):
+        """测试启用合并提交后新增交易接口正常工作"""
+        saved = {key: app.config.get(key) for key in ("DATABASE_PATH", "GROUP_COMMIT")}
+        app.config.update(
+            TESTING=True, DATABASE_PATH=TEST_DATABASE_PATH, GROUP_COMMIT=True
+        )
+        try:
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess["user_id"] = 1
+            response = client.post(
+                "/api/transactions",
+                json={"type": "income", "amount": 8, "category": "测试"},
+            )
+            self.assertTrue(response.get_json()["success"])
+            self.assertEqual(client.get("/api/balance").get_json()["balance"], 8.0)
+            get_group_committer(TEST_DATABASE_PATH).shutdown()
+        finally:
+            app.extensions.pop("group_committers", None)
+            app.config.update(saved)
+            if saved["DATABASE_PATH"] is None:
+                app.config.pop("DATABASE_PATH")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,154 @@
+"""
+数据库维护任务的测试用例
+"""
+
+import os
+import sqlite3
+import sys
+import unittest
+
+from backend import repository, scheduler
+from backend.database.init_db import ensure_schema
+from backend.maintenance import quick_check
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from enable_incremental_vacuum import enable_incremental_vacuum  # noqa: E402
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_maintenance.db"
+)
+
+
+class MaintenanceTestCase(unittest.TestCase):
+    """统计信息、增量回收、检查点和完整性检查测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+        self.conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        self.conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (1, 'testuser', 'x')"
+        )
+        self.insert(2000)
+
+    def tearDown(self):
+        self.conn.close()
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def insert(self, count):
+        for _ in range(count):
+            repository.add_transaction(
+                self.conn, 1, "income", 1.0, "记录" * 20, "零花钱"
+            )
+        self.conn.commit()
+
+    def test_new_database_uses_incremental_vacuum(self):
+        """测试新建的数据库启用增量回收，删除后的空闲页被回收"""
+        self.assertEqual(self.conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        self.conn.execute("DELETE FROM transactions")
+        self.conn.commit()
+        self.assertGreater(self.conn.execute("PRAGMA freelist_count").fetchone()[0], 0)
+
+        report = scheduler.vacuum_database(self.conn)[0]
+        self.assertTrue(report["enabled"])
+        self.assertGreater(report["freed_pages"], 0)
+        self.assertEqual(report["free_pages"], 0)
+        self.assertEqual(report["database"], os.path.abspath(TEST_DATABASE_PATH))
+
+    def test_migrate_existing_database(self):
+        """测试迁移脚本为已有数据库启用增量回收"""
+        conn = sqlite3.connect(TEST_DATABASE_PATH + "-old")
+        conn.execute("CREATE TABLE t (x)")
+        conn.close()
+        try:
+            conn = sqlite3.connect(TEST_DATABASE_PATH + "-old")
+            self.assertFalse(scheduler.vacuum_database(conn)[0]["enabled"])
+            conn.close()
+
+            self.assertIsNotNone(enable_incremental_vacuum(TEST_DATABASE_PATH + "-old"))
+            self.assertIsNone(enable_incremental_vacuum(TEST_DATABASE_PATH + "-old"))
+        finally:
+            os.remove(TEST_DATABASE_PATH + "-old")
+
+    def test_analyze_only_changed_tables(self):
+        """测试只有行数变化超过阈值的表重新收集统计信息"""
+        report = scheduler.analyze_database(self.conn, min_changes=1000)[0]
+        self.assertEqual(
+            report["analyzed"], ["categories", "descriptions", "transactions", "users"]
+        )
+
+        self.assertEqual(scheduler.analyze_database(self.conn, 1000)[0]["analyzed"], [])
+        self.insert(300)
+        self.assertEqual(scheduler.analyze_database(self.conn, 1000)[0]["analyzed"], [])
+        self.insert(1000)
+        self.assertEqual(
+            scheduler.analyze_database(self.conn, 1000)[0]["analyzed"], ["transactions"]
+        )
+
+    def test_analyze_without_counting_rows(self):
+        """测试按rowid范围估计行数，不执行COUNT(*)"""
+        statements = []
+        self.conn.set_trace_callback(statements.append)
+        scheduler.analyze_database(self.conn, min_changes=1000)
+        self.assertFalse([sql for sql in statements if "COUNT(*)" in sql])
+
+        # 删除中间的行不改变rowid范围；之后按新增的行数判断，与实际行数不同也不会反复分析
+        self.conn.execute("DELETE FROM transactions WHERE id BETWEEN 100 AND 1599")
+        self.conn.commit()
+        self.assertEqual(scheduler.analyze_database(self.conn, 1000)[0]["analyzed"], [])
+        self.insert(1000)
+        self.assertEqual(
+            scheduler.analyze_database(self.conn, 1000)[0]["analyzed"], ["transactions"]
+        )
+        self.assertEqual(scheduler.analyze_database(self.conn, 1000)[0]["analyzed"], [])
+        self.conn.set_trace_callback(None)
+
+    def test_checkpoint_truncates_wal(self):
+        """测试检查点把WAL写回数据库并截断WAL文件"""
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.insert(100)
+        self.assertGreater(os.path.getsize(TEST_DATABASE_PATH + "-wal"), 0)
+
+        report = scheduler.checkpoint_database(self.conn)[0]
+        self.assertGreater(report["frames"], 0)
+        self.assertEqual(report["checkpointed"], report["frames"])
+        self.assertTrue(report["truncated"])
+        self.assertEqual(os.path.getsize(TEST_DATABASE_PATH + "-wal"), 0)
+
+    def test_checkpoint_with_open_reader(self):
+        """测试有读事务时检查点不等待，也不截断WAL"""
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.insert(100)
+        reader = sqlite3.connect(TEST_DATABASE_PATH, isolation_level=None)
+        reader.execute("BEGIN")
+        reader.execute("SELECT COUNT(*) FROM transactions").fetchone()
+        self.insert(100)
+
+        report = scheduler.checkpoint_database(self.conn)[0]
+        reader.close()
+        self.assertFalse(report["truncated"])
+        self.assertLess(report["seconds"], 1.0)
+
+    def test_quick_check(self):
+        """测试完整性检查结果和时间上限"""
+        self.assertTrue(scheduler.check_database(self.conn)[0]["ok"])
+        self.assertIsNone(quick_check(self.conn, seconds=0)["ok"])
+        # 中断后连接仍可正常使用
+        self.assertEqual(
+            self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0], 2000
+        )
+
+    def test_ensure_schema_keeps_existing_mode(self):
+        """测试结构升级不改变已有数据库的回收模式"""
+        self.conn.execute("PRAGMA user_version = 1")
+        self.assertTrue(ensure_schema(self.conn))
+        self.assertEqual(self.conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,141 @@
+"""
+请求指标和访问日志的测试用例
+"""
+
+import json
+import os
+import unittest
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.metrics import Metrics
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_metrics.db"
+)
+
+
+class MetricsRenderTestCase(unittest.TestCase):
+    """Prometheus文本格式的测试用例"""
+
+    def test_histogram_and_gauge(self):
+        """测试直方图按桶累计、标签转义，以及gauge在抓取时计算"""
+        metrics = Metrics()
+        metrics.observe("/api/balance", "GET", 200, 0.003, 2, 0.0005)
+        metrics.observe("/api/balance", "GET", 200, 0.02, 3, 0.004)
+        metrics.observe("/api/balance", "GET", 500, 20, 0, 0.0)
+        values = [1]
+        metrics.gauge("things", "测试", lambda: [({"name": 'a"b'}, values[0])])
+        values[0] = 5
+
+        lines = metrics.render().splitlines()
+        name = "cash_manager_http_request_duration_seconds_bucket"
+        labels = 'route="/api/balance",method="GET"'
+        self.assertIn(f'{name}{{{labels},le="0.005"}} 1', lines)
+        self.assertIn(f'{name}{{{labels},le="0.025"}} 2', lines)
+        self.assertIn(f'{name}{{{labels},le="10.0"}} 2', lines)
+        self.assertIn(f'{name}{{{labels},le="+Inf"}} 3', lines)
+        prefix = "cash_manager_http_request"
+        self.assertIn(f"{prefix}_duration_seconds_count{{{labels}}} 3", lines)
+        self.assertIn(f"{prefix}_sql_statements_sum{{{labels}}} 5.0", lines)
+        self.assertIn(f'{prefix}s_total{{{labels},status="500"}} 1', lines)
+        self.assertIn("# TYPE cash_manager_things gauge", lines)
+        self.assertIn('cash_manager_things{name="a\\"b"} 5', lines)
+
+
+class MetricsApiTestCase(unittest.TestCase):
+    """请求指标、/metrics和访问日志的测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+        self.saved = {key: app.config.get(key) for key in ("DATABASE_PATH", "METRICS")}
+        app.config.update(TESTING=True, DATABASE_PATH=TEST_DATABASE_PATH, METRICS=True)
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        repository.create_user(conn, "testuser", "x")
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+
+    def tearDown(self):
+        for key, value in self.saved.items():
+            if value is None:
+                app.config.pop(key, None)
+            else:
+                app.config[key] = value
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        return response.get_data(as_text=True).splitlines()
+
+    def count(self, lines, prefix):
+        for line in lines:
+            if line.startswith(prefix + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    def test_request_metrics(self):
+        """测试按路由模板统计请求数、耗时和SQL语句数"""
+        delete = (
+            'cash_manager_http_requests_total{route="/api/transactions/<int:tx_id>",'
+            'method="DELETE",status="200"}'
+        )
+        sql = (
+            "cash_manager_http_request_sql_statements_sum"
+            '{route="/api/balance",method="GET"}'
+        )
+        before = self.scrape()
+
+        self.client.post("/api/transactions", json={"type": "income", "amount": 5})
+        self.client.delete("/api/transactions/1")
+        self.client.delete("/api/transactions/99")
+        with repository.count_queries() as counter:
+            self.client.get("/api/balance")
+        self.client.get("/no-such-page")
+
+        lines = self.scrape()
+        self.assertEqual(self.count(lines, delete) - self.count(before, delete), 2)
+        self.assertEqual(
+            self.count(lines, sql) - self.count(before, sql), counter.count
+        )
+        self.assertGreater(counter.count, 0)
+        for prefix in (
+            'cash_manager_http_requests_total{route="<unmatched>"',
+            "cash_manager_db_pool_in_use_connections"
+            '{database="test_cash_manager_metrics.db"',
+        ):
+            self.assertTrue(any(line.startswith(prefix) for line in lines), prefix)
+        self.assertIn("cash_manager_scheduler_running 0", lines)
+
+    def test_access_log(self):
+        """测试每个请求一行JSON访问日志，带有耗时和SQL语句数"""
+        with self.assertLogs("cash_manager.access", level="INFO") as logs:
+            with repository.count_queries() as counter:
+                self.client.get("/api/transactions?page=1&per_page=4")
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry["route"], "/api/transactions")
+        self.assertEqual(entry["path"], "/api/transactions")
+        self.assertEqual(
+            (entry["method"], entry["status"], entry["user_id"]), ("GET", 200, 1)
+        )
+        self.assertEqual(entry["sql_statements"], counter.count)
+        self.assertGreaterEqual(entry["duration_ms"], entry["sql_ms"])
+
+    def test_disabled(self):
+        """测试关闭后/metrics返回404"""
+        app.config["METRICS"] = False
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,135 @@
+"""
+整数分金额的测试用例
+"""
+
+import os
+import unittest
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.money import format_cents, to_cents, to_yuan, yuan_rows
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_money.db"
+)
+
+
+class MoneyTestCase(unittest.TestCase):
+    """元和分之间转换的测试用例"""
+
+    def test_to_cents(self):
+        """测试数字和字符串金额四舍五入到分"""
+        self.assertEqual(to_cents(12), 1200)
+        self.assertEqual(to_cents(0.1), 10)
+        self.assertEqual(to_cents(1.005), 101)
+        self.assertEqual(to_cents("19.99"), 1999)
+        self.assertEqual(to_cents(" 2.5 "), 250)
+        self.assertEqual(to_cents("-0.01"), -1)
+        for value in (None, "", "abc", "inf", "nan", True, [1]):
+            with self.assertRaises(ValueError, msg=repr(value)):
+                to_cents(value)
+
+    def test_to_yuan_and_format(self):
+        """测试分转换为元和两位小数的文字"""
+        self.assertEqual(to_yuan(1999), 19.99)
+        self.assertIsNone(to_yuan(None))
+        self.assertEqual(format_cents(1250), "12.50")
+        self.assertEqual(format_cents(5), "0.05")
+        self.assertEqual(format_cents(-101), "-1.01")
+
+    def test_yuan_rows(self):
+        """测试只转换查询结果中的金额列"""
+        rows = repository.Rows(
+            [
+                repository.Record(
+                    {"category": 0, "total": 1, "count": 2}, ("零食", 350, 3)
+                )
+            ]
+        )
+        rows.columns = ["category", "total", "count"]
+        converted = yuan_rows(rows)
+        self.assertEqual(converted.columns, rows.columns)
+        self.assertEqual(
+            converted[0].as_dict(), {"category": "零食", "total": 3.5, "count": 3}
+        )
+
+
+class MoneyApiTestCase(unittest.TestCase):
+    """接口按元收发金额、按分精确汇总的测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+        self.saved_path = app.config.get("DATABASE_PATH")
+        app.config.update(TESTING=True, DATABASE_PATH=TEST_DATABASE_PATH)
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        repository.create_user(conn, "testuser", "x")
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+
+    def tearDown(self):
+        if self.saved_path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = self.saved_path
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def add(self, trans_type, amount):
+        return self.client.post(
+            "/api/transactions",
+            json={"type": trans_type, "amount": amount, "category": "零食"},
+        ).get_json()
+
+    def test_exact_totals(self):
+        """测试多笔小数金额的合计没有浮点误差"""
+        for _ in range(10):
+            self.assertTrue(self.add("income", 0.1)["success"])
+        self.assertTrue(self.add("expense", "0.3")["success"])
+
+        balance = self.client.get("/api/balance").get_json()
+        self.assertEqual((balance["balance"], balance["income"]), (0.7, 1.0))
+        stats = self.client.get("/api/stats").get_json()
+        self.assertEqual(
+            stats["expense_by_category"], [{"category": "零食", "total": 0.3}]
+        )
+        transactions = self.client.get("/api/transactions").get_json()["transactions"]
+        self.assertEqual(transactions[0]["amount"], 0.3)
+
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        self.assertEqual(repository.totals(conn, 1), (100, 30))
+        conn.close()
+
+        csv_text = self.client.get("/api/export/transactions").data.decode("utf-8")
+        self.assertIn(",0.30,", csv_text)
+
+    def test_invalid_amounts(self):
+        """测试无法解析或不足一分的金额被拒绝"""
+        for amount in ("abc", 0.004, -1, None):
+            self.assertFalse(self.add("income", amount)["success"], amount)
+
+    def test_amount_upper_bound(self):
+        """测试超过上限的金额在新增、修改和定时发放接口中都被拒绝"""
+        for amount in (1e19, "1e19", "100000000.01"):
+            self.assertFalse(self.add("income", amount)["success"], amount)
+            response = self.client.post(
+                "/api/schedules", json={"frequency": "daily", "amount": amount}
+            )
+            self.assertFalse(response.get_json()["success"], amount)
+        self.assertTrue(self.add("income", "100000000")["success"])
+
+        response = self.client.put("/api/transactions/1", json={"amount": 1e19})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.get_json()["success"])
+        self.assertEqual(self.client.get("/api/balance").get_json()["balance"], 1e8)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,160 @@
+"""
+密码哈希的测试用例
+"""
+
+import os
+import sqlite3
+import unittest
+
+from werkzeug.security import generate_password_hash
+
+from backend.app import app
+from backend.passwords import PasswordHasher, PasswordHasherBusy, normalize_method
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_passwords.db"
+)
+
+CHEAP_METHOD = "pbkdf2:sha256:1000"
+
+
+class PasswordHasherTestCase(unittest.TestCase):
+    """密码哈希器测试用例"""
+
+    def test_normalize_method(self):
+        """测试简写的哈希算法会补全为完整形式"""
+        self.assertEqual(normalize_method("scrypt"), "scrypt:32768:8:1")
+        self.assertTrue(normalize_method("pbkdf2").startswith("pbkdf2:sha256:"))
+        self.assertEqual(normalize_method(CHEAP_METHOD), CHEAP_METHOD)
+
+    def test_hash_and_verify_in_process_pool(self):
+        """测试在进程池中哈希和校验"""
+        hasher = PasswordHasher(method=CHEAP_METHOD, workers=1)
+        try:
+            hashed = hasher.hash("secret")
+            self.assertTrue(hashed.startswith(CHEAP_METHOD + "$"))
+            self.assertTrue(hasher.verify(hashed, "secret"))
+            self.assertFalse(hasher.verify(hashed, "wrong"))
+            self.assertFalse(hasher.needs_rehash(hashed))
+            self.assertTrue(hasher.needs_rehash(generate_password_hash("secret")))
+        finally:
+            hasher.shutdown()
+
+    def test_queue_limit(self):
+        """测试排队已满时抛出PasswordHasherBusy"""
+        hasher = PasswordHasher(method=CHEAP_METHOD, workers=1, max_pending=1)
+        hasher.queue_timeout = 0.01
+        hasher._slots.acquire()  # 模拟一个正在执行的任务
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                hasher.hash("secret")
+        finally:
+            hasher._slots.release()
+            hasher.shutdown()
+
+
+class PasswordRehashTestCase(unittest.TestCase):
+    """登录时透明重新哈希的测试用例"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config["TESTING"] = True
+
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        conn.execute(
+            """
+            CREATE TABLE users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """
+        )
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (?, ?, ?)",
+            (1, "rehash", generate_password_hash("test123", "pbkdf2:sha256:2000")),
+        )
+        conn.commit()
+        conn.close()
+
+    def setUp(self):
+        self.saved_config = {
+            key: app.config.get(key)
+            for key in (
+                "DATABASE_PATH",
+                "PASSWORD_HASH_METHOD",
+                "PASSWORD_HASH_WORKERS",
+            )
+        }
+        app.config["DATABASE_PATH"] = TEST_DATABASE_PATH
+        app.config["PASSWORD_HASH_METHOD"] = CHEAP_METHOD
+        app.config["PASSWORD_HASH_WORKERS"] = 0
+        app.extensions.pop("password_hasher", None)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        for key, value in self.saved_config.items():
+            if value is None:
+                app.config.pop(key, None)
+            else:
+                app.config[key] = value
+        app.extensions.pop("password_hasher", None)
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+    def stored_hash(self):
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        password = conn.execute("SELECT password FROM users WHERE id = 1").fetchone()[0]
+        conn.close()
+        return password
+
+    def test_login_rehashes_when_parameters_change(self):
+        """测试哈希参数变化后，登录成功会更新已存储的哈希"""
+        self.assertTrue(self.stored_hash().startswith("pbkdf2:sha256:2000$"))
+
+        response = self.client.post(
+            "/login", data={"username": "rehash", "password": "test123"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(self.stored_hash().startswith(CHEAP_METHOD + "$"))
+
+        # 新哈希仍可正常登录
+        response = self.client.post(
+            "/login", data={"username": "rehash", "password": "test123"}
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_failed_login_does_not_rehash(self):
+        """测试登录失败时不修改已存储的哈希"""
+        before = self.stored_hash()
+        response = self.client.post(
+            "/login", data={"username": "rehash", "password": "wrong"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_hash(), before)
+
+    def test_login_busy_returns_503(self):
+        """测试哈希队列已满时登录返回503"""
+        hasher = PasswordHasher(method=CHEAP_METHOD, workers=1, max_pending=1)
+        hasher.queue_timeout = 0.01
+        hasher._slots.acquire()
+        app.extensions["password_hasher"] = hasher
+        try:
+            response = self.client.post(
+                "/login", data={"username": "rehash", "password": "test123"}
+            )
+            self.assertEqual(response.status_code, 503)
+        finally:
+            hasher._slots.release()
+            hasher.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,446 @@
+"""
+数据访问层的测试用例
+"""
+
+import json
+import os
+import sqlite3
+import time
+import unittest
+from datetime import datetime
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.archive import ALL_TRANSACTIONS
+from backend.database.init_db import (
+    SCHEMA_PATH,
+    SCHEMA_VERSION,
+    ensure_schema,
+    get_schema_version,
+)
+from backend.repository import Record, count_queries
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_repository.db"
+)
+
+# 版本5之前以文字保存分类和备注的表结构
+LEGACY_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT,
+    category TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_user_transactions ON transactions(user_id);
+CREATE TABLE schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    frequency TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE transactions_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT,
+    category TEXT,
+    created_at TIMESTAMP
+);
+CREATE TABLE archive_horizons (
+    user_id INTEGER PRIMARY KEY,
+    archived_before TEXT NOT NULL,
+    archived_count INTEGER NOT NULL DEFAULT 0,
+    archived_days INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE archive_rollups (
+    user_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, category, type)
+);
+PRAGMA user_version = 4;
+"""
+
+
+class RecordTestCase(unittest.TestCase):
+    """行对象测试用例"""
+
+    def test_record(self):
+        """测试行对象与sqlite3.Row的用法一致"""
+        row = Record({"id": 0, "amount": 1}, (7, 2.5))
+        self.assertEqual(row["amount"], 2.5)
+        self.assertEqual(row[0], 7)
+        self.assertEqual(dict(row), {"id": 7, "amount": 2.5})
+        self.assertEqual(list(row), [7, 2.5])
+
+    def test_json(self):
+        """测试行对象直接编码为JSON对象"""
+        rows = [Record({"id": 0, "category": 1}, (1, "零食"))]
+        with app.app_context():
+            self.assertEqual(
+                json.loads(app.json.dumps({"rows": rows})),
+                {"rows": [{"id": 1, "category": "零食"}]},
+            )
+
+
+class RepositoryTestCase(unittest.TestCase):
+    """查询计数、监听和定时任务数据库配置的测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+        self.saved_path = app.config.get("DATABASE_PATH")
+        app.config.update(TESTING=True, DATABASE_PATH=TEST_DATABASE_PATH)
+
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        repository.create_user(conn, "testuser", "x")
+        self.user_id = repository.get_user_by_name(conn, "testuser")["id"]
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = self.user_id
+
+    def tearDown(self):
+        if self.saved_path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = self.saved_path
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def add(self, trans_type, amount, category):
+        response = self.client.post(
+            "/api/transactions",
+            json={"type": trans_type, "amount": amount, "category": category},
+        )
+        self.assertTrue(response.get_json()["success"])
+
+    def test_query_counts(self):
+        """测试主要读接口的查询次数"""
+        self.add("income", 10, "零花钱")
+        self.add("expense", 4, "零食")
+
+        expected = {
+            "/api/balance": 2,
+            "/api/transactions": 3,
+            "/api/stats": 3,
+            "/api/stats/overview": 3,
+            "/api/categories": 1,
+            "/api/summary/monthly": 1,
+            "/api/schedules": 1,
+        }
+        for url, count in expected.items():
+            with count_queries() as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(queries.count, count, (url, queries.statements))
+
+    def test_listener(self):
+        """测试语句监听收到SQL、参数和耗时"""
+        calls = []
+
+        def listener(sql, params, seconds):
+            calls.append((sql, params, seconds))
+
+        repository.add_listener(listener)
+        try:
+            self.client.get("/api/balance")
+        finally:
+            repository.remove_listener(listener)
+
+        self.assertEqual(len(calls), 2)
+        self.assertIn("FROM transactions", calls[0][0])
+        self.assertEqual(calls[0][1], (self.user_id,))
+        self.assertGreaterEqual(calls[0][2], 0)
+
+    def test_listener_times_fetch(self):
+        """测试查询的耗时包括取回结果，每条语句只通知一次"""
+        calls = []
+
+        def listener(sql, params, seconds):
+            calls.append((sql, seconds))
+
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        # 每一行都要等待10毫秒，执行语句时只算出第一行，其余的在取回时计算
+        conn.create_function("slow", 1, lambda value: time.sleep(0.01) or value)
+        sql = (
+            "WITH RECURSIVE n(i) AS "
+            "(SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 10) "
+            "SELECT slow(i) AS i FROM n"
+        )
+        repository.add_listener(listener)
+        try:
+            rows = repository.fetch_all(conn, sql)
+            raw = repository.fetch_rows(conn, sql)
+            repository.fetch_one(conn, sql)
+            repository.fetch_value(conn, sql)
+        finally:
+            repository.remove_listener(listener)
+            conn.close()
+
+        self.assertEqual([row["i"] for row in rows], list(range(1, 11)))
+        self.assertEqual(len(raw), 10)
+        self.assertEqual([call[0] for call in calls], [sql] * 4)
+        self.assertGreaterEqual(calls[0][1], 0.09)
+        self.assertGreaterEqual(calls[1][1], 0.09)
+
+    def test_rows_serialised_as_objects(self):
+        """测试查询结果在响应中仍是每行一个对象"""
+        self.add("expense", 4, "零食")
+        self.client.post("/api/schedules", json={"frequency": "daily", "amount": 2})
+
+        transactions = self.client.get("/api/transactions").get_json()["transactions"]
+        self.assertEqual(transactions[0]["category"], "零食")
+        self.assertEqual(transactions[0]["amount"], 4)
+        schedules = self.client.get("/api/schedules").get_json()["schedules"]
+        self.assertEqual(schedules[0]["frequency"], "daily")
+
+    def test_scheduler_uses_app_database(self):
+        """测试定时任务按应用配置的数据库路径发放"""
+        self.client.post("/api/schedules", json={"frequency": "daily", "amount": 2})
+        saved = (
+            scheduler.DATABASE_PATH,
+            scheduler.DATABASE_URL,
+            scheduler.BACKUP_DIR,
+            scheduler.router,
+        )
+        try:
+            scheduler.configure(app.config)
+            self.assertEqual(scheduler.DATABASE_PATH, TEST_DATABASE_PATH)
+            self.assertEqual(
+                scheduler.process_daily_schedules(now=datetime(2025, 3, 5, 9, 0)), 1
+            )
+        finally:
+            (
+                scheduler.DATABASE_PATH,
+                scheduler.DATABASE_URL,
+                scheduler.BACKUP_DIR,
+                scheduler.router,
+            ) = saved
+
+        self.assertEqual(self.client.get("/api/balance").get_json()["balance"], 2)
+
+
+class DictionaryTestCase(unittest.TestCase):
+    """分类和备注字典表及旧数据库升级的测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+        self.conn = sqlite3.connect(TEST_DATABASE_PATH)
+
+    def tearDown(self):
+        self.conn.close()
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def count(self, table):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_names_stored_once(self):
+        """测试重复的分类和备注只保存一份，查询结果仍是名称"""
+        ensure_schema(self.conn)
+        repository.create_user(self.conn, "testuser", "x")
+        for amount in (1, 2, 3):
+            repository.add_transaction(
+                self.conn, 1, "expense", amount, "[自动发放] 每日零花钱", "零食"
+            )
+        repository.add_transaction(self.conn, 1, "income", 9, None, None)
+        repository.add_schedule(self.conn, 1, "daily", 2, "零食", "", None, None)
+
+        self.assertEqual(self.count("categories"), 1)
+        self.assertEqual(self.count("descriptions"), 2)
+        rows = repository.list_transactions(self.conn, 1, "transactions", 10, 0)
+        self.assertEqual(
+            sorted((row["category"] or "", row["description"] or "") for row in rows),
+            [("", "")] + [("零食", "[自动发放] 每日零花钱")] * 3,
+        )
+        self.assertEqual(
+            [tuple(row) for row in repository.category_totals(self.conn, 1)],
+            [("零食", 0, 6, 3)],
+        )
+        self.assertEqual(repository.list_schedules(self.conn, 1)[0]["category"], "零食")
+
+    def test_delete_unused_names(self):
+        """测试清理字典表时只删除修改、删除交易后不再被引用的分类和备注"""
+        ensure_schema(self.conn)
+        repository.create_user(self.conn, "testuser", "x")
+        for description, category in (("买糖果", "零食"), ("买铅笔", "文具")):
+            repository.add_transaction(
+                self.conn, 1, "expense", 1, description, category
+            )
+        repository.add_schedule(self.conn, 1, "daily", 2, "零花钱", "每日", None, None)
+        repository.update_transaction(
+            self.conn, "transactions", 1, 1, 5, "买薯片", "零食"
+        )
+        repository.delete_transaction(self.conn, "transactions", 2, 1)
+
+        self.assertEqual(repository.delete_unused_names(self.conn), 3)
+        self.assertEqual(
+            sorted(row[0] for row in self.conn.execute("SELECT name FROM categories")),
+            ["零花钱", "零食"],
+        )
+        self.assertEqual(
+            sorted(
+                row[0] for row in self.conn.execute("SELECT text FROM descriptions")
+            ),
+            ["买薯片", "每日"],
+        )
+        self.assertEqual(scheduler.prune_dictionaries(self.conn), 0)
+
+    def test_upgrade_text_columns(self):
+        """测试旧数据库的分类和备注转换为字典表的id、金额转换为分，数据和交易id序号不变"""
+        self.conn.executescript(LEGACY_SCHEMA)
+        self.conn.execute(
+            "INSERT INTO users (username, password) VALUES ('testuser', 'x')"
+        )
+        self.conn.executemany(
+            """INSERT INTO transactions
+                   (user_id, type, amount, description, category, created_at)
+               VALUES (1, ?, ?, ?, ?, ?)""",
+            [
+                ("income", 10.0, "每周零花钱", "零花钱", "2025-01-05 10:00:00"),
+                ("expense", 4.0, "买零食", "零食", "2025-01-06 10:00:00"),
+                ("expense", 3.0, "买零食", "零食", "2025-01-07 10:00:00"),
+                ("income", 1.0, None, None, "2025-01-08 10:00:00"),
+                ("expense", 2.0, "", "", "2025-01-09 10:00:00"),
+                ("expense", 5.0, "已删除", "零食", "2025-01-10 10:00:00"),
+            ],
+        )
+        self.conn.execute("DELETE FROM transactions WHERE id = 6")
+        self.conn.execute(
+            """INSERT INTO transactions_archive VALUES
+               (100, 1, 'expense', 7.0, '旧记录', '文具', '2024-12-01 10:00:00')"""
+        )
+        self.conn.execute(
+            """INSERT INTO archive_rollups VALUES
+               (1, '2024-12', '文具', 'expense', 7.0, 1),
+               (1, '2024-12', '', 'income', 8.0, 1)"""
+        )
+        self.conn.execute(
+            """INSERT INTO schedules (user_id, frequency, amount, category)
+               VALUES (1, 'daily', 2, '零花钱')"""
+        )
+        self.conn.commit()
+        before = [
+            row[:2] + (round(row[2] * 100),) + row[3:]
+            for row in self.conn.execute(
+                """SELECT id, type, amount, description, category, created_at
+                   FROM transactions
+                   UNION ALL
+                   SELECT id, type, amount, description, category, created_at
+                   FROM transactions_archive
+                   ORDER BY id"""
+            )
+        ]
+
+        self.assertTrue(ensure_schema(self.conn))
+        self.assertEqual(get_schema_version(self.conn), SCHEMA_VERSION)
+        columns = [
+            row[1] for row in self.conn.execute("PRAGMA table_info(transactions)")
+        ]
+        self.assertNotIn("category", columns)
+        self.assertEqual(self.count("categories"), 4)
+
+        after = repository.transactions_since(
+            self.conn, 1, ALL_TRANSACTIONS, "0001-01-01"
+        )
+        self.assertEqual(
+            sorted(tuple(row[:1]) + tuple(row[2:]) for row in after), before
+        )
+        self.assertEqual(
+            dict(
+                (row["category"], row["total"])
+                for row in repository.expense_by_category(self.conn, 1)
+            ),
+            {"零食": 700, "": 200, "文具": 700},
+        )
+        schedule = repository.list_schedules(self.conn, 1)[0]
+        self.assertEqual((schedule["category"], schedule["amount"]), ("零花钱", 200))
+        self.assertEqual(
+            self.conn.execute(
+                """SELECT COUNT(*) FROM sqlite_master
+                   WHERE name = 'idx_user_transactions'"""
+            ).fetchone()[0],
+            1,
+        )
+
+        # 已删除交易的id不会被重新使用
+        repository.add_transaction(self.conn, 1, "income", 100, None, "零花钱")
+        self.assertEqual(
+            self.conn.execute("SELECT MAX(id) FROM transactions").fetchone()[0], 7
+        )
+        self.assertFalse(ensure_schema(self.conn))
+
+    def test_upgrade_real_amounts(self):
+        """测试金额以元保存为REAL的数据库升级后金额为整数分"""
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            schema = f.read()
+        for column in ("amount", "income", "expense", "balance", "total"):
+            schema = schema.replace(
+                f"{column} INTEGER NOT NULL", f"{column} REAL NOT NULL"
+            )
+        self.conn.executescript(schema)
+        self.conn.execute("PRAGMA user_version = 5")
+        repository.create_user(self.conn, "testuser", "x")
+        for _ in range(10):
+            repository.add_transaction(self.conn, 1, "income", 0.1, None, "零花钱")
+        repository.add_transaction(self.conn, 1, "expense", 0.3, "买零食", "零食")
+        repository.add_schedule(self.conn, 1, "daily", 2.5, "零花钱", "", None, None)
+        self.conn.execute(
+            """INSERT INTO balance_snapshots (user_id, month, income, expense, balance)
+               VALUES (1, '2025-01', 1.0, 0.3, 0.7)"""
+        )
+        self.conn.execute(
+            "INSERT INTO archive_rollups VALUES (1, '2024-12', 0, 'expense', 2.35, 1)"
+        )
+        self.conn.commit()
+
+        self.assertTrue(ensure_schema(self.conn))
+        self.assertEqual(repository.totals(self.conn, 1), (100, 30))
+        self.assertEqual(
+            self.conn.execute(
+                "SELECT DISTINCT typeof(amount) FROM transactions"
+            ).fetchall(),
+            [("integer",)],
+        )
+        self.assertEqual(repository.list_schedules(self.conn, 1)[0]["amount"], 250)
+        self.assertEqual(
+            self.conn.execute(
+                "SELECT income, expense, balance FROM balance_snapshots"
+            ).fetchone(),
+            (100, 30, 70),
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT total FROM archive_rollups").fetchone(), (235,)
+        )
+        self.assertEqual(self.count("categories"), 2)
+        self.assertFalse(ensure_schema(self.conn))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,150 @@
+"""
+定时发放任务的测试用例（使用虚拟时钟）
+"""
+
+import os
+import unittest
+from datetime import datetime
+
+from backend import scheduler
+from backend.simulate import (
+    create_scratch_database,
+    expected_payouts,
+    main,
+    run_simulation,
+)
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_scheduler.db"
+)
+
+
+class SchedulerTestCase(unittest.TestCase):
+    """定时发放测试用例"""
+
+    def setUp(self):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+        create_scratch_database(TEST_DATABASE_PATH, users=2)
+        self.conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+
+    def tearDown(self):
+        self.conn.close()
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+    def count_transactions(self):
+        return self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def test_daily_payout_only_once_per_day(self):
+        """测试同一天多次执行只发放一次"""
+        morning = datetime(2025, 3, 5, 9, 0)
+        evening = datetime(2025, 3, 5, 21, 0)
+
+        self.assertEqual(scheduler.process_daily_schedules(self.conn, morning), 2)
+        self.assertEqual(scheduler.process_daily_schedules(self.conn, evening), 0)
+        self.assertEqual(
+            scheduler.process_daily_schedules(self.conn, datetime(2025, 3, 6, 9, 0)), 2
+        )
+
+    def test_payout_uses_clock_time(self):
+        """测试发放记录的时间来自注入的时钟"""
+        scheduler.process_monthly_schedules(self.conn, datetime(2024, 2, 1, 9, 0))
+        row = self.conn.execute(
+            "SELECT created_at FROM transactions LIMIT 1"
+        ).fetchone()
+        self.assertEqual(row["created_at"], "2024-02-01 09:00:00")
+
+    def test_weekly_period_starts_on_monday(self):
+        """测试每周发放以周一作为本周开始"""
+        # 2025-03-09 是周日，2025-03-10 是周一
+        self.assertEqual(
+            scheduler.process_weekly_schedules(self.conn, datetime(2025, 3, 9, 9, 0)), 2
+        )
+        self.assertEqual(
+            scheduler.process_weekly_schedules(self.conn, datetime(2025, 3, 10, 9, 0)),
+            2,
+        )
+        self.assertEqual(
+            scheduler.process_weekly_schedules(self.conn, datetime(2025, 3, 16, 9, 0)),
+            0,
+        )
+
+    def test_simulate_one_year(self):
+        """测试回放一整年的发放结果"""
+        start = datetime(2025, 1, 1)
+        reports = run_simulation(TEST_DATABASE_PATH, start, 365)
+
+        self.assertEqual(len(reports), 365)
+        self.assertEqual(sum(r.daily for r in reports), 365 * 2)
+        self.assertEqual(sum(r.weekly for r in reports), 52 * 2)
+        self.assertEqual(sum(r.monthly for r in reports), 12 * 2)
+        self.assertTrue(all(r.queries > 0 for r in reports))
+        self.assertEqual(
+            self.count_transactions(), expected_payouts(self.conn, start, 365)
+        )
+
+        # 重放同一区间不会重复发放
+        reports = run_simulation(TEST_DATABASE_PATH, start, 365)
+        self.assertEqual(sum(r.daily + r.weekly + r.monthly for r in reports), 0)
+
+    def test_simulation_restores_clock(self):
+        """测试模拟结束后恢复原来的时钟"""
+        original = scheduler.clock
+        run_simulation(TEST_DATABASE_PATH, datetime(2025, 1, 1), 3)
+        self.assertIs(scheduler.clock, original)
+
+    def test_source_copy_starts_empty(self):
+        """测试从已有数据库复制时只保留用户和定时配置，交易、快照和归档都清空"""
+        start = datetime(2025, 1, 1)
+        run_simulation(TEST_DATABASE_PATH, start, 120)
+        scheduler.archive_old_transactions(self.conn, datetime(2025, 5, 1), 30)
+        self.assertGreater(
+            self.conn.execute("SELECT COUNT(*) FROM transactions_archive").fetchone()[
+                0
+            ],
+            0,
+        )
+
+        copy_path = TEST_DATABASE_PATH + "-copy"
+        try:
+            create_scratch_database(copy_path, source=TEST_DATABASE_PATH)
+            conn = scheduler.get_db_connection(copy_path)
+            for table in (
+                "transactions",
+                "balance_snapshots",
+                "transactions_archive",
+                "archive_horizons",
+                "archive_rollups",
+            ):
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                self.assertEqual(count, 0, table)
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM schedules").fetchone()[0], 6
+            )
+            conn.close()
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(copy_path + suffix):
+                    os.remove(copy_path + suffix)
+
+    def test_existing_database_needs_force(self):
+        """测试--database已存在时不加--force拒绝覆盖"""
+        argv = [
+            "--database",
+            TEST_DATABASE_PATH,
+            "--days",
+            "3",
+            "--start",
+            "2025-01-01",
+        ]
+        with self.assertRaises(SystemExit):
+            main(argv)
+        self.assertEqual(
+            self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 2
+        )
+        self.assertEqual(main(argv + ["--force"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
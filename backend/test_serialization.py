@@ -0,0 +1,135 @@
+"""
+列式响应格式的测试用例
+"""
+
+import json
+import os
+import sqlite3
+import unittest
+
+from backend import repository
+from backend.app import app
+from backend.serialization import COLUMNAR_MIMETYPE, from_columns
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_serialization.db"
+)
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+
+
+class ColumnarFormatTestCase(unittest.TestCase):
+    """列式格式测试用例"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config["TESTING"] = True
+
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (1, 'testuser', 'x')"
+        )
+        for i in range(20):
+            repository.add_transaction(
+                conn,
+                1,
+                "income" if i % 3 else "expense",
+                i + 0.5,
+                f"记录{i}",
+                ["零花钱", "零食", "文具"][i % 3],
+                f"2025-01-{i + 1:02d} 10:00:00",
+            )
+        conn.commit()
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+    def setUp(self):
+        self.saved_database_path = app.config.get("DATABASE_PATH")
+        app.config["DATABASE_PATH"] = TEST_DATABASE_PATH
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["username"] = "testuser"
+
+    def tearDown(self):
+        if self.saved_database_path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = self.saved_database_path
+
+    def test_default_format_unchanged(self):
+        """测试默认仍然返回每行一个对象"""
+        response = self.client.get("/api/transactions?per_page=5")
+        data = response.get_json()
+
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertIsInstance(data["transactions"], list)
+        self.assertIsInstance(data["transactions"][0], dict)
+
+    def test_columnar_matches_rows(self):
+        """测试列式格式还原后与默认格式一致"""
+        rows = self.client.get("/api/transactions?per_page=15").get_json()
+
+        for query in ("format=columnar", "format=columnar&dictionary=1"):
+            response = self.client.get(f"/api/transactions?per_page=15&{query}")
+            self.assertEqual(response.mimetype, COLUMNAR_MIMETYPE)
+            data = json.loads(response.data)
+            self.assertEqual(data["total"], rows["total"])
+            self.assertEqual(from_columns(data["transactions"]), rows["transactions"])
+
+    def test_dictionary_encoding(self):
+        """测试分类字符串按字典编码"""
+        response = self.client.get(
+            "/api/transactions?per_page=20&format=columnar&dictionary=1"
+        )
+        payload = json.loads(response.data)["transactions"]
+
+        self.assertEqual(
+            sorted(payload["dictionaries"]["category"]), ["文具", "零花钱", "零食"]
+        )
+        category = payload["data"][payload["columns"].index("category")]
+        self.assertTrue(all(isinstance(value, int) for value in category))
+
+    def test_accept_header_negotiation(self):
+        """测试通过Accept头请求列式格式"""
+        response = self.client.get(
+            "/api/categories", headers={"Accept": COLUMNAR_MIMETYPE}
+        )
+        payload = json.loads(response.data)
+
+        self.assertEqual(response.mimetype, COLUMNAR_MIMETYPE)
+        self.assertEqual(
+            payload["categories"]["columns"], ["category", "income", "expense", "count"]
+        )
+        rows = self.client.get("/api/categories").get_json()["categories"]
+        self.assertEqual(from_columns(payload["categories"]), rows)
+
+    def test_empty_result_keeps_columns(self):
+        """测试结果为空时仍返回列名"""
+        response = self.client.get(
+            "/api/search/transactions?keyword=不存在&format=columnar"
+        )
+        payload = json.loads(response.data)["transactions"]
+
+        self.assertIn("category", payload["columns"])
+        self.assertTrue(all(column == [] for column in payload["data"]))
+
+    def test_columnar_is_smaller(self):
+        """测试列式格式的响应体更小"""
+        rows = self.client.get("/api/transactions?per_page=20")
+        columnar = self.client.get(
+            "/api/transactions?per_page=20&format=columnar&dictionary=1"
+        )
+        self.assertLess(len(columnar.data), len(rows.data) / 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
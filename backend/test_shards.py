@@ -0,0 +1,144 @@
+"""
+按用户分片的测试用例
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.shards import ShardRouter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from shard_database import shard_database  # noqa: E402
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+
+
+def create_database(path, users):
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+    for user_id in users:
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (?, ?, 'x')",
+            (user_id, f"user{user_id}"),
+        )
+        repository.add_transaction(
+            conn, user_id, "income", 1000 * user_id, None, "测试", "2025-01-05 10:00:00"
+        )
+        repository.add_transaction(
+            conn, user_id, "expense", 100, None, "测试", "2025-02-05 10:00:00"
+        )
+        repository.add_schedule(
+            conn, user_id, "daily", 200, "每日零花钱", None, None, None
+        )
+    conn.commit()
+    conn.close()
+
+
+class ShardTestCase(unittest.TestCase):
+    """分片路由、请求连接选择、定时任务和迁移工具测试用例"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="cash_manager_shards_")
+        self.catalog = os.path.join(self.tmp, "cash_manager.db")
+        create_database(self.catalog, [1, 2, 3])
+        self.router = ShardRouter(self.catalog, shard_count=2)
+
+        app.config["TESTING"] = True
+        self.saved_config = {
+            key: app.config.get(key)
+            for key in ("DATABASE_PATH", "SHARD_COUNT", "SHARD_DIR")
+        }
+
+    def tearDown(self):
+        app.config.update(self.saved_config)
+        if self.saved_config["DATABASE_PATH"] is None:
+            app.config.pop("DATABASE_PATH")
+        shutil.rmtree(self.tmp)
+
+    def test_router_assigns_buckets_and_keeps_them(self):
+        """测试按哈希桶分配分片，调整分片数后已有用户不移动"""
+        self.assertEqual(self.router.shard_for(1), 1)
+        self.assertEqual(self.router.shard_for(2), 0)
+
+        resized = ShardRouter(self.catalog, shard_count=5)
+        self.assertEqual(resized.shard_for(1), 1)
+        self.assertEqual(resized.shard_for(2), 0)
+        self.assertEqual(resized.shard_for(3), 3)
+
+    def test_disabled_router_uses_catalog(self):
+        """测试不分片时所有用户都在主数据库"""
+        router = ShardRouter(self.catalog)
+        self.assertEqual(router.path_for(1), self.catalog)
+        self.assertEqual(router.database_paths(), [self.catalog])
+
+    def test_migration_and_requests(self):
+        """测试迁移后请求按登录用户路由到各自的分片"""
+        report = shard_database(self.catalog, 2, purge=True)
+
+        self.assertEqual(len(report), 2)
+        self.assertEqual(sum(copied["transactions"] for copied in report.values()), 6)
+        conn = sqlite3.connect(self.catalog)
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0], 0
+        )
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 3)
+        conn.close()
+
+        app.config["DATABASE_PATH"] = self.catalog
+        app.config["SHARD_COUNT"] = 2
+        app.config["SHARD_DIR"] = None
+        for user_id in (1, 2, 3):
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess["user_id"] = user_id
+            data = client.get("/api/balance").get_json()
+            self.assertEqual(data["balance"], 10.0 * user_id - 1.0)
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = 2
+        client.post(
+            "/api/transactions",
+            json={"type": "income", "amount": 5, "category": "测试"},
+        )
+        shard = sqlite3.connect(self.router.shard_path(0))
+        self.assertEqual(
+            shard.execute(
+                "SELECT COUNT(*) FROM transactions WHERE user_id = 2"
+            ).fetchone()[0],
+            3,
+        )
+        shard.close()
+
+    def test_migration_is_repeatable(self):
+        """测试重复执行迁移不会产生重复数据"""
+        shard_database(self.catalog, 2)
+        report = shard_database(self.catalog, 2)
+        self.assertEqual(sum(copied["schedules"] for copied in report.values()), 3)
+
+    def test_scheduler_fans_out(self):
+        """测试定时任务依次处理每个分片"""
+        shard_database(self.catalog, 2, purge=True)
+        saved_router = scheduler.router
+        scheduler.router = self.router
+        try:
+            now = datetime(2025, 3, 5, 9, 0)
+            self.assertEqual(len(self.router.database_paths()), 2)
+            self.assertEqual(scheduler.process_daily_schedules(now=now), 3)
+            self.assertEqual(scheduler.process_daily_schedules(now=now), 0)
+            self.assertEqual(scheduler.close_monthly_snapshots(now=now), 6)
+        finally:
+            scheduler.router = saved_router
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
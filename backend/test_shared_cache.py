@@ -0,0 +1,187 @@
+"""
+多进程共用的统计结果缓存的测试用例
+"""
+
+import os
+import unittest
+
+from backend import repository, scheduler
+from backend.analytics import AnalyticsEngine
+from backend.app import app
+from backend.shared_cache import SharedCache
+
+DATABASE_DIR = os.path.join(os.path.dirname(__file__), "database")
+TEST_DATABASE_PATH = os.path.join(DATABASE_DIR, "test_cash_manager_shared.db")
+TEST_CACHE_PATH = os.path.join(DATABASE_DIR, "test_cash_manager_cache.db")
+
+
+def remove_files():
+    for path in (TEST_DATABASE_PATH, TEST_CACHE_PATH):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class SharedCacheTestCase(unittest.TestCase):
+    """两个缓存实例（模拟两个worker）共用同一个缓存文件的测试用例"""
+
+    def setUp(self):
+        remove_files()
+        self.first = SharedCache(path=TEST_CACHE_PATH)
+        self.second = SharedCache(path=TEST_CACHE_PATH)
+
+    def tearDown(self):
+        self.first.close()
+        self.second.close()
+        remove_files()
+
+    def test_hit_across_workers(self):
+        """测试一个worker保存的响应另一个worker也能命中"""
+        version, cached = self.first.lookup(1, "balance")
+        self.assertEqual((version, cached), (0, None))
+        self.first.store(1, "balance", version, "2025-06-01", "application/json", "{}")
+
+        self.assertEqual(
+            self.second.lookup(1, "balance"), (0, ("application/json", "{}"))
+        )
+        self.assertEqual((self.second.hits, self.first.misses), (1, 1))
+
+    def test_invalidate_from_other_worker(self):
+        """测试另一个worker提交变化后缓存不再使用，其他用户不受影响"""
+        self.first.store(1, "balance", 0, "2025-06-01", "application/json", "{}")
+        self.first.store(2, "balance", 0, "2025-06-01", "application/json", "{}")
+        self.second.invalidate(1)
+
+        self.assertEqual(self.first.lookup(1, "balance"), (1, None))
+        self.assertIsNotNone(self.first.lookup(2, "balance")[1])
+
+    def test_stale_store_ignored(self):
+        """测试计算期间有写入时，按旧版本号计算的响应不会被使用"""
+        version, _ = self.first.lookup(1, "stats")
+        self.second.invalidate(1)
+        self.first.store(1, "stats", version, "2025-06-01", "application/json", "old")
+        self.assertIsNone(self.second.lookup(1, "stats")[1])
+
+        self.second.store(1, "stats", 1, "2025-06-01", "application/json", "new")
+        self.first.store(1, "stats", 0, "2025-06-01", "application/json", "old")
+        self.assertEqual(self.first.lookup(1, "stats")[1][1], "new")
+
+    def test_clear(self):
+        """测试清空后缓存不再命中，版本号继续增加"""
+        self.first.store(1, "balance", 0, "2025-06-01", "application/json", "{}")
+        self.first.clear()
+        self.first.invalidate(1)
+        self.assertEqual(self.second.lookup(1, "balance"), (1, None))
+
+
+class SharedCacheAppTestCase(unittest.TestCase):
+    """统计接口使用共享缓存的测试用例"""
+
+    def setUp(self):
+        remove_files()
+        self.saved = {
+            key: app.config.get(key)
+            for key in ("DATABASE_PATH", "SHARED_CACHE", "SHARED_CACHE_PATH")
+        }
+        app.config.update(
+            TESTING=True,
+            DATABASE_PATH=TEST_DATABASE_PATH,
+            SHARED_CACHE=True,
+            SHARED_CACHE_PATH=TEST_CACHE_PATH,
+        )
+
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        repository.create_user(conn, "testuser", "x")
+        self.user_id = repository.get_user_by_name(conn, "testuser")["id"]
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = self.user_id
+        self.add("income", 10)
+
+    def tearDown(self):
+        cached = app.extensions.pop("shared_cache", None)
+        if cached is not None:
+            repository.remove_change_listener(cached[1].invalidate)
+            cached[1].close()
+        engine = app.extensions.pop("analytics", None)
+        if engine is not None:
+            repository.remove_change_listener(engine.changed)
+        app.config["ANALYTICS_ENGINE"] = False
+        for key, value in self.saved.items():
+            if value is None:
+                app.config.pop(key, None)
+            else:
+                app.config[key] = value
+        remove_files()
+
+    def add(self, trans_type, amount):
+        response = self.client.post(
+            "/api/transactions", json={"type": trans_type, "amount": amount}
+        )
+        self.assertTrue(response.get_json()["success"])
+
+    def balance(self):
+        return self.client.get("/api/balance").get_json()["balance"]
+
+    def other_worker_adds(self, amount):
+        """模拟另一个worker：直接写入数据库，再通过自己的缓存实例让版本号加1"""
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        repository.add_transaction(conn, self.user_id, "income", amount * 100, "", "")
+        conn.commit()
+        conn.close()
+        other = SharedCache(path=TEST_CACHE_PATH)
+        other.invalidate(self.user_id)
+        other.close()
+
+    def test_second_request_hits(self):
+        """测试第二次请求直接使用缓存的响应，不查询数据库"""
+        urls = (
+            "/api/balance",
+            "/api/trends?days=30",
+            "/api/stats",
+            "/api/stats/overview",
+            "/api/categories?format=columnar",
+            "/api/summary/monthly",
+        )
+        for url in urls:
+            first = self.client.get(url)
+            with repository.count_queries() as queries:
+                second = self.client.get(url)
+            self.assertEqual(queries.count, 0, url)
+            self.assertEqual(second.get_data(), first.get_data(), url)
+            self.assertEqual(second.mimetype, first.mimetype, url)
+
+    def test_invalidate_on_write(self):
+        """测试本进程写入后重新计算"""
+        self.assertEqual(self.balance(), 10)
+        self.add("expense", 4)
+        self.assertEqual(self.balance(), 6)
+
+    def test_invalidate_from_other_worker(self):
+        """测试其他worker写入后本进程的缓存不再使用"""
+        self.assertEqual(self.balance(), 10)
+        self.other_worker_adds(5)
+        self.assertEqual(self.balance(), 15)
+
+    def test_analytics_engine_reloads(self):
+        """测试列式统计引擎按共享版本号发现其他worker的写入"""
+        engine = AnalyticsEngine(use_numpy=False)
+        app.extensions["analytics"] = engine
+        repository.add_change_listener(engine.changed)
+        app.config["ANALYTICS_ENGINE"] = True
+
+        self.assertEqual(self.balance(), 10)
+        self.add("expense", 4)
+        self.assertEqual(self.balance(), 6)
+        self.assertEqual((engine.loads, engine.appends), (1, 1))
+
+        self.other_worker_adds(5)
+        self.assertEqual(self.balance(), 11)
+        self.assertEqual(engine.loads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,176 @@
+"""
+慢查询日志的测试用例
+"""
+
+import json
+import os
+import sys
+import unittest
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.slow_queries import (
+    SlowQueryLog,
+    explain,
+    format_report,
+    normalize_sql,
+    param_shape,
+    plan_flags,
+)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from slow_query_report import read_records  # noqa: E402
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_slow_queries.db"
+)
+
+
+class SlowQueryFormatTestCase(unittest.TestCase):
+    """SQL规范化、参数类型和查询计划的测试用例"""
+
+    def test_normalize_sql(self):
+        """测试合并空白、替换字面量和合并IN列表"""
+        self.assertEqual(
+            normalize_sql(
+                """SELECT * FROM t1
+                   WHERE type = 'income' AND id IN (?, ?, ?) LIMIT 10"""
+            ),
+            "SELECT * FROM t1 WHERE type = ? AND id IN (?, ...) LIMIT ?",
+        )
+        self.assertEqual(
+            normalize_sql("SELECT DATE('now', '-30 days'), 1.5"), "SELECT DATE(?, ?), ?"
+        )
+
+    def test_param_shape(self):
+        """测试只记录参数的类型和长度"""
+        self.assertEqual(
+            param_shape((1, "零食", None, 2.5)), ["int", "str[2]", "null", "float"]
+        )
+        self.assertEqual(param_shape({"q": "%a%"}), {"q": "str[3]"})
+        self.assertEqual(
+            param_shape([(1, "a"), (2, "b")]), {"rows": 2, "first": ["int", "str[1]"]}
+        )
+        self.assertEqual(param_shape(iter([])), "iterator")
+
+    def test_plan_flags(self):
+        """测试标出全表扫描和临时B树，按索引扫描不标出"""
+        self.assertEqual(
+            plan_flags(["SCAN t", "  USE TEMP B-TREE FOR ORDER BY"]),
+            ["全表扫描", "临时B树"],
+        )
+        self.assertEqual(plan_flags(["SCAN t USING INDEX idx_t"]), [])
+        self.assertEqual(plan_flags(None), [])
+
+
+class SlowQueryLogTestCase(unittest.TestCase):
+    """慢查询日志和报告的测试用例"""
+
+    def setUp(self):
+        self.remove_files()
+        self.saved_path = app.config.get("DATABASE_PATH")
+        app.config.update(TESTING=True, DATABASE_PATH=TEST_DATABASE_PATH)
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        repository.create_user(conn, "testuser", "x")
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+        self.client.post(
+            "/api/transactions",
+            json={
+                "type": "expense",
+                "amount": 3,
+                "category": "零食",
+                "description": "买糖果",
+            },
+        )
+        # 阈值为0，记录所有语句
+        self.log = SlowQueryLog(threshold_ms=0).start()
+
+    def tearDown(self):
+        self.log.stop()
+        if self.saved_path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = self.saved_path
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(TEST_DATABASE_PATH + suffix):
+                os.remove(TEST_DATABASE_PATH + suffix)
+
+    def test_search_logged_with_plan(self):
+        """测试LIKE搜索被记录，带有路由、参数类型和查询计划"""
+        with self.assertLogs("cash_manager.slow_query", level="INFO") as logs:
+            self.client.get("/api/search/transactions?keyword=糖")
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        search = [record for record in records if "LIKE" in record["sql"]][0]
+        self.assertEqual(search["route"], "GET /api/search/transactions")
+        self.assertIn("str[3]", search["params"])
+        self.assertNotIn("%糖%", json.dumps(search, ensure_ascii=False))
+        self.assertTrue(search["plan"])
+        steps = [step.strip() for step in search["plan"]]
+        self.assertTrue(any(step.startswith("SEARCH") for step in steps), steps)
+
+        # 同一条语句再执行时汇总到一起，日志文件可以由报告脚本重新汇总
+        with self.assertLogs("cash_manager.slow_query", level="INFO") as again:
+            self.client.get("/api/search/transactions?keyword=零")
+        top = {entry["sql"]: entry for entry in self.log.top(100)}
+        self.assertEqual(top[search["sql"]]["count"], 2)
+        self.assertEqual(
+            top[search["sql"]]["routes"]["GET /api/search/transactions"], 2
+        )
+        lines = [f"INFO:cash_manager.slow_query:{r.getMessage()}" for r in logs.records]
+        lines += ["INFO:werkzeug:GET / 200", "{not json"]
+        lines += [record.getMessage() for record in again.records]
+        self.assertEqual(
+            len(list(read_records(lines))), len(logs.records) + len(again.records)
+        )
+
+        report = format_report(self.log.top(3))
+        self.assertIn("#1 次数", report)
+        self.assertIn(
+            "来源: GET /api/search/transactions ×2",
+            format_report([top[search["sql"]]]),
+        )
+
+    def test_threshold_and_non_request_route(self):
+        """测试低于阈值的语句不记录，非请求线程记为线程名"""
+        self.log.stop()
+        slow = SlowQueryLog(threshold_ms=60000).start()
+        try:
+            self.client.get("/api/balance")
+            self.assertEqual(slow.count, 0)
+        finally:
+            slow.stop()
+
+        self.log.start()
+        count = self.log.count
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        sql = "SELECT COUNT(*) FROM transactions WHERE user_id = ?"
+        repository.fetch_value(conn, sql, (1,))
+        conn.close()
+        self.assertEqual(self.log.count, count + 1)
+        entry = self.log.stats.entries[sql]
+        self.assertTrue(list(entry["routes"])[0].startswith("thread:"))
+
+    def test_explain_executemany(self):
+        """测试executemany按第一行参数取查询计划，无法执行时返回None"""
+        conn = scheduler.get_db_connection(TEST_DATABASE_PATH)
+        try:
+            sql = "SELECT * FROM transactions WHERE id = ?"
+            plan = explain(conn, sql, [(1,), (2,)])
+            self.assertTrue(plan[0].startswith("SEARCH transactions"))
+            self.assertIsNone(explain(conn, "SELECT * FROM no_such_table", ()))
+            self.assertIsNone(explain(object(), "SELECT 1", ()))
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,243 @@
+"""
+月末余额快照的测试用例
+"""
+
+import os
+import unittest
+from datetime import date, datetime, timedelta
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.database.init_db import SCHEMA_VERSION, ensure_schema, get_schema_version
+from backend.snapshots import balance_as_of, close_months
+from backend.testing import PostgresBackend, SQLiteBackend, skip_unless_postgres
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_snapshots.db"
+)
+
+# 固定的"当前时间"，之前的月份都已结束
+NOW = datetime(2025, 6, 15, 12, 0, 0)
+
+# 金额以分为单位
+TRANSACTIONS = [
+    ("income", 10000, "2025-01-05 10:00:00"),
+    ("expense", 3000, "2025-01-20 10:00:00"),
+    # 2025-02没有交易
+    ("income", 5000, "2025-03-01 00:00:00"),
+    ("expense", 550, "2025-03-31 23:59:59"),
+    ("income", 2000, "2025-04-10T08:00:00"),
+    ("income", 700, "2025-06-02 09:00:00"),
+]
+
+
+class SnapshotTestCase(SQLiteBackend, unittest.TestCase):
+    """快照生成与按日期查询余额测试用例"""
+
+    database_path = TEST_DATABASE_PATH
+
+    def setUp(self):
+        self.use_backend()
+        self.reset_database()
+        self.conn = self.connect()
+        self.conn.execute(
+            "INSERT INTO users (username, password) VALUES ('testuser', 'x')"
+        )
+        for trans_type, amount, created_at in TRANSACTIONS:
+            repository.add_transaction(
+                self.conn, 1, trans_type, amount, None, "测试", created_at
+            )
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.restore_backend()
+
+    def brute_force(self, before):
+        return self.conn.execute(
+            """SELECT COALESCE(
+                   SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END), 0)
+               FROM transactions WHERE user_id = 1 AND created_at < ?""",
+            (before,),
+        ).fetchone()[0]
+
+    def test_close_months(self):
+        """测试为已结束的月份（包括没有交易的月份）生成快照"""
+        self.assertEqual(close_months(self.conn, 1, NOW), 5)
+        snapshots = self.conn.execute(
+            "SELECT month, balance FROM balance_snapshots ORDER BY month"
+        ).fetchall()
+
+        self.assertEqual(
+            [tuple(snapshot) for snapshot in snapshots],
+            [
+                ("2025-01", 7000),
+                ("2025-02", 7000),
+                ("2025-03", 11450),
+                ("2025-04", 13450),
+                ("2025-05", 13450),
+            ],
+        )
+        # 已是最新时不再生成
+        self.assertEqual(close_months(self.conn, 1, NOW), 0)
+
+    def test_balance_as_of_matches_full_scan(self):
+        """测试快照加尾部扫描的结果与全量汇总一致"""
+        day = date(2024, 12, 25)
+        expected = [self.brute_force(d) for d in self.days(day)]
+
+        without = [balance_as_of(self.conn, 1, d)["balance"] for d in self.days(day)]
+        close_months(self.conn, 1, NOW)
+        with_snapshots = [
+            balance_as_of(self.conn, 1, d)["balance"] for d in self.days(day)
+        ]
+
+        self.assertEqual(without, expected)
+        self.assertEqual(with_snapshots, expected)
+        self.assertEqual(
+            balance_as_of(self.conn, 1, "2025-06-10")["snapshot"], "2025-05"
+        )
+
+    def days(self, start):
+        return [
+            (start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(0, 200, 3)
+        ]
+
+    def test_scheduler_job(self):
+        """测试定时任务为所有用户结账"""
+        self.assertEqual(scheduler.close_monthly_snapshots(self.conn, NOW), 5)
+        self.assertEqual(scheduler.close_monthly_snapshots(self.conn, NOW), 0)
+
+    def test_ensure_schema_upgrades_old_database(self):
+        """测试旧版本数据库补建快照表且保留数据"""
+        self.conn.execute("DROP TABLE balance_snapshots")
+        self.conn.execute("PRAGMA user_version = 1")
+        self.conn.commit()
+
+        self.assertTrue(ensure_schema(self.conn))
+        self.assertEqual(get_schema_version(self.conn), SCHEMA_VERSION)
+        self.assertEqual(close_months(self.conn, 1, NOW), 5)
+        self.assertEqual(
+            self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0],
+            len(TRANSACTIONS),
+        )
+        self.assertFalse(ensure_schema(self.conn))
+
+
+class SnapshotApiTestCase(SQLiteBackend, unittest.TestCase):
+    """按日期查询余额接口和回溯修改测试用例"""
+
+    database_path = TEST_DATABASE_PATH
+
+    def setUp(self):
+        self.use_backend()
+        self.reset_database()
+        conn = self.connect()
+        conn.execute("INSERT INTO users (username, password) VALUES ('testuser', 'x')")
+        for trans_type, amount, created_at in (
+            ("income", 10000, "2024-01-10 10:00:00"),
+            ("expense", 4000, "2024-02-10 10:00:00"),
+            ("income", 500, "2024-03-10 10:00:00"),
+        ):
+            repository.add_transaction(
+                conn, 1, trans_type, amount, None, "测试", created_at
+            )
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["username"] = "testuser"
+
+    def tearDown(self):
+        self.restore_backend()
+
+    def as_of(self, day):
+        return self.client.get(f"/api/balance/as-of?date={day}").get_json()
+
+    def test_as_of_includes_whole_day(self):
+        """测试余额包含指定日期当天的交易"""
+        self.assertEqual(self.as_of("2024-02-09")["balance"], 100.0)
+        data = self.as_of("2024-02-10")
+        self.assertEqual(data["balance"], 60.0)
+        self.assertEqual(data["income"], 100.0)
+        self.assertEqual(data["expense"], 40.0)
+
+    def test_invalid_date(self):
+        """测试日期格式错误"""
+        response = self.client.get("/api/balance/as-of?date=2024-13-01")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()["success"])
+
+    def test_writes_close_months_and_backdated_delete_rebuilds(self):
+        """测试写入时补齐快照，删除已结账月份的交易后快照重建"""
+        self.client.post(
+            "/api/transactions",
+            json={"type": "income", "amount": 1, "category": "测试"},
+        )
+        conn = self.connect()
+        february = conn.execute(
+            """SELECT balance FROM balance_snapshots
+               WHERE user_id = 1 AND month = '2024-02'"""
+        ).fetchone()
+        self.assertEqual(february["balance"], 6000)
+
+        tx_id = conn.execute(
+            "SELECT id FROM transactions WHERE created_at = '2024-02-10 10:00:00'"
+        ).fetchone()[0]
+        conn.close()
+        self.client.delete(f"/api/transactions/{tx_id}")
+
+        conn = self.connect()
+        february = conn.execute(
+            """SELECT balance FROM balance_snapshots
+               WHERE user_id = 1 AND month = '2024-02'"""
+        ).fetchone()
+        conn.close()
+        self.assertEqual(february["balance"], 10000)
+        self.assertEqual(self.as_of("2024-12-31")["balance"], 105.0)
+
+    def test_backdated_update_rebuilds(self):
+        """测试修改已结账月份交易的金额后余额随之更新"""
+        self.client.post(
+            "/api/transactions",
+            json={"type": "income", "amount": 1, "category": "测试"},
+        )
+        conn = self.connect()
+        tx_id = conn.execute(
+            "SELECT id FROM transactions WHERE created_at = '2024-01-10 10:00:00'"
+        ).fetchone()[0]
+        conn.close()
+
+        self.client.put(f"/api/transactions/{tx_id}", json={"amount": 200})
+        self.assertEqual(self.as_of("2024-03-31")["balance"], 165.0)
+
+    def test_trend_opening_balance_from_snapshot(self):
+        """测试趋势接口的期初余额与快照一致"""
+        self.client.post(
+            "/api/transactions",
+            json={"type": "expense", "amount": 2, "category": "测试"},
+        )
+        data = self.client.get("/api/trends?days=7").get_json()
+
+        self.assertEqual(data["opening_balance"], 65.0)
+        self.assertEqual(data["balance"], [63.0])
+
+
+@skip_unless_postgres
+class PostgresSnapshotTestCase(PostgresBackend, SnapshotTestCase):
+    """在PostgreSQL上运行的快照测试用例"""
+
+    def test_ensure_schema_upgrades_old_database(self):
+        """PostgreSQL的表结构升级见test_storage.py"""
+        self.skipTest("只适用于SQLite")
+
+
+@skip_unless_postgres
+class PostgresSnapshotApiTestCase(PostgresBackend, SnapshotApiTestCase):
+    """在PostgreSQL上运行的按日期查询余额接口测试用例"""
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
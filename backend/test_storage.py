@@ -0,0 +1,312 @@
+"""
+存储后端的测试用例
+
+SQLite后端总是测试；设置 TEST_DATABASE_URL=postgresql://... 并安装psycopg后，
+同样的用例也在PostgreSQL上运行（见testing.py）。
+"""
+
+import os
+import re
+import sqlite3
+import unittest
+from datetime import datetime
+
+from backend import repository, scheduler
+from backend.app import app
+from backend.database.init_db import SCHEMA_VERSION
+from backend.storage import psycopg, translate
+from backend.testing import (
+    POSTGRES_TABLES,
+    TEST_DATABASE_URL,
+    PostgresBackend,
+    SQLiteBackend,
+    skip_unless_postgres,
+)
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_storage.db"
+)
+# 第一版PostgreSQL表结构（版本4）：分类和备注为文字，金额为浮点数的元
+POSTGRES_SCHEMA_V4 = """
+CREATE TABLE users (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+CREATE TABLE transactions (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    type TEXT NOT NULL,
+    amount DOUBLE PRECISION NOT NULL,
+    description TEXT,
+    category TEXT,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+CREATE TABLE schedules (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    frequency TEXT NOT NULL,
+    amount DOUBLE PRECISION NOT NULL,
+    category TEXT,
+    description TEXT,
+    day_of_week INTEGER,
+    day_of_month INTEGER,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+CREATE TABLE balance_snapshots (
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    month TEXT NOT NULL,
+    income DOUBLE PRECISION NOT NULL,
+    expense DOUBLE PRECISION NOT NULL,
+    balance DOUBLE PRECISION NOT NULL,
+    closed_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+    PRIMARY KEY (user_id, month)
+);
+CREATE TABLE transactions_archive (
+    id BIGINT PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users (id),
+    type TEXT NOT NULL,
+    amount DOUBLE PRECISION NOT NULL,
+    description TEXT,
+    category TEXT,
+    created_at TIMESTAMP
+);
+CREATE TABLE archive_rollups (
+    user_id BIGINT NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL,
+    total DOUBLE PRECISION NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, category, type)
+);
+CREATE TABLE schema_version (version INTEGER NOT NULL);
+INSERT INTO schema_version (version) VALUES (4);
+INSERT INTO users (username, password) VALUES ('testuser', 'x');
+INSERT INTO transactions (user_id, type, amount, description, category, created_at)
+    VALUES (1, 'income', 12.5, '压岁钱', '零花钱', '2025-03-01 10:00:00'),
+           (1, 'expense', 3.25, NULL, '零食', '2025-03-02 10:00:00');
+INSERT INTO transactions_archive (id, user_id, type, amount, category, created_at)
+    VALUES (100, 1, 'income', 0.1, '零花钱', '2025-01-01 10:00:00');
+INSERT INTO archive_rollups (user_id, month, category, type, total, count)
+    VALUES (1, '2025-01', '零花钱', 'income', 0.1, 1);
+INSERT INTO schedules (user_id, frequency, amount, category, description)
+    VALUES (1, 'daily', 0.5, '零花钱', '每日零花钱');
+INSERT INTO balance_snapshots (user_id, month, income, expense, balance)
+    VALUES (1, '2025-01', 0.1, 0, 0.1);
+"""
+
+TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+
+class TranslateTestCase(unittest.TestCase):
+    """SQLite写法到PostgreSQL语法的改写测试用例"""
+
+    def test_placeholders(self):
+        """测试占位符改写，字符串中的?和%不受影响"""
+        self.assertEqual(
+            translate("SELECT * FROM t WHERE a = ? AND b LIKE '%?' AND c = ?"),
+            "SELECT * FROM t WHERE a = %s AND b ILIKE '%%?' AND c = %s",
+        )
+
+    def test_date_functions(self):
+        """测试日期函数改写，'now'按UTC计算"""
+        self.assertEqual(
+            translate("SELECT strftime('%Y-%m', created_at) FROM t"),
+            "SELECT to_char(created_at, 'YYYY-MM') FROM t",
+        )
+        self.assertEqual(
+            translate("WHERE DATE(created_at) = DATE('now')"),
+            "WHERE CAST(created_at AS DATE) = CAST((now() AT TIME ZONE 'utc') AS DATE)",
+        )
+        self.assertEqual(
+            translate("WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')"),
+            "WHERE to_char(created_at, 'YYYY-MM') = "
+            "to_char((now() AT TIME ZONE 'utc'), 'YYYY-MM')",
+        )
+        self.assertEqual(translate("UPDATE t SET a = ?"), "UPDATE t SET a = %s")
+
+    def test_insert_or_ignore(self):
+        """测试INSERT OR IGNORE改写为ON CONFLICT DO NOTHING"""
+        self.assertEqual(
+            translate("INSERT OR IGNORE INTO t (a) VALUES (?)"),
+            "INSERT INTO t (a) VALUES (%s) ON CONFLICT DO NOTHING",
+        )
+
+
+class StorageFlowTests:
+    """两种存储后端共用的用例：通过接口和定时任务走一遍主要流程"""
+
+    def setUp(self):
+        self.use_backend()
+        self.reset_database()
+
+        conn = self.connect()
+        conn.execute("INSERT INTO users (username, password) VALUES ('testuser', 'x')")
+        self.user_id = conn.execute(
+            "SELECT id FROM users WHERE username = 'testuser'"
+        ).fetchone()["id"]
+        conn.commit()
+        conn.close()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = self.user_id
+
+    def tearDown(self):
+        self.restore_backend()
+
+    def add(self, trans_type, amount, category):
+        response = self.client.post(
+            "/api/transactions",
+            json={"type": trans_type, "amount": amount, "category": category},
+        )
+        self.assertTrue(response.get_json()["success"])
+
+    def test_api_flow(self):
+        """测试记账、查询、统计、修改和删除"""
+        self.add("income", 100, "零花钱")
+        self.add("expense", 30, "零食")
+        self.add("expense", 5, "零食")
+
+        self.assertEqual(self.client.get("/api/balance").get_json()["balance"], 65)
+        listing = self.client.get("/api/transactions").get_json()
+        self.assertEqual(listing["total"], 3)
+        self.assertRegex(listing["transactions"][0]["created_at"], TIMESTAMP)
+
+        categories = self.client.get("/api/categories").get_json()["categories"]
+        snacks = [c for c in categories if c["category"] == "零食"][0]
+        self.assertEqual((snacks["count"], snacks["expense"]), (2, 35))
+
+        monthly = self.client.get("/api/summary/monthly").get_json()["data"]
+        self.assertEqual((monthly[0]["income"], monthly[0]["expense"]), (100, 35))
+
+        overview = self.client.get("/api/stats/overview").get_json()
+        self.assertEqual(overview["today"], {"income": 100, "expense": 35})
+        self.assertEqual(overview["this_month"], {"income": 100, "expense": 35})
+        self.assertEqual(overview["total_transactions"], 3)
+
+        stats = self.client.get("/api/stats").get_json()
+        self.assertEqual(
+            stats["expense_by_category"], [{"category": "零食", "total": 35}]
+        )
+        trends = self.client.get("/api/trends?days=7").get_json()
+        self.assertEqual(trends["balance"], [65])
+
+        found = self.client.get("/api/search/transactions?keyword=零食").get_json()
+        self.assertEqual(found["total"], 2)
+        tx_id = found["transactions"][0]["id"]
+        self.client.put(
+            f"/api/transactions/{tx_id}", json={"amount": 10, "category": "零食"}
+        )
+        self.assertEqual(self.client.get("/api/balance").get_json()["balance"], 60)
+        self.client.delete(f"/api/transactions/{tx_id}")
+        self.assertEqual(self.client.get("/api/balance").get_json()["balance"], 70)
+
+        csv_text = self.client.get("/api/export/transactions").data.decode("utf-8")
+        self.assertEqual(len(csv_text.strip().splitlines()), 3)
+
+    def test_search_ignores_case(self):
+        """测试搜索不区分ASCII字母的大小写，两种后端的结果相同"""
+        self.add("expense", 20, "Lego")
+        self.add("expense", 5, "零食")
+        for keyword in ("lego", "LEGO", "Lego"):
+            found = self.client.get(
+                f"/api/search/transactions?keyword={keyword}"
+            ).get_json()
+            self.assertEqual(found["total"], 1, keyword)
+            self.assertEqual(found["transactions"][0]["category"], "Lego")
+
+    def test_unique_violation(self):
+        """测试唯一约束冲突按sqlite3.IntegrityError抛出"""
+        conn = self.connect()
+        with self.assertRaises(sqlite3.IntegrityError):
+            conn.execute(
+                "INSERT INTO users (username, password) VALUES ('testuser', 'y')"
+            )
+        conn.close()
+
+    def test_scheduler_snapshots_and_archive(self):
+        """测试定时发放、月末快照和归档"""
+        self.client.post("/api/schedules", json={"frequency": "daily", "amount": 2})
+        conn = self.connect()
+        for trans_type, amount, created_at in (
+            ("income", 5000, "2025-01-05 10:00:00"),
+            ("expense", 2000, "2025-02-10 10:00:00"),
+            ("income", 1000, "2025-05-01 10:00:00"),
+        ):
+            repository.add_transaction(
+                conn, self.user_id, trans_type, amount, None, "零花钱", created_at
+            )
+        conn.commit()
+
+        now = datetime(2025, 6, 15, 9, 0)
+        self.assertEqual(scheduler.process_daily_schedules(conn, now), 1)
+        self.assertEqual(scheduler.process_daily_schedules(conn, now), 0)
+        self.assertEqual(scheduler.close_monthly_snapshots(conn, now), 5)
+        self.assertEqual(
+            scheduler.archive_old_transactions(conn, now, after_days=60), 2
+        )
+        conn.close()
+
+        self.assertEqual(self.client.get("/api/balance").get_json()["balance"], 42)
+        as_of = self.client.get("/api/balance/as-of?date=2025-02-28").get_json()
+        self.assertEqual(as_of["balance"], 30)
+        listing = self.client.get("/api/transactions?per_page=10").get_json()
+        self.assertEqual(listing["total"], 4)
+        self.assertEqual(len(listing["transactions"]), 4)
+
+
+class SQLiteStorageTestCase(SQLiteBackend, StorageFlowTests, unittest.TestCase):
+    """SQLite存储后端测试用例"""
+
+    database_path = TEST_DATABASE_PATH
+
+
+@skip_unless_postgres
+class PostgresStorageTestCase(PostgresBackend, SQLiteStorageTestCase):
+    """PostgreSQL存储后端测试用例"""
+
+    def test_upgrade_from_first_schema(self):
+        """测试第一版表结构升级为字典表和整数分，数据保持不变"""
+        self.drop_database()
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            for table in POSTGRES_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+            conn.execute(POSTGRES_SCHEMA_V4)
+
+        conn = self.connect()
+        self.assertEqual(
+            conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0],
+            SCHEMA_VERSION,
+        )
+        rows = conn.execute(
+            """SELECT t.amount, c.name, d.text FROM transactions t
+               LEFT JOIN categories c ON c.id = t.category_id
+               LEFT JOIN descriptions d ON d.id = t.description_id
+               ORDER BY t.id"""
+        ).fetchall()
+        self.assertEqual(
+            [tuple(row) for row in rows],
+            [(1250, "零花钱", "压岁钱"), (325, "零食", None)],
+        )
+        schedule = conn.execute(
+            """SELECT s.amount, c.name FROM schedules s
+               JOIN categories c ON c.id = s.category_id"""
+        ).fetchone()
+        self.assertEqual(tuple(schedule), (50, "零花钱"))
+        rollup = conn.execute(
+            "SELECT total, category_id FROM archive_rollups"
+        ).fetchone()
+        self.assertEqual(rollup["total"], 10)
+        self.assertNotEqual(rollup["category_id"], 0)
+        conn.close()
+
+        self.assertEqual(self.client.get("/api/balance").get_json()["balance"], 9.35)
+        as_of = self.client.get("/api/balance/as-of?date=2025-01-31").get_json()
+        self.assertEqual(as_of["balance"], 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -3,7 +3,6 @@
 """
 
 import os
-import sqlite3
 import unittest
 
 from werkzeug.security import generate_password_hash
@@ -17,60 +16,30 @@ TEST_DATABASE_PATH = os.path.join(
 os.environ["TEST_DATABASE_PATH"] = TEST_DATABASE_PATH
 
 from backend.app import app
+from backend.testing import PostgresBackend, SQLiteBackend, skip_unless_postgres
 
 
-class TransactionTestCase(unittest.TestCase):
+class TransactionTestCase(SQLiteBackend, unittest.TestCase):
     """交易功能测试用例"""
 
+    database_path = TEST_DATABASE_PATH
+
     @classmethod
     def setUpClass(cls):
         """测试类初始化，创建测试数据库和测试用户"""
-        # 设置测试数据库路径
-        app.config["TESTING"] = True
-        app.config["DATABASE_PATH"] = TEST_DATABASE_PATH
-
-        # 删除可能存在的旧测试数据库
-        if os.path.exists(TEST_DATABASE_PATH):
-            os.remove(TEST_DATABASE_PATH)
-
-        # 创建测试数据库
-        conn = sqlite3.connect(TEST_DATABASE_PATH)
-        cursor = conn.cursor()
-
-        # 创建表结构
-        cursor.execute(
-            """
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        )
+        # 使用测试数据库
+        cls.use_backend()
 
-        cursor.execute(
-            """
-            CREATE TABLE transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                type TEXT NOT NULL,
-                amount REAL NOT NULL,
-                description TEXT,
-                category TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        """
-        )
+        # 删除可能存在的旧测试数据库，按当前表结构重建
+        cls.reset_database()
 
         # 创建测试用户
+        conn = cls.connect()
         hashed_password = generate_password_hash("test123")
-        cursor.execute(
-            "INSERT INTO users (id, username, password) VALUES (?, ?, ?)",
-            (1, "testuser", hashed_password),
+        conn.execute(
+            "INSERT INTO users (username, password) VALUES (?, ?)",
+            ("testuser", hashed_password),
         )
-
         conn.commit()
         conn.close()
 
@@ -84,26 +53,23 @@ class TransactionTestCase(unittest.TestCase):
             sess["username"] = "testuser"
 
         # 彻底清空交易记录
-        conn = sqlite3.connect(TEST_DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM transactions")
-        conn.commit()
-        conn.close()
+        self.clear_transactions()
 
     def tearDown(self):
         """每个测试方法执行后的清理工作"""
         # 彻底清空交易记录
-        conn = sqlite3.connect(TEST_DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM transactions")
-        conn.commit()
-        conn.close()
+        self.clear_transactions()
 
     @classmethod
     def tearDownClass(cls):
         """测试类清理，删除测试数据库"""
-        if os.path.exists(TEST_DATABASE_PATH):
-            os.remove(TEST_DATABASE_PATH)
+        cls.restore_backend()
+
+    def clear_transactions(self):
+        conn = self.connect()
+        conn.execute("DELETE FROM transactions")
+        conn.commit()
+        conn.close()
 
     def test_add_income(self):
         """测试添加收入记录"""
@@ -391,6 +357,11 @@ class TransactionTestCase(unittest.TestCase):
         self.assertFalse(data["success"])
 
 
+@skip_unless_postgres
+class PostgresTransactionTestCase(PostgresBackend, TransactionTestCase):
+    """在PostgreSQL上运行的交易功能测试用例"""
+
+
 if __name__ == "__main__":
     # 临时修改app模块的数据库路径
     import app as app_module
@@ -0,0 +1,164 @@
+"""
+趋势接口降采样、补齐和期初余额的测试用例
+"""
+
+import os
+import sqlite3
+import unittest
+from datetime import datetime, timedelta
+
+from backend import repository
+from backend.app import app
+from backend.downsample import lttb, minmax
+from backend.money import to_cents
+
+TEST_DATABASE_PATH = os.path.join(
+    os.path.dirname(__file__), "database", "test_cash_manager_trends.db"
+)
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+
+
+class DownsampleTestCase(unittest.TestCase):
+    """降采样算法测试用例"""
+
+    def test_lttb_keeps_endpoints_and_peak(self):
+        """测试LTTB保留首尾点和明显的峰值"""
+        ys = [0.0] * 1000
+        ys[500] = 100.0
+        keep = lttb(list(range(1000)), ys, 50)
+
+        self.assertEqual(len(keep), 50)
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], 999)
+        self.assertIn(500, keep)
+        self.assertEqual(keep, sorted(keep))
+
+    def test_lttb_short_series_unchanged(self):
+        """测试点数不超过阈值时不降采样"""
+        self.assertEqual(lttb([0, 1, 2], [1, 2, 3], 10), [0, 1, 2])
+
+    def test_minmax_keeps_extremes(self):
+        """测试minmax保留每个桶的最小值和最大值"""
+        ys = [(i % 10) - (50 if i == 321 else 0) for i in range(1000)]
+        keep = minmax(ys, 100)
+
+        self.assertLessEqual(len(keep), 100)
+        self.assertIn(321, keep)
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], 999)
+
+    def test_small_budget_is_bounded(self):
+        """测试点数上限很小时两种方式都不超过上限，并保留首尾点"""
+        xs = list(range(500))
+        ys = [i % 13 for i in xs]
+        for max_points in (1, 2, 3, 4, 5, 10):
+            for keep in (lttb(xs, ys, max_points), minmax(ys, max_points)):
+                self.assertLessEqual(len(keep), max_points)
+                self.assertEqual(keep[0], 0)
+                if max_points >= 2:
+                    self.assertEqual(keep[-1], 499)
+
+
+class TrendsTestCase(unittest.TestCase):
+    """趋势接口测试用例"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config["TESTING"] = True
+
+    def setUp(self):
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        conn.execute(
+            "INSERT INTO users (id, username, password) VALUES (1, 'testuser', 'x')"
+        )
+        conn.commit()
+        conn.close()
+
+        self.saved_database_path = app.config.get("DATABASE_PATH")
+        app.config["DATABASE_PATH"] = TEST_DATABASE_PATH
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["username"] = "testuser"
+
+    def tearDown(self):
+        if self.saved_database_path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = self.saved_database_path
+        if os.path.exists(TEST_DATABASE_PATH):
+            os.remove(TEST_DATABASE_PATH)
+
+    def add_transactions(self, rows):
+        conn = sqlite3.connect(TEST_DATABASE_PATH)
+        for trans_type, amount, created_at in rows:
+            repository.add_transaction(
+                conn, 1, trans_type, to_cents(amount), None, "测试", created_at
+            )
+        conn.commit()
+        conn.close()
+
+    def days_ago(self, days):
+        return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d 12:00:00")
+
+    def test_opening_balance(self):
+        """测试余额曲线从窗口开始前的余额起算"""
+        self.add_transactions(
+            [
+                ("income", 100.0, self.days_ago(60)),
+                ("expense", 30.0, self.days_ago(45)),
+                ("income", 10.0, self.days_ago(3)),
+            ]
+        )
+        data = self.client.get("/api/trends?days=7").get_json()
+
+        self.assertEqual(data["opening_balance"], 70.0)
+        self.assertEqual(data["balance"], [80.0])
+
+    def test_gap_filling(self):
+        """测试fill=1时补齐没有交易的日期"""
+        self.add_transactions(
+            [("income", 10.0, self.days_ago(5)), ("expense", 4.0, self.days_ago(2))]
+        )
+        data = self.client.get("/api/trends?days=7&fill=1").get_json()
+
+        self.assertEqual(len(data["dates"]), 8)
+        self.assertEqual(data["dates"][-1], datetime.now().strftime("%Y-%m-%d"))
+        self.assertEqual(sum(data["income"]), 10.0)
+        self.assertEqual(data["income"].count(0), 7)
+        self.assertEqual(data["balance"][-1], 6.0)
+        self.assertFalse(data["downsampled"])
+
+    def test_long_range_is_bounded(self):
+        """测试很长的时间范围也只返回max_points个点"""
+        amounts = [(i, float(i % 7)) for i in range(0, 3650, 2)]
+        self.add_transactions(
+            [("income", amount, self.days_ago(i)) for i, amount in amounts]
+        )
+        for method in ("lttb", "minmax"):
+            data = self.client.get(
+                f"/api/trends?days=3650&fill=1&max_points=200&downsample={method}"
+            ).get_json()
+
+            self.assertTrue(data["downsampled"])
+            self.assertLessEqual(len(data["dates"]), 200)
+            self.assertEqual(len(data["dates"]), len(data["balance"]))
+            self.assertEqual(data["dates"], sorted(data["dates"]))
+            # 最后一个点仍是当前余额，收支合计不因降采样丢失
+            self.assertEqual(data["balance"][-1], sum(a for _, a in amounts))
+            self.assertAlmostEqual(sum(data["income"]), sum(a for _, a in amounts))
+
+        for method in ("lttb", "minmax"):
+            data = self.client.get(
+                f"/api/trends?days=3650&fill=1&max_points=3&downsample={method}"
+            ).get_json()
+            self.assertLessEqual(len(data["dates"]), 3)
+            self.assertAlmostEqual(sum(data["income"]), sum(a for _, a in amounts))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
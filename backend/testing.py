@@ -0,0 +1,113 @@
+"""
+测试用例使用的存储后端
+
+接口测试在SQLite和PostgreSQL上各运行一次：测试类混入SQLiteBackend，PostgreSQL的测试类
+再混入PostgresBackend（用skip_unless_postgres标记）。用例只通过connect()访问测试库，
+SQL按SQLite的写法编写，与业务代码一样由存储后端改写。
+
+设置 TEST_DATABASE_URL=postgresql://... 并安装psycopg后运行PostgreSQL的用例
+（测试会删除并重建该数据库中的表，请使用单独的测试库）。
+"""
+
+import os
+import unittest
+
+from backend import scheduler
+from backend.app import app
+from backend.storage import psycopg
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# 重建PostgreSQL测试库时删除的表
+POSTGRES_TABLES = (
+    "archive_rollups",
+    "archive_horizons",
+    "transactions_archive",
+    "balance_snapshots",
+    "schedules",
+    "transactions",
+    "descriptions",
+    "categories",
+    "users",
+    "schema_version",
+)
+
+skip_unless_postgres = unittest.skipUnless(
+    TEST_DATABASE_URL and psycopg is not None,
+    "需要设置TEST_DATABASE_URL并安装psycopg[binary,pool]",
+)
+
+
+class SQLiteBackend:
+    """SQLite测试库：database_path指定的数据库文件"""
+
+    database_path = None
+    database_url = None
+
+    @classmethod
+    def use_backend(cls):
+        """应用和定时任务改用测试库，restore_backend()时恢复"""
+        cls._saved_backend = (
+            app.config.get("DATABASE_PATH"),
+            app.config.get("DATABASE_URL"),
+            scheduler.DATABASE_URL,
+        )
+        app.config.update(
+            TESTING=True,
+            DATABASE_PATH=cls.database_path,
+            DATABASE_URL=cls.database_url,
+        )
+        scheduler.DATABASE_URL = cls.database_url
+
+    @classmethod
+    def restore_backend(cls):
+        """删除测试库，恢复use_backend()之前的配置"""
+        cls.drop_database()
+        path, url, scheduler_url = cls._saved_backend
+        if path is None:
+            app.config.pop("DATABASE_PATH", None)
+        else:
+            app.config["DATABASE_PATH"] = path
+        app.config["DATABASE_URL"] = url
+        scheduler.DATABASE_URL = scheduler_url
+
+    @classmethod
+    def connect(cls):
+        """测试库的连接（与定时任务相同），行按列名和下标取值"""
+        return scheduler.get_db_connection(cls.database_path)
+
+    @classmethod
+    def reset_database(cls):
+        """删除测试库并按当前表结构重建"""
+        cls.drop_database()
+        cls.connect().close()
+
+    @classmethod
+    def drop_database(cls):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(cls.database_path + suffix):
+                os.remove(cls.database_path + suffix)
+
+
+class PostgresBackend:
+    """PostgreSQL测试库：TEST_DATABASE_URL指定的数据库，混入在SQLiteBackend之前"""
+
+    database_url = TEST_DATABASE_URL
+
+    @classmethod
+    def reset_database(cls):
+        cls.drop_database()
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            for table in POSTGRES_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+        cls.connect().close()
+
+    @classmethod
+    def drop_database(cls):
+        """关闭应用和定时任务的连接池，下一次取连接时重新检查表结构"""
+        storage = app.extensions.pop("postgres_storage", None)
+        if storage is not None:
+            storage.close()
+        if scheduler.storage is not None:
+            scheduler.storage.close()
+            scheduler.storage = None
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+接口和定时任务基准测试
+
+在临时目录中按"用户数 × 年数 × 每天交易数"生成确定的模拟数据（同一个--seed每次相同），
+然后：
+
+- 依次请求app.py中的每个路由（部分路由有多种参数），记录每次请求的耗时分布、
+  SQL语句数和状态码；新增路由没有对应的测试项时列在"未覆盖"中
+- 依次执行scheduler.py中的每个定时任务，发放、结账和归档按虚拟时间逐次向后推进，
+  每次执行都有实际要处理的数据
+
+结果可以保存为JSON（--json），用--compare和之前保存的结果比较，中位数变慢超过
+--threshold时以退出码1结束，便于在不同提交之间发现性能回退。
+
+使用方法:
+python benchmarks/bench_api.py
+python benchmarks/bench_api.py --users 50 --years 3 --per-day 4 --json results.json
+python benchmarks/bench_api.py --set ANALYTICS_ENGINE=1 --compare results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend import repository, scheduler  # noqa: E402
+from backend.app import app, get_password_hasher  # noqa: E402
+from backend.generate_test_data import create_users, generate_dataset  # noqa: E402
+
+PASSWORD = "bench123"
+
+# 不属于app.py业务接口的路由
+IGNORED_ENDPOINTS = {"static", "serve_asset"}
+
+# 哈希密码的接口每次请求要数十毫秒CPU，最多请求这么多次
+HASHING_REQUESTS = 10
+
+# 一个测试项：name为报告中的名称；make(ctx, i)返回第i次请求的(客户端, url, 参数)，
+# 参数为{"json": ...}或{"data": ...}；准备工作在make中完成，不计入耗时
+Case = namedtuple("Case", "name method endpoint make limit")
+
+
+def case(name, endpoint, make, limit=None):
+    method, _ = name.split(" ", 1)
+    return Case(name, method, endpoint, make, limit)
+
+
+class Context:
+    """每个模拟用户一个已登录的测试客户端，按固定的随机序列选择用户"""
+
+    def __init__(self, users, seed):
+        self.users = users
+        self.rng = random.Random(seed)
+        self.clients = {}
+
+    def client(self, user_id=None):
+        user_id = user_id or self.rng.randint(1, self.users)
+        client = self.clients.get(user_id)
+        if client is None:
+            client = self.clients[user_id] = app.test_client()
+            self.login(client, user_id)
+        return client, user_id
+
+    def login(self, client, user_id):
+        with client.session_transaction() as sess:
+            sess["user_id"] = user_id
+            sess["username"] = f"bench_{user_id}"
+
+    def connection(self):
+        return scheduler.get_db_connection(app.config["DATABASE_PATH"])
+
+    def add_transaction(self, user_id):
+        """为删除和修改接口准备一笔交易，返回id"""
+        conn = self.connection()
+        repository.add_transaction(conn, user_id, "expense", 100, "待删除", "零食")
+        tx_id = conn.execute("SELECT MAX(id) FROM transactions").fetchone()[0]
+        conn.commit()
+        conn.close()
+        return tx_id
+
+    def add_schedule(self, user_id):
+        conn = self.connection()
+        repository.add_schedule(conn, user_id, "daily", 100, "零花钱", "", None, None)
+        schedule_id = conn.execute("SELECT MAX(id) FROM schedules").fetchone()[0]
+        conn.commit()
+        conn.close()
+        return schedule_id
+
+    def oldest_transaction(self, user_id):
+        conn = self.connection()
+        tx_id = conn.execute(
+            "SELECT MIN(id) FROM transactions WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+        conn.close()
+        return tx_id
+
+
+def _get(path):
+    def make(ctx, i):
+        client, _ = ctx.client()
+        return client, path, {}
+
+    return make
+
+
+def _post_transaction(ctx, i):
+    client, _ = ctx.client()
+    return client, "/api/transactions", {
+        "json": {"type": "expense", "amount": "1.25", "category": "零食"}
+    }
+
+
+def _delete_transaction(ctx, i):
+    client, user_id = ctx.client()
+    return client, f"/api/transactions/{ctx.add_transaction(user_id)}", {}
+
+
+def _update_transaction(ctx, i):
+    # 修改最早的交易：已结账月份的快照需要重建，是最慢的情况
+    client, user_id = ctx.client()
+    tx_id = ctx.oldest_transaction(user_id)
+    return client, f"/api/transactions/{tx_id}", {
+        "json": {"amount": 2 + i % 2, "category": "零食"}
+    }
+
+
+def _post_schedule(ctx, i):
+    client, _ = ctx.client()
+    return client, "/api/schedules", {"json": {"frequency": "weekly", "amount": 5}}
+
+
+def _delete_schedule(ctx, i):
+    client, user_id = ctx.client()
+    return client, f"/api/schedules/{ctx.add_schedule(user_id)}", {}
+
+
+def _login_page(ctx, i):
+    return app.test_client(), "/login", {}
+
+
+def _login(ctx, i):
+    return app.test_client(), "/login", {
+        "data": {"username": f"bench_{i % ctx.users + 1}", "password": PASSWORD}
+    }
+
+
+def _register(ctx, i):
+    return app.test_client(), "/register", {
+        "json": {"username": f"bench_new_{os.getpid()}_{i}", "password": PASSWORD}
+    }
+
+
+def _change_password(ctx, i):
+    # 最后一个用户来回修改密码
+    client, _ = ctx.client(ctx.users)
+    old, new = (PASSWORD, PASSWORD + "!") if i % 2 == 0 else (PASSWORD + "!", PASSWORD)
+    return client, "/api/change-password", {
+        "json": {"old_password": old, "new_password": new}
+    }
+
+
+def _logout(ctx, i):
+    client, user_id = ctx.client()
+    ctx.login(client, user_id)
+    return client, "/logout", {}
+
+
+CASES = [
+    case("GET /", "index", _get("/")),
+    case("GET /set_language/en_US", "set_language", _get("/set_language/en_US")),
+    case("GET /login", "login", _login_page),
+    case("POST /login", "login", _login, HASHING_REQUESTS),
+    case("POST /register", "register", _register, HASHING_REQUESTS),
+    case("GET /dashboard", "dashboard", _get("/dashboard")),
+    case("GET /api/transactions", "transactions", _get("/api/transactions")),
+    case(
+        "GET /api/transactions?page=50&per_page=20",
+        "transactions",
+        _get("/api/transactions?page=50&per_page=20"),
+    ),
+    case(
+        "GET /api/transactions?format=columnar",
+        "transactions",
+        _get("/api/transactions?per_page=100&format=columnar&dictionary=1"),
+    ),
+    case("POST /api/transactions", "transactions", _post_transaction),
+    case("DELETE /api/transactions/<id>", "delete_transaction", _delete_transaction),
+    case("PUT /api/transactions/<id>", "update_transaction", _update_transaction),
+    case("GET /api/balance", "balance", _get("/api/balance")),
+    case(
+        "GET /api/balance/as-of",
+        "balance_as_of_date",
+        _get(f"/api/balance/as-of?date={date.today() - timedelta(days=40)}"),
+    ),
+    case("GET /api/trends?days=30", "trends", _get("/api/trends?days=30")),
+    case(
+        "GET /api/trends?days=365&fill=1",
+        "trends",
+        _get("/api/trends?days=365&fill=1&max_points=200"),
+    ),
+    case("GET /api/stats", "stats", _get("/api/stats")),
+    case("GET /api/stats/overview", "stats_overview", _get("/api/stats/overview")),
+    case("GET /api/summary/monthly", "monthly_summary", _get("/api/summary/monthly")),
+    case("GET /api/categories", "get_categories", _get("/api/categories")),
+    case("GET /api/schedules", "schedules", _get("/api/schedules")),
+    case("POST /api/schedules", "schedules", _post_schedule),
+    case("DELETE /api/schedules/<id>", "delete_schedule", _delete_schedule),
+    case(
+        "GET /api/search/transactions",
+        "search_transactions",
+        _get("/api/search/transactions?keyword=零食&per_page=20"),
+    ),
+    case(
+        "GET /api/export/transactions",
+        "export_transactions",
+        _get(f"/api/export/transactions?start_date={date.today() - timedelta(days=90)}"),
+    ),
+    case(
+        "POST /api/change-password",
+        "change_password",
+        _change_password,
+        HASHING_REQUESTS,
+    ),
+    case("GET /metrics", "export_metrics", _get("/metrics")),
+    case("GET /logout", "logout", _logout),
+]
+
+
+def _month_start(moment, months):
+    """moment之后第months个月的1号9点"""
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, 9)
+
+
+def processors(base, archive_days, backup_dir):
+    """定时任务 {名称: run(i)}：第i次执行的虚拟时间依次向后推进"""
+    return {
+        "process_daily_schedules": lambda i: scheduler.process_daily_schedules(
+            now=base + timedelta(days=i)
+        ),
+        "process_weekly_schedules": lambda i: scheduler.process_weekly_schedules(
+            now=base + timedelta(weeks=i)
+        ),
+        "process_monthly_schedules": lambda i: scheduler.process_monthly_schedules(
+            now=_month_start(base, i + 1)
+        ),
+        "close_monthly_snapshots": lambda i: scheduler.close_monthly_snapshots(
+            now=_month_start(base, i + 1)
+        ),
+        "archive_old_transactions": lambda i: scheduler.archive_old_transactions(
+            now=_month_start(base, i + 1), after_days=archive_days
+        ),
+        "analyze_database": lambda i: scheduler.analyze_database(min_changes=0),
+        "vacuum_database": lambda i: scheduler.vacuum_database(),
+        "checkpoint_database": lambda i: scheduler.checkpoint_database(),
+        "check_database": lambda i: scheduler.check_database(),
+        "backup_databases": lambda i: scheduler.backup_databases(
+            now=base + timedelta(days=i), backup_dir=backup_dir, keep=1
+        ),
+    }
+
+
+def build_dataset(path, users, years, per_day, seed, archive_days):
+    """用backend/generate_test_data.py生成模拟数据，返回交易笔数
+
+    用户id为1到users、用户名为bench_加id；生成后为已结束的月份建立快照，
+    archive_days大于0时归档旧交易。
+    """
+    conn = scheduler.get_db_connection(path)
+    try:
+        user_ids = create_users(
+            conn, users, get_password_hasher().hash(PASSWORD), prefix="bench_"
+        )
+        return generate_dataset(
+            conn,
+            user_ids,
+            round(365.25 * years) + 1,
+            per_day,
+            seed,
+            archive_days=archive_days,
+        )
+    finally:
+        conn.close()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(durations, queries, statuses=None):
+    """耗时（秒）列表转换为毫秒的分布，附平均SQL语句数和状态码计数"""
+    ms = sorted(d * 1000 for d in durations)
+    summary = {
+        "count": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 0.5), 3),
+        "p90_ms": round(percentile(ms, 0.9), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "max_ms": round(ms[-1], 3) if ms else 0.0,
+        "queries": round(sum(queries) / len(queries), 1) if queries else 0.0,
+    }
+    if statuses is not None:
+        summary["status"] = {str(code): n for code, n in sorted(statuses.items())}
+    return summary
+
+
+def run_case(ctx, item, requests, warmup):
+    limit = requests if item.limit is None else min(requests, item.limit)
+    durations, queries, statuses = [], [], Counter()
+    for i in range(warmup + limit):
+        client, url, kwargs = item.make(ctx, i)
+        with repository.count_queries() as counter:
+            began = time.perf_counter()
+            response = client.open(url, method=item.method, **kwargs)
+            response.get_data()
+            elapsed = time.perf_counter() - began
+        response.close()
+        if i < warmup:
+            continue
+        durations.append(elapsed)
+        queries.append(counter.count)
+        statuses[response.status_code] += 1
+    return summarize(durations, queries, statuses)
+
+
+def run_processor(run, runs):
+    durations, queries = [], []
+    for i in range(runs):
+        with repository.count_queries() as counter:
+            began = time.perf_counter()
+            run(i)
+            durations.append(time.perf_counter() - began)
+        queries.append(counter.count)
+    return summarize(durations, queries)
+
+
+def uncovered_routes():
+    """app.py中没有测试项的路由和方法"""
+    covered = {(item.method, item.endpoint) for item in CASES}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint in IGNORED_ENDPOINTS:
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if (method, rule.endpoint) not in covered:
+                missing.append(f"{method} {rule.rule}")
+    return missing
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def apply_settings(settings):
+    """--set KEY=VALUE：按app.config中原值的类型转换后覆盖"""
+    applied = {}
+    for setting in settings:
+        key, _, value = setting.partition("=")
+        current = app.config.get(key)
+        if isinstance(current, bool):
+            value = value.lower() in ("1", "true", "yes")
+        elif isinstance(current, int):
+            value = int(value)
+        elif isinstance(current, float):
+            value = float(value)
+        app.config[key] = applied[key] = value
+    return applied
+
+
+def compare(results, baseline, threshold):
+    """与之前的结果比较中位数，返回变慢超过threshold的项"""
+    regressions = []
+    print(f"\n与 {baseline.get('commit') or '基准'} 比较（中位数，超过{threshold:.0%}标记）")
+    for section in ("routes", "processors"):
+        for name, current in results[section].items():
+            before = baseline.get(section, {}).get(name)
+            if not before or not before["p50_ms"]:
+                continue
+            ratio = current["p50_ms"] / before["p50_ms"]
+            mark = " <- 变慢" if ratio > 1 + threshold else ""
+            if mark:
+                regressions.append(name)
+            print(
+                f"{name:<48}{before['p50_ms']:>10.2f}{current['p50_ms']:>10.2f}"
+                f"{ratio:>8.2f}x{mark}"
+            )
+    return regressions
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'名称':<48}{'次数':>6}{'p50':>10}{'p95':>10}{'最大':>10}{'SQL数':>8}")
+    for name, s in rows.items():
+        print(
+            f"{name:<48}{s['count']:>6}{s['p50_ms']:>8.2f}ms{s['p95_ms']:>8.2f}ms"
+            f"{s['max_ms']:>8.2f}ms{s['queries']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口和定时任务基准测试")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--per-day", type=int, default=3, help="每个用户每天的平均交易数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=50, help="每个接口测试项的请求次数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个测试项不计时的预热请求数")
+    parser.add_argument("--runs", type=int, default=5, help="每个定时任务的执行次数")
+    parser.add_argument("--archive-days", type=int, default=0,
+                        help="生成数据后归档早于多少天的交易（0为不归档）")
+    parser.add_argument("--only", help="只运行名称包含该字符串的测试项")
+    parser.add_argument("--set", dest="settings", action="append", default=[],
+                        metavar="KEY=VALUE", help="覆盖app.config，可重复")
+    parser.add_argument("--json", dest="json_path", help="将结果写入JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果比较")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="中位数变慢超过该比例视为回退（默认0.2）")
+    args = parser.parse_args()
+
+    logging.getLogger(scheduler.__name__).setLevel(logging.WARNING)
+    tmp = tempfile.mkdtemp(prefix="cash_manager_bench_")
+    app.config.update(TESTING=True, DATABASE_PATH=os.path.join(tmp, "bench.db"))
+    settings = apply_settings(args.settings)
+    scheduler.configure(app.config)
+
+    try:
+        began = time.perf_counter()
+        count = build_dataset(
+            app.config["DATABASE_PATH"],
+            args.users,
+            args.years,
+            args.per_day,
+            args.seed,
+            args.archive_days,
+        )
+        build_seconds = time.perf_counter() - began
+        print(
+            f"{args.users} 个用户 × {args.years:g} 年 × 每天约 {args.per_day} 笔："
+            f"{count} 笔交易，生成耗时 {build_seconds:.1f}s"
+        )
+
+        ctx = Context(args.users, args.seed)
+        routes = {}
+        for item in CASES:
+            if args.only and args.only not in item.name:
+                continue
+            routes[item.name] = run_case(ctx, item, args.requests, args.warmup)
+        print_table("接口", routes)
+
+        base = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+        base = base.replace(hour=9)
+        jobs = {}
+        for name, run in processors(
+            base, args.archive_days or 180, os.path.join(tmp, "backups")
+        ).items():
+            if args.only and args.only not in name:
+                continue
+            jobs[name] = run_processor(run, args.runs)
+        print_table("定时任务", jobs)
+
+        missing = uncovered_routes()
+        if missing:
+            print(f"\n未覆盖的路由: {', '.join(missing)}")
+    finally:
+        pools = app.extensions.pop("database_pools", None)
+        if pools is not None:
+            pools.close()
+        hasher = app.extensions.pop("password_hasher", None)
+        if hasher is not None:
+            hasher.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "dataset": {
+            "users": args.users,
+            "years": args.years,
+            "per_day": args.per_day,
+            "seed": args.seed,
+            "archive_days": args.archive_days,
+            "transactions": count,
+            "build_seconds": round(build_seconds, 3),
+        },
+        "settings": settings,
+        "requests": args.requests,
+        "runs": args.runs,
+        "routes": routes,
+        "processors": jobs,
+        "uncovered": missing,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json_path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+响应压缩基准测试
+
+用与线上相近的负载（一页交易记录、一年的趋势数据、分类统计、CSV导出）
+比较 gzip/deflate 在不同压缩级别下的CPU耗时和节省的字节数。
+
+使用方法:
+python benchmarks/bench_compression.py
+python benchmarks/bench_compression.py --levels 1 6 9 --rows 20000
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.http_compression import ENCODINGS, compress_bytes  # noqa: E402
+
+CATEGORIES = ["零花钱", "奖励", "红包", "零食", "文具", "玩具", "书籍", "交通"]
+
+
+def build_payloads(rows, seed=42):
+    """生成各接口的代表性响应体"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    transactions = [
+        {
+            "id": i,
+            "user_id": 1,
+            "type": rng.choice(["income", "expense"]),
+            "amount": round(rng.uniform(1, 100), 2),
+            "category": rng.choice(CATEGORIES),
+            "description": f"测试记录{i}",
+            "created_at": (start + timedelta(minutes=37 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        for i in range(rows)
+    ]
+
+    days = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(365)]
+    trends = {
+        "success": True,
+        "dates": days,
+        "income": [round(rng.uniform(0, 50), 2) for _ in days],
+        "expense": [round(rng.uniform(0, 50), 2) for _ in days],
+        "balance": [round(rng.uniform(0, 500), 2) for _ in days],
+    }
+    categories = {
+        "success": True,
+        "categories": [
+            {"category": c, "income": 100.5, "expense": 88.2, "count": 42}
+            for c in CATEGORIES
+        ],
+    }
+
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["日期", "类型", "金额", "分类", "备注"])
+    for tx in transactions:
+        writer.writerow(
+            [tx["created_at"], tx["type"], tx["amount"], tx["category"], tx["description"]]
+        )
+
+    return {
+        "transactions(100)": json.dumps(
+            {"success": True, "transactions": transactions[:100], "total": rows}
+        ).encode(),
+        "trends(365d)": json.dumps(trends).encode(),
+        "categories": json.dumps(categories).encode(),
+        f"export({rows})": output.getvalue().encode("utf-8"),
+    }
+
+
+def measure(data, encoding, level, min_seconds=0.2):
+    """返回(平均压缩耗时秒, 压缩后字节数)"""
+    runs = 0
+    began = time.perf_counter()
+    while True:
+        compressed = compress_bytes(data, encoding, level)
+        runs += 1
+        elapsed = time.perf_counter() - began
+        if elapsed >= min_seconds:
+            return elapsed / runs, len(compressed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应压缩基准测试")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 3, 6, 9])
+    parser.add_argument("--rows", type=int, default=5000, help="CSV导出的行数")
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.rows)
+    print(f"{'负载':<20}{'编码':<9}{'级别':>4}{'原始':>10}{'压缩后':>10}"
+          f"{'节省':>8}{'耗时':>11}{'MB/s':>9}")
+    for name, data in payloads.items():
+        for encoding in ENCODINGS:
+            for level in args.levels:
+                seconds, size = measure(data, encoding, level)
+                saved = 1 - size / len(data)
+                print(
+                    f"{name:<20}{encoding:<9}{level:>4}{len(data):>10}{size:>10}"
+                    f"{saved:>8.1%}{seconds * 1e6:>9.0f}µs"
+                    f"{len(data) / seconds / 1e6:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
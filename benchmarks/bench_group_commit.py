@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+合并提交基准测试
+
+在临时目录的数据库文件上，用多个线程并发调用 POST /api/transactions，
+比较逐条提交和合并提交（不同等待窗口）下每秒写入的笔数和每批平均写入数。
+
+使用方法:
+python benchmarks/bench_group_commit.py
+python benchmarks/bench_group_commit.py --threads 32 --writes 50 --windows 0 2 5
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.app import app  # noqa: E402
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "backend", "database", "schema.sql"
+)
+
+
+def create_database(path):
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.execute("INSERT INTO users (id, username, password) VALUES (1, 'bench', 'x')")
+    conn.commit()
+    conn.close()
+
+
+def run(threads, writes):
+    """返回(总耗时秒, 总写入数)"""
+
+    def worker():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = 1
+        for _ in range(writes):
+            client.post(
+                "/api/transactions",
+                json={"type": "income", "amount": 1, "category": "测试"},
+            )
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    began = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - began, threads * writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并提交基准测试")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=50, help="每个线程的写入数")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5],
+                        help="要测试的合并提交等待窗口（毫秒）")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="cash_manager_bench_")
+    app.config["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+
+    modes = [("逐条提交", None)] + [(f"合并提交 {w:g}ms", w) for w in args.windows]
+    print(f"{args.threads} 个线程，每个线程写入 {args.writes} 笔")
+    print(f"{'模式':<16}{'每秒写入':>10}{'每批平均':>10}")
+    try:
+        for name, window in modes:
+            create_database(app.config["DATABASE_PATH"])
+            app.config["GROUP_COMMIT"] = window is not None
+            app.config["GROUP_COMMIT_WINDOW_MS"] = window or 0
+            elapsed, total = run(args.threads, args.writes)
+
+            committers = app.extensions.pop("group_committers", {})
+            per_batch = "-"
+            for committer in committers.values():
+                committer.shutdown()
+                per_batch = f"{committer.operations / max(committer.batches, 1):.1f}"
+            print(f"{name:<16}{total / elapsed:>10.0f}{per_batch:>10}")
+            os.remove(app.config["DATABASE_PATH"])
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+登录吞吐量基准测试
+
+在临时数据库上用多个线程并发请求 /login，分别测试在请求线程中直接哈希和
+使用进程池哈希时每秒可处理的登录数，同时测量登录高峰期间 /api/balance 的延迟，
+以观察哈希计算是否会卡住其他API。
+
+使用方法:
+python benchmarks/bench_login.py
+python benchmarks/bench_login.py --method pbkdf2:sha256:600000 --threads 16 --seconds 10
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from backend.app import app  # noqa: E402
+
+
+def create_database(path, method):
+    conn = sqlite3.connect(path)
+    with open(
+        os.path.join(os.path.dirname(__file__), "..", "backend", "database", "schema.sql"),
+        encoding="utf-8",
+    ) as f:
+        conn.executescript(f.read())
+    conn.execute(
+        "INSERT INTO users (id, username, password) VALUES (1, 'bench', ?)",
+        (generate_password_hash("bench123", method),),
+    )
+    conn.commit()
+    conn.close()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(workers, method, threads, seconds):
+    """运行一轮测试，返回(每秒登录数, balance请求p50, balance请求p95)"""
+    app.config["PASSWORD_HASH_WORKERS"] = workers
+    app.config["PASSWORD_HASH_METHOD"] = method
+    app.config["PASSWORD_HASH_QUEUE"] = threads * 2
+    old = app.extensions.pop("password_hasher", None)
+    if old is not None:
+        old.shutdown()
+
+    # 预热进程池
+    warm = app.test_client()
+    warm.post("/login", data={"username": "bench", "password": "bench123"})
+
+    stop = threading.Event()
+    logins = [0] * threads
+    balance_latencies = []
+
+    def login_worker(index):
+        client = app.test_client()
+        while not stop.is_set():
+            response = client.post(
+                "/login", data={"username": "bench", "password": "bench123"}
+            )
+            if response.status_code == 302:
+                logins[index] += 1
+
+    def balance_worker():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = 1
+        while not stop.is_set():
+            began = time.perf_counter()
+            client.get("/api/balance")
+            balance_latencies.append(time.perf_counter() - began)
+            time.sleep(0.01)
+
+    pool = [threading.Thread(target=login_worker, args=(i,)) for i in range(threads)]
+    pool.append(threading.Thread(target=balance_worker))
+    for t in pool:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in pool:
+        t.join()
+
+    return (
+        sum(logins) / seconds,
+        percentile(balance_latencies, 0.50) * 1000,
+        percentile(balance_latencies, 0.95) * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录吞吐量基准测试")
+    parser.add_argument("--method", default=app.config["PASSWORD_HASH_METHOD"])
+    parser.add_argument("--threads", type=int, default=8, help="并发登录线程数")
+    parser.add_argument("--seconds", type=float, default=5, help="每轮持续时间")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[0, 2, os.cpu_count() or 1],
+        help="要测试的进程池大小（0表示在请求线程中哈希）",
+    )
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="cash_manager_bench_")
+    app.config["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+    create_database(app.config["DATABASE_PATH"], args.method)
+
+    print(f"算法: {args.method}  并发线程: {args.threads}  每轮: {args.seconds}s")
+    print(f"{'进程池':>8}{'登录/秒':>12}{'balance p50':>14}{'balance p95':>14}")
+    try:
+        for workers in args.workers:
+            rate, p50, p95 = run(workers, args.method, args.threads, args.seconds)
+            label = "内联" if workers == 0 else str(workers)
+            print(f"{label:>8}{rate:>12.1f}{p50:>12.1f}ms{p95:>12.1f}ms")
+    finally:
+        hasher = app.extensions.pop("password_hasher", None)
+        if hasher is not None:
+            hasher.shutdown()
+        os.remove(app.config["DATABASE_PATH"])
+        os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+列表接口序列化基准测试
+
+在临时数据库上比较 /api/transactions 一页数据在默认格式、列式格式和
+列式+字典编码格式下的响应字节数（含gzip后）和服务端每次请求的耗时。
+
+使用方法:
+python benchmarks/bench_serialization.py
+python benchmarks/bench_serialization.py --per-page 500 --requests 200
+"""
+
+import argparse
+import gzip
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend import repository  # noqa: E402
+from backend.app import app  # noqa: E402
+from backend.serialization import orjson  # noqa: E402
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "backend", "database", "schema.sql"
+)
+CATEGORIES = ["零花钱", "奖励", "红包", "零食", "文具", "玩具", "书籍", "交通"]
+
+FORMATS = {
+    "rows": "",
+    "columnar": "&format=columnar",
+    "columnar+dict": "&format=columnar&dictionary=1",
+}
+
+
+def create_database(path, rows):
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.execute("INSERT INTO users (id, username, password) VALUES (1, 'bench', 'x')")
+    for i in range(rows):
+        repository.add_transaction(
+            conn,
+            1,
+            rng.choice(["income", "expense"]),
+            rng.randint(100, 10000),
+            f"测试记录{i}",
+            rng.choice(CATEGORIES),
+        )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表接口序列化基准测试")
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="cash_manager_bench_")
+    app.config["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+    create_database(app.config["DATABASE_PATH"], args.per_page * 2)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = 1
+
+    print(f"每页 {args.per_page} 条，每种格式请求 {args.requests} 次"
+          f"（JSON编码: {'orjson' if orjson else 'json'}）")
+    print(f"{'格式':<16}{'字节':>10}{'gzip后':>10}{'每次请求':>12}")
+    try:
+        for name, query in FORMATS.items():
+            url = f"/api/transactions?per_page={args.per_page}{query}"
+            headers = {"Accept-Encoding": "identity"}
+            body = client.get(url, headers=headers).data
+            began = time.perf_counter()
+            for _ in range(args.requests):
+                client.get(url, headers=headers)
+            elapsed = (time.perf_counter() - began) / args.requests
+            print(
+                f"{name:<16}{len(body):>10}{len(gzip.compress(body, 6)):>10}"
+                f"{elapsed * 1000:>10.2f}ms"
+            )
+    finally:
+        os.remove(app.config["DATABASE_PATH"])
+        os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+冷启动时间基准测试
+
+模拟容器的启动路径，测量从启动进程到第一次成功登录（POST /login 返回302）的时间：
+- baseline: 不使用字节码缓存，先单独运行 init_db.py，再以调试重载器启动 run.py
+- fast:     预编译字节码，FAST_START=1 启动 run.py（进程内检查数据库结构版本）
+
+每种模式分别测试首次启动（空数据库）和重启（数据库已存在）。
+
+使用方法:
+python benchmarks/bench_startup.py
+python benchmarks/bench_startup.py --repeat 5
+"""
+
+import argparse
+import compileall
+import http.client
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def try_login(port):
+    """尝试登录，成功返回True"""
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request(
+            "POST",
+            "/login",
+            body=urlencode({"username": "admin", "password": "admin123"}),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        return response.status == 302 and "/dashboard" in response.getheader(
+            "Location", ""
+        )
+    except OSError:
+        return False
+
+
+def clear_bytecode():
+    for directory in ("backend", "backend/database"):
+        shutil.rmtree(os.path.join(ROOT, directory, "__pycache__"), ignore_errors=True)
+
+
+def start_once(mode, database_path, timeout=60):
+    """按指定模式启动一次应用，返回到首次成功登录的秒数"""
+    port = free_port()
+    env = dict(os.environ, DATABASE_PATH=database_path, PORT=str(port), HOST="127.0.0.1")
+    env.pop("FAST_START", None)
+
+    began = time.perf_counter()
+    if mode == "baseline":
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        clear_bytecode()
+        subprocess.run(
+            [sys.executable, "backend/database/init_db.py"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True,
+        )
+    else:
+        env["FAST_START"] = "1"
+
+    process = subprocess.Popen(
+        [sys.executable, "run.py"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        while time.perf_counter() - began < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"{mode} 模式启动失败，退出码 {process.returncode}")
+            if try_login(port):
+                return time.perf_counter() - began
+            time.sleep(0.01)
+        raise RuntimeError(f"{mode} 模式在 {timeout}s 内未能登录")
+    finally:
+        # 调试重载器会启动子进程，结束整个进程组
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动时间基准测试")
+    parser.add_argument("--repeat", type=int, default=3, help="每种情况重复次数")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="cash_manager_startup_")
+    results = {}
+    try:
+        for mode in ("baseline", "fast"):
+            if mode == "fast":
+                compileall.compile_dir(os.path.join(ROOT, "backend"), quiet=1)
+            first, restart = [], []
+            for i in range(args.repeat):
+                database_path = os.path.join(tmp, f"{mode}_{i}.db")
+                first.append(start_once(mode, database_path))
+                restart.append(start_once(mode, database_path))
+            results[mode] = (statistics.median(first), statistics.median(restart))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'模式':<10}{'首次启动':>12}{'重启':>12}")
+    for mode, (first, restart) in results.items():
+        print(f"{mode:<10}{first * 1000:>10.0f}ms{restart * 1000:>10.0f}ms")
+    base, fast = results["baseline"][1], results["fast"][1]
+    print(f"重启到首次登录的时间缩短 {(1 - fast / base) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+仪表盘负载测试
+
+在本机启动应用（python backend/app.py，或用--url指定已启动的实例，此时必须用--database
+指定该实例使用的数据库文件），模拟多个同时打开的仪表盘，按dashboard.js的行为发送请求：
+
+- 登录后打开 /dashboard，加载余额、交易列表（每页4笔）和30天趋势
+- 每隔--poll-interval秒（默认30秒）轮询余额和交易列表
+- 每次轮询后按--add-rate的概率添加一笔交易（之后重新加载余额、第一页交易和趋势），
+  按--delete-rate的概率删除列表中的一笔交易（之后重新加载余额、交易列表和趋势）
+
+同时在本进程中按虚拟日历触发定时任务：每--day-seconds秒为一天，每天执行每日发放，
+周一执行每周发放，每月1号执行每月发放、月末快照和归档。本脚本启动的应用设置SCHEDULER=0，
+不再同时按实际时间运行应用自己的调度器；--url指定的实例需要自行关闭调度器。
+
+仪表盘在第一个轮询周期内均匀地开始。结束后按接口输出吞吐量、p50/p95/p99延迟和错误率，
+以及轮询的延迟（应用处理不过来时，轮询晚于计划的时间）。
+
+数据用backend/generate_test_data.py生成（用户名为load_加序号，密码为load123）；
+--database指定的文件已存在时直接使用。
+
+使用方法:
+python benchmarks/load_dashboards.py --dashboards 200 --duration 120
+python benchmarks/load_dashboards.py --dashboards 500 --poll-interval 5 \
+    --env GROUP_COMMIT=1 --env GROUP_COMMIT_WINDOW_MS=2
+python benchmarks/load_dashboards.py --url http://127.0.0.1:19754 --database backend/database/cash_manager.db
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from backend import scheduler  # noqa: E402
+from backend.generate_test_data import create_users, generate_dataset  # noqa: E402
+from backend.passwords import PasswordHasher  # noqa: E402
+
+PASSWORD = "load123"
+USER_PREFIX = "load_"
+
+# 与dashboard.js中的perPage一致
+PER_PAGE = 4
+
+CATEGORIES = {"income": ["零花钱", "奖励", "红包"], "expense": ["零食", "文具", "玩具", "书籍"]}
+
+
+class Stats:
+    """按名称记录每次请求的耗时和失败原因（多线程共用）"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, error=None):
+        with self.lock:
+            self.samples[name].append(seconds)
+            if error is not None:
+                self.errors[name][error] += 1
+
+
+class Dashboard:
+    """一个打开的仪表盘"""
+
+    def __init__(self, host, port, username, stats, rng, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.stats = stats
+        self.rng = rng
+        self.timeout = timeout
+        self.cookie = None
+        self.page_ids = []
+
+    def request(self, method, path, name, json_body=None, form=None, expect=200):
+        """发送请求并记录耗时，返回JSON响应（不是JSON或失败时为None）"""
+        headers = {}
+        body = None
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        if json_body is not None:
+            body = json.dumps(json_body)
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        began = time.perf_counter()
+        status, payload = 0, None
+        try:
+            # 开发服务器按HTTP/1.0应答，每个请求使用新的连接
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                status = response.status
+                cookie = response.getheader("Set-Cookie")
+                if cookie:
+                    self.cookie = cookie.split(";", 1)[0]
+                if "json" in response.getheader("Content-Type", ""):
+                    payload = json.loads(data)
+            finally:
+                conn.close()
+        except (OSError, http.client.HTTPException, ValueError):
+            pass
+        if status != expect:
+            error = f"HTTP {status}" if status else "连接失败"
+        elif payload is not None and not payload.get("success", True):
+            error = payload.get("message") or "success=false"
+        else:
+            error = None
+        self.stats.record(name, time.perf_counter() - began, error)
+        return payload if error is None else None
+
+    def login(self):
+        self.request(
+            "POST",
+            "/login",
+            "POST /login",
+            form={"username": self.username, "password": PASSWORD},
+            expect=302,
+        )
+        return self.cookie is not None
+
+    def load_balance(self):
+        self.request("GET", "/api/balance", "GET /api/balance")
+
+    def load_transactions(self, page=1):
+        payload = self.request(
+            "GET",
+            f"/api/transactions?page={page}&per_page={PER_PAGE}",
+            "GET /api/transactions",
+        )
+        if payload is not None:
+            self.page_ids = [row["id"] for row in payload["transactions"]]
+
+    def load_trends(self):
+        self.request("GET", "/api/trends?days=30&fill=1", "GET /api/trends")
+
+    def open(self):
+        self.request("GET", "/dashboard", "GET /dashboard")
+        self.load_balance()
+        self.load_transactions()
+        self.load_trends()
+
+    def poll(self):
+        self.load_balance()
+        self.load_transactions()
+
+    def add_transaction(self):
+        trans_type = "income" if self.rng.random() < 0.3 else "expense"
+        self.request(
+            "POST",
+            "/api/transactions",
+            "POST /api/transactions",
+            json_body={
+                "type": trans_type,
+                "amount": f"{self.rng.randint(100, 3000) / 100:.2f}",
+                "category": self.rng.choice(CATEGORIES[trans_type]),
+                "description": "",
+            },
+        )
+        self.load_balance()
+        self.load_transactions()
+        self.load_trends()
+
+    def delete_transaction(self):
+        if not self.page_ids:
+            return
+        tx_id = self.rng.choice(self.page_ids)
+        self.request("DELETE", f"/api/transactions/{tx_id}", "DELETE /api/transactions/<id>")
+        self.load_balance()
+        # 与页面一样先检查当前页，再重新加载列表
+        self.load_transactions()
+        self.load_transactions()
+        self.load_trends()
+
+    def run(self, delay, interval, duration_end, add_rate, delete_rate, stop, lags):
+        if stop.wait(delay):
+            return
+        if not self.login():
+            return
+        self.open()
+        planned = time.monotonic() + interval
+        while True:
+            if stop.wait(max(0.0, planned - time.monotonic())):
+                return
+            now = time.monotonic()
+            if now >= duration_end:
+                return
+            lags.record("轮询延迟", now - planned)
+            planned += interval
+            self.poll()
+            roll = self.rng.random()
+            if roll < add_rate:
+                self.add_transaction()
+            elif roll < add_rate + delete_rate:
+                self.delete_transaction()
+
+
+def jobs_for(day):
+    """虚拟日历上某一天要执行的定时任务"""
+    jobs = [("process_daily_schedules", scheduler.process_daily_schedules)]
+    if day.weekday() == 0:
+        jobs.append(("process_weekly_schedules", scheduler.process_weekly_schedules))
+    if day.day == 1:
+        jobs.append(("process_monthly_schedules", scheduler.process_monthly_schedules))
+        jobs.append(("close_monthly_snapshots", scheduler.close_monthly_snapshots))
+        jobs.append(("archive_old_transactions", scheduler.archive_old_transactions))
+    return jobs
+
+
+def run_scheduler(database_path, day_seconds, stop, stats):
+    """每day_seconds秒在虚拟日历上前进一天，执行这一天的定时任务"""
+    scheduler.configure({"DATABASE_PATH": database_path})
+    day = date.today() + timedelta(days=1)
+    while not stop.wait(day_seconds):
+        now = datetime(day.year, day.month, day.day, 9)
+        for name, job in jobs_for(day):
+            began = time.perf_counter()
+            error = None
+            try:
+                job(now=now)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            stats.record(name, time.perf_counter() - began, error)
+        day += timedelta(days=1)
+
+
+def build_dataset(path, users, years, per_day, seed, method):
+    """生成模拟数据，返回交易笔数"""
+    conn = scheduler.get_db_connection(path)
+    try:
+        user_ids = create_users(
+            conn, users, PasswordHasher(method=method, workers=0).hash(PASSWORD), USER_PREFIX
+        )
+        return generate_dataset(conn, user_ids, round(365.25 * years) + 1, per_day, seed)
+    finally:
+        conn.close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_path, env_settings, log_path, timeout=60):
+    """启动应用，返回(进程, 端口)"""
+    port = free_port()
+    # 定时任务由本脚本按虚拟日历触发，应用不再运行自己的调度器
+    env = dict(
+        os.environ,
+        DATABASE_PATH=database_path,
+        PORT=str(port),
+        HOST="127.0.0.1",
+        SCHEDULER="0",
+    )
+    env.pop("FLASK_ENV", None)
+    env.update(env_settings)
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "backend/app.py"],
+            cwd=ROOT,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    began = time.perf_counter()
+    while time.perf_counter() - began < timeout:
+        if process.poll() is not None:
+            break
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/login")
+            conn.getresponse().read()
+            conn.close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    process.wait()
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        print(f.read()[-2000:], file=sys.stderr)
+    raise RuntimeError("应用启动失败")
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summarize(stats, elapsed):
+    results = {}
+    for name, durations in sorted(stats.samples.items()):
+        errors = sum(stats.errors[name].values())
+        results[name] = {
+            "count": len(durations),
+            "throughput": len(durations) / elapsed,
+            "p50_ms": percentile(durations, 50) * 1000,
+            "p95_ms": percentile(durations, 95) * 1000,
+            "p99_ms": percentile(durations, 99) * 1000,
+            "max_ms": max(durations) * 1000,
+            "errors": errors,
+            "error_rate": errors / len(durations),
+            "error_reasons": dict(stats.errors[name]),
+        }
+    return results
+
+
+def print_table(title, results):
+    print(f"\n{title}")
+    print(
+        f"{'名称':<36}{'次数':>8}{'次/秒':>9}{'p50':>10}{'p95':>10}{'p99':>10}"
+        f"{'错误':>7}{'错误率':>8}"
+    )
+    for name, row in results.items():
+        print(
+            f"{name:<38}{row['count']:>8}{row['throughput']:>9.1f}"
+            f"{row['p50_ms']:>8.1f}ms{row['p95_ms']:>8.1f}ms{row['p99_ms']:>8.1f}ms"
+            f"{row['errors']:>7}{row['error_rate'] * 100:>7.1f}%"
+        )
+    for name, row in results.items():
+        for reason, count in row["error_reasons"].items():
+            print(f"  {name}: {reason} × {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="仪表盘负载测试")
+    parser.add_argument("--dashboards", type=int, default=50, help="同时打开的仪表盘数")
+    parser.add_argument("--duration", type=float, default=120, help="测试时长（秒）")
+    parser.add_argument("--poll-interval", type=float, default=30, help="轮询间隔（秒）")
+    parser.add_argument("--add-rate", type=float, default=0.05,
+                        help="每次轮询后添加一笔交易的概率")
+    parser.add_argument("--delete-rate", type=float, default=0.02,
+                        help="每次轮询后删除一笔交易的概率")
+    parser.add_argument("--day-seconds", type=float, default=30,
+                        help="定时任务的虚拟日历中一天对应的秒数（0为不触发定时任务）")
+    parser.add_argument("--users", type=int, help="生成的用户数（默认与仪表盘数相同）")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--per-day", type=float, default=2, help="每个用户每天的平均交易数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", help="数据库文件（不存在时生成，默认在临时目录中）")
+    parser.add_argument("--url", help="已启动的应用地址（不再启动应用）")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="启动应用时设置的环境变量，可重复")
+    parser.add_argument("--timeout", type=float, default=30, help="单个请求的超时（秒）")
+    parser.add_argument("--json", dest="json_path", help="把结果写入JSON文件")
+    args = parser.parse_args()
+    if args.url and not args.database:
+        parser.error("使用--url时必须用--database指定该实例的数据库文件")
+
+    # 定时任务在本进程中执行，不输出每次发放的日志
+    logging.getLogger("backend.scheduler").setLevel(logging.WARNING)
+    env_settings = dict(item.split("=", 1) for item in args.env)
+    users = args.users or args.dashboards
+    tmp = tempfile.mkdtemp(prefix="cash_manager_load_")
+    database_path = args.database or os.path.join(tmp, "load.db")
+    process = None
+    try:
+        if not os.path.exists(database_path):
+            began = time.perf_counter()
+            count = build_dataset(
+                database_path,
+                users,
+                args.years,
+                args.per_day,
+                args.seed,
+                env_settings.get("PASSWORD_HASH_METHOD"),
+            )
+            print(f"生成 {users} 个用户、{count} 笔交易，耗时 {time.perf_counter() - began:.1f}s")
+
+        if args.url:
+            parts = urlsplit(args.url)
+            host, port = parts.hostname, parts.port or 80
+        else:
+            process, port = start_server(
+                database_path, env_settings, os.path.join(tmp, "server.log")
+            )
+            host = "127.0.0.1"
+
+        stats, lags, jobs = Stats(), Stats(), Stats()
+        stop = threading.Event()
+        rng = random.Random(args.seed)
+        began = time.monotonic()
+        duration_end = began + args.duration
+        threads = []
+        for i in range(args.dashboards):
+            dashboard = Dashboard(
+                host,
+                port,
+                f"{USER_PREFIX}{i % users + 1}",
+                stats,
+                random.Random(rng.random()),
+                args.timeout,
+            )
+            delay = args.poll_interval * i / max(args.dashboards, 1)
+            threads.append(
+                threading.Thread(
+                    target=dashboard.run,
+                    args=(
+                        delay,
+                        args.poll_interval,
+                        duration_end,
+                        args.add_rate,
+                        args.delete_rate,
+                        stop,
+                        lags,
+                    ),
+                    daemon=True,
+                )
+            )
+        if args.day_seconds > 0:
+            threads.append(
+                threading.Thread(
+                    target=run_scheduler,
+                    args=(database_path, args.day_seconds, stop, jobs),
+                    daemon=True,
+                )
+            )
+        for thread in threads:
+            thread.start()
+        stop.wait(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join(args.timeout)
+        elapsed = time.monotonic() - began
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if not args.database:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    requests = summarize(stats, elapsed)
+    total = sum(row["count"] for row in requests.values())
+    errors = sum(row["errors"] for row in requests.values())
+    print(f"\n{args.dashboards} 个仪表盘，{elapsed:.0f}s，轮询间隔 {args.poll_interval:g}s")
+    print_table("接口", requests)
+    print(
+        f"合计 {total} 次请求，{total / elapsed:.1f} 次/秒，"
+        f"错误 {errors} 次（{errors / max(total, 1) * 100:.2f}%）"
+    )
+    lag = summarize(lags, elapsed).get("轮询延迟")
+    if lag:
+        print(
+            f"轮询延迟 p50 {lag['p50_ms']:.0f}ms，p95 {lag['p95_ms']:.0f}ms，"
+            f"p99 {lag['p99_ms']:.0f}ms，最大 {lag['max_ms']:.0f}ms"
+        )
+    job_results = summarize(jobs, elapsed)
+    if job_results:
+        print_table("定时任务", job_results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "settings": {
+                        "dashboards": args.dashboards,
+                        "duration": args.duration,
+                        "poll_interval": args.poll_interval,
+                        "add_rate": args.add_rate,
+                        "delete_rate": args.delete_rate,
+                        "day_seconds": args.day_seconds,
+                        "env": env_settings,
+                    },
+                    "requests": requests,
+                    "poll_lag": lag,
+                    "jobs": job_results,
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        print(f"结果已写入 {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,699 @@
+let currentType = 'income';
+let currentChartType = 'balance';
+let trendData = { dates: [], income: [], expense: [], balance: [] };
+let trendChart = null;
+let currentPage = 1;
+let totalPages = 1;
+const perPage = 4;
+
+function changeChartType(chartType) {
+    currentChartType = chartType;
+
+    document.querySelectorAll('.config-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    document.querySelector(`#btn-${chartType}`).classList.add('active');
+
+    renderChartWithCurrentType();
+}
+
+function renderChartWithCurrentType() {
+    let data;
+    switch(currentChartType) {
+        case 'income':
+            data = trendData.income;
+            break;
+        case 'expense':
+            data = trendData.expense;
+            break;
+        default:
+            data = trendData.balance;
+    }
+    renderChart(trendData.dates, data);
+}
+
+function setType(type) {
+    currentType = type;  // 更新当前类型
+
+    document.querySelectorAll('.type-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+
+    document.querySelector(`.type-btn.${type}`).classList.add('active');
+
+    // 根据收入/支出类型更新分类选项
+    updateCategoryOptions(type);
+}
+
+function updateCategoryOptions(type) {
+    const categorySelect = document.getElementById('category');
+    const incomeCategories = document.getElementById('incomeCategories');
+    const expenseCategories = document.getElementById('expenseCategories');
+
+    // 清空当前选择
+    categorySelect.value = '';
+
+    if (type === 'income') {
+        // 显示收入分类，隐藏支出分类
+        incomeCategories.style.display = '';
+        expenseCategories.style.display = 'none';
+        // 默认选择第一个收入分类
+        categorySelect.value = '零花钱';
+    } else {
+        // 显示支出分类，隐藏收入分类
+        incomeCategories.style.display = 'none';
+        expenseCategories.style.display = '';
+        // 默认选择第一个支出分类
+        categorySelect.value = '零食';
+    }
+}
+
+function formatMoney(amount) {
+    return '¥' + parseFloat(amount).toFixed(2);
+}
+
+function formatDate(dateString) {
+    const date = new Date(dateString);
+    return date.toLocaleDateString('zh-CN', {
+        month: '2-digit',
+        day: '2-digit',
+        hour: '2-digit',
+        minute: '2-digit'
+    });
+}
+
+async function loadBalance() {
+    try {
+        const response = await fetch('/api/balance');
+        const data = await response.json();
+
+        if (data.success) {
+            document.getElementById('balance').textContent = formatMoney(data.balance);
+            document.getElementById('income').textContent = formatMoney(data.income);
+            document.getElementById('expense').textContent = formatMoney(data.expense);
+        }
+    } catch (error) {
+        console.error('加载余额失败:', error);
+    }
+}
+
+async function loadTransactions(page = currentPage) {
+    try {
+        currentPage = page;
+        const response = await fetch(`/api/transactions?page=${page}&per_page=${perPage}`);
+        const data = await response.json();
+
+        if (data.success) {
+            const listElement = document.getElementById('transactionsList');
+            const paginationElement = document.getElementById('pagination');
+            const paginationInfo = document.getElementById('paginationInfo');
+            const paginationControls = document.getElementById('paginationControls');
+
+            // 计算总页数
+            totalPages = Math.ceil(data.total / perPage);
+
+            if (data.transactions.length === 0) {
+                listElement.innerHTML = '<div class="empty-state">暂无记录</div>';
+                paginationElement.style.display = 'none';
+                return;
+            }
+
+            // 渲染交易记录列表（按发生时间倒序，最新的在前）
+            listElement.innerHTML = data.transactions.map(tx => `
+                <div class="transaction-item">
+                    <div class="transaction-info">
+                        <div class="transaction-category">${tx.category || '未分类'}</div>
+                        <div class="transaction-description">${tx.description || '无备注'}</div>
+                    </div>
+                    <div style="display: flex; align-items: center;">
+                        <div class="transaction-amount ${tx.type}">
+                            ${tx.type === 'income' ? '+' : '-'}${formatMoney(tx.amount)}
+                        </div>
+                        <div class="transaction-date">${formatDate(tx.created_at)}</div>
+                        <button class="delete-btn" onclick="deleteTransaction(${tx.id})">删除</button>
+                    </div>
+                </div>
+            `).join('');
+
+            // 更新分页信息
+            const start = (page - 1) * perPage + 1;
+            const end = Math.min(page * perPage, data.total);
+            paginationInfo.textContent = `共 ${data.total} 条记录，显示第 ${start}-${end} 条`;
+
+            // 渲染分页控件
+            let paginationHTML = '';
+
+            // 上一页按钮
+            paginationHTML += `<button class="pagination-btn" onclick="loadTransactions(${page - 1})" ${page <= 1 ? 'disabled' : ''}>上一页</button>`;
+
+            // 页码按钮
+            const maxPagesToShow = 5;
+            let startPage = Math.max(1, page - Math.floor(maxPagesToShow / 2));
+            let endPage = Math.min(totalPages, startPage + maxPagesToShow - 1);
+
+            if (endPage - startPage < maxPagesToShow - 1) {
+                startPage = Math.max(1, endPage - maxPagesToShow + 1);
+            }
+
+            if (startPage > 1) {
+                paginationHTML += `<button class="pagination-btn" onclick="loadTransactions(1)">1</button>`;
+                if (startPage > 2) {
+                    paginationHTML += `<span style="padding: 0 5px; color: #999;">...</span>`;
+                }
+            }
+
+            for (let i = startPage; i <= endPage; i++) {
+                paginationHTML += `<button class="pagination-btn pagination-page ${i === page ? 'active' : ''}" onclick="loadTransactions(${i})">${i}</button>`;
+            }
+
+            if (endPage < totalPages) {
+                if (endPage < totalPages - 1) {
+                    paginationHTML += `<span style="padding: 0 5px; color: #999;">...</span>`;
+                }
+                paginationHTML += `<button class="pagination-btn" onclick="loadTransactions(${totalPages})">${totalPages}</button>`;
+            }
+
+            // 下一页按钮
+            paginationHTML += `<button class="pagination-btn" onclick="loadTransactions(${page + 1})" ${page >= totalPages ? 'disabled' : ''}>下一页</button>`;
+
+            paginationControls.innerHTML = paginationHTML;
+            paginationElement.style.display = 'flex';
+        }
+    } catch (error) {
+        console.error('加载交易记录失败:', error);
+        const listElement = document.getElementById('transactionsList');
+        listElement.innerHTML = '<div class="empty-state">加载失败，请刷新重试</div>';
+    }
+}
+
+async function addTransaction() {
+    const amount = document.getElementById('amount').value;
+    const category = document.getElementById('category').value;
+    const description = document.getElementById('description').value;
+
+    if (!amount || parseFloat(amount) <= 0) {
+        showMessage('请输入有效金额', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/transactions', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                type: currentType,
+                amount: amount,
+                category: category,
+                description: description
+            })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('添加成功', 'success');
+            document.getElementById('amount').value = '';
+            document.getElementById('description').value = '';
+
+            loadBalance();
+            loadTransactions(1); // 添加新记录后回到第一页
+            loadTrends();
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('添加失败', 'error');
+    }
+}
+
+async function deleteTransaction(txId) {
+    if (!confirm('确定要删除这条记录吗？')) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/transactions/${txId}`, {
+            method: 'DELETE'
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('删除成功', 'success');
+            loadBalance();
+
+            // 检查当前页是否还有数据，如果没有则回到上一页
+            const checkResponse = await fetch(`/api/transactions?page=${currentPage}&per_page=${perPage}`);
+            const checkData = await checkResponse.json();
+            if (checkData.success) {
+                if (checkData.transactions.length === 0 && currentPage > 1) {
+                    loadTransactions(currentPage - 1);
+                } else {
+                    loadTransactions(currentPage);
+                }
+            } else {
+                loadTransactions(currentPage);
+            }
+            loadTrends();
+        }
+    } catch (error) {
+        showMessage('删除失败', 'error');
+    }
+}
+
+async function loadTrends() {
+    try {
+        const response = await fetch('/api/trends?days=30&fill=1');
+        const data = await response.json();
+
+        console.log('Trends data:', data);
+
+        if (data.success) {
+            trendData = {
+                dates: data.dates,
+                income: data.income,
+                expense: data.expense,
+                balance: data.balance
+            };
+            renderChartWithCurrentType();
+        } else {
+            console.error('API返回失败:', data);
+        }
+    } catch (error) {
+        console.error('加载趋势数据失败:', error);
+    }
+}
+
+function renderChart(dates, balances) {
+    console.log('=== renderChart START ===');
+    console.log('dates:', dates);
+    console.log('balances:', balances);
+    console.log('chartType:', currentChartType);
+
+    const svg = document.getElementById('chartSvg');
+    const tooltip = document.getElementById('chartTooltip');
+
+    console.log('svg element:', svg);
+    console.log('tooltip element:', tooltip);
+
+    if (!svg) {
+        console.error('SVG element not found!');
+        return;
+    }
+
+    const width = svg.clientWidth || svg.parentElement.clientWidth || 800;
+    const height = svg.clientHeight || svg.parentElement.clientHeight || 300;
+    const padding = { top: 20, right: 30, bottom: 40, left: 60 };
+
+    console.log('dimensions:', { width, height, clientWidth: svg.clientWidth, clientHeight: svg.clientHeight });
+
+    if (balances.length === 0) {
+        svg.innerHTML = '<text x="50%" y="50%" text-anchor="middle" fill="#999">暂无数据</text>';
+        return;
+    }
+
+    const hasNegativeValues = balances.some(b => b < 0);
+    const maxValue = Math.max(...balances, 0);
+    const minValue = hasNegativeValues ? Math.min(...balances) : 0;
+    const range = maxValue - minValue || 1;
+
+    console.log('value calculations:', { hasNegativeValues, maxValue, minValue, range });
+
+    const chartHeight = height - padding.top - padding.bottom;
+    const chartWidth = width - padding.left - padding.right;
+    const barWidth = Math.min(40, chartWidth / dates.length * 0.6);
+    const barSpacing = chartWidth / dates.length;
+
+    console.log('chart dimensions:', { chartHeight, chartWidth, barWidth, barSpacing });
+
+    const xScale = (index) => padding.left + (index * barSpacing) + (barSpacing - barWidth) / 2;
+
+    const yScale = (value) => {
+        if (range === 0) return height - padding.bottom - chartHeight / 2;
+        return height - padding.bottom - ((value - minValue) / range) * chartHeight;
+    };
+
+    const zeroY = yScale(0);
+    console.log('zeroY:', zeroY);
+
+    let svgContent = '';
+
+    const gridLines = 5;
+    for (let i = 0; i <= gridLines; i++) {
+        const value = minValue + (range * i / gridLines);
+        const y = yScale(value);
+        svgContent += `<line class="chart-grid" x1="${padding.left}" y1="${y}" x2="${width - padding.right}" y2="${y}"/>`;
+        svgContent += `<text class="chart-label" x="${padding.left - 10}" y="${y + 4}" text-anchor="end">¥${value.toFixed(0)}</text>`;
+    }
+
+    console.log('grid lines created');
+
+    const barClass = currentChartType;
+    let barsCreated = 0;
+
+    balances.forEach((b, i) => {
+        const x = xScale(i);
+        const valueY = yScale(b);
+
+        let barY, barHeight;
+        if (b >= 0) {
+            barHeight = Math.max(1, zeroY - valueY);
+            barY = valueY;
+        } else {
+            barHeight = Math.max(1, valueY - zeroY);
+            barY = zeroY;
+        }
+
+        if (i < 3) {
+            console.log(`Bar ${i}:`, { b, x, valueY, barY, barHeight });
+        }
+
+        svgContent += `<rect class="chart-bar ${barClass}" x="${x}" y="${barY}" width="${barWidth}" height="${barHeight}" rx="3"
+            data-date="${dates[i]}" data-value="${b.toFixed(2)}"
+            onmouseover="showChartTooltip('${dates[i]}', '${b.toFixed(2)}', '${currentChartType}', ${x}, ${barY}, ${barWidth})"
+            onmouseout="hideChartTooltip()"
+            style="cursor: pointer"/>`;
+        barsCreated++;
+
+        if (i % Math.max(1, Math.ceil(dates.length / 6)) === 0 || i === dates.length - 1) {
+            const labelX = x + barWidth / 2;
+            const dateLabel = dates[i].substring(5);
+            svgContent += `<text class="chart-label" x="${labelX}" y="${height - 10}" text-anchor="middle">${dateLabel}</text>`;
+        }
+    });
+
+    console.log('bars created:', barsCreated);
+    console.log('svgContent length:', svgContent.length);
+
+    svg.innerHTML = svgContent;
+    console.log('SVG innerHTML set, children count:', svg.children.length);
+    console.log('=== renderChart END ===');
+}
+
+function showChartTooltip(date, value, type, x, y, width) {
+    const tooltip = document.getElementById('chartTooltip');
+    const label = type === 'balance' ? '余额' : (type === 'income' ? '收入' : '支出');
+    tooltip.style.display = 'block';
+    tooltip.style.left = (x + width + 10) + 'px';
+    tooltip.style.top = (y - 30) + 'px';
+    tooltip.textContent = `${date}: ${label} ¥${value}`;
+}
+
+function hideChartTooltip() {
+    const tooltip = document.getElementById('chartTooltip');
+    tooltip.style.display = 'none';
+}
+
+function showMessage(message, type) {
+    const existingMessage = document.querySelector('.message');
+    if (existingMessage) {
+        existingMessage.remove();
+    }
+
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${type}`;
+    messageDiv.textContent = message;
+
+    const container = document.querySelector('.container');
+    container.insertBefore(messageDiv, container.firstChild);
+
+    setTimeout(() => {
+        messageDiv.remove();
+    }, 3000);
+}
+
+function updateScheduleOptions() {
+    const frequency = document.getElementById('scheduleFrequency').value;
+    const weeklyOptions = document.getElementById('weeklyOptions');
+    const monthlyOptions = document.getElementById('monthlyOptions');
+
+    weeklyOptions.style.display = 'none';
+    monthlyOptions.style.display = 'none';
+
+    if (frequency === 'weekly') {
+        weeklyOptions.style.display = 'flex';
+    } else if (frequency === 'monthly') {
+        monthlyOptions.style.display = 'flex';
+    }
+}
+
+function logout() {
+    if (confirm('确定要退出登录吗？')) {
+        window.location.href = '/logout';
+    }
+}
+
+function openScheduleModal() {
+    const modal = document.getElementById('scheduleModal');
+    if (modal) {
+        modal.classList.add('active');
+        loadSchedules();
+    }
+}
+
+function closeScheduleModal() {
+    document.getElementById('scheduleModal').classList.remove('active');
+}
+
+// 点击模态框外部关闭
+document.addEventListener('click', function(event) {
+    const modal = document.getElementById('scheduleModal');
+    if (event.target === modal) {
+        closeScheduleModal();
+    }
+});
+
+// ESC键关闭弹窗
+document.addEventListener('keydown', function(event) {
+    if (event.key === 'Escape') {
+        const modal = document.getElementById('scheduleModal');
+        if (modal && modal.classList.contains('active')) {
+            closeScheduleModal();
+        }
+    }
+});
+
+async function loadSchedules() {
+    try {
+        const response = await fetch('/api/schedules');
+        const data = await response.json();
+
+        if (data.success) {
+            renderSchedules(data.schedules);
+        } else {
+            const listElement = document.getElementById('scheduleList');
+            listElement.innerHTML = `
+                <div class="empty-schedules">
+                    <div class="empty-schedules-icon">⚠️</div>
+                    <div>加载配置失败</div>
+                    <div style="margin-top: 10px; font-size: 12px; color: #999;">${data.message || '请稍后重试'}</div>
+                </div>
+            `;
+        }
+    } catch (error) {
+        console.error('加载定时发放配置失败:', error);
+        const listElement = document.getElementById('scheduleList');
+        listElement.innerHTML = `
+            <div class="empty-schedules">
+                <div class="empty-schedules-icon">⚠️</div>
+                <div>加载配置失败</div>
+                <div style="margin-top: 10px; font-size: 12px; color: #999;">网络错误，请稍后重试</div>
+            </div>
+        `;
+    }
+}
+
+function renderSchedules(schedules) {
+    const listElement = document.getElementById('scheduleList');
+
+    if (schedules.length === 0) {
+        listElement.innerHTML = `
+            <div class="empty-schedules">
+                <div class="empty-schedules-icon">📝</div>
+                <div>暂无定时发放配置</div>
+                <div style="margin-top: 10px; font-size: 12px; color: #999;">请在左侧添加新配置</div>
+            </div>
+        `;
+        return;
+    }
+
+    const frequencyText = {
+        'daily': '每天',
+        'weekly': '每周',
+        'monthly': '每月'
+    };
+
+    const weekDayText = {
+        '0': '周日',
+        '1': '周一',
+        '2': '周二',
+        '3': '周三',
+        '4': '周四',
+        '5': '周五',
+        '6': '周六'
+    };
+
+    const frequencyIcons = {
+        'daily': '📅',
+        'weekly': '📆',
+        'monthly': '🗓️'
+    };
+
+    listElement.innerHTML = schedules.map(schedule => {
+        let detailText = frequencyText[schedule.frequency];
+        let icon = frequencyIcons[schedule.frequency];
+
+        if (schedule.frequency === 'weekly' && schedule.day_of_week !== null) {
+            detailText += ' ' + weekDayText[schedule.day_of_week.toString()];
+        } else if (schedule.frequency === 'monthly' && schedule.day_of_month !== null) {
+            detailText += ' ' + schedule.day_of_month + '号';
+        }
+
+        return `
+        <div class="schedule-item">
+            <div class="schedule-info">
+                <h4>${icon} ${detailText} · ${schedule.category}</h4>
+                <p>
+                    <span class="schedule-amount">${formatMoney(schedule.amount)}</span>
+                    ${schedule.description ? '<span style="color: #999;">| ' + schedule.description + '</span>' : ''}
+                </p>
+            </div>
+            <div class="schedule-actions">
+                <button class="delete-btn" onclick="deleteSchedule(${schedule.id})">删除</button>
+            </div>
+        </div>
+        `;
+    }).join('');
+}
+
+async function addSchedule() {
+    const addBtn = document.getElementById('addScheduleBtn');
+    const frequency = document.getElementById('scheduleFrequency').value;
+    const amount = document.getElementById('scheduleAmount').value;
+    const category = document.getElementById('scheduleCategory').value;
+    const description = document.getElementById('scheduleDescription').value;
+
+    // 表单验证
+    if (!amount || parseFloat(amount) <= 0) {
+        showMessage('请输入有效金额', 'error');
+        document.getElementById('scheduleAmount').focus();
+        return;
+    }
+
+    if (parseFloat(amount) > 999999) {
+        showMessage('金额过大，请输入小于100万的金额', 'error');
+        document.getElementById('scheduleAmount').focus();
+        return;
+    }
+
+    if (!category || category.trim() === '') {
+        showMessage('请选择分类', 'error');
+        document.getElementById('scheduleCategory').focus();
+        return;
+    }
+
+    // 防止重复提交
+    if (addBtn.disabled) {
+        return;
+    }
+
+    // 获取周期特定的参数
+    let dayOfWeek = null;
+    let dayOfMonth = null;
+
+    if (frequency === 'weekly') {
+        dayOfWeek = document.getElementById('scheduleDayOfWeek').value;
+    } else if (frequency === 'monthly') {
+        dayOfMonth = document.getElementById('scheduleDayOfMonth').value;
+    }
+
+    // 禁用按钮，显示加载状态
+    addBtn.disabled = true;
+    const originalText = addBtn.textContent;
+    addBtn.textContent = '⏳ 添加中...';
+
+    try {
+        const response = await fetch('/api/schedules', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                frequency: frequency,
+                amount: amount,
+                category: category,
+                description: description,
+                day_of_week: dayOfWeek,
+                day_of_month: dayOfMonth
+            })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('添加成功', 'success');
+            // 重置表单
+            document.getElementById('scheduleFrequency').value = 'daily';
+            document.getElementById('scheduleAmount').value = '';
+            document.getElementById('scheduleCategory').value = '零花钱';
+            document.getElementById('scheduleDescription').value = '';
+            document.getElementById('weeklyOptions').style.display = 'none';
+            document.getElementById('monthlyOptions').style.display = 'none';
+            // 滚动到列表顶部，让用户看到新添加的配置
+            const listPanel = document.querySelector('.schedule-list-panel');
+            if (listPanel) {
+                listPanel.scrollTop = 0;
+            }
+            loadSchedules();
+        } else {
+            showMessage(data.message || '添加失败', 'error');
+        }
+    } catch (error) {
+        console.error('添加定时发放配置失败:', error);
+        showMessage('网络错误，添加失败', 'error');
+    } finally {
+        // 恢复按钮状态
+        addBtn.disabled = false;
+        addBtn.textContent = originalText;
+    }
+}
+
+async function deleteSchedule(scheduleId) {
+    if (!confirm('确定要删除这个定时发放配置吗？')) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/schedules/${scheduleId}`, {
+            method: 'DELETE'
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('删除成功', 'success');
+            loadSchedules();
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('删除失败', 'error');
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    updateCategoryOptions('income');
+
+    document.querySelector('#btn-balance').classList.add('active');
+
+    loadBalance();
+    loadTransactions();
+    loadTrends();
+
+    setInterval(() => {
+        loadBalance();
+        loadTransactions();
+    }, 30000);
+});
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """
 Cash Manager Application Entry Point
+
+设置 FAST_START=1 时启用快速启动模式：在当前进程中检查数据库结构（版本一致时跳过），
+不再单独启动 init_db.py，关闭调试重载器避免应用被导入两次，并在后台预热密码哈希进程池。
 """
 
 import os
@@ -9,13 +12,36 @@ import sys
 # Add backend directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "backend"))
 
-# Import and run the Flask application
-from app import app
+FAST_START = os.environ.get("FAST_START") == "1"
+
+
+def main():
+    # 应用在这里导入：密码哈希进程池的子进程会重新导入本模块，不应再加载整个应用
+    if FAST_START:
+        from database.init_db import create_default_user, init_database
+
+        if init_database():
+            create_default_user()
+
+    # Import and run the Flask application
+    from app import app, get_password_hasher
+
+    if FAST_START:
+        import threading
+
+        # 在后台预先启动密码哈希进程，与服务启动并行
+        threading.Thread(target=get_password_hasher().warm_up, daemon=True).start()
+
+    host = os.environ.get("HOST", "127.0.0.1")
+    port = int(os.environ.get("PORT", 19754))
 
-if __name__ == "__main__":
     print("🚀 Starting Cash Manager...")
-    print("📱 Access at: http://127.0.0.1:19754")
+    print(f"📱 Access at: http://{host}:{port}")
     print("👤 Default login: admin / admin123")
     print("🛑 Press Ctrl+C to stop")
 
-    app.run(host="127.0.0.1", port=19754, debug=True)
+    app.run(host=host, port=port, debug=True, use_reloader=not FAST_START)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+数据库在线备份与恢复
+
+backup 可以在应用运行时执行；restore 前请停止应用和定时任务。
+备份目录、保留份数和压缩选项默认读取 BACKUP_DIR / BACKUP_KEEP / BACKUP_COMPRESS，
+分片配置读取 SHARD_COUNT / SHARD_DIR，与定时备份任务一致。
+
+使用方法:
+python scripts/backup_database.py backup
+python scripts/backup_database.py list
+python scripts/backup_database.py verify backend/database/backups/backup_20250601_020000
+python scripts/backup_database.py restore backend/database/backups/backup_20250601_020000
+python scripts/backup_database.py restore <备份目录> --database /tmp/restored.db
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend import scheduler  # noqa: E402
+from backend.backup import (  # noqa: E402
+    BackupError,
+    list_backups,
+    read_manifest,
+    restore_backup,
+    verify_backup,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库在线备份与恢复")
+    parser.add_argument("--backup-dir", default=scheduler.BACKUP_DIR, help="备份目录")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backup = commands.add_parser("backup", help="立即备份所有数据库")
+    backup.add_argument(
+        "--keep", type=int, default=max(scheduler.BACKUP_KEEP, 1), help="保留份数"
+    )
+
+    commands.add_parser("list", help="列出已有备份")
+
+    verify = commands.add_parser("verify", help="校验备份")
+    verify.add_argument("backup", help="备份目录")
+
+    restore = commands.add_parser("restore", help="从备份恢复")
+    restore.add_argument("backup", help="备份目录")
+    restore.add_argument("--database", help="恢复到指定文件（只适用于只有一个数据库的备份）")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "backup":
+            print(scheduler.backup_databases(backup_dir=args.backup_dir, keep=args.keep))
+        elif args.command == "list":
+            for path in list_backups(args.backup_dir):
+                manifest = read_manifest(path)
+                size = sum(entry["bytes"] for entry in manifest["files"])
+                count = len(manifest["files"])
+                print(f"{path}  {manifest['created_at']}  {count} 个数据库  {size} 字节")
+        elif args.command == "verify":
+            manifest = verify_backup(args.backup)
+            print(f"校验通过，共 {len(manifest['files'])} 个数据库")
+        else:
+            targets = None
+            if args.database:
+                files = read_manifest(args.backup)["files"]
+                if len(files) != 1:
+                    parser.error("备份中有多个数据库，不能使用 --database")
+                targets = {files[0]["name"]: args.database}
+            for path in restore_backup(args.backup, targets):
+                print(f"已恢复: {path}")
+    except BackupError as e:
+        print(f"失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
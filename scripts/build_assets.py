@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+静态资源构建脚本
+
+把 frontend/static/src 下的 CSS 和 JavaScript 复制为带内容哈希的文件名
+（如 dashboard.3f2a9c1b7e.css），同时生成 gzip 和 brotli 预压缩版本，
+并写入 manifest.json 供模板通过 asset_url() 引用。
+文件名随内容变化，因此可以使用长期不可变缓存。
+
+brotli 为可选依赖，未安装时只生成 gzip 版本。
+
+使用方法:
+python scripts/build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+STATIC_DIR = Path(__file__).parent.parent / "frontend" / "static"
+SOURCE_DIR = STATIC_DIR / "src"
+DIST_DIR = STATIC_DIR / "dist"
+
+ASSET_SUFFIXES = (".css", ".js")
+MANIFEST_NAME = "manifest.json"
+
+
+def hashed_name(path, content):
+    """根据内容生成带哈希的文件名"""
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    return f"{path.stem}.{digest}{path.suffix}"
+
+
+def build_assets(source_dir=SOURCE_DIR, dist_dir=DIST_DIR):
+    """构建所有静态资源，返回manifest字典"""
+    source_dir, dist_dir = Path(source_dir), Path(dist_dir)
+    dist_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {}
+    written = set()
+    for path in sorted(source_dir.iterdir()):
+        if path.suffix not in ASSET_SUFFIXES:
+            continue
+
+        content = path.read_bytes()
+        name = hashed_name(path, content)
+        manifest[path.name] = name
+
+        (dist_dir / name).write_bytes(content)
+        # mtime=0 保证相同内容生成相同的压缩文件
+        (dist_dir / f"{name}.gz").write_bytes(gzip.compress(content, 9, mtime=0))
+        written.update({name, f"{name}.gz"})
+        if brotli is not None:
+            (dist_dir / f"{name}.br").write_bytes(brotli.compress(content, quality=11))
+            written.add(f"{name}.br")
+
+        print(f"{path.name} -> {name}")
+
+    (dist_dir / MANIFEST_NAME).write_text(
+        json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8"
+    )
+    written.add(MANIFEST_NAME)
+
+    # 清理旧版本的资源文件
+    for stale in dist_dir.iterdir():
+        if stale.name not in written:
+            stale.unlink()
+
+    if brotli is None:
+        print("未安装brotli，仅生成gzip压缩版本")
+    return manifest
+
+
+if __name__ == "__main__":
+    build_assets()
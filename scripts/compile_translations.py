@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+预编译翻译文件
+
+把 backend/translations 下的 .po 文件编译为 .mo 文件，在构建镜像时执行，
+避免应用运行时再处理翻译源文件。没有翻译目录或 .mo 已是最新时直接跳过。
+
+使用方法:
+python scripts/compile_translations.py
+"""
+
+import os
+from pathlib import Path
+
+TRANSLATIONS_DIR = Path(__file__).parent.parent / "backend" / "translations"
+
+
+def compile_catalogs(translations_dir=TRANSLATIONS_DIR):
+    """编译所有过期的 .po 文件，返回编译的文件数"""
+    if not translations_dir.is_dir():
+        print(f"未找到翻译目录 {translations_dir}，跳过")
+        return 0
+
+    from babel.messages.mofile import write_mo
+    from babel.messages.pofile import read_po
+
+    compiled = 0
+    for po_path in sorted(translations_dir.glob("*/LC_MESSAGES/*.po")):
+        mo_path = po_path.with_suffix(".mo")
+        if mo_path.exists() and mo_path.stat().st_mtime >= po_path.stat().st_mtime:
+            continue
+
+        with open(po_path, "rb") as f:
+            catalog = read_po(f, locale=po_path.parent.parent.name)
+        with open(mo_path, "wb") as f:
+            write_mo(f, catalog)
+        compiled += 1
+        print(f"已编译 {os.path.relpath(mo_path)}")
+
+    print(f"翻译文件编译完成，共 {compiled} 个")
+    return compiled
+
+
+if __name__ == "__main__":
+    compile_catalogs()
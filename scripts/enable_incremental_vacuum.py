@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+为已有数据库启用 auto_vacuum=INCREMENTAL
+
+新建的数据库在建表前已启用增量回收。之前创建的数据库需要执行一次完整的VACUUM
+才能切换，VACUUM会重写整个文件并在期间锁住数据库，所以放在这个单独的迁移脚本里，
+定时维护任务只做分批的 PRAGMA incremental_vacuum。
+启用分片时同时处理主数据库和所有分片。已启用的数据库会跳过。
+
+迁移期间请停止应用，并确保磁盘有数据库大小两倍的空闲空间。
+
+使用方法:
+python scripts/enable_incremental_vacuum.py
+python scripts/enable_incremental_vacuum.py --database backend/database/cash_manager.db --shards 8
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.database.init_db import DATABASE_PATH  # noqa: E402
+from backend.shards import ShardRouter  # noqa: E402
+
+
+def enable_incremental_vacuum(path):
+    """切换数据库为增量回收，返回(切换前的文件大小, 切换后的文件大小)；已启用时返回None"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return None
+        before = os.path.getsize(path)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return before, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="为已有数据库启用 auto_vacuum=INCREMENTAL")
+    parser.add_argument("--database", default=DATABASE_PATH, help="主数据库")
+    parser.add_argument(
+        "--shards", type=int, default=int(os.environ.get("SHARD_COUNT", 0)), help="分片数"
+    )
+    parser.add_argument(
+        "--shard-dir", default=os.environ.get("SHARD_DIR"), help="分片文件目录"
+    )
+    args = parser.parse_args()
+
+    router = ShardRouter(args.database, args.shard_dir, args.shards)
+    paths = [args.database]
+    if router.enabled:
+        paths += router.database_paths()
+
+    for path in paths:
+        sizes = enable_incremental_vacuum(path)
+        if sizes is None:
+            print(f"{path}: 已启用，跳过")
+        else:
+            print(f"{path}: 已启用增量回收，{sizes[0]} -> {sizes[1]} 字节")
+
+
+if __name__ == "__main__":
+    main()
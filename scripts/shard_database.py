@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+把单个数据库拆分为按用户分片的数据库
+
+用户账号留在原数据库（作为主数据库和分片目录），每个用户的交易记录（含归档）、定时发放配置和
+余额快照复制到 user_id % 分片数 对应的分片文件中，并写入分片目录user_shards。
+复制后逐个分片核对行数；指定 --purge 时才从原数据库删除已复制的数据。
+可以重复执行：每次先清空分片中这些用户的数据再复制。
+
+迁移期间请停止应用。迁移后以相同的 SHARD_COUNT / SHARD_DIR 启动应用和定时任务。
+
+使用方法:
+python scripts/shard_database.py --shards 8
+python scripts/shard_database.py --database backend/database/cash_manager.db --shards 8 --purge
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.database.init_db import DATABASE_PATH, ensure_schema  # noqa: E402
+from backend.shards import ShardRouter  # noqa: E402
+
+# 按user_id分片的表
+SHARDED_TABLES = (
+    "categories",
+    "descriptions",
+    "transactions",
+    "schedules",
+    "balance_snapshots",
+    "transactions_archive",
+    "archive_horizons",
+    "archive_rollups",
+)
+
+
+def _columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def shard_database(source, shard_count, shard_dir=None, purge=False):
+    """拆分数据库，返回每个分片每张表复制的行数 {分片文件: {表: 行数}}"""
+    conn = sqlite3.connect(source)
+    ensure_schema(conn)
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+    conn.close()
+
+    router = ShardRouter(source, shard_dir, shard_count)
+    by_path = {}
+    for user_id in user_ids:
+        by_path.setdefault(router.path_for(user_id), []).append(user_id)
+
+    report = {}
+    for path, users in sorted(by_path.items()):
+        shard = sqlite3.connect(path)
+        ensure_schema(shard)
+        shard.execute("ATTACH DATABASE ? AS src", (source,))
+        shard.execute("CREATE TEMP TABLE moving (user_id INTEGER PRIMARY KEY)")
+        shard.executemany("INSERT INTO moving VALUES (?)", [(u,) for u in users])
+
+        copied = {}
+        with shard:
+            for table in SHARDED_TABLES:
+                # 按列名复制，原数据库中后加的列顺序可能与schema.sql不同
+                columns = ", ".join(_columns(shard, "src", table))
+                shard.execute(
+                    f"DELETE FROM main.{table} WHERE user_id IN (SELECT user_id FROM moving)"
+                )
+                shard.execute(
+                    f"""INSERT INTO main.{table} ({columns})
+                        SELECT {columns} FROM src.{table}
+                        WHERE user_id IN (SELECT user_id FROM moving)"""
+                )
+                copied[table] = _count(shard, "main", table)
+
+        for table, count in copied.items():
+            expected = _count(shard, "src", table)
+            if count != expected:
+                shard.close()
+                raise RuntimeError(f"{path} 的 {table} 行数不一致: {count} != {expected}")
+        report[path] = copied
+
+        if purge:
+            with shard:
+                for table in SHARDED_TABLES:
+                    shard.execute(
+                        f"DELETE FROM src.{table} WHERE user_id IN (SELECT user_id FROM moving)"
+                    )
+        shard.close()
+
+    return report
+
+
+def _count(conn, schema, table):
+    return conn.execute(
+        f"SELECT COUNT(*) FROM {schema}.{table} WHERE user_id IN (SELECT user_id FROM moving)"
+    ).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把单个数据库拆分为按用户分片的数据库")
+    parser.add_argument("--database", default=DATABASE_PATH, help="原数据库（迁移后作为主数据库）")
+    parser.add_argument("--shards", type=int, required=True, help="分片数")
+    parser.add_argument("--shard-dir", help="分片文件目录（默认主数据库所在目录下的shards）")
+    parser.add_argument("--purge", action="store_true", help="核对无误后从原数据库删除已复制的数据")
+    args = parser.parse_args()
+
+    if args.shards < 1:
+        parser.error("分片数必须大于0")
+
+    report = shard_database(args.database, args.shards, args.shard_dir, args.purge)
+    for path, copied in report.items():
+        counts = ", ".join(f"{table} {count}" for table, count in copied.items())
+        print(f"{path}: {counts}")
+    print(f"迁移完成，共 {len(report)} 个分片" + ("，已清理原数据库" if args.purge else ""))
+
+
+if __name__ == "__main__":
+    main()
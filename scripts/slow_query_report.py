@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+慢查询报告
+
+从慢查询日志（logger cash_manager.slow_query输出的JSON行，可以带有日志格式的前缀）中
+按规范化的SQL汇总，输出总耗时最多的前N条语句：次数、总耗时、平均和最大耗时、
+主要来源的路由和查询计划，计划中有全表扫描或临时B树排序的语句标出。
+可以同时读取多个worker进程的日志。
+
+使用方法:
+python scripts/slow_query_report.py app.log
+python scripts/slow_query_report.py app.log app.log.1 --top 20
+docker-compose logs app | python scripts/slow_query_report.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.slow_queries import SlowQueryStats, format_report  # noqa: E402
+
+
+def read_records(lines):
+    """日志行中的慢查询记录，跳过其他日志"""
+    for line in lines:
+        start = line.find("{")
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(record, dict) and "sql" in record and "duration_ms" in record:
+            yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="慢查询报告")
+    parser.add_argument("files", nargs="*", help="日志文件（默认读取标准输入）")
+    parser.add_argument("--top", type=int, default=10, help="输出多少条语句")
+    parser.add_argument("--route", help="只统计来源包含该字符串的记录")
+    args = parser.parse_args()
+
+    stats = SlowQueryStats()
+    sources = [open(path, encoding="utf-8", errors="replace") for path in args.files]
+    try:
+        for source in sources or [sys.stdin]:
+            for record in read_records(source):
+                if args.route and args.route not in record.get("route", ""):
+                    continue
+                stats.add(record)
+    finally:
+        for source in sources:
+            source.close()
+
+    total = sum(entry["count"] for entry in stats.entries.values())
+    print(f"共 {total} 条慢查询记录，{len(stats.entries)} 条不同的语句\n")
+    print(format_report(stats.top(args.top)))
+
+
+if __name__ == "__main__":
+    main()
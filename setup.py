@@ -55,6 +55,12 @@ setup(
         "docker": [
             "gunicorn>=21.0.0",
         ],
+        "postgres": [
+            "psycopg[binary,pool]>=3.1",
+        ],
+        "analytics": [
+            "numpy>=1.22",
+        ],
     },
     entry_points={
         "console_scripts": [